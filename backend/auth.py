@@ -12,7 +12,8 @@ from uuid import UUID
 
 from database_tenant import get_session
 from models import User, UserRole
-from tenant_manager import get_current_tenant_id, require_tenant_access
+from models_master import PlatformAdmin
+from tenant_manager import get_current_tenant_id, get_master_session, require_tenant_access
 
 # Configuration JWT
 SECRET_KEY = "your-secret-key-change-in-production"  # TODO: Utiliser une variable d'environnement
@@ -234,3 +235,48 @@ require_recruteur = require_role([UserRole.RECRUTEUR, UserRole.MANAGER, UserRole
 require_client = require_role([UserRole.CLIENT, UserRole.ADMINISTRATEUR])
 require_admin = require_role([UserRole.ADMINISTRATEUR])
 
+
+
+# ==================== ADMINISTRATEURS DE LA PLATEFORME ====================
+
+def authenticate_platform_admin(email: str, password: str) -> Optional[PlatformAdmin]:
+    """Authentifie un administrateur de la plateforme (base MASTER)"""
+    with get_master_session() as master_session:
+        admin = master_session.exec(select(PlatformAdmin).where(PlatformAdmin.email == email)).first()
+        if not admin or not admin.is_active or not verify_password(password, admin.password_hash):
+            return None
+        admin.last_login_at = datetime.utcnow()
+        master_session.add(admin)
+        master_session.commit()
+        master_session.refresh(admin)
+        return admin
+
+
+def create_platform_access_token(admin: PlatformAdmin) -> str:
+    """Token d'un administrateur de la plateforme (sans company_id : aucun tenant n'est sélectionné)"""
+    return create_access_token({"sub": str(admin.id), "platform_admin": True, "role": admin.role})
+
+
+async def require_platform_admin(token: str = Depends(oauth2_scheme)) -> PlatformAdmin:
+    """Vérifie que le token est celui d'un administrateur de la plateforme actif"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if not payload.get("platform_admin") or payload.get("sub") is None:
+            raise credentials_exception
+        admin_id = UUID(payload["sub"])
+    except (JWTError, ValueError):
+        raise credentials_exception
+
+    with get_master_session() as master_session:
+        admin = master_session.get(PlatformAdmin, admin_id)
+    if admin is None or not admin.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé aux administrateurs de la plateforme"
+        )
+    return admin
@@ -45,6 +45,47 @@ class Settings(BaseSettings):
     # Stockage
     upload_dir: str = "uploads"
     max_upload_size: int = 10485760  # 10MB
+    upload_chunk_size: int = 65536  # 64KB par bloc lors de la copie des uploads
+    storage_backend: str = "local"  # local | s3
+    storage_local_root: str = "."  # Racine du pilote local (contient uploads/ et static/)
+
+    # Stockage objet compatible S3 (AWS, MinIO) si storage_backend = "s3"
+    s3_endpoint_url: Optional[str] = None  # Ex: http://minio:9000 (vide pour AWS)
+    s3_bucket: str = "recrutement"
+    s3_region: str = "us-east-1"
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+    s3_public_url: Optional[str] = None  # URL publique du bucket pour les photos (CDN)
+    s3_part_size: int = 8388608  # 8MB par partie d'upload multipart
+
+    # Service des fichiers par nginx (X-Accel-Redirect) et URLs signées
+    x_accel_redirect: bool = False  # Activer uniquement derrière nginx
+    x_accel_prefix: str = "/_protected"  # Location interne nginx
+    signed_url_ttl: int = 300  # Durée de validité minimale des URLs signées (secondes)
+
+    # Import en masse des candidats (CSV / JSON)
+    candidate_import_max_rows: int = 50000
+
+    # Tâches d'arrière-plan (aperçus de CV, précalculs)
+    background_workers: int = 2
+
+    # Cache des KPI (par processus, invalidé par la version des données du tenant)
+    kpi_cache_max_entries: int = 1000
+    kpi_cache_ttl: int = 300  # Au-delà (secondes), un résultat est recalculé même sans écriture
+    kpi_cache_max_stale: int = 3600  # Au-delà (secondes), un résultat périmé n'est plus servi
+
+    # Analyses IA des KPI (générées en arrière-plan)
+    kpi_ai_material_change: float = 0.1  # Écart relatif d'un KPI qui déclenche une nouvelle analyse
+    kpi_ai_task_timeout: int = 900  # Au-delà (secondes), une analyse en cours est considérée perdue
+
+    # Statistiques de la plateforme (requête exécutée en parallèle sur chaque base tenant)
+    platform_analytics_workers: int = 16  # Bases interrogées simultanément
+    platform_analytics_tenant_timeout: float = 5.0  # statement_timeout par base (secondes)
+    platform_analytics_timeout: float = 30.0  # Délai global d'un rapport (secondes)
+    platform_analytics_cache_ttl: int = 600  # Durée de conservation d'un rapport complet (secondes)
+
+    # Export analytique Parquet (scripts/export_analytics.py)
+    analytics_export_lag: int = 60  # Les lignes modifiées depuis moins longtemps (secondes) attendent l'export suivant
 
     class Config:
         env_file = ".env"
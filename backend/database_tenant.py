@@ -13,7 +13,8 @@ from models import (
     User, Job, Candidate, Interview, Application, Notification,
     JobHistory, ApplicationHistory, Offer, OnboardingChecklist,
     SecurityLog, Setting, Team, TeamMember, JobRecruiter,
-    ClientInterviewRequest, CandidateJobComparison
+    ClientInterviewRequest, ClientAvailabilitySlot, CandidateJobComparison,
+    KPIDailyRollup
 )
 
 logger = logging.getLogger(__name__)
@@ -15,8 +15,9 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
 from database_tenant import init_db
-from routers import jobs, candidates, auth, kpi, shortlists, notifications, interviews, offers, onboarding, history, admin, applications, teams, client_interview_requests
+from routers import jobs, candidates, auth, kpi, shortlists, notifications, interviews, offers, onboarding, history, admin, applications, teams, client_interview_requests, files, platform
 from tenant_manager import tenant_middleware
+from services import background
 
 # Configuration du logging
 logging.basicConfig(
@@ -43,8 +44,8 @@ async def lifespan(app: FastAPI):
 
     yield
 
-    # Shutdown (si nécessaire)
-    # Ajoutez ici du code de nettoyage si besoin
+    # Shutdown: ne pas attendre les tâches d'arrière-plan en cours
+    background.shutdown(wait=False)
 
 
 # Création de l'application FastAPI
@@ -139,6 +140,8 @@ app.include_router(applications.router, prefix="/api")
 app.include_router(client_interview_requests.router, prefix="/api")
 app.include_router(teams.router, prefix="/api")
 app.include_router(admin.router, prefix="/api")
+app.include_router(files.router, prefix="/api")
+app.include_router(platform.router, prefix="/api")
 
 # Servir les fichiers statiques (photos, CVs, etc.)
 static_dir = Path("static")
@@ -153,10 +156,10 @@ root_uploads_dir = Path("uploads")
 root_uploads_dir.mkdir(exist_ok=True)
 (root_uploads_dir / "cvs").mkdir(exist_ok=True)
 
-# Servir les fichiers statiques
+# Servir les fichiers statiques (photos de profil) ; en production nginx les sert directement
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-# Servir aussi le dossier uploads à la racine
-app.mount("/uploads", StaticFiles(directory=str(root_uploads_dir)), name="uploads")
+# Le dossier uploads (CVs) n'est PAS exposé : les CVs passent par les routes autorisées
+# (/api/candidates/{id}/cv) ou par des URLs signées (/api/files/signed)
 
 
 # Middleware global pour capturer toutes les exceptions non gérées
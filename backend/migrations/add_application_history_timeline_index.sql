@@ -0,0 +1,8 @@
+-- Migration pour les KPI calculés sur l'historique des candidatures
+-- Le cycle moyen par étape utilise LAG(created_at) OVER (PARTITION BY application_id ORDER BY created_at) :
+-- avec l'index (application_id, created_at), les changements de statut sont lus dans l'ordre de la fenêtre,
+-- sans tri de la table entière
+CREATE INDEX IF NOT EXISTS idx_application_history_app_created
+ON application_history (application_id, created_at);
+
+ANALYZE application_history;
@@ -0,0 +1,8 @@
+-- Migration pour le tableau kanban d'un besoin (GET /jobs/{job_id}/pipeline)
+-- Les candidatures d'un besoin sont lues dans l'ordre des colonnes et des cartes :
+-- row_number() OVER (PARTITION BY status ORDER BY updated_at DESC, id DESC) n'a pas de tri
+-- à effectuer, et le « voir plus » d'une colonne reprend directement après le curseur
+CREATE INDEX IF NOT EXISTS idx_applications_job_pipeline
+ON applications (job_id, status, updated_at DESC, id DESC);
+
+ANALYZE applications;
@@ -0,0 +1,10 @@
+-- Migration pour accélérer la détection des doublons de candidats
+-- Utilisée par la création unitaire (check_duplicate_candidate) et par l'import en masse,
+-- qui comparent les emails et les noms sans tenir compte de la casse
+CREATE INDEX IF NOT EXISTS idx_candidates_lower_email
+ON candidates (lower(email)) WHERE email IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_candidates_lower_name
+ON candidates (lower(first_name), lower(last_name));
+
+ANALYZE candidates;
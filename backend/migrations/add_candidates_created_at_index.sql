@@ -0,0 +1,4 @@
+-- Migration pour l'entonnoir de recrutement par cohorte (GET /kpi/funnel)
+-- Les cohortes sont les candidats créés dans la fenêtre demandée : l'index évite
+-- de parcourir toute la table pour quelques semaines ou mois de sourcing
+CREATE INDEX IF NOT EXISTS idx_candidates_created_at ON candidates (created_at);
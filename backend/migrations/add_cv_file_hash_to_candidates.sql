@@ -0,0 +1,5 @@
+-- Migration pour ajouter l'empreinte SHA-256 du CV à la table candidates
+-- Calculée pendant l'upload en streaming (sert aussi d'ETag pour les téléchargements)
+ALTER TABLE candidates
+ADD COLUMN IF NOT EXISTS cv_file_hash VARCHAR(64) NULL;
+COMMENT ON COLUMN candidates.cv_file_hash IS 'Empreinte SHA-256 du fichier CV';
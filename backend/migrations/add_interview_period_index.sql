@@ -0,0 +1,48 @@
+-- Migration pour le calendrier des entretiens (GET /interviews/calendar)
+-- et la détection des conflits d'agenda des interviewers
+-- La plage horaire d'un entretien est tsrange(scheduled_at, fin, '[)'), la fin valant
+-- scheduled_at + 1 heure si elle n'est pas renseignée (même expression que le code)
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- tsrange refuse une fin antérieure au début : ces fins incohérentes sont retirées
+-- (l'entretien reprend la durée par défaut), puis interdites
+UPDATE interviews SET scheduled_end_at = NULL WHERE scheduled_end_at <= scheduled_at;
+
+ALTER TABLE interviews DROP CONSTRAINT IF EXISTS interviews_period_check;
+ALTER TABLE interviews ADD CONSTRAINT interviews_period_check
+CHECK (scheduled_end_at IS NULL OR scheduled_end_at > scheduled_at);
+
+-- Vues semaine / mois : recherche de chevauchement (&&) sur la plage horaire
+CREATE INDEX IF NOT EXISTS idx_interviews_period
+ON interviews USING GIST (
+    tsrange(scheduled_at, COALESCE(scheduled_end_at, scheduled_at + interval '1 hour'), '[)')
+);
+
+-- Conflits et calendrier d'un interviewer : égalité sur l'interviewer + chevauchement
+CREATE INDEX IF NOT EXISTS idx_interviews_interviewer_period
+ON interviews USING GIST (
+    interviewer_id,
+    tsrange(scheduled_at, COALESCE(scheduled_end_at, scheduled_at + interval '1 hour'), '[)')
+)
+WHERE interviewer_id IS NOT NULL;
+
+-- Deux réservations simultanées du même créneau passent toutes deux la vérification
+-- applicative : la base refuse le chevauchement des entretiens actifs d'un interviewer
+-- (erreur 409 côté API). L'ajout échoue si des chevauchements existent déjà ; ils sont
+-- listés par la requête ci-dessous et doivent être replanifiés ou annulés avant.
+SELECT a.id, b.id AS overlapping_id, a.interviewer_id, a.scheduled_at, b.scheduled_at AS overlapping_at
+FROM interviews a
+JOIN interviews b ON b.interviewer_id = a.interviewer_id AND b.id > a.id
+WHERE a.status IN ('planifié', 'reporté') AND b.status IN ('planifié', 'reporté')
+AND tsrange(a.scheduled_at, COALESCE(a.scheduled_end_at, a.scheduled_at + interval '1 hour'), '[)')
+ && tsrange(b.scheduled_at, COALESCE(b.scheduled_end_at, b.scheduled_at + interval '1 hour'), '[)');
+
+ALTER TABLE interviews DROP CONSTRAINT IF EXISTS interviews_interviewer_no_overlap;
+ALTER TABLE interviews ADD CONSTRAINT interviews_interviewer_no_overlap
+EXCLUDE USING GIST (
+    interviewer_id WITH =,
+    tsrange(scheduled_at, COALESCE(scheduled_end_at, scheduled_at + interval '1 hour'), '[)') WITH &&
+)
+WHERE (interviewer_id IS NOT NULL AND status IN ('planifié', 'reporté'));
+
+ANALYZE interviews;
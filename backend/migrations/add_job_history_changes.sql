@@ -0,0 +1,41 @@
+-- Migration de l'historique des besoins en change-sets
+-- Une modification = une ligne de job_history, dont la colonne JSONB changes contient
+-- la liste des champs modifiés [{"field": ..., "old": ..., "new": ...}]
+BEGIN;
+
+ALTER TABLE job_history ADD COLUMN IF NOT EXISTS changes JSONB;
+
+-- Regrouper les lignes par champ existantes : une modification créait une ligne par champ,
+-- pour le même besoin, le même auteur et dans la même seconde. Les lignes sans besoin
+-- (job_id NULL après suppression) restent chacune leur propre modification
+CREATE TEMP TABLE job_history_changesets ON COMMIT DROP AS
+SELECT
+    (array_agg(id ORDER BY created_at, id))[1] AS keep_id,
+    min(created_at) AS created_at,
+    jsonb_agg(
+        jsonb_build_object('field', field_name, 'old', old_value, 'new', new_value)
+        ORDER BY created_at, id
+    ) AS changes
+FROM job_history
+WHERE changes IS NULL
+GROUP BY COALESCE(job_id::text, id::text), modified_by, date_trunc('second', created_at);
+
+UPDATE job_history h
+SET changes = c.changes,
+    created_at = c.created_at,
+    field_name = NULL,
+    old_value = NULL,
+    new_value = NULL
+FROM job_history_changesets c
+WHERE h.id = c.keep_id;
+
+-- Les autres lignes du groupe sont désormais incluses dans la ligne conservée
+DELETE FROM job_history WHERE changes IS NULL;
+
+-- Recherche par champ / valeur (opérateur @>), par ex. les besoins supprimés
+CREATE INDEX IF NOT EXISTS idx_job_history_changes
+ON job_history USING GIN (changes jsonb_path_ops);
+
+COMMIT;
+
+ANALYZE job_history;
@@ -0,0 +1,16 @@
+-- Migration pour la recherche des besoins par facettes (GET /jobs/search)
+-- Index couvrant des colonnes de facettes : les compteurs (GROUPING SETS) sont calculés
+-- par un parcours d'index seul, sans lire les lignes (et leurs grands champs texte)
+CREATE INDEX IF NOT EXISTS idx_jobs_facets
+ON jobs (status, department, contract_type, urgency, localisation, teletravail)
+INCLUDE (salaire_minimum, salaire_maximum, created_by, created_at);
+
+-- Filtre sur les compétences obligatoires (opérateur @>)
+CREATE INDEX IF NOT EXISTS idx_jobs_competences_obligatoires
+ON jobs USING GIN (competences_techniques_obligatoires);
+
+-- Filtres par facette hors statut (départements, contrats) sur de gros volumes
+CREATE INDEX IF NOT EXISTS idx_jobs_department ON jobs (department);
+CREATE INDEX IF NOT EXISTS idx_jobs_contract_type ON jobs (contract_type);
+
+ANALYZE jobs;
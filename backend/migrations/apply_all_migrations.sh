@@ -51,5 +51,137 @@ else
     exit 1
 fi
 
+# Migration 5: Ajouter cv_file_hash à candidates
+echo "📝 Migration 5: Ajout de cv_file_hash à la table candidates..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_cv_file_hash_to_candidates.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 5 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 5"
+    exit 1
+fi
+
+# Migration 6: Index de détection des doublons de candidats
+echo "📝 Migration 6: Ajout des index de détection des doublons sur la table candidates..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_candidate_dedup_indexes.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 6 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 6"
+    exit 1
+fi
+
+# Migration 7: Index de la recherche des besoins par facettes
+echo "📝 Migration 7: Ajout des index de recherche sur la table jobs..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_job_search_indexes.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 7 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 7"
+    exit 1
+fi
+
+# Migration 8: Historique des besoins en change-sets JSONB
+echo "📝 Migration 8: Conversion de l'historique des besoins (job_history) en change-sets..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_job_history_changes.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 8 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 8"
+    exit 1
+fi
+
+# Migration 9: Index du tableau kanban des besoins
+echo "📝 Migration 9: Ajout de l'index du tableau kanban sur la table applications..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_application_pipeline_index.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 9 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 9"
+    exit 1
+fi
+
+# Migration 10: Index des plages horaires des entretiens (calendrier, conflits)
+echo "📝 Migration 10: Ajout des index de plages horaires sur la table interviews..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_interview_period_index.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 10 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 10"
+    exit 1
+fi
+
+# Migration 11: Créneaux de disponibilité structurés des demandes d'entretien client
+echo "📝 Migration 11: Création de la table client_availability_slots..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/create_client_availability_slots_table.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 11 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 11"
+    exit 1
+fi
+
+# Migration 12: Index de l'historique des candidatures (cycle moyen par étape)
+echo "📝 Migration 12: Ajout de l'index (application_id, created_at) sur la table application_history..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_application_history_timeline_index.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 12 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 12"
+    exit 1
+fi
+
+# Migration 13: Agrégats KPI quotidiens
+echo "📝 Migration 13: Création de la table kpi_daily_rollups..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/create_kpi_daily_rollups_table.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 13 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 13"
+    exit 1
+fi
+
+# Migration 14: Version des données KPI
+echo "📝 Migration 14: Création de la séquence kpi_data_version..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/create_kpi_data_version_sequence.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 14 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 14"
+    exit 1
+fi
+
+# Migration 15: Index des cohortes de sourcing
+echo "📝 Migration 15: Index sur la date de création des candidats..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/add_candidates_created_at_index.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 15 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 15"
+    exit 1
+fi
+
+# Migration 16: Analyses IA des KPI
+echo "📝 Migration 16: Création de la table kpi_ai_analyses..."
+psql -h localhost -U postgres -d recrutement_db -f "$SCRIPT_DIR/create_kpi_ai_analyses_table.sql"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Migration 16 appliquée avec succès"
+else
+    echo "❌ Erreur lors de l'application de la migration 16"
+    exit 1
+fi
+
 echo "🎉 Toutes les migrations ont été appliquées avec succès !"
 
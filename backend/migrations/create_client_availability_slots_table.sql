@@ -0,0 +1,42 @@
+-- Migration pour stocker les créneaux de disponibilité des demandes d'entretien client
+-- en lignes (plages horaires interrogeables) au lieu de la seule chaîne JSON
+-- client_interview_requests.availability_slots (conservée pour l'affichage)
+CREATE TABLE IF NOT EXISTS client_availability_slots (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    request_id UUID NOT NULL REFERENCES client_interview_requests(id) ON DELETE CASCADE,
+    starts_at TIMESTAMP NOT NULL,
+    ends_at TIMESTAMP NOT NULL,
+    CONSTRAINT client_availability_slots_period_check CHECK (ends_at > starts_at)
+);
+
+CREATE INDEX IF NOT EXISTS idx_client_availability_slots_request_id
+ON client_availability_slots (request_id, starts_at);
+
+-- Recherche des créneaux par chevauchement (&&) de plages horaires
+CREATE INDEX IF NOT EXISTS idx_client_availability_slots_period
+ON client_availability_slots USING GIST (tsrange(starts_at, ends_at, '[)'));
+
+-- Reprise des créneaux des demandes existantes (les JSON illisibles sont ignorés)
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT id, availability_slots
+        FROM client_interview_requests cir
+        WHERE NOT EXISTS (SELECT 1 FROM client_availability_slots s WHERE s.request_id = cir.id)
+    LOOP
+        BEGIN
+            INSERT INTO client_availability_slots (request_id, starts_at, ends_at)
+            SELECT r.id,
+                   (slot->>'date')::date + (slot->>'start_time')::time,
+                   (slot->>'date')::date + (slot->>'end_time')::time
+            FROM jsonb_array_elements(r.availability_slots::jsonb) AS slot
+            WHERE (slot->>'end_time')::time > (slot->>'start_time')::time;
+        EXCEPTION WHEN others THEN
+            RAISE NOTICE 'Créneaux illisibles pour la demande %', r.id;
+        END;
+    END LOOP;
+END $$;
+
+ANALYZE client_availability_slots;
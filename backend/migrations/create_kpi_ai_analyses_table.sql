@@ -0,0 +1,22 @@
+-- Migration pour les analyses IA des KPI (/kpi/manager/ai-analysis, /kpi/recruiter/ai-analysis)
+-- Les analyses sont générées en arrière-plan (tâche planifiée scripts/refresh_kpi_ai_analyses.py,
+-- changement significatif des KPI ou rafraîchissement demandé) ; chaque ligne conserve
+-- l'instantané des KPI analysé et sert de suivi de tâche (identifiant retourné au client).
+CREATE TABLE IF NOT EXISTS kpi_ai_analyses (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    scope_key VARCHAR(40) NOT NULL,
+    role VARCHAR(20) NOT NULL,
+    filters TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    kpi_snapshot TEXT,
+    analysis_data TEXT,
+    data_version BIGINT,
+    error TEXT,
+    requested_by UUID REFERENCES users(id) ON DELETE SET NULL,
+    requested_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+-- Dernière analyse terminée (ou tâche en cours) d'un périmètre
+CREATE INDEX IF NOT EXISTS idx_kpi_ai_analyses_scope
+ON kpi_ai_analyses (scope_key, status, requested_at);
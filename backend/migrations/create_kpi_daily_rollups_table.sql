@@ -0,0 +1,44 @@
+-- Migration pour les agrégats KPI quotidiens (tableaux de bord /kpi/*)
+-- Une ligne par entité × jour de création × créateur × source × statut ; les jours sont
+-- recalculés après chaque écriture et par la tâche planifiée scripts/refresh_kpi_rollups.py.
+-- La première construction est lancée automatiquement au premier affichage des KPI
+-- (ou avec: python scripts/refresh_kpi_rollups.py --full)
+CREATE TABLE IF NOT EXISTS kpi_daily_rollups (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    entity VARCHAR(20) NOT NULL,
+    day DATE NOT NULL,
+    recruiter_id UUID,
+    source VARCHAR(100),
+    status VARCHAR(50),
+    count INTEGER NOT NULL DEFAULT 0,
+    first_created_at TIMESTAMP,
+    offers INTEGER NOT NULL DEFAULT 0,
+    shortlisted INTEGER NOT NULL DEFAULT 0,
+    shortlist_validated INTEGER NOT NULL DEFAULT 0,
+    budget_sum DOUBLE PRECISION,
+    budget_count INTEGER NOT NULL DEFAULT 0,
+    score_sum DOUBLE PRECISION,
+    score_count INTEGER NOT NULL DEFAULT 0,
+    feedbacks INTEGER NOT NULL DEFAULT 0,
+    feedbacks_on_time INTEGER NOT NULL DEFAULT 0,
+    feedback_delay_sum DOUBLE PRECISION,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Recalcul d'un jour (DELETE ... WHERE entity = ? AND day IN (...)) et lectures par période
+CREATE INDEX IF NOT EXISTS idx_kpi_daily_rollups_entity_day
+ON kpi_daily_rollups (entity, day);
+
+-- Lectures par recruteur (KPI recruteur, performance par recruteur)
+CREATE INDEX IF NOT EXISTS idx_kpi_daily_rollups_entity_recruiter
+ON kpi_daily_rollups (entity, recruiter_id, day);
+
+-- Jours à recalculer après une mise à jour en masse ou par la tâche planifiée
+-- (lignes modifiées depuis une date)
+CREATE INDEX IF NOT EXISTS idx_candidates_updated_at ON candidates (updated_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at);
+CREATE INDEX IF NOT EXISTS idx_applications_updated_at ON applications (updated_at);
+CREATE INDEX IF NOT EXISTS idx_interviews_updated_at ON interviews (updated_at);
+
+-- Reconstruction au prochain affichage des KPI (les agrégats sont vides)
+DELETE FROM settings WHERE key = 'kpi_rollups_built_at';
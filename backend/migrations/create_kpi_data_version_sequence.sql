@@ -0,0 +1,5 @@
+-- Migration pour la version des données KPI (cache des tableaux de bord /kpi/*)
+-- La séquence est incrémentée après chaque commit qui modifie candidats, besoins,
+-- candidatures, entretiens, historique ou utilisateurs ; les résultats KPI en cache
+-- restent valides tant qu'elle ne change pas.
+CREATE SEQUENCE IF NOT EXISTS kpi_data_version;
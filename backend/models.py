@@ -4,8 +4,8 @@ Modèles SQLModel pour la base de données
 from __future__ import annotations
 
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID, ARRAY
-from sqlalchemy import Column, ForeignKey, String, Text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, ARRAY, JSONB
+from sqlalchemy import Column, ForeignKey, Sequence, String, Text
 from typing import TYPE_CHECKING, List, Optional
 from datetime import datetime, date
 from enum import Enum
@@ -176,6 +176,7 @@ class Candidate(SQLModel, table=True):
     email: str | None = Field(default=None, max_length=255)
     phone: str | None = Field(default=None, max_length=100)
     cv_file_path: str | None = Field(default=None, max_length=500)
+    cv_file_hash: str | None = Field(default=None, max_length=64)  # Empreinte SHA-256 du CV (calculée à l'upload)
     profile_picture_url: str | None = Field(default=None, max_length=500)  # URL de la photo de profil
     # photo_url n'est pas mappé à la base de données, on utilise seulement profile_picture_url
     tags: list[str] | None = Field(default=None, sa_column=Column(ARRAY(Text)))  # PostgreSQL array (TEXT[])
@@ -282,9 +283,10 @@ class JobHistory(SQLModel, table=True):
     id: UUID | None = Field(default_factory=uuid4, sa_column=Column(PG_UUID(as_uuid=True), primary_key=True))
     job_id: UUID | None = Field(default=None, sa_column=Column(PG_UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="SET NULL")))
     modified_by: UUID = Field(sa_column=Column(PG_UUID(as_uuid=True), ForeignKey("users.id")))
-    field_name: str | None = Field(default=None, max_length=100)  # Champ modifié
+    field_name: str | None = Field(default=None, max_length=100)  # Champ modifié (lignes antérieures aux change-sets)
     old_value: str | None = Field(default=None)  # Ancienne valeur
     new_value: str | None = Field(default=None)  # Nouvelle valeur
+    changes: list[dict] | None = Field(default=None, sa_column=Column(JSONB))  # Champs modifiés : [{"field", "old", "new"}]
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     # Relationships
@@ -437,6 +439,16 @@ class ClientInterviewRequest(SQLModel, table=True):
     # et chargées manuellement si nécessaire dans les routers
 
 
+class ClientAvailabilitySlot(SQLModel, table=True):
+    """Modèle créneau de disponibilité d'une demande d'entretien client"""
+    __tablename__ = "client_availability_slots"
+    
+    id: UUID | None = Field(default_factory=uuid4, sa_column=Column(PG_UUID(as_uuid=True), primary_key=True))
+    request_id: UUID = Field(sa_column=Column(PG_UUID(as_uuid=True), ForeignKey("client_interview_requests.id", ondelete="CASCADE"), index=True))
+    starts_at: datetime  # Début du créneau
+    ends_at: datetime  # Fin du créneau (exclue)
+
+
 class CandidateJobComparison(SQLModel, table=True):
     """Modèle pour stocker les analyses IA de correspondance candidat-besoin"""
     __tablename__ = "candidate_job_comparisons"
@@ -453,6 +465,54 @@ class CandidateJobComparison(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class KPIDailyRollup(SQLModel, table=True):
+    """Agrégats KPI quotidiens (jour de création × recruteur × source × statut), recalculés par jour"""
+    __tablename__ = "kpi_daily_rollups"
+    
+    id: UUID | None = Field(default_factory=uuid4, sa_column=Column(PG_UUID(as_uuid=True), primary_key=True))
+    entity: str = Field(max_length=20)  # 'candidates', 'jobs', 'applications', 'interviews'
+    day: date  # Jour de création des lignes agrégées
+    recruiter_id: UUID | None = Field(default=None, sa_column=Column(PG_UUID(as_uuid=True)))  # Créateur des lignes
+    source: str | None = Field(default=None, max_length=100)  # Source du candidat
+    status: str | None = Field(default=None, max_length=50)
+    count: int = Field(default=0)
+    first_created_at: datetime | None = None  # Candidats : première création du groupe
+    offers: int = Field(default=0)  # Candidatures : offres envoyées
+    shortlisted: int = Field(default=0)  # Candidatures : en shortlist
+    shortlist_validated: int = Field(default=0)  # Candidatures : shortlist validée par le client
+    budget_sum: float | None = None  # Besoins : somme des budgets renseignés
+    budget_count: int = Field(default=0)
+    score_sum: float | None = None  # Entretiens : somme des scores renseignés
+    score_count: int = Field(default=0)
+    feedbacks: int = Field(default=0)  # Entretiens : feedbacks transmis
+    feedbacks_on_time: int = Field(default=0)  # Entretiens : feedbacks transmis dans le délai cible
+    feedback_delay_sum: float | None = None  # Entretiens : somme des délais de feedback (jours)
+    refreshed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class KPIAIAnalysis(SQLModel, table=True):
+    """Analyse IA des KPI d'un périmètre (rôle + filtres), générée en arrière-plan avec l'instantané analysé"""
+    __tablename__ = "kpi_ai_analyses"
+    
+    id: UUID | None = Field(default_factory=uuid4, sa_column=Column(PG_UUID(as_uuid=True), primary_key=True))
+    scope_key: str = Field(max_length=40, index=True)  # Empreinte du rôle et des filtres normalisés
+    role: str = Field(max_length=20)  # 'manager' ou 'recruteur'
+    filters: str = Field(sa_column=Column(Text))  # JSON des filtres normalisés
+    status: str = Field(default="pending", max_length=20)  # 'pending', 'running', 'done', 'failed'
+    kpi_snapshot: str | None = Field(default=None, sa_column=Column(Text))  # JSON des KPI et tendances analysés
+    analysis_data: str | None = Field(default=None, sa_column=Column(Text))  # JSON de KPIAnalysis
+    data_version: int | None = None  # Version des données KPI de l'instantané
+    error: str | None = Field(default=None, sa_column=Column(Text))
+    requested_by: UUID | None = Field(default=None, sa_column=Column(PG_UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL")))  # None : tâche planifiée
+    requested_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: datetime | None = None
+
+
+# Version des données KPI : incrémentée après chaque commit qui modifie les données des tableaux de bord
+# (services/kpi_cache.py). Une séquence évite tout verrou entre transactions concurrentes.
+KPI_DATA_VERSION = Sequence("kpi_data_version", metadata=SQLModel.metadata)
+
+
 # Ajouter la relation manager à Team après la définition de toutes les classes
 # pour éviter les problèmes de résolution de références forward
 Team.__annotations__["manager"] = "User"
@@ -5,12 +5,17 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlmodel import Session, select
 from typing import List, Optional
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 from database_tenant import get_session
 from models import Application, Candidate, Job, User
 from auth import get_current_active_user, require_recruteur
+from schemas import BULK_ACTION_MAX_ITEMS, BulkActionResponse
+from services.images import get_thumbnail_url
+from services.bulk_actions import (
+    PIPELINE_STATUSES, bulk_set_shortlist, bulk_update_application_status, record_status_changes
+)
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
@@ -27,6 +32,19 @@ class ApplicationStatusUpdate(BaseModel):
     status: str
 
 
+class ApplicationBulkStatusUpdate(BaseModel):
+    """Schéma pour déplacer un lot d'applications dans le pipeline"""
+    application_ids: List[UUID] = Field(..., min_length=1, max_length=BULK_ACTION_MAX_ITEMS)
+    status: str
+    notes: Optional[str] = None  # Commentaire enregistré dans l'historique
+
+
+class ApplicationBulkShortlistUpdate(BaseModel):
+    """Schéma pour ajouter / retirer un lot d'applications de la shortlist"""
+    application_ids: List[UUID] = Field(..., min_length=1, max_length=BULK_ACTION_MAX_ITEMS)
+    is_in_shortlist: bool
+
+
 class ApplicationResponse(BaseModel):
     """Schéma de réponse pour une application"""
     id: UUID
@@ -36,6 +54,7 @@ class ApplicationResponse(BaseModel):
     candidate_profile_title: Optional[str]
     candidate_years_of_experience: Optional[int]
     candidate_photo_url: Optional[str]
+    candidate_photo_thumbnail_url: Optional[str] = None
     job_id: UUID
     job_title: str
     status: str
@@ -113,6 +132,7 @@ def create_application(
         candidate_profile_title=candidate.profile_title,
         candidate_years_of_experience=candidate.years_of_experience,
         candidate_photo_url=candidate.profile_picture_url,
+        candidate_photo_thumbnail_url=get_thumbnail_url(candidate.profile_picture_url),
         job_id=new_application.job_id,
         job_title=job.title,
         status=new_application.status,
@@ -161,6 +181,7 @@ def get_job_applications(
             candidate_profile_title=candidate.profile_title if candidate else None,
             candidate_years_of_experience=candidate.years_of_experience if candidate else None,
             candidate_photo_url=candidate.profile_picture_url if candidate else None,
+            candidate_photo_thumbnail_url=get_thumbnail_url(candidate.profile_picture_url) if candidate else None,
             job_id=application.job_id,
             job_title=job.title,
             status=application.status,
@@ -214,6 +235,7 @@ def get_job_shortlist(
             candidate_profile_title=candidate.profile_title if candidate else None,
             candidate_years_of_experience=candidate.years_of_experience if candidate else None,
             candidate_photo_url=candidate.profile_picture_url if candidate else None,
+            candidate_photo_thumbnail_url=get_thumbnail_url(candidate.profile_picture_url) if candidate else None,
             job_id=application.job_id,
             job_title=job.title,
             status=application.status,
@@ -264,6 +286,7 @@ def get_candidate_applications(
             candidate_profile_title=candidate.profile_title,
             candidate_years_of_experience=candidate.years_of_experience,
             candidate_photo_url=candidate.profile_picture_url,
+            candidate_photo_thumbnail_url=get_thumbnail_url(candidate.profile_picture_url),
             job_id=application.job_id,
             job_title=job.title if job else "",
             status=application.status,
@@ -280,6 +303,48 @@ def get_candidate_applications(
     return result
 
 
+@router.post("/bulk/status", response_model=BulkActionResponse)
+def bulk_update_application_status_route(
+    data: ApplicationBulkStatusUpdate,
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Déplacer un lot d'applications dans le pipeline en une requête
+    
+    Mêmes effets que la modification unitaire (shortlist, statut du candidat).
+    Le passage en shortlist / offre exige un entretien avec feedback pour le candidat.
+    Chaque changement est enregistré dans l'historique des candidatures.
+    """
+    if data.status not in PIPELINE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Statut invalide. Statuts valides: {', '.join(PIPELINE_STATUSES)}"
+        )
+    
+    outcome = bulk_update_application_status(
+        session, data.application_ids, data.status, changed_by=current_user.id, notes=data.notes
+    )
+    return BulkActionResponse.model_validate(outcome.as_response())
+
+
+@router.post("/bulk/shortlist", response_model=BulkActionResponse)
+def bulk_set_shortlist_route(
+    data: ApplicationBulkShortlistUpdate,
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Ajouter un lot d'applications à la shortlist, ou les en retirer
+    
+    Contrairement à toggle-shortlist, l'état cible est explicite (sélections mixtes).
+    """
+    outcome = bulk_set_shortlist(
+        session, data.application_ids, data.is_in_shortlist, changed_by=current_user.id
+    )
+    return BulkActionResponse.model_validate(outcome.as_response())
+
+
 @router.patch("/{application_id}/toggle-shortlist", response_model=ApplicationResponse)
 def toggle_shortlist(
     application_id: UUID,
@@ -298,6 +363,7 @@ def toggle_shortlist(
         )
     
     # Basculer le statut de shortlist (toggle)
+    old_status = application.status
     application.is_in_shortlist = not application.is_in_shortlist
     if application.is_in_shortlist:
         application.status = "shortlist"
@@ -308,6 +374,9 @@ def toggle_shortlist(
     
     application.updated_at = datetime.utcnow()
     session.add(application)
+    record_status_changes(
+        session, [(application.id, old_status, application.status)], current_user.id, now=application.updated_at
+    )
     session.commit()
     session.refresh(application)
     
@@ -324,6 +393,7 @@ def toggle_shortlist(
         candidate_profile_title=candidate.profile_title if candidate else None,
         candidate_years_of_experience=candidate.years_of_experience if candidate else None,
         candidate_photo_url=candidate.profile_picture_url if candidate else None,
+        candidate_photo_thumbnail_url=get_thumbnail_url(candidate.profile_picture_url) if candidate else None,
         job_id=application.job_id,
         job_title=job.title if job else "",
         status=application.status,
@@ -404,6 +474,9 @@ def update_application_status(
             session.add(candidate)
     
     session.add(application)
+    record_status_changes(
+        session, [(application.id, old_status, new_status)], current_user.id, now=application.updated_at
+    )
     session.commit()
     session.refresh(application)
     
@@ -420,6 +493,7 @@ def update_application_status(
         candidate_profile_title=candidate.profile_title if candidate else None,
         candidate_years_of_experience=candidate.years_of_experience if candidate else None,
         candidate_photo_url=candidate.profile_picture_url if candidate else None,
+        candidate_photo_thumbnail_url=get_thumbnail_url(candidate.profile_picture_url) if candidate else None,
         job_id=application.job_id,
         job_title=job.title if job else "",
         status=application.status,
@@ -2,17 +2,16 @@
 Routes pour la gestion des candidats (US04)
 """
 import os
-import shutil
 import json
-import tempfile
-import base64
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from sqlalchemy import text, func
 from typing import List, Optional
 from uuid import UUID, uuid4
+from datetime import date, datetime
 
 # Imports pour l'extraction de texte
 try:
@@ -39,10 +38,33 @@ except ImportError:
     genai = None
     GeminiError = Exception
 
+from config import settings
 from database_tenant import get_session
-from models import Candidate, User, UserRole, Interview, Application, Job, CandidateJobComparison
-from schemas import CandidateCreate, CandidateUpdate, CandidateResponse, CandidateParseResponse, JobCandidateComparisonResponse
+from models import Candidate, User, UserRole, Application, Job, CandidateJobComparison
+from schemas import (
+    CandidateCreate, CandidateUpdate, CandidateResponse, CandidateParseResponse, JobCandidateComparisonResponse,
+    CandidateImportReport, CandidateBulkStatusUpdate, CandidateBulkTagsUpdate, BulkActionResponse
+)
 from auth import get_current_active_user, require_recruteur, require_client
+from services.uploads import save_upload_to_temp, store_upload, hash_stored_file
+from services.storage import get_storage
+from services.images import (
+    PHOTOS_DIR, PHOTOS_PREFIX, MIN_PORTRAIT_SIDE, EmbeddedImage, select_portrait, load_image_size,
+    store_profile_picture, generate_thumbnails, get_thumbnail_url
+)
+from services.downloads import send_stored_file
+from services.signed_urls import make_signed_url
+from services.projections import Projection
+from services.exports import build_candidate_export_query, iter_row_batches, stream_csv, stream_xlsx
+from services.imports import ImportFileError, parse_csv, parse_json, validate_rows, import_candidates
+from services.bulk_actions import (
+    PIPELINE_STATUSES, FEEDBACK_REQUIRED_MESSAGE, has_interview_feedback,
+    bulk_update_candidate_status, bulk_update_candidate_tags
+)
+from services.previews import (
+    PREVIEW_PAGES, PREVIEW_MEDIA_TYPE, can_preview, get_cv_version,
+    get_cached_previews, has_failed, schedule_cv_previews
+)
 
 router = APIRouter(prefix="/candidates", tags=["candidates"])
 
@@ -50,13 +72,47 @@ router = APIRouter(prefix="/candidates", tags=["candidates"])
 UPLOAD_DIR = Path("uploads/cvs")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# Dossier pour les photos de profil (dans static/uploads)
-PHOTOS_DIR = Path("static/uploads")
+# Dossier pour les photos de profil (dans static/uploads, défini par services.images)
 PHOTOS_DIR.mkdir(parents=True, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {".pdf", ".doc", ".docx"}
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 
+# Champs sélectionnables avec fields= / view=summary sur la liste des candidats
+CANDIDATE_PROJECTION = Projection(
+    model=CandidateResponse,
+    columns={
+        "id": Candidate.id,
+        "first_name": Candidate.first_name,
+        "last_name": Candidate.last_name,
+        "profile_title": Candidate.profile_title,
+        "years_of_experience": Candidate.years_of_experience,
+        "email": Candidate.email,
+        "phone": Candidate.phone,
+        "cv_file_path": Candidate.cv_file_path,
+        "profile_picture_url": Candidate.profile_picture_url,
+        "tags": Candidate.tags,
+        "skills": Candidate.skills,
+        "source": Candidate.source,
+        "status": Candidate.status,
+        "notes": Candidate.notes,
+        "created_by": Candidate.created_by,
+        "created_at": Candidate.created_at,
+        "updated_at": Candidate.updated_at,
+        "creator_first_name": select(User.first_name).where(User.id == Candidate.created_by).scalar_subquery(),
+        "creator_last_name": select(User.last_name).where(User.id == Candidate.created_by).scalar_subquery(),
+        "creator_email": select(User.email).where(User.id == Candidate.created_by).scalar_subquery(),
+    },
+    derived={
+        "photo_url": (("profile_picture_url",), lambda row: row["profile_picture_url"]),
+        "photo_thumbnail_url": (("profile_picture_url",), lambda row: get_thumbnail_url(row["profile_picture_url"])),
+    },
+    summary=(
+        "first_name", "last_name", "profile_title", "years_of_experience", "email", "phone",
+        "photo_thumbnail_url", "tags", "source", "status", "created_at",
+    ),
+)
+
 
 def is_allowed_file(filename: str) -> bool:
     """Vérifie si le fichier a une extension autorisée"""
@@ -188,71 +244,64 @@ def extract_text_from_docx(file_path: str) -> str:
         )
 
 
-def extract_image_from_pdf(file_path: str) -> Optional[str]:
-    """Extrait la première image d'un fichier PDF (généralement la photo de profil)"""
+def extract_image_from_pdf(file_path: str) -> Optional[bytes]:
+    """Extrait la photo de profil d'un fichier PDF (image la plus probable des 2 premières pages)"""
     if fitz is None:
         return None
     
     try:
         doc = fitz.open(file_path)
-        # Chercher la première image sur la première page (généralement où se trouve la photo)
+        images = []
+        # La photo se trouve généralement sur la première page
         for page_num in range(min(2, len(doc))):  # Vérifier les 2 premières pages
             page = doc[page_num]
-            image_list = page.get_images(full=True)
-            
-            for img_index, img in enumerate(image_list):
+            for img in page.get_images(full=True):
                 try:
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    image_ext = base_image["ext"]
-                    
-                    # Convertir en base64
-                    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                    # Retourner avec le préfixe data URI
-                    mime_type = f"image/{image_ext}" if image_ext != "jpg" else "image/jpeg"
-                    doc.close()
-                    return f"data:{mime_type};base64,{image_base64}"
-                except Exception as e:
+                    base_image = doc.extract_image(img[0])
+                    images.append(EmbeddedImage(
+                        data=base_image["image"],
+                        width=base_image.get("width", 0),
+                        height=base_image.get("height", 0),
+                        page=page_num,
+                    ))
+                except Exception:
                     continue
-        
         doc.close()
-        return None
-    except Exception as e:
+        
+        portrait = select_portrait(images)
+        return portrait.data if portrait else None
+    except Exception:
         return None
 
 
-def extract_image_from_docx(file_path: str) -> Optional[str]:
-    """Extrait la première image d'un document Word"""
+def extract_image_from_docx(file_path: str) -> Optional[bytes]:
+    """Extrait la photo de profil d'un document Word (image la plus probable)"""
     if Document is None:
         return None
     
     try:
         doc = Document(file_path)
+        images = []
         
-        # Parcourir les relations du document pour trouver les images
-        # Les images dans Word sont stockées dans les relations
+        # Les images dans Word sont stockées dans les relations du document
         for rel in doc.part.rels.values():
             if "image" in rel.target_ref:
                 try:
-                    image_part = rel.target_part
-                    image_bytes = image_part.blob
-                    
-                    # Convertir en base64
-                    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                    # Déterminer le type MIME
-                    content_type = image_part.content_type
-                    return f"data:{content_type};base64,{image_base64}"
-                except Exception as e:
+                    image_bytes = rel.target_part.blob
+                    # Sans dimensions connues, l'image reste candidate avec un score minimal
+                    width, height = load_image_size(image_bytes) or (MIN_PORTRAIT_SIDE, MIN_PORTRAIT_SIDE)
+                    images.append(EmbeddedImage(data=image_bytes, width=width, height=height))
+                except Exception:
                     continue
         
-        return None
-    except Exception as e:
+        portrait = select_portrait(images)
+        return portrait.data if portrait else None
+    except Exception:
         return None
 
 
-def extract_image_from_cv(file_path: str, file_extension: str) -> Optional[str]:
-    """Extrait la première image d'un CV (PDF ou Word)"""
+def extract_image_from_cv(file_path: str, file_extension: str) -> Optional[bytes]:
+    """Extrait la photo de profil d'un CV (PDF ou Word)"""
     try:
         if file_extension == ".pdf":
             return extract_image_from_pdf(file_path)
@@ -260,7 +309,7 @@ def extract_image_from_cv(file_path: str, file_extension: str) -> Optional[str]:
             return extract_image_from_docx(file_path)
         else:
             return None
-    except Exception as e:
+    except Exception:
         return None
 
 
@@ -274,45 +323,35 @@ async def extract_text_from_cv(file: UploadFile) -> tuple[str, str]:
     
     file_extension = Path(file.filename).suffix.lower()
     
-    # Créer un fichier temporaire
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-        tmp_path = tmp_file.name
-        try:
-            # Réinitialiser le pointeur du fichier
-            await file.seek(0)
-            
-            # Lire le contenu du fichier uploadé
-            content = await file.read()
-            
-            # Écrire le contenu dans le fichier temporaire
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # Extraire le texte selon le type de fichier
-            if file_extension == ".pdf":
-                text = extract_text_from_pdf(tmp_path)
-            elif file_extension in {".doc", ".docx"}:
-                text = extract_text_from_docx(tmp_path)
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Format de fichier non supporté: {file_extension}"
-                )
-            
-            return text, tmp_path
-        except HTTPException:
-            # Nettoyer le fichier temporaire en cas d'erreur
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-            raise
-        except Exception as e:
-            # Nettoyer le fichier temporaire en cas d'erreur
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+    # Copier l'upload par blocs dans un fichier temporaire (taille et type contrôlés)
+    stored = await save_upload_to_temp(file, ALLOWED_EXTENSIONS)
+    tmp_path = str(stored.path)
+    try:
+        # Extraire le texte selon le type de fichier
+        if file_extension == ".pdf":
+            text = extract_text_from_pdf(tmp_path)
+        elif file_extension in {".doc", ".docx"}:
+            text = extract_text_from_docx(tmp_path)
+        else:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erreur lors de l'extraction du texte du CV: {str(e)}"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Format de fichier non supporté: {file_extension}"
             )
+        
+        return text, tmp_path
+    except HTTPException:
+        # Nettoyer le fichier temporaire en cas d'erreur
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    except Exception as e:
+        # Nettoyer le fichier temporaire en cas d'erreur
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de l'extraction du texte du CV: {str(e)}"
+        )
 
 
 def parse_cv_with_llm(cv_text: str) -> dict:
@@ -505,22 +544,25 @@ async def upload_candidate_photo(
             detail=f"Format d'image non autorisé. Formats acceptés: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
         )
     
-    # Vérifier que le dossier de destination existe (sécurité bonus)
-    PHOTOS_DIR.mkdir(parents=True, exist_ok=True)
-    
     # Générer un nom de fichier unique
-    file_extension = Path(photo.filename).suffix
+    file_extension = Path(photo.filename).suffix.lower()
     unique_filename = f"{uuid4().hex}{file_extension}"
-    file_path = PHOTOS_DIR / unique_filename
+    photo_key = f"{PHOTOS_PREFIX}{unique_filename}"
     
-    # Sauvegarder le fichier
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(photo.file, buffer)
+    # Sauvegarder le fichier par blocs dans le stockage (taille maximale et type réel vérifiés)
+    await store_upload(photo, photo_key, ALLOWED_IMAGE_EXTENSIONS)
     
-    # Retourner l'URL relative (sera servie par FastAPI via /static)
-    photo_url = f"/static/uploads/{unique_filename}"
+    # Générer les miniatures dès l'upload (les listes ne chargent que celles-ci)
+    await run_in_threadpool(generate_thumbnails, photo_key)
     
-    return {"photo_url": photo_url, "filename": unique_filename}
+    # URL publique (/static/... en stockage local, servie par FastAPI ou nginx)
+    photo_url = get_storage().public_url(photo_key)
+    
+    return {
+        "photo_url": photo_url,
+        "thumbnail_url": get_thumbnail_url(photo_url),
+        "filename": unique_filename,
+    }
 
 
 @router.post("/parse-cv", response_model=CandidateParseResponse)
@@ -567,11 +609,13 @@ async def parse_cv(
                 detail="Le CV semble vide ou le texte n'a pas pu être extrait correctement"
             )
         
-        # Extraire l'image du CV
-        profile_picture_base64 = None
+        # Extraire la photo du CV et l'enregistrer en fichier (avec miniatures)
+        profile_picture_url = None
         if tmp_path and os.path.exists(tmp_path):
             try:
-                profile_picture_base64 = extract_image_from_cv(tmp_path, file_extension)
+                portrait_data = extract_image_from_cv(tmp_path, file_extension)
+                if portrait_data:
+                    profile_picture_url = await run_in_threadpool(store_profile_picture, portrait_data)
             except Exception as e:
                 # Si l'extraction d'image échoue, continuer sans image
                 import logging
@@ -611,7 +655,8 @@ async def parse_cv(
             skills=parsed_data.get("skills", []),
             source=parsed_data.get("source"),
             notes=parsed_data.get("notes"),
-            profile_picture_base64=profile_picture_base64
+            profile_picture_url=profile_picture_url,
+            profile_picture_thumbnail_url=get_thumbnail_url(profile_picture_url),
         )
         
         return response_data
@@ -685,6 +730,7 @@ async def create_candidate(
     
     # Gérer l'upload du CV
     cv_file_path = None
+    cv_file_hash = None
     if cv_file and cv_file.filename:
         if not is_allowed_file(cv_file.filename):
             raise HTTPException(
@@ -693,13 +739,13 @@ async def create_candidate(
             )
         
         # Générer un nom de fichier unique
-        file_extension = Path(cv_file.filename).suffix
+        file_extension = Path(cv_file.filename).suffix.lower()
         unique_filename = f"{uuid4().hex}{file_extension}"
-        cv_file_path = str(UPLOAD_DIR / unique_filename)
+        cv_file_path = (UPLOAD_DIR / unique_filename).as_posix()
         
-        # Sauvegarder le fichier
-        with open(cv_file_path, "wb") as buffer:
-            shutil.copyfileobj(cv_file.file, buffer)
+        # Sauvegarder le fichier par blocs dans le stockage en calculant son empreinte au passage
+        stored_cv = await store_upload(cv_file, cv_file_path, ALLOWED_EXTENSIONS)
+        cv_file_hash = stored_cv.sha256
     
     # Vérifier les doublons avant de créer le candidat
     existing_candidate = check_duplicate_candidate(
@@ -711,6 +757,9 @@ async def create_candidate(
     )
     
     if existing_candidate:
+        # Ne pas conserver le CV d'un candidat qui ne sera pas créé
+        if cv_file_path:
+            get_storage().delete(cv_file_path)
         # Si un candidat existe déjà, retourner une erreur avec les informations du candidat existant
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -733,6 +782,7 @@ async def create_candidate(
             email=email.strip() if email else None,
             phone=phone.strip() if phone else None,
             cv_file_path=cv_file_path,
+            cv_file_hash=cv_file_hash,
             profile_picture_url=profile_picture_url.strip() if profile_picture_url else None,
             # photo_url n'est pas stocké en DB, on utilise seulement profile_picture_url
             tags=tags_list if tags_list else None,  # S'assurer que None est utilisé si la liste est vide
@@ -747,6 +797,13 @@ async def create_candidate(
         session.commit()
         session.refresh(candidate)
         
+        # Préparer les aperçus du CV en arrière-plan
+        if candidate.cv_file_path:
+            schedule_cv_previews(
+                candidate.cv_file_path,
+                get_cv_version(candidate.cv_file_path, candidate.cv_file_hash)
+            )
+        
         # Normaliser la réponse comme dans get_candidate et list_candidates
         # Créer un dictionnaire avec toutes les valeurs
         creator_info = get_creator_info(candidate.created_by, session)
@@ -761,6 +818,7 @@ async def create_candidate(
             "cv_file_path": candidate.cv_file_path,
             "profile_picture_url": candidate.profile_picture_url,
             "photo_url": candidate.profile_picture_url,  # Alias de profile_picture_url (non mappé en DB)
+            "photo_thumbnail_url": get_thumbnail_url(candidate.profile_picture_url),  # Miniature pour les listes
             "tags": candidate.tags if candidate.tags else None,
             "skills": candidate.skills if candidate.skills else [],  # Convertir None en []
             "source": candidate.source,
@@ -792,6 +850,8 @@ def list_candidates(
     tag_filter: Optional[str] = Query(None, description="Filtrer par tag"),
     source_filter: Optional[str] = Query(None, description="Filtrer par source"),
     status_filter: Optional[str] = Query(None, description="Filtrer par statut"),
+    fields: Optional[str] = Query(None, description="Champs à retourner, séparés par des virgules (ex: first_name,last_name,status)"),
+    view: Optional[str] = Query(None, pattern="^(full|summary)$", description="summary: colonnes des tableaux uniquement"),
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
@@ -802,16 +862,24 @@ def list_candidates(
     - Client: Ne voit que les candidats en shortlist pour ses propres postes
     - Recruteur/Manager/Admin: Voit tous les candidats
     
+    Avec fields= ou view=summary, seules les colonnes demandées sont lues et retournées
+    (l'id est toujours inclus).
+    
     ⚠️ IMPORTANT : 
     - Le champ 'photo_url' n'existe PAS dans la base de données, c'est juste un alias de 'profile_picture_url' dans le schéma de réponse.
     - Si vous obtenez une erreur concernant 'profile_picture_url' ou 'skills', exécutez la migration SQL :
       psql -U postgres -d recrutement_db -c "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS profile_picture_url VARCHAR(500); ALTER TABLE candidates ADD COLUMN IF NOT EXISTS skills TEXT[];"
     """
+    selected_fields = CANDIDATE_PROJECTION.resolve(fields, view)
+    
     try:
         # IMPORTANT: select(Candidate) ne charge que les colonnes définies dans le modèle Candidate
         # Le modèle n'a PAS de champ 'photo_url', seulement 'profile_picture_url'
         # 'photo_url' est un alias ajouté dans le schéma de réponse (CandidateResponse)
-        statement = select(Candidate)
+        if selected_fields is None:
+            statement = select(Candidate)
+        else:
+            statement = select(*CANDIDATE_PROJECTION.select_columns(selected_fields)).select_from(Candidate)
         
         # Règle d'accès: Les clients ne voient que les candidats en shortlist pour leurs postes
         user_role = current_user.role if isinstance(current_user.role, str) else current_user.role.value
@@ -853,9 +921,17 @@ def list_candidates(
             # Filtre par statut
             if status_filter:
                 statement = statement.where(Candidate.status == status_filter)
+            
+            # Filtre par tag en SQL, avant la pagination
+            if tag_filter:
+                statement = statement.where(Candidate.tags.any(tag_filter))
         
         statement = statement.offset(skip).limit(limit).order_by(Candidate.created_at.desc())
         
+        if selected_fields is not None:
+            rows = session.execute(statement).mappings().all()
+            return CANDIDATE_PROJECTION.response(selected_fields, rows)
+        
         candidates = session.exec(statement).all()
         
         # Convertir explicitement en CandidateResponse pour éviter les problèmes de sérialisation
@@ -877,6 +953,7 @@ def list_candidates(
                     "cv_file_path": candidate.cv_file_path,
                     "profile_picture_url": candidate.profile_picture_url,
                     "photo_url": candidate.profile_picture_url,  # Alias pour compatibilité
+                    "photo_thumbnail_url": get_thumbnail_url(candidate.profile_picture_url),  # Miniature pour les listes
                     "tags": candidate.tags or [],
                     "skills": candidate.skills or [],
                     "source": candidate.source,
@@ -905,13 +982,6 @@ def list_candidates(
             logger.info(f"🔍 [DEBUG] Premier candidat - tags: {first_candidate.tags}")
             logger.info(f"🔍 [DEBUG] Premier candidat - status: {first_candidate.status}")
         
-        # Filtrer par tag en Python si nécessaire (pour éviter les problèmes SQL)
-        if tag_filter and user_role != UserRole.CLIENT.value:
-            candidates_list = [
-                c for c in candidates_list 
-                if c.tags and tag_filter in c.tags
-            ]
-        
         return candidates_list
     except Exception as e:
         import logging
@@ -999,6 +1069,8 @@ def list_candidates(
                         sql_query += f" AND source = '{source_filter.replace(chr(39), chr(39)+chr(39))}'"
                     if status_filter:
                         sql_query += f" AND status = '{status_filter.replace(chr(39), chr(39)+chr(39))}'"
+                    if tag_filter:
+                        sql_query += f" AND '{tag_filter.replace(chr(39), chr(39)+chr(39))}' = ANY(tags)"
                 
                 sql_query += f" ORDER BY created_at DESC LIMIT {limit} OFFSET {skip}"
                 
@@ -1051,13 +1123,6 @@ def list_candidates(
                         logger.warning(f"Erreur lors de la conversion d'une ligne: {row_error}, row length: {len(row) if hasattr(row, '__len__') else 'N/A'}")
                         continue
                 
-                # Filtrer par tag si nécessaire
-                if tag_filter and user_role != UserRole.CLIENT.value:
-                    candidates_response = [
-                        c for c in candidates_response 
-                        if c.get('tags') and tag_filter in c['tags']
-                    ]
-                
                 return candidates_response
                 
             except Exception as sql_error:
@@ -1079,6 +1144,155 @@ def list_candidates(
 
 
 # Routes spécifiques AVANT les routes génériques pour éviter les conflits de routage
+@router.post("/import", response_model=CandidateImportReport)
+def import_candidates_file(
+    file: UploadFile = File(..., description="Fichier CSV (en-têtes: prénom, nom, email, ...) ou tableau JSON"),
+    dry_run: bool = Query(False, description="Analyser le fichier sans créer les candidats"),
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Importer des candidats en masse depuis un fichier CSV ou JSON
+    
+    Les doublons (avec les candidats existants ou au sein du fichier) sont détectés
+    avec les mêmes règles que la création unitaire et ne sont pas créés.
+    Le rapport indique le résultat de chaque ligne.
+    """
+    extension = Path(file.filename or "").suffix.lower()
+    if extension not in {".csv", ".json"}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Format de fichier non autorisé. Formats acceptés: CSV, JSON"
+        )
+    
+    content = file.file.read(settings.max_upload_size + 1)
+    if len(content) > settings.max_upload_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Fichier trop volumineux (maximum {settings.max_upload_size // (1024 * 1024)}MB)"
+        )
+    
+    try:
+        records = parse_json(content) if extension == ".json" else parse_csv(content)
+    except ImportFileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if not records:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Le fichier ne contient aucun candidat")
+    if len(records) > settings.candidate_import_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trop de lignes ({len(records)}), maximum {settings.candidate_import_max_rows} par import"
+        )
+    
+    rows = validate_rows(records)
+    try:
+        results = import_candidates(session, rows, created_by=current_user.id, dry_run=dry_run)
+    except Exception as e:
+        session.rollback()
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Erreur lors de l'import des candidats: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de l'import des candidats: {str(e)}"
+        )
+    
+    return CandidateImportReport(
+        total=len(results),
+        created=sum(1 for result in results if result["status"] == "créé"),
+        duplicates=sum(1 for result in results if result["status"] == "doublon"),
+        invalid=sum(1 for result in results if result["status"] == "invalide"),
+        dry_run=dry_run,
+        rows=results,
+    )
+
+
+@router.get("/export")
+def export_candidates(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Format du fichier: csv ou xlsx"),
+    tag_filter: Optional[str] = Query(None, description="Filtrer par tag"),
+    source_filter: Optional[str] = Query(None, description="Filtrer par source"),
+    status_filter: Optional[str] = Query(None, description="Filtrer par statut"),
+    job_id: Optional[UUID] = Query(None, description="Candidats ayant postulé à ce besoin"),
+    created_from: Optional[date] = Query(None, description="Créés à partir de cette date"),
+    created_to: Optional[date] = Query(None, description="Créés jusqu'à cette date (incluse)"),
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Exporter les candidats filtrés avec leurs candidatures (une ligne par candidature)
+    
+    Le fichier est produit en streaming à partir d'un curseur côté serveur :
+    la mémoire utilisée est constante et le téléchargement commence immédiatement.
+    """
+    statement = build_candidate_export_query(
+        status_filter=status_filter,
+        source_filter=source_filter,
+        tag_filter=tag_filter,
+        job_id=job_id,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    # La session de la requête est fermée avant l'envoi du corps : l'export utilise sa propre connexion
+    batches = iter_row_batches(session.get_bind(), statement)
+    
+    filename = f"candidats_{datetime.utcnow():%Y%m%d_%H%M}.{format}"
+    if format == "xlsx":
+        body = stream_xlsx(batches)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = stream_csv(batches)
+        media_type = "text/csv; charset=utf-8"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/bulk/status", response_model=BulkActionResponse)
+def bulk_update_candidate_status_route(
+    data: CandidateBulkStatusUpdate,
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Changer le statut d'un lot de candidats en une requête
+    
+    Même règle que la modification unitaire : le passage en shortlist / offre exige
+    un entretien avec feedback. Les candidats refusés sont listés avec leur motif.
+    """
+    if data.status not in PIPELINE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Statut invalide. Statuts valides: {', '.join(PIPELINE_STATUSES)}"
+        )
+    
+    outcome = bulk_update_candidate_status(session, data.candidate_ids, data.status)
+    return BulkActionResponse.model_validate(outcome.as_response())
+
+
+@router.post("/bulk/tags", response_model=BulkActionResponse)
+def bulk_update_candidate_tags_route(
+    data: CandidateBulkTagsUpdate,
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Ajouter et / ou retirer des tags sur un lot de candidats en une requête
+    """
+    if not data.add and not data.remove:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Aucun tag à ajouter ou à retirer"
+        )
+    
+    outcome = bulk_update_candidate_tags(session, data.candidate_ids, add=data.add, remove=data.remove)
+    return BulkActionResponse.model_validate(outcome.as_response())
+
+
 @router.patch("/{candidate_id}/status", response_model=CandidateResponse)
 def update_candidate_status(
     candidate_id: UUID,
@@ -1104,37 +1318,12 @@ def update_candidate_status(
     
     # Vérifier si le changement de statut nécessite un feedback
     if new_status in ["shortlist", "offre"] and candidate.status not in ["shortlist", "offre"]:
-        # Trouver les applications de ce candidat
-        applications_statement = select(Application).where(Application.candidate_id == candidate_id)
-        applications = session.exec(applications_statement).all()
-        
-        if not applications:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Veuillez saisir un feedback avant de changer le statut"
-            )
-        
         # Vérifier qu'il existe au moins un entretien avec un feedback non vide pour ce candidat
-        has_feedback = False
-        for app in applications:
-            # Vérifier les entretiens avec feedback non null et non vide
-            interviews_statement = select(Interview).where(
-                Interview.application_id == app.id
-            )
-            all_interviews = session.exec(interviews_statement).all()
-            
-            for interview in all_interviews:
-                if interview.feedback and interview.feedback.strip():
-                    has_feedback = True
-                    break
-            
-            if has_feedback:
-                break
-        
+        has_feedback = session.exec(select(has_interview_feedback(candidate_id))).one()
         if not has_feedback:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Veuillez saisir un feedback avant de changer le statut"
+                detail=FEEDBACK_REQUIRED_MESSAGE
             )
     
     candidate.status = new_status
@@ -1155,6 +1344,7 @@ def update_candidate_status(
         "cv_file_path": candidate.cv_file_path,
         "profile_picture_url": candidate.profile_picture_url,
         "photo_url": candidate.profile_picture_url,  # Alias de profile_picture_url (non mappé en DB)
+        "photo_thumbnail_url": get_thumbnail_url(candidate.profile_picture_url),  # Miniature pour les listes
         "tags": candidate.tags if candidate.tags else None,
         "skills": candidate.skills if candidate.skills else [],  # Convertir None en []
         "source": candidate.source,
@@ -1205,6 +1395,7 @@ def get_candidate(
             "cv_file_path": candidate.cv_file_path,
             "profile_picture_url": candidate.profile_picture_url,
             "photo_url": candidate.profile_picture_url,  # Alias de profile_picture_url (non mappé en DB)
+            "photo_thumbnail_url": get_thumbnail_url(candidate.profile_picture_url),  # Miniature pour les listes
             "tags": candidate.tags if candidate.tags else None,
             "skills": candidate.skills if candidate.skills else [],  # Convertir None en []
             "source": candidate.source,
@@ -1274,6 +1465,7 @@ def update_candidate(
         "cv_file_path": candidate.cv_file_path,
         "profile_picture_url": candidate.profile_picture_url,
         "photo_url": candidate.profile_picture_url,  # Alias de profile_picture_url (non mappé en DB)
+        "photo_thumbnail_url": get_thumbnail_url(candidate.profile_picture_url),  # Miniature pour les listes
         "tags": candidate.tags if candidate.tags else None,
         "skills": candidate.skills if candidate.skills else [],  # Convertir None en []
         "source": candidate.source,
@@ -1289,13 +1481,25 @@ def update_candidate(
     return CandidateResponse.model_validate(candidate_dict)
 
 
+def get_cv_filename(candidate: Candidate) -> str:
+    """Nom proposé au téléchargement du CV"""
+    return f"CV_{candidate.first_name}_{candidate.last_name}{Path(candidate.cv_file_path).suffix}"
+
+
 @router.get("/{candidate_id}/cv", response_class=FileResponse)
 def download_cv(
     candidate_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
     """
     Télécharger le CV d'un candidat
+    
+    Supporte les requêtes conditionnelles (ETag basé sur l'empreinte du CV -> 304)
+    et les requêtes partielles (Range -> 206) pour l'affichage progressif des PDF.
+    Le type de contenu est détecté à partir du fichier.
+    Derrière nginx, le transfert est délégué via X-Accel-Redirect.
     """
     candidate = session.get(Candidate, candidate_id)
     if not candidate:
@@ -1304,16 +1508,141 @@ def download_cv(
             detail="Candidat non trouvé"
         )
     
-    if not candidate.cv_file_path or not os.path.exists(candidate.cv_file_path):
+    if not candidate.cv_file_path or not get_storage().exists(candidate.cv_file_path):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="CV non trouvé"
         )
     
-    return FileResponse(
-        path=candidate.cv_file_path,
-        filename=f"CV_{candidate.first_name}_{candidate.last_name}{Path(candidate.cv_file_path).suffix}",
-        media_type="application/pdf"
+    # CV antérieur au calcul d'empreinte à l'upload: calcul unique puis mémorisation
+    if not candidate.cv_file_hash:
+        candidate.cv_file_hash = hash_stored_file(candidate.cv_file_path)
+        session.add(candidate)
+        session.commit()
+    
+    return send_stored_file(
+        request,
+        candidate.cv_file_path,
+        filename=get_cv_filename(candidate),
+        content_hash=candidate.cv_file_hash,
+    )
+
+
+@router.get("/{candidate_id}/cv/url")
+def get_cv_signed_url(
+    candidate_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    URL signée et temporaire du CV d'un candidat
+    
+    L'URL ne nécessite pas d'en-tête Authorization : elle peut être utilisée
+    directement dans un lien, un <iframe> ou un <img>.
+    """
+    candidate = session.get(Candidate, candidate_id)
+    if not candidate:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Candidat non trouvé"
+        )
+    
+    if not candidate.cv_file_path or not get_storage().exists(candidate.cv_file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CV non trouvé"
+        )
+    
+    return {"url": make_signed_url(candidate.cv_file_path, filename=get_cv_filename(candidate))}
+
+
+@router.get("/{candidate_id}/cv/previews")
+def get_cv_previews(
+    candidate_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Aperçus (images des premières pages) du CV d'un candidat
+    
+    Retourne status="ready" avec les URLs signées des pages, "pending" si le rendu est en cours
+    (il est alors lancé en arrière-plan), "failed" si le rendu de cette version du CV a échoué,
+    ou "unavailable" si le CV ne peut pas être prévisualisé (absent ou document Word).
+    """
+    candidate = session.get(Candidate, candidate_id)
+    if not candidate:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Candidat non trouvé"
+        )
+    
+    if not can_preview(candidate.cv_file_path):
+        return {"status": "unavailable", "pages": []}
+    
+    version = get_cv_version(candidate.cv_file_path, candidate.cv_file_hash)
+    previews = get_cached_previews(candidate.cv_file_path, version)
+    if not previews:
+        if has_failed(candidate.cv_file_path, version):
+            return {"status": "failed", "pages": []}
+        schedule_cv_previews(candidate.cv_file_path, version)
+        return {"status": "pending", "pages": []}
+    
+    # URLs signées (utilisables dans un <img>) ; stables pendant la fenêtre de validité
+    return {
+        "status": "ready",
+        "pages": [make_signed_url(key) for key in previews],
+    }
+
+
+@router.get("/{candidate_id}/cv/preview/{page}")
+def get_cv_preview_page(
+    candidate_id: UUID,
+    page: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Image d'aperçu d'une page du CV (servie avec un cache navigateur longue durée)
+    
+    Retourne 202 si l'aperçu est en cours de génération, 422 si son rendu a échoué.
+    """
+    candidate = session.get(Candidate, candidate_id)
+    if not candidate:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Candidat non trouvé"
+        )
+    
+    if page < 1 or page > PREVIEW_PAGES or not can_preview(candidate.cv_file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aperçu non disponible"
+        )
+    
+    version = get_cv_version(candidate.cv_file_path, candidate.cv_file_hash)
+    previews = get_cached_previews(candidate.cv_file_path, version)
+    if not previews:
+        if has_failed(candidate.cv_file_path, version):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Impossible de générer l'aperçu de ce CV"
+            )
+        schedule_cv_previews(candidate.cv_file_path, version)
+        return Response(status_code=status.HTTP_202_ACCEPTED, headers={"Retry-After": "2"})
+    
+    if page > len(previews):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aperçu non disponible"
+        )
+    
+    # Le nom du fichier change avec le contenu du CV : l'aperçu d'une version est immuable
+    return send_stored_file(
+        request,
+        previews[page - 1],
+        media_type=PREVIEW_MEDIA_TYPE,
+        cache_control="private, max-age=31536000, immutable"
     )
 
 
@@ -1492,24 +1821,25 @@ def compare_candidate_with_job(
         )
     
     # Vérifier que le candidat a un CV
-    if not candidate.cv_file_path or not os.path.exists(candidate.cv_file_path):
+    if not candidate.cv_file_path or not get_storage().exists(candidate.cv_file_path):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Le candidat doit avoir un CV pour effectuer l'analyse"
         )
     
-    # Extraire le texte du CV
+    # Extraire le texte du CV (copie locale temporaire si le stockage est distant)
     try:
         file_extension = Path(candidate.cv_file_path).suffix.lower()
-        if file_extension == ".pdf":
-            cv_text = extract_text_from_pdf(candidate.cv_file_path)
-        elif file_extension in {".doc", ".docx"}:
-            cv_text = extract_text_from_docx(candidate.cv_file_path)
-        else:
+        if file_extension not in {".pdf", ".doc", ".docx"}:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Format de CV non supporté: {file_extension}"
             )
+        with get_storage().open_local(candidate.cv_file_path) as local_cv_path:
+            if file_extension == ".pdf":
+                cv_text = extract_text_from_pdf(str(local_cv_path))
+            else:
+                cv_text = extract_text_from_docx(str(local_cv_path))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
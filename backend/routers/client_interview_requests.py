@@ -1,8 +1,8 @@
 """
 Routes pour la gestion des demandes d'entretien client avec disponibilités
 """
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
 from typing import List, Optional
 from uuid import UUID
@@ -10,8 +10,9 @@ from pydantic import BaseModel, ConfigDict, Field
 import json
 
 from database_tenant import get_session
-from models import User, UserRole, ClientInterviewRequest, Application, Candidate, Job, Interview
+from models import User, UserRole, ClientInterviewRequest, ClientAvailabilitySlot, Application, Candidate, Job, Interview
 from auth import get_current_active_user
+from services.slot_matching import build_busy_query, build_slots_query, group_slots, match_slots, slot_interval
 
 router = APIRouter(prefix="/client-interview-requests", tags=["client-interview-requests"])
 
@@ -49,6 +50,20 @@ class ClientInterviewRequestResponse(BaseModel):
     updated_at: datetime
 
 
+class SlotSuggestion(BaseModel):
+    """Créneau proposé pour un entretien client"""
+    start: datetime
+    end: datetime
+    interviewer_id: UUID
+
+
+class RequestSlotSuggestions(BaseModel):
+    """Créneaux proposés pour une demande en attente"""
+    request_id: UUID
+    application_id: UUID
+    suggestions: List[SlotSuggestion]
+
+
 @router.post("/", response_model=ClientInterviewRequestResponse, status_code=status.HTTP_201_CREATED)
 def create_client_interview_request(
     request_data: ClientInterviewRequestCreate,
@@ -96,6 +111,12 @@ def create_client_interview_request(
             detail="Une demande d'entretien est déjà en attente pour ce candidat"
         )
     
+    # Plages des créneaux (erreur 400 si un créneau est invalide)
+    intervals = [
+        slot_interval(slot.date, slot.start_time, slot.end_time)
+        for slot in request_data.availability_slots
+    ]
+    
     # Convertir les créneaux en JSON
     availability_json = json.dumps([slot.model_dump() for slot in request_data.availability_slots])
     
@@ -109,6 +130,11 @@ def create_client_interview_request(
     )
     
     session.add(new_request)
+    # Créneaux structurés, utilisés pour les propositions de créneaux
+    session.add_all([
+        ClientAvailabilitySlot(request_id=new_request.id, starts_at=start, ends_at=end)
+        for start, end in intervals
+    ])
     session.commit()
     session.refresh(new_request)
     
@@ -159,6 +185,52 @@ def list_client_interview_requests(
     return [build_request_response(req, session) for req in requests]
 
 
+@router.get("/slot-suggestions", response_model=List[RequestSlotSuggestions])
+def suggest_interview_slots(
+    interviewer_id: List[UUID] = Query(..., description="Interviewers disponibles (plusieurs valeurs possibles)"),
+    duration_minutes: int = Query(60, ge=15, le=480, description="Durée de l'entretien en minutes"),
+    limit: int = Query(3, ge=1, le=10, description="Nombre de propositions par demande"),
+    request_id: List[UUID] = Query([], description="Demandes à traiter (par défaut : toutes les demandes en attente)"),
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Proposer des créneaux pour les demandes d'entretien client en attente
+    
+    Croise les disponibilités des clients avec les entretiens déjà planifiés des interviewers
+    et retourne, pour chaque demande (de la plus ancienne à la plus récente), les premiers
+    créneaux libres. Le premier créneau proposé à une demande n'est pas proposé aux suivantes.
+    """
+    user_role = current_user.role if isinstance(current_user.role, str) else current_user.role.value
+    if user_role not in [UserRole.RECRUTEUR.value, UserRole.MANAGER.value]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seuls les recruteurs et managers peuvent programmer un entretien"
+        )
+    
+    # Recruteurs : demandes pour les jobs qu'ils ont créés (comme la liste des demandes)
+    access = []
+    if user_role == UserRole.RECRUTEUR.value:
+        jobs_query = select(Job.id).where(Job.created_by == current_user.id)
+        access.append(ClientInterviewRequest.application_id.in_(
+            select(Application.id).where(Application.job_id.in_(jobs_query))
+        ))
+    
+    now = datetime.utcnow()
+    requests = group_slots(session.execute(build_slots_query(request_id, now, access)).mappings().all(), now)
+    if not requests:
+        return []
+    
+    # Occupations des interviewers sur l'ensemble des créneaux
+    window_start = min(start for request in requests for start, _ in request.slots)
+    window_end = max(end for request in requests for _, end in request.slots)
+    busy = {interviewer: [] for interviewer in dict.fromkeys(interviewer_id)}
+    for row in session.execute(build_busy_query(list(busy), window_start, window_end)).mappings():
+        busy[row["interviewer_id"]].append((row["scheduled_at"], row["busy_end"]))
+    
+    return match_slots(requests, busy, timedelta(minutes=duration_minutes), limit)
+
+
 @router.get("/{request_id}", response_model=ClientInterviewRequestResponse)
 def get_client_interview_request(
     request_id: UUID,
@@ -0,0 +1,52 @@
+"""
+Routes de téléchargement de fichiers par URL signée
+"""
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+
+from services.downloads import send_stored_file
+from services.signed_urls import to_storage_path, verify_signature
+from services.storage import get_storage
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+
+@router.get("/signed")
+def download_signed_file(
+    request: Request,
+    path: str = Query(..., description="Chemin de stockage du fichier"),
+    exp: int = Query(..., description="Date d'expiration (timestamp Unix)"),
+    sig: str = Query(..., description="Signature HMAC"),
+    name: Optional[str] = Query(None, description="Nom du fichier téléchargé"),
+):
+    """
+    Télécharger un fichier à partir d'une URL signée
+
+    Route publique (pas d'en-tête Authorization, utilisable dans un <img> ou un <iframe>) :
+    l'autorisation a été vérifiée à la création de l'URL, la signature en apporte la preuve.
+    """
+    if not verify_signature(path, exp, sig, name):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Lien expiré ou invalide"
+        )
+
+    try:
+        storage_path = to_storage_path(path)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fichier non trouvé"
+        )
+
+    if not get_storage().exists(storage_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fichier non trouvé"
+        )
+
+    # Le navigateur peut garder le fichier jusqu'à l'expiration du lien
+    max_age = max(exp - int(time.time()), 0)
+    return send_stored_file(request, storage_path, filename=name, cache_control=f"private, max-age={max_age}")
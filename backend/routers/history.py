@@ -1,16 +1,18 @@
 """
 Routes pour l'historique des modifications (US03, US06)
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 from pydantic import BaseModel, ConfigDict
 
 from database_tenant import get_session
 from models import User, UserRole, JobHistory, ApplicationHistory, Job, Application, Candidate
 from auth import get_current_active_user
+from services.job_history import changes_contain, expand_job_history
 
 router = APIRouter(prefix="/history", tags=["history"])
 
@@ -46,11 +48,15 @@ class ApplicationHistoryItem(BaseModel):
 @router.get("/jobs/{job_id}", response_model=List[JobHistoryItem])
 def get_job_history(
     job_id: UUID,
+    field_name: Optional[str] = Query(None, description="Ne retourner que l'historique de ce champ"),
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
     """
     Récupérer l'historique des modifications d'un besoin (US03)
+    
+    Chaque modification est stockée en une ligne (change-set) et redéployée en un
+    élément par champ modifié.
     """
     # Vérifier que le job existe
     job = session.get(Job, job_id)
@@ -62,21 +68,19 @@ def get_job_history(
     
     # Récupérer l'historique
     statement = select(JobHistory).where(JobHistory.job_id == job_id).order_by(JobHistory.created_at.desc())
-    history_items = session.exec(statement).all()
+    if field_name:
+        statement = statement.where(changes_contain(field=field_name))
+    history_items = expand_job_history(session.exec(statement).all(), field_name)
     
     # Construire les réponses avec les noms des utilisateurs
     results = []
     for item in history_items:
-        modifier = session.get(User, item.modified_by)
+        modifier = session.get(User, item["modified_by"])
         results.append({
-            "id": str(item.id),
-            "job_id": str(item.job_id),
-            "modified_by": str(item.modified_by),
+            **item,
+            "job_id": str(item["job_id"]),
+            "modified_by": str(item["modified_by"]),
             "modified_by_name": f"{modifier.first_name} {modifier.last_name}" if modifier else "",
-            "field_name": item.field_name,
-            "old_value": item.old_value,
-            "new_value": item.new_value,
-            "created_at": item.created_at
         })
     
     return results
@@ -199,12 +203,17 @@ def get_deleted_jobs(
     Retourne la liste des besoins qui ont été supprimés, basée sur l'historique.
     """
     # Récupérer toutes les entrées d'historique avec status "supprimé"
-    deletion_history = session.exec(
-        select(JobHistory).where(
-            JobHistory.field_name == "status", 
-            JobHistory.new_value == "supprimé"
-        ).order_by(JobHistory.created_at.desc())
-    ).all()
+    deletion_history = expand_job_history(
+        session.exec(
+            select(JobHistory)
+            .where(changes_contain(field="status", new="supprimé"))
+            .order_by(JobHistory.created_at.desc())
+        ).all(),
+        "status"
+    )
+    deletion_history = [
+        SimpleNamespace(**item) for item in deletion_history if item["new_value"] == "supprimé"
+    ]
     
     if not deletion_history:
         return []
@@ -238,7 +247,7 @@ def get_deleted_jobs(
             time_window_start = deletion_entry.created_at - timedelta(seconds=10)
             time_window_end = deletion_entry.created_at + timedelta(seconds=10)
             
-            similar_entries = session.exec(
+            similar_entries = expand_job_history(session.exec(
                 select(JobHistory)
                 .where(
                     JobHistory.modified_by == deletion_entry.modified_by,
@@ -246,13 +255,13 @@ def get_deleted_jobs(
                     JobHistory.created_at <= time_window_end
                 )
                 .order_by(JobHistory.created_at.desc())
-            ).all()
+            ).all())
             
             for entry in similar_entries:
-                if entry.field_name == "title":
-                    title = entry.new_value or entry.old_value or title
-                if entry.field_name == "department":
-                    department = entry.new_value or entry.old_value or department
+                if entry["field_name"] == "title":
+                    title = entry["new_value"] or entry["old_value"] or title
+                if entry["field_name"] == "department":
+                    department = entry["new_value"] or entry["old_value"] or department
             
             results.append({
                 "job_id": entry_id,  # Utiliser l'ID de l'entrée comme identifiant
@@ -278,11 +287,14 @@ def get_deleted_jobs(
             processed_job_ids.add(job_id)
             
             # Récupérer toutes les entrées d'historique pour ce job
-            all_history = session.exec(
-                select(JobHistory)
-                .where(JobHistory.job_id == job_id)
-                .order_by(JobHistory.created_at.desc())
-            ).all()
+            all_history = [
+                SimpleNamespace(**item)
+                for item in expand_job_history(session.exec(
+                    select(JobHistory)
+                    .where(JobHistory.job_id == job_id)
+                    .order_by(JobHistory.created_at.desc())
+                ).all())
+            ]
             
             # Si aucune entrée trouvée, utiliser uniquement l'entrée de suppression
             if not all_history:
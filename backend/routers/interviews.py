@@ -11,6 +11,10 @@ from pydantic import BaseModel, ConfigDict, Field, field_validator
 from database_tenant import get_session
 from models import User, UserRole, Interview, Application, Candidate, Job
 from auth import get_current_active_user, require_recruteur
+from services.interview_calendar import (
+    ACTIVE_INTERVIEW_STATUSES, MAX_CALENDAR_RANGE, build_calendar_query, check_interviewer_availability,
+    save_interview
+)
 
 router = APIRouter(prefix="/interviews", tags=["interviews"])
 
@@ -105,6 +109,23 @@ class InterviewResponse(BaseModel):
     updated_at: datetime
 
 
+class CalendarInterview(BaseModel):
+    """Entretien affiché dans le calendrier"""
+    id: UUID
+    application_id: UUID
+    interview_type: str
+    status: Optional[str]
+    scheduled_at: datetime
+    scheduled_end_at: Optional[datetime]
+    location: Optional[str]
+    meeting_link: Optional[str]
+    interviewer_id: Optional[UUID]
+    interviewer_name: Optional[str]
+    candidate_name: str
+    job_id: UUID
+    job_title: str
+
+
 def build_interview_response(interview: Interview, session: Session) -> dict:
     """Helper pour construire une réponse InterviewResponse"""
     try:
@@ -215,6 +236,11 @@ def create_interview(
                 detail="Interviewer non trouvé"
             )
     
+    # Vérifier que l'interviewer est disponible sur le créneau
+    check_interviewer_availability(
+        session, interview_data.interviewer_id, interview_data.scheduled_at, interview_data.scheduled_end_at
+    )
+    
     try:
         # Créer l'entretien
         new_interview = Interview(
@@ -228,11 +254,11 @@ def create_interview(
             created_by=current_user.id
         )
         
-        session.add(new_interview)
-        session.commit()
-        session.refresh(new_interview)
+        save_interview(session, new_interview)
         
         return build_interview_response(new_interview, session)
+    except HTTPException:
+        raise
     except Exception as e:
         session.rollback()
         import logging
@@ -327,6 +353,37 @@ def list_interviews(
         )
 
 
+@router.get("/calendar", response_model=List[CalendarInterview])
+def get_interview_calendar(
+    start: datetime = Query(..., description="Début de la fenêtre (inclus)"),
+    end: datetime = Query(..., description="Fin de la fenêtre (exclue)"),
+    interviewer_id: List[UUID] = Query([], description="Interviewers (plusieurs valeurs possibles)"),
+    job_id: Optional[UUID] = Query(None, description="Filtrer par job"),
+    include_cancelled: bool = Query(False, description="Inclure les entretiens annulés"),
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Calendrier des entretiens sur une fenêtre (vue semaine ou mois)
+    
+    Retourne les entretiens dont la plage horaire chevauche [start, end), triés par date,
+    en une requête sur l'index des plages horaires.
+    """
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fin de la fenêtre doit être postérieure à son début"
+        )
+    if end - start > MAX_CALENDAR_RANGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La fenêtre du calendrier est limitée à {MAX_CALENDAR_RANGE.days} jours"
+        )
+    
+    statement = build_calendar_query(start, end, interviewer_id, job_id, include_cancelled)
+    return session.execute(statement).mappings().all()
+
+
 @router.get("/{interview_id}", response_model=InterviewResponse)
 def get_interview(
     interview_id: UUID,
@@ -420,6 +477,25 @@ def update_interview(
                 detail="Interviewer non trouvé"
             )
     
+    # Nouveau créneau : si seul le début change, la fin est décalée en gardant la même durée
+    scheduled_at = interview_data.scheduled_at or interview.scheduled_at
+    scheduled_end_at = interview_data.scheduled_end_at
+    if scheduled_end_at is None and interview.scheduled_end_at:
+        scheduled_end_at = scheduled_at + (interview.scheduled_end_at - interview.scheduled_at)
+    
+    # Vérifier que l'interviewer est disponible si le créneau ou l'interviewer change
+    if (
+        interview.status in ACTIVE_INTERVIEW_STATUSES
+        and (interview_data.scheduled_at or interview_data.scheduled_end_at or interview_data.interviewer_id)
+    ):
+        check_interviewer_availability(
+            session,
+            interview_data.interviewer_id or interview.interviewer_id,
+            scheduled_at,
+            scheduled_end_at,
+            exclude_id=interview.id
+        )
+    
     # Mettre à jour les champs fournis
     if interview_data.interview_type is not None:
         # Vérifier que le type d'entretien est valide
@@ -430,10 +506,8 @@ def update_interview(
                 detail=f"Type d'entretien invalide. Types valides: {', '.join(valid_types)}"
             )
         interview.interview_type = interview_data.interview_type
-    if interview_data.scheduled_at is not None:
-        interview.scheduled_at = interview_data.scheduled_at
-    if interview_data.scheduled_end_at is not None:
-        interview.scheduled_end_at = interview_data.scheduled_end_at
+    interview.scheduled_at = scheduled_at
+    interview.scheduled_end_at = scheduled_end_at
     if interview_data.location is not None:
         interview.location = interview_data.location
     if interview_data.interviewer_id is not None:
@@ -443,9 +517,7 @@ def update_interview(
     
     interview.updated_at = datetime.utcnow()
     
-    session.add(interview)
-    session.commit()
-    session.refresh(interview)
+    save_interview(session, interview)
     
     return build_interview_response(interview, session)
 
@@ -476,15 +548,24 @@ def update_interview_status(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="La nouvelle date (rescheduled_at) est requise pour reporter un entretien"
             )
+        # Ajuster la fin en gardant la même durée
+        rescheduled_end_at = None
+        if interview.scheduled_end_at:
+            duration = interview.scheduled_end_at - interview.scheduled_at
+            rescheduled_end_at = status_data.rescheduled_at + duration
+        
+        # Vérifier que l'interviewer est disponible sur le nouveau créneau
+        check_interviewer_availability(
+            session, interview.interviewer_id, status_data.rescheduled_at, rescheduled_end_at,
+            exclude_id=interview.id
+        )
+        
         interview.status = "reporté"
         interview.rescheduled_at = status_data.rescheduled_at
         interview.rescheduling_reason = status_data.rescheduling_reason
         # Mettre à jour la date planifiée
         interview.scheduled_at = status_data.rescheduled_at
-        if status_data.rescheduled_at and interview.scheduled_end_at:
-            # Ajuster la fin en gardant la même durée
-            duration = interview.scheduled_end_at - interview.scheduled_at
-            interview.scheduled_end_at = status_data.rescheduled_at + duration
+        interview.scheduled_end_at = rescheduled_end_at
     
     elif new_status == "annulé":
         if not status_data.cancellation_reason:
@@ -501,6 +582,12 @@ def update_interview_status(
         interview.completed_at = datetime.utcnow()
     
     elif new_status == "planifié":
+        # Un entretien annulé ou réalisé qui redevient planifié réoccupe son créneau
+        if interview.status not in ACTIVE_INTERVIEW_STATUSES:
+            check_interviewer_availability(
+                session, interview.interviewer_id, interview.scheduled_at, interview.scheduled_end_at,
+                exclude_id=interview.id
+            )
         interview.status = "planifié"
         # Réinitialiser les champs de report/annulation si on revient à planifié
         interview.rescheduled_at = None
@@ -510,9 +597,7 @@ def update_interview_status(
     
     interview.updated_at = datetime.utcnow()
     
-    session.add(interview)
-    session.commit()
-    session.refresh(interview)
+    save_interview(session, interview)
     
     return build_interview_response(interview, session)
 
@@ -1,26 +1,38 @@
 """
 Routes pour la gestion des besoins de recrutement (US01)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlmodel import Session, select, func
 from typing import List, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from pydantic import BaseModel
 
 from database_tenant import get_session, get_engine
 engine = get_engine  # Adapter pour compatibilité
 from models import Job, JobStatus, UrgencyLevel, User, UserRole, JobHistory, Application, JobRecruiter
-from schemas import JobCreate, JobUpdate, JobResponse, JobResponseWithCreator, JobSubmitForValidation
+from schemas import (
+    JobCreate, JobUpdate, JobResponse, JobResponseWithCreator, JobSubmitForValidation, JobSearchResponse,
+    JobPipelineResponse
+)
 from auth import get_current_active_user, require_recruteur, require_manager
+from services.uploads import save_upload_to_temp, CONTENT_TYPES, EXTENSION_KINDS
+from services.storage import get_storage
+from services.downloads import send_stored_file
+from services.projections import Projection
+from services.job_history import expand_job_history, history_change, record_job_changes, record_status_change
+from services.job_search import (
+    JobSearchFilters, job_access_conditions, build_facet_query, collect_facets, apply_search_filters
+)
+from services.job_pipeline import build_pipeline_query, build_columns, decode_cursor
+from services.bulk_actions import PIPELINE_STATUSES
 from datetime import datetime, date
 from sqlalchemy import text, inspect
 import logging
 from fastapi import UploadFile, File
 from pathlib import Path
-import tempfile
-import shutil
 import os
 import json
+from starlette.concurrency import run_in_threadpool
 
 # Imports pour l'extraction de texte
 try:
@@ -45,6 +57,36 @@ router = APIRouter(prefix="/jobs", tags=["jobs"])
 
 ALLOWED_EXTENSIONS = {".pdf", ".doc", ".docx"}
 
+# Champs sélectionnables avec fields= / view=summary sur la liste des besoins
+# (tous les champs de JobResponse sont des colonnes de la table jobs)
+JOB_PROJECTION = Projection(
+    model=JobResponse,
+    columns={name: getattr(Job, name) for name in JobResponse.model_fields},
+    summary=(
+        "title", "department", "entreprise", "contract_type", "urgency", "status",
+        "localisation", "date_prise_poste", "created_by", "created_at", "updated_at",
+    ),
+)
+
+# Fiches de poste conservées dans le stockage (clé enregistrée dans job_description_file_path)
+JOB_DESCRIPTIONS_PREFIX = "uploads/job_descriptions/"
+
+
+def check_job_description_key(file_path: Optional[str]) -> None:
+    """Refuse un chemin de fiche de poste qui ne provient pas de /jobs/parse-job-description"""
+    if file_path and (not file_path.startswith(JOB_DESCRIPTIONS_PREFIX) or ".." in file_path):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chemin de fiche de poste invalide"
+        )
+
+
+def store_job_description(tmp_path: str, extension: str) -> str:
+    """Conserve la fiche de poste uploadée dans le stockage et retourne sa clé"""
+    key = f"{JOB_DESCRIPTIONS_PREFIX}{uuid4().hex}{extension}"
+    get_storage().write_file(key, Path(tmp_path), content_type=CONTENT_TYPES.get(EXTENSION_KINDS.get(extension)))
+    return key
+
 
 def is_allowed_file(filename: str) -> bool:
     """Vérifie si le fichier a une extension autorisée"""
@@ -96,34 +138,27 @@ async def extract_text_from_job_description(file: UploadFile) -> tuple[str, str]
     """Extrait le texte brut d'une fiche de poste (PDF ou Word) et retourne aussi le chemin temporaire"""
     file_extension = Path(file.filename).suffix.lower()
     
-    # Créer un fichier temporaire
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-        tmp_path = tmp_file.name
-        try:
-            # Réinitialiser le pointeur du fichier
-            await file.seek(0)
-            # Lire le contenu du fichier uploadé
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # Extraire le texte selon le type de fichier
-            if file_extension == ".pdf":
-                text = extract_text_from_pdf(tmp_path)
-            elif file_extension in {".doc", ".docx"}:
-                text = extract_text_from_docx(tmp_path)
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Format de fichier non supporté: {file_extension}"
-                )
-            
-            return text, tmp_path
-        except HTTPException:
-            # Nettoyer le fichier temporaire en cas d'erreur
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-            raise
+    # Copier l'upload par blocs dans un fichier temporaire (taille et type contrôlés)
+    stored = await save_upload_to_temp(file, ALLOWED_EXTENSIONS)
+    tmp_path = str(stored.path)
+    try:
+        # Extraire le texte selon le type de fichier
+        if file_extension == ".pdf":
+            text = extract_text_from_pdf(tmp_path)
+        elif file_extension in {".doc", ".docx"}:
+            text = extract_text_from_docx(tmp_path)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Format de fichier non supporté: {file_extension}"
+            )
+        
+        return text, tmp_path
+    except HTTPException:
+        # Nettoyer le fichier temporaire en cas d'erreur
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
 
 
 def parse_job_description_with_llm(job_text: str) -> dict:
@@ -265,6 +300,7 @@ def create_job(
     - Si créé par un recruteur ou manager: statut "brouillon"
     - Si créé par un client: statut "en_attente_validation"
     """
+    check_job_description_key(job_data.job_description_file_path)
     try:
         # Utiliser l'utilisateur connecté
         created_by = current_user.id
@@ -367,16 +403,19 @@ async def parse_job_description(
         # Extraire le texte de la fiche de poste (sans IA)
         job_text, tmp_path = await extract_text_from_job_description(job_description_file)
         
-        # Nettoyer le fichier temporaire immédiatement après extraction
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-        
         if not job_text or not job_text.strip():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Impossible d'extraire le texte du fichier. Vérifiez que le fichier n'est pas vide ou corrompu."
             )
         
+        # Conserver la fiche de poste dans le stockage, puis nettoyer le fichier temporaire
+        job_description_file_path = await run_in_threadpool(
+            store_job_description, tmp_path, Path(job_description_file.filename).suffix.lower()
+        )
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        
         # Préparer les données avec le texte extrait dans missions_principales
         # L'utilisateur pourra compléter les autres champs manuellement
         parsed_data = {
@@ -461,6 +500,7 @@ async def parse_job_description(
             salaire_maximum=parsed_data.get("salaire_maximum"),
             avantages=parsed_data.get("avantages", []),
             evolution_poste=parsed_data.get("evolution_poste"),
+            job_description_file_path=job_description_file_path,
         )
         
         return response_data
@@ -493,6 +533,8 @@ def list_jobs(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[JobStatus] = None,
+    fields: Optional[str] = Query(None, description="Champs à retourner, séparés par des virgules (ex: title,status,urgency)"),
+    view: Optional[str] = Query(None, pattern="^(full|summary)$", description="summary: colonnes des tableaux uniquement"),
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
@@ -502,27 +544,21 @@ def list_jobs(
     - Les recruteurs voient uniquement les besoins validés (statut "validé" ou "en_cours")
     - Les managers et admins voient tous les besoins
     - Les clients voient uniquement leurs propres besoins
+    
+    Avec fields= ou view=summary, seules les colonnes demandées sont lues et retournées
+    (sans les champs texte longs : missions, KPI, critères, ...). L'id est toujours inclus.
     """
+    selected_fields = JOB_PROJECTION.resolve(fields, view)
+    
     try:
-        statement = select(Job)
-        
-        # Filtrer selon le rôle de l'utilisateur
-        # Convertir le rôle en string pour la comparaison
-        user_role = current_user.role if isinstance(current_user.role, str) else current_user.role.value
+        if selected_fields is None:
+            statement = select(Job)
+        else:
+            statement = select(*JOB_PROJECTION.select_columns(selected_fields)).select_from(Job)
         
-        if user_role == UserRole.RECRUTEUR.value:
-            # Les recruteurs ne voient que les besoins validés qui leur sont attribués
-            statement = statement.join(
-                JobRecruiter, Job.id == JobRecruiter.job_id
-            ).where(
-                JobRecruiter.recruiter_id == current_user.id
-            ).where(
-                (Job.status == "validé") | (Job.status == "en_cours") | (Job.status == "clôturé")
-            )
-        elif user_role == UserRole.CLIENT.value:
-            # Les clients voient uniquement leurs propres besoins
-            statement = statement.where(Job.created_by == current_user.id)
-        # Les managers et admins voient tous les besoins (pas de filtre supplémentaire)
+        # Filtrer selon le rôle de l'utilisateur (recruteurs: besoins attribués validés,
+        # clients: leurs besoins, managers et admins: tous les besoins)
+        statement = statement.where(*job_access_conditions(current_user))
         
         if status_filter:
             status_value = status_filter.value if hasattr(status_filter, 'value') else str(status_filter)
@@ -530,6 +566,10 @@ def list_jobs(
         
         statement = statement.offset(skip).limit(limit).order_by(Job.created_at.desc())
         
+        if selected_fields is not None:
+            rows = session.execute(statement).mappings().all()
+            return JOB_PROJECTION.response(selected_fields, rows)
+        
         jobs = session.exec(statement).all()
         # Convertir explicitement en JobResponse pour éviter les problèmes de sérialisation
         return [JobResponse.model_validate(job) for job in jobs]
@@ -625,6 +665,65 @@ def list_jobs(
             )
 
 
+@router.get("/search", response_model=JobSearchResponse)
+def search_jobs(
+    status_values: List[str] = Query([], alias="status", description="Statuts (plusieurs valeurs possibles)"),
+    department: List[str] = Query([], description="Départements"),
+    contract_type: List[str] = Query([], description="Types de contrat"),
+    urgency: List[str] = Query([], description="Niveaux d'urgence"),
+    localisation: List[str] = Query([], description="Localisations"),
+    teletravail: List[str] = Query([], description="Modes de télétravail"),
+    salary_min: Optional[float] = Query(None, ge=0, description="Salaire minimum recherché"),
+    salary_max: Optional[float] = Query(None, ge=0, description="Salaire maximum recherché"),
+    skills: List[str] = Query([], description="Compétences obligatoires (toutes requises)"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Champs des résultats, séparés par des virgules"),
+    view: str = Query("summary", pattern="^(full|summary)$", description="Colonnes des résultats (summary par défaut)"),
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Rechercher des besoins par facettes
+    
+    Retourne une page de résultats, le total et, pour chaque facette, le nombre de besoins
+    par valeur (calculé en une requête, en appliquant tous les filtres sauf celui de la facette).
+    Mêmes règles de visibilité que la liste des besoins.
+    """
+    filters = JobSearchFilters(
+        facets={
+            "status": status_values,
+            "department": department,
+            "contract_type": contract_type,
+            "urgency": urgency,
+            "localisation": localisation,
+            "teletravail": teletravail,
+        },
+        salary_min=salary_min,
+        salary_max=salary_max,
+        skills=[skill.strip() for skill in skills if skill.strip()],
+    )
+    access = job_access_conditions(current_user)
+    selected_fields = JOB_PROJECTION.resolve(fields, view)
+    
+    counts = collect_facets(session.execute(build_facet_query(filters, access)).mappings().all())
+    
+    if selected_fields is None:
+        statement = apply_search_filters(select(Job), filters, access)
+    else:
+        statement = apply_search_filters(
+            select(*JOB_PROJECTION.select_columns(selected_fields)).select_from(Job), filters, access
+        )
+    statement = statement.order_by(Job.created_at.desc()).offset(skip).limit(limit)
+    
+    if selected_fields is None:
+        items = [JobResponse.model_validate(job).model_dump(mode="json") for job in session.exec(statement).all()]
+    else:
+        items = JOB_PROJECTION.serialize(selected_fields, session.execute(statement).mappings().all())
+    
+    return JobSearchResponse(total=counts["total"], items=items, facets=counts["facets"])
+
+
 @router.get("/pending-validation", response_model=List[JobResponse])
 def get_pending_validation_jobs(
     current_user: User = Depends(require_manager),
@@ -745,6 +844,37 @@ def get_pending_approval_jobs(
     return results
 
 
+@router.get("/{job_id}/job-description")
+def download_job_description(
+    job_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Télécharger la fiche de poste d'un besoin de recrutement
+    """
+    job = session.get(Job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Besoin de recrutement non trouvé"
+        )
+    
+    file_path = job.job_description_file_path
+    if not file_path or not file_path.startswith(JOB_DESCRIPTIONS_PREFIX) or not get_storage().exists(file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fiche de poste non trouvée"
+        )
+    
+    return send_stored_file(
+        request,
+        file_path,
+        filename=f"Fiche_de_poste_{job.title}{Path(file_path).suffix}",
+    )
+
+
 @router.get("/{job_id}", response_model=JobResponse)
 def get_job(
     job_id: UUID,
@@ -873,6 +1003,7 @@ def update_job(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Données de mise à jour invalides: {str(e)}"
         )
+    check_job_description_key(update_data.get("job_description_file_path"))
     
     # Mapping des noms de champs pour l'affichage dans l'historique
     field_labels = {
@@ -927,6 +1058,7 @@ def update_job(
             logger.warning(f"Erreur lors du formatage de la valeur {val}: {str(e)}")
             return str(val) if val is not None else None
     
+    history_changes = []
     for field, new_value in update_data.items():
         # Ignorer les champs système qui ne doivent pas être modifiés directement
         if field in ['created_by', 'validated_by', 'validated_at', 'closed_at', 'created_at', 'updated_at']:
@@ -972,25 +1104,11 @@ def update_job(
                 # Mettre à jour le champ
                 setattr(job, field, new_value)
                 
-                # Créer une entrée d'historique
+                # Ajouter le champ au change-set de la modification (tronqué aux limites de la base)
                 try:
-                    field_label = field_labels.get(field, field)
-                    # Limiter la longueur du field_name à 100 caractères (contrainte de la base)
-                    if len(field_label) > 100:
-                        field_label = field_label[:97] + "..."
-                    
-                    # Limiter la longueur des valeurs pour éviter les erreurs de base de données
-                    old_val = old_value_str[:5000] if old_value_str and len(old_value_str) > 5000 else old_value_str
-                    new_val = new_value_str[:5000] if new_value_str and len(new_value_str) > 5000 else new_value_str
-                    
-                    history_entry = JobHistory(
-                        job_id=job.id,
-                        modified_by=current_user.id,
-                        field_name=field_label,
-                        old_value=old_val,
-                        new_value=new_val
+                    history_changes.append(
+                        history_change(field_labels.get(field, field), old_value_str, new_value_str)
                     )
-                    session.add(history_entry)
                 except Exception as hist_error:
                     # Si l'historique échoue, on continue quand même avec la mise à jour
                     logger.warning(f"Impossible de créer l'entrée d'historique pour {field}: {str(hist_error)}", exc_info=True)
@@ -1000,6 +1118,9 @@ def update_job(
                 # Ne pas faire de rollback ici, on continue avec les autres champs
                 continue
     
+    # Une seule ligne d'historique pour l'ensemble des champs modifiés
+    record_job_changes(session, job.id, current_user.id, history_changes)
+    
     # Gestion spéciale du statut : permettre au manager de changer le statut
     # Si le statut est modifié et devient "validé", enregistrer validated_by et validated_at
     if 'status' in update_data:
@@ -1112,14 +1233,7 @@ def validate_job(
         job.validated_at = datetime.utcnow()
         
         # Enregistrer dans l'historique
-        history_entry = JobHistory(
-            job_id=job.id,
-            modified_by=current_user.id,
-            field_name="status",
-            old_value=old_status,
-            new_value="validé"
-        )
-        session.add(history_entry)
+        record_status_change(session, job.id, current_user.id, old_status, "validé")
         
         # Attribuer les recruteurs si fournis
         if validation.recruiter_ids:
@@ -1172,14 +1286,8 @@ def validate_job(
         job.validated_at = None
         
         # Enregistrer dans l'historique
-        history_entry = JobHistory(
-            job_id=job.id,
-            modified_by=current_user.id,
-            field_name="status",
-            old_value=old_status,
-            new_value=f"Rejeté: {validation.feedback}" if validation.feedback else "Rejeté"
-        )
-        session.add(history_entry)
+        rejection = f"Rejeté: {validation.feedback}" if validation.feedback else "Rejeté"
+        record_status_change(session, job.id, current_user.id, old_status, rejection)
         
         # TODO: Envoyer une notification au recruteur avec le feedback
     
@@ -1246,27 +1354,66 @@ def get_job_history(
     
     history_entries = session.exec(history_statement).all()
     
-    # Formater la réponse
+    # Formater la réponse (un élément par champ modifié)
     history_list = []
-    for entry in history_entries:
+    for item in expand_job_history(history_entries):
         # Récupérer le nom du modificateur
-        modifier = session.get(User, entry.modified_by)
+        modifier = session.get(User, item["modified_by"])
         modifier_name = f"{modifier.first_name} {modifier.last_name}" if modifier else "Inconnu"
         
         history_list.append({
-            "id": str(entry.id),
-            "job_id": str(entry.job_id),
-            "modified_by": str(entry.modified_by),
+            "id": item["id"],
+            "job_id": str(item["job_id"]),
+            "modified_by": str(item["modified_by"]),
             "modifier_name": modifier_name,
-            "field_name": entry.field_name,
-            "old_value": entry.old_value,
-            "new_value": entry.new_value,
-            "created_at": entry.created_at.isoformat() if entry.created_at else None
+            "field_name": item["field_name"],
+            "old_value": item["old_value"],
+            "new_value": item["new_value"],
+            "created_at": item["created_at"].isoformat() if item["created_at"] else None
         })
     
     return history_list
 
 
+@router.get("/{job_id}/pipeline", response_model=JobPipelineResponse)
+def get_job_pipeline(
+    job_id: UUID,
+    limit: int = Query(20, ge=1, le=100, description="Nombre de cartes par colonne"),
+    column: Optional[str] = Query(None, alias="status", description="Colonne à poursuivre (avec cursor)"),
+    cursor: Optional[str] = Query(None, description="Curseur next_cursor de la colonne"),
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Tableau kanban d'un besoin : candidatures groupées par statut
+    
+    Retourne, pour chaque statut, le nombre de candidatures et les premières cartes
+    (les plus récemment modifiées). Pour afficher la suite d'une colonne, passer
+    status et le next_cursor de cette colonne.
+    """
+    if cursor and not column:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le paramètre status est requis avec cursor"
+        )
+    
+    # Vérifier que le job existe et est visible par l'utilisateur
+    visible = session.exec(
+        select(Job.id).where(Job.id == job_id, *job_access_conditions(current_user))
+    ).first()
+    if not visible:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Besoin de recrutement non trouvé"
+        )
+    
+    statement = build_pipeline_query(job_id, limit, column, decode_cursor(cursor) if cursor else None)
+    rows = session.execute(statement).mappings().all()
+    columns = build_columns(rows, limit, [column] if column else PIPELINE_STATUSES)
+    
+    return JobPipelineResponse(job_id=job_id, columns=columns)
+
+
 @router.patch("/{job_id}/status", response_model=JobResponse)
 def update_job_status(
     job_id: UUID,
@@ -1312,14 +1459,7 @@ def update_job_status(
         job.closed_at = datetime.utcnow()
     
     # Enregistrer dans l'historique
-    history_entry = JobHistory(
-        job_id=job.id,
-        modified_by=current_user.id,
-        field_name="status",
-        old_value=old_status,
-        new_value=new_status
-    )
-    session.add(history_entry)
+    record_status_change(session, job.id, current_user.id, old_status, new_status)
     session.commit()
     session.refresh(job)
     
@@ -1350,14 +1490,7 @@ def archive_job(
     job.updated_at = datetime.utcnow()
     
     # Enregistrer dans l'historique
-    history_entry = JobHistory(
-        job_id=job.id,
-        modified_by=current_user.id,
-        field_name="status",
-        old_value=old_status,
-        new_value="archive"
-    )
-    session.add(history_entry)
+    record_status_change(session, job.id, current_user.id, old_status, "archive")
     session.commit()
     session.refresh(job)
     
@@ -1387,14 +1520,7 @@ def mark_job_as_won(
     job.updated_at = datetime.utcnow()
     
     # Enregistrer dans l'historique
-    history_entry = JobHistory(
-        job_id=job.id,
-        modified_by=current_user.id,
-        field_name="status",
-        old_value=old_status,
-        new_value="gagne"
-    )
-    session.add(history_entry)
+    record_status_change(session, job.id, current_user.id, old_status, "gagne")
     session.commit()
     session.refresh(job)
     
@@ -1435,38 +1561,14 @@ def delete_job(
     # Stocker le job_id et les informations importantes avant la suppression
     job_id_to_keep = job.id
     
-    # Créer des entrées d'historique pour conserver les informations importantes
-    # 1. Historique du statut (supprimé)
-    history_status = JobHistory(
-        job_id=job_id_to_keep,
-        modified_by=current_user.id,
-        field_name="status",
-        old_value=job.status,
-        new_value="supprimé"
-    )
-    session.add(history_status)
-    
-    # 2. Historique du titre (pour pouvoir l'afficher après suppression)
+    # Conserver les informations importantes dans une ligne d'historique :
+    # le statut (supprimé), le titre et le département (pour les afficher après suppression)
+    deletion_changes = [history_change("status", job.status, "supprimé")]
     if job.title:
-        history_title = JobHistory(
-            job_id=job_id_to_keep,
-            modified_by=current_user.id,
-            field_name="title",
-            old_value=job.title,
-            new_value=job.title  # Conserver le titre
-        )
-        session.add(history_title)
-    
-    # 3. Historique du département (pour pouvoir l'afficher après suppression)
+        deletion_changes.append(history_change("title", job.title, job.title))
     if job.department:
-        history_department = JobHistory(
-            job_id=job_id_to_keep,
-            modified_by=current_user.id,
-            field_name="department",
-            old_value=job.department,
-            new_value=job.department  # Conserver le département
-        )
-        session.add(history_department)
+        deletion_changes.append(history_change("department", job.department, job.department))
+    record_job_changes(session, job_id_to_keep, current_user.id, deletion_changes)
     
     # Flush pour sauvegarder l'historique avant de supprimer le job
     session.flush()
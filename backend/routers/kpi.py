@@ -6,15 +6,45 @@ import os
 import json
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select, func, and_, or_
-from typing import List, Optional
+from sqlmodel import Session, select, func
+from typing import Dict, List, Optional
 from uuid import UUID
 from pydantic import BaseModel
-from sqlalchemy import case, cast, Date
 
 from database_tenant import get_session
-from models import User, UserRole, Candidate, Job, Application, Interview, ApplicationHistory
+from models import User, UserRole, Candidate, Job, Application, KPIAIAnalysis
 from auth import get_current_active_user, require_manager, require_recruteur, require_client
+from services.kpi_engine import (
+    CANDIDATE_STATUSES,
+    JOB_STATUSES,
+    KPIScope,
+    PeriodStarts,
+    average_stage_cycle,
+    column_total,
+    count_client_interviews,
+    load_client_applications,
+    jobs_on_time_rate,
+    status_count,
+)
+from services.kpi_ai_analysis import (
+    FAILED,
+    AnalysisSource,
+    latest_analysis,
+    refresh_if_needed,
+    request_analysis,
+    scope_key,
+)
+from services.kpi_cache import cached_kpis
+from services.kpi_funnel import FUNNEL_GRANULARITIES, load_funnel
+from services.kpi_timeseries import SeriesWindow, load_time_series, parse_families
+from services.kpi_rollups import (
+    load_applications,
+    load_candidates,
+    load_interviews,
+    load_jobs,
+    load_recruiter_candidates,
+    load_recruiter_jobs,
+)
 
 # Import pour Google Gemini
 try:
@@ -230,148 +260,16 @@ def calculate_time_to_hire(session: Session, filters: KPIFilters) -> Optional[fl
     return float(result) if result else None
 
 
-def calculate_time_to_fill(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Time to Fill: Date acceptation offre - Date ouverture poste"""
-    # Utiliser offer_sent_at et updated_at comme approximation, ou le statut "offre"
-    statement = select(
-        func.avg(
-            func.extract('epoch', Application.updated_at - Job.validated_at) / 86400
-        )
-    ).select_from(Application).join(Job, Application.job_id == Job.id).where(
-        Application.status == "offre",
-        Application.updated_at.isnot(None),
-        Job.validated_at.isnot(None)
-    )
-    
-    if filters.recruiter_id:
-        statement = statement.where(Job.created_by == filters.recruiter_id)
-    if filters.job_id:
-        statement = statement.where(Job.id == filters.job_id)
-    
-    result = session.exec(statement).one()
-    return float(result) if result else None
-
-
 def calculate_average_cycle_per_stage(session: Session, filters: KPIFilters) -> Optional[float]:
     """Cycle moyen par étape: Durée moyenne passée par les candidats à chaque étape"""
-    # Calculer manuellement la moyenne des durées entre changements de statut
-    all_history = session.exec(
-        select(ApplicationHistory)
-        .order_by(ApplicationHistory.application_id, ApplicationHistory.created_at)
-    ).all()
-    
-    if not all_history:
-        return None
-    
-    # Grouper par application et calculer les durées
-    durations = []
-    current_app = None
-    prev_date = None
-    
-    for hist in all_history:
-        if current_app != hist.application_id:
-            current_app = hist.application_id
-            prev_date = hist.created_at
-        else:
-            if prev_date:
-                duration = (hist.created_at - prev_date).total_seconds() / 86400
-                if duration > 0:
-                    durations.append(duration)
-            prev_date = hist.created_at
-    
-    return sum(durations) / len(durations) if durations else None
-
-
-def calculate_average_feedback_delay(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Délai moyen feedback: Temps moyen de retour du manager/client après sollicitation"""
-    # Utiliser Interview.feedback_provided_at - Interview.scheduled_at
-    statement = select(
-        func.avg(
-            func.extract('epoch', Interview.feedback_provided_at - Interview.scheduled_at) / 86400
-        )
-    ).where(
-        Interview.feedback_provided_at.isnot(None),
-        Interview.scheduled_at.isnot(None)
-    )
-    
-    if filters.recruiter_id:
-        statement = statement.where(Interview.created_by == filters.recruiter_id)
-    
-    result = session.exec(statement).one()
-    return float(result) if result else None
+    # Durées entre changements de statut calculées en base (LAG sur l'historique)
+    return average_stage_cycle(session, KPIScope.from_filters(filters))
 
 
 def calculate_percentage_jobs_on_time(session: Session, filters: KPIFilters) -> Optional[float]:
     """% de postes respectant le délai: Pourcentage de postes clôturés dans le délai cible"""
-    # Pour simplifier, on considère un délai cible de 60 jours (configurable)
-    TARGET_DAYS = 60
-    
-    statement = select(Job).where(
-        Job.status == "clôturé",
-        Job.closed_at.isnot(None),
-        Job.validated_at.isnot(None)
-    )
-    
-    if filters.recruiter_id:
-        statement = statement.where(Job.created_by == filters.recruiter_id)
-    if filters.job_id:
-        statement = statement.where(Job.id == filters.job_id)
-    
-    jobs = session.exec(statement).all()
-    
-    if not jobs:
-        return None
-    
-    on_time = 0
-    for job in jobs:
-        if job.closed_at and job.validated_at:
-            duration = (job.closed_at - job.validated_at).total_seconds() / 86400
-            if duration <= TARGET_DAYS:
-                on_time += 1
-    
-    return (on_time / len(jobs) * 100) if jobs else None
-
-
-def calculate_rejection_rate_per_stage(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Taux de rejet par étape: Pourcentage de candidats rejetés à chaque étape"""
-    # Compter les candidats rejetés vs total candidats
-    total_applications = session.exec(
-        select(func.count(Application.id))
-    ).one()
-    
-    rejected_applications = session.exec(
-        select(func.count(Application.id)).where(Application.status == "rejeté")
-    ).one()
-    
-    return (rejected_applications / total_applications * 100) if total_applications > 0 else None
-
-
-def calculate_no_show_rate(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Taux de no-show entretien: Pourcentage de candidats absents aux entretiens"""
-    # Approximation: entretiens sans feedback = no-show potentiel
-    total_interviews = session.exec(
-        select(func.count(Interview.id)).where(Interview.scheduled_at.isnot(None))
-    ).one()
-    
-    interviews_with_feedback = session.exec(
-        select(func.count(Interview.id)).where(
-            Interview.feedback.isnot(None),
-            Interview.feedback_provided_at.isnot(None)
-        )
-    ).one()
-    
-    # Approximation: si un entretien est passé et n'a pas de feedback, c'est peut-être un no-show
-    # On considère les entretiens planifiés dans le passé sans feedback comme no-show
-    from datetime import datetime
-    now = datetime.utcnow()
-    no_show_interviews = session.exec(
-        select(func.count(Interview.id)).where(
-            Interview.scheduled_at < now,
-            Interview.feedback.is_(None)
-        )
-    ).one()
-    
-    return (no_show_interviews / total_interviews * 100) if total_interviews > 0 else None
+    # Délai cible de 60 jours entre validation et clôture (JOB_TARGET_DAYS)
+    return jobs_on_time_rate(session, KPIScope.from_filters(filters))
 
 
 def calculate_turnover_rate(session: Session, filters: KPIFilters) -> Optional[float]:
@@ -381,419 +279,76 @@ def calculate_turnover_rate(session: Session, filters: KPIFilters) -> Optional[f
     return None
 
 
-def calculate_average_recruitment_cost(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Coût moyen par recrutement"""
-    # Utiliser Job.budget comme approximation
-    statement = select(func.avg(Job.budget)).where(Job.budget.isnot(None))
-    
-    if filters.recruiter_id:
-        statement = statement.where(Job.created_by == filters.recruiter_id)
-    if filters.job_id:
-        statement = statement.where(Job.id == filters.job_id)
-    
-    result = session.exec(statement).one()
-    return float(result) if result else None
-
-
-def calculate_cost_per_source(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Coût par source"""
-    # Approximation basée sur le budget des jobs liés aux candidats d'une source
-    if not filters.source:
-        return None
-    
-    # Trouver les candidats de cette source
-    candidates = session.exec(
-        select(Candidate.id).where(Candidate.source == filters.source)
-    ).all()
-    
-    if not candidates:
-        return None
-    
-    # Trouver les applications de ces candidats
-    applications = session.exec(
-        select(Application.job_id).where(Application.candidate_id.in_(candidates))
-    ).all()
-    
-    if not applications:
-        return None
-    
-    # Calculer le budget moyen des jobs
-    avg_budget = session.exec(
-        select(func.avg(Job.budget)).where(
-            Job.id.in_(applications),
-            Job.budget.isnot(None)
-        )
-    ).one()
-    
-    return float(avg_budget) if avg_budget else None
-
-
-def calculate_budget_spent_vs_planned(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Budget dépensé vs prévu"""
-    # Somme des budgets des jobs clôturés vs total budget
-    total_budget = session.exec(
-        select(func.sum(Job.budget)).where(Job.budget.isnot(None))
-    ).one() or 0
-    
-    spent_budget = session.exec(
-        select(func.sum(Job.budget)).where(
-            Job.status == "clôturé",
-            Job.budget.isnot(None)
-        )
-    ).one() or 0
-    
-    return (spent_budget / total_budget * 100) if total_budget > 0 else None
-
-
-def calculate_candidate_response_rate(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Taux de réponse candidat: Pourcentage de réponses aux messages envoyés"""
-    # Approximation: offres envoyées avec réponse (acceptée ou refusée) vs total offres
-    total_offers = session.exec(
-        select(func.count(Application.id)).where(Application.offer_sent_at.isnot(None))
-    ).one()
-    
-    # Utiliser le statut "offre" ou "embauché" comme indicateur de réponse
-    responded_offers = session.exec(
-        select(func.count(Application.id)).where(
-            Application.offer_sent_at.isnot(None),
-            Application.status.in_(["offre", "embauché"])
-        )
-    ).one()
-    
-    return (responded_offers / total_offers * 100) if total_offers > 0 else None
-
-
-def calculate_recruiter_success_rate(session: Session, recruiter_id: UUID) -> Optional[float]:
-    """Taux de réussite recruteur: (Nb embauches / Nb shortlists) x100"""
-    total_shortlists = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == recruiter_id,
-            Application.is_in_shortlist == True
-        )
-    ).one()
-    
-    total_hired = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == recruiter_id,
-            Application.status == "embauché"
-        )
-    ).one()
-    
-    return (total_hired / total_shortlists * 100) if total_shortlists > 0 else None
-
+def percentage(part, total, default: Optional[float] = None) -> Optional[float]:
+    """(part / total) x100, ou default si le total est nul"""
+    return (part / total * 100) if total > 0 else default
 
-def calculate_feedbacks_on_time_rate(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Feedbacks fournis à temps: Pourcentage de feedbacks transmis dans les délais"""
-    # Délai cible: 2 jours après l'entretien
-    TARGET_DAYS = 2
-    
-    total_feedbacks = session.exec(
-        select(func.count(Interview.id)).where(
-            Interview.feedback_provided_at.isnot(None),
-            Interview.scheduled_at.isnot(None)
-        )
-    ).one()
-    
-    if total_feedbacks == 0:
-        return None
-    
-    on_time_count = 0
-    interviews = session.exec(
-        select(Interview).where(
-            Interview.feedback_provided_at.isnot(None),
-            Interview.scheduled_at.isnot(None)
-        )
-    ).all()
-    
-    for interview in interviews:
-        delay = (interview.feedback_provided_at - interview.scheduled_at).total_seconds() / 86400
-        if delay <= TARGET_DAYS:
-            on_time_count += 1
-    
-    return (on_time_count / total_feedbacks * 100) if total_feedbacks > 0 else None
 
+def as_float(value) -> Optional[float]:
+    """Valeur d'un agrégat (None si absente ou nulle)"""
+    return float(value) if value else None
 
-def calculate_performance_per_source(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Performance par source: Pourcentage d'embauches générées par chaque source"""
-    if not filters.source:
-        return None
-    
-    # Candidats de cette source
-    candidates = session.exec(
-        select(Candidate.id).where(Candidate.source == filters.source)
-    ).all()
-    
-    if not candidates:
-        return None
-    
-    # Applications de ces candidats
-    applications = session.exec(
-        select(Application.id).where(Application.candidate_id.in_(candidates))
-    ).all()
-    
-    if not applications:
-        return None
-    
-    # Embauchés parmi ces applications
-    hired = session.exec(
-        select(func.count(Application.id)).where(
-            Application.id.in_(applications),
-            Application.status == "embauché"
-        )
-    ).one()
-    
-    return (hired / len(applications) * 100) if applications else None
 
+def status_statistics(rows, statuses: List[str], model, keep_empty: bool = False) -> list:
+    """Répartition par statut à partir des compteurs in_scope du moteur KPI"""
+    total = column_total(rows, "in_scope")
+    if total == 0 and not keep_empty:
+        return []
+    statistics = []
+    for name in statuses:
+        count = status_count(rows, name, "in_scope")
+        statistics.append(model(
+            status=name,
+            count=count,
+            percentage=round(percentage(count, total, 0), 2)
+        ))
+    return statistics
 
-def calculate_conversion_rate_per_source(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Taux de conversion par source: Conversion candidats sourcés vers embauche"""
-    if not filters.source:
-        return None
-    
-    total_sourced = session.exec(
-        select(func.count(Candidate.id)).where(Candidate.source == filters.source)
-    ).one()
-    
-    if total_sourced == 0:
-        return None
-    
-    # Candidats de cette source embauchés
-    candidates = session.exec(
-        select(Candidate.id).where(Candidate.source == filters.source)
-    ).all()
-    
-    hired = session.exec(
-        select(func.count(Application.id)).where(
-            Application.candidate_id.in_(candidates),
-            Application.status == "embauché"
-        )
-    ).one()
-    
-    return (hired / total_sourced * 100) if total_sourced > 0 else None
 
+def sourcing_statistics_from(row, total_column: str, filters: KPIFilters, now: datetime) -> SourcingStatistics:
+    """
+    Statistiques de sourcing par jour, mois et année à partir des compteurs du moteur KPI
 
-def calculate_average_sourcing_time(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Temps moyen de sourcing: Durée moyenne de la phase de sourcing"""
-    # Approximation: temps entre création du candidat et première application
-    statement = select(
-        func.avg(
-            func.extract('epoch', Application.created_at - Candidate.created_at) / 86400
-        )
-    ).select_from(Application).join(Candidate, Application.candidate_id == Candidate.id)
-    
-    if filters.source:
-        statement = statement.where(Candidate.source == filters.source)
-    if filters.recruiter_id:
-        statement = statement.where(Candidate.created_by == filters.recruiter_id)
-    
-    result = session.exec(statement).one()
-    return float(result) if result else None
+    La moyenne par jour porte sur la période filtrée, ou depuis le premier
+    candidat sourcé (30 derniers jours à défaut).
+    """
+    row = row or {}
+    total = row.get(total_column) or 0
+    start_date = filters.start_date or row.get("first_created_at") or now - timedelta(days=30)
+    end_date = filters.end_date or now
 
+    days_diff = (end_date - start_date).days
+    if days_diff <= 0:
+        days_diff = 1
 
-def calculate_average_onboarding_delay(session: Session, filters: KPIFilters) -> Optional[float]:
-    """Délai moyen d'onboarding: Durée entre début onboarding et prise de poste"""
-    # Utiliser updated_at - offer_sent_at comme approximation pour les candidats embauchés
-    statement = select(
-        func.avg(
-            func.extract('epoch', Application.updated_at - Application.offer_sent_at) / 86400
-        )
-    ).where(
-        Application.status == "embauché",
-        Application.offer_sent_at.isnot(None),
-        Application.updated_at.isnot(None)
+    # Moyennes (approximation : 30 jours par mois, 365 jours par an)
+    per_day = total / days_diff
+    return SourcingStatistics(
+        per_day=round(per_day, 2),
+        per_month=round(per_day * 30, 2),
+        per_year=round(per_day * 365, 2),
+        today_count=row.get("today") or 0,
+        this_month_count=row.get("this_month") or 0,
+        this_year_count=row.get("this_year") or 0
     )
-    
-    if filters.recruiter_id:
-        statement = statement.where(Application.created_by == filters.recruiter_id)
-    if filters.job_id:
-        statement = statement.where(Application.job_id == filters.job_id)
-    
-    result = session.exec(statement).one()
-    return float(result) if result else None
 
 
 def calculate_sourcing_statistics(session: Session, filters: KPIFilters) -> Optional[SourcingStatistics]:
     """Calcule les statistiques de sourcing par jour, mois et année"""
-    from datetime import datetime, timedelta
-    
     now = datetime.utcnow()
-    today_start = datetime(now.year, now.month, now.day)
-    month_start = datetime(now.year, now.month, 1)
-    year_start = datetime(now.year, 1, 1)
-    
-    # Nombre aujourd'hui
-    today_query = select(func.count(Candidate.id)).where(
-        Candidate.status == "sourcé",
-        Candidate.created_at >= today_start
-    )
-    if filters.recruiter_id:
-        today_query = today_query.where(Candidate.created_by == filters.recruiter_id)
-    if filters.source:
-        today_query = today_query.where(Candidate.source == filters.source)
-    today_count = session.exec(today_query).one()
-    
-    # Nombre ce mois
-    this_month_query = select(func.count(Candidate.id)).where(
-        Candidate.status == "sourcé",
-        Candidate.created_at >= month_start
-    )
-    if filters.recruiter_id:
-        this_month_query = this_month_query.where(Candidate.created_by == filters.recruiter_id)
-    if filters.source:
-        this_month_query = this_month_query.where(Candidate.source == filters.source)
-    this_month_count = session.exec(this_month_query).one()
-    
-    # Nombre cette année
-    this_year_query = select(func.count(Candidate.id)).where(
-        Candidate.status == "sourcé",
-        Candidate.created_at >= year_start
-    )
-    if filters.recruiter_id:
-        this_year_query = this_year_query.where(Candidate.created_by == filters.recruiter_id)
-    if filters.source:
-        this_year_query = this_year_query.where(Candidate.source == filters.source)
-    this_year_count = session.exec(this_year_query).one()
-    
-    # Calculer les moyennes
-    # Pour la moyenne par jour : nombre total / nombre de jours depuis le début
-    all_candidates_query = select(func.count(Candidate.id)).where(Candidate.status == "sourcé")
-    if filters.recruiter_id:
-        all_candidates_query = all_candidates_query.where(Candidate.created_by == filters.recruiter_id)
-    if filters.source:
-        all_candidates_query = all_candidates_query.where(Candidate.source == filters.source)
-    
-    if filters.start_date:
-        all_candidates_query = all_candidates_query.where(Candidate.created_at >= filters.start_date)
-    if filters.end_date:
-        all_candidates_query = all_candidates_query.where(Candidate.created_at <= filters.end_date)
-    
-    total_candidates = session.exec(all_candidates_query).one()
-    
-    # Calculer le nombre de jours
-    if filters.start_date:
-        start_date = filters.start_date
-    else:
-        # Trouver la date du premier candidat sourcé
-        first_candidate_query = select(func.min(Candidate.created_at)).where(Candidate.status == "sourcé")
-        if filters.recruiter_id:
-            first_candidate_query = first_candidate_query.where(Candidate.created_by == filters.recruiter_id)
-        if filters.source:
-            first_candidate_query = first_candidate_query.where(Candidate.source == filters.source)
-        first_candidate_date = session.exec(first_candidate_query).one()
-        start_date = first_candidate_date if first_candidate_date else now - timedelta(days=30)
-    
-    if filters.end_date:
-        end_date = filters.end_date
-    else:
-        end_date = now
-    
-    days_diff = (end_date - start_date).days
-    if days_diff <= 0:
-        days_diff = 1
-    
-    # Moyennes
-    per_day = total_candidates / days_diff if days_diff > 0 else 0
-    per_month = per_day * 30  # Approximation : 30 jours par mois
-    per_year = per_day * 365  # Approximation : 365 jours par an
-    
-    return SourcingStatistics(
-        per_day=round(per_day, 2),
-        per_month=round(per_month, 2),
-        per_year=round(per_year, 2),
-        today_count=today_count,
-        this_month_count=this_month_count,
-        this_year_count=this_year_count
-    )
+    candidates = load_candidates(session, KPIScope.from_filters(filters), PeriodStarts.at(now))
+    return sourcing_statistics_from(candidates.get("sourcé"), "in_scope", filters, now)
 
 
 def calculate_candidates_by_status(session: Session, filters: KPIFilters) -> List[CandidateStatusStatistics]:
     """Calcule les statistiques par statut de candidat"""
-    # Statuts possibles
-    statuses = ['sourcé', 'qualifié', 'entretien_rh', 'entretien_client', 'shortlist', 'offre', 'rejeté', 'embauché']
-    
-    # Base query pour compter tous les candidats
-    base_query = select(func.count(Candidate.id))
-    if filters.recruiter_id:
-        base_query = base_query.where(Candidate.created_by == filters.recruiter_id)
-    if filters.source:
-        base_query = base_query.where(Candidate.source == filters.source)
-    if filters.start_date:
-        base_query = base_query.where(Candidate.created_at >= filters.start_date)
-    if filters.end_date:
-        base_query = base_query.where(Candidate.created_at <= filters.end_date)
-    
-    total_candidates = session.exec(base_query).one()
-    
-    if total_candidates == 0:
-        return []
-    
-    statistics = []
-    for status in statuses:
-        status_query = select(func.count(Candidate.id)).where(Candidate.status == status)
-        if filters.recruiter_id:
-            status_query = status_query.where(Candidate.created_by == filters.recruiter_id)
-        if filters.source:
-            status_query = status_query.where(Candidate.source == filters.source)
-        if filters.start_date:
-            status_query = status_query.where(Candidate.created_at >= filters.start_date)
-        if filters.end_date:
-            status_query = status_query.where(Candidate.created_at <= filters.end_date)
-        
-        count = session.exec(status_query).one()
-        percentage = (count / total_candidates * 100) if total_candidates > 0 else 0
-        
-        statistics.append(CandidateStatusStatistics(
-            status=status,
-            count=count,
-            percentage=round(percentage, 2)
-        ))
-    
-    return statistics
+    candidates = load_candidates(session, KPIScope.from_filters(filters), PeriodStarts.at(datetime.utcnow()))
+    return status_statistics(candidates, CANDIDATE_STATUSES, CandidateStatusStatistics)
 
 
 def calculate_jobs_by_status(session: Session, filters: KPIFilters) -> List[JobStatusStatistics]:
     """Calcule les statistiques par statut de besoin"""
-    # Statuts possibles
-    statuses = ['brouillon', 'a_valider', 'urgent', 'tres_urgent', 'besoin_courant', 'validé', 'en_cours', 'gagne', 'standby', 'archive', 'clôturé']
-    
-    # Base query pour compter tous les jobs
-    base_query = select(func.count(Job.id))
-    if filters.recruiter_id:
-        base_query = base_query.where(Job.created_by == filters.recruiter_id)
-    if filters.job_id:
-        base_query = base_query.where(Job.id == filters.job_id)
-    if filters.start_date:
-        base_query = base_query.where(Job.created_at >= filters.start_date)
-    if filters.end_date:
-        base_query = base_query.where(Job.created_at <= filters.end_date)
-    
-    total_jobs = session.exec(base_query).one()
-    
-    if total_jobs == 0:
-        return []
-    
-    statistics = []
-    for status in statuses:
-        status_query = select(func.count(Job.id)).where(Job.status == status)
-        if filters.recruiter_id:
-            status_query = status_query.where(Job.created_by == filters.recruiter_id)
-        if filters.job_id:
-            status_query = status_query.where(Job.id == filters.job_id)
-        if filters.start_date:
-            status_query = status_query.where(Job.created_at >= filters.start_date)
-        if filters.end_date:
-            status_query = status_query.where(Job.created_at <= filters.end_date)
-        
-        count = session.exec(status_query).one()
-        percentage = (count / total_jobs * 100) if total_jobs > 0 else 0
-        
-        statistics.append(JobStatusStatistics(
-            status=status,
-            count=count,
-            percentage=round(percentage, 2)
-        ))
-    
-    return statistics
+    return status_statistics(load_jobs(session, KPIScope.from_filters(filters)), JOB_STATUSES, JobStatusStatistics)
 
 
 def calculate_recruiters_performance_statistics(session: Session, filters: KPIFilters) -> List[RecruiterPerformanceStatistics]:
@@ -801,59 +356,29 @@ def calculate_recruiters_performance_statistics(session: Session, filters: KPIFi
     # Trouver tous les recruteurs
     recruiters_statement = select(User).where(User.role == UserRole.RECRUTEUR.value)
     recruiters = session.exec(recruiters_statement).all()
-    
+
+    now = datetime.utcnow()
+    # Tous les recruteurs en deux requêtes (GROUP BY créateur, statut), quel que soit leur nombre
+    scope = KPIScope.from_filters(filters)
+    candidates = load_recruiter_candidates(session, scope, PeriodStarts.at(now))
+    jobs = load_recruiter_jobs(session, scope)
+
     performances = []
     for recruiter in recruiters:
-        # Créer un filtre spécifique pour ce recruteur
-        recruiter_filters = KPIFilters(
-            start_date=filters.start_date,
-            end_date=filters.end_date,
-            recruiter_id=recruiter.id,
-            source=filters.source,
-            job_id=filters.job_id
-        )
-        
-        # Statistiques de candidats par statut pour ce recruteur
-        candidates_by_status = calculate_candidates_by_status(session, recruiter_filters)
-        
-        # Statistiques de jobs par statut pour ce recruteur
-        jobs_by_status = calculate_jobs_by_status(session, recruiter_filters)
-        
-        # Statistiques de sourcing pour ce recruteur
-        sourcing_stats = calculate_sourcing_statistics(session, recruiter_filters)
-        
-        if not sourcing_stats:
-            continue
-        
-        # Total candidats sourcés
-        total_candidates_query = select(func.count(Candidate.id)).where(
-            Candidate.created_by == recruiter.id,
-            Candidate.status == "sourcé"
-        )
-        if filters.start_date:
-            total_candidates_query = total_candidates_query.where(Candidate.created_at >= filters.start_date)
-        if filters.end_date:
-            total_candidates_query = total_candidates_query.where(Candidate.created_at <= filters.end_date)
-        total_candidates_sourced = session.exec(total_candidates_query).one()
-        
-        # Total jobs gérés
-        total_jobs_query = select(func.count(Job.id)).where(Job.created_by == recruiter.id)
-        if filters.start_date:
-            total_jobs_query = total_jobs_query.where(Job.created_at >= filters.start_date)
-        if filters.end_date:
-            total_jobs_query = total_jobs_query.where(Job.created_at <= filters.end_date)
-        total_jobs_managed = session.exec(total_jobs_query).one()
-        
+        recruiter_candidates = candidates.get(recruiter.id, {})
+        recruiter_jobs = jobs.get(recruiter.id, {})
+
         performances.append(RecruiterPerformanceStatistics(
             recruiter_id=recruiter.id,
             recruiter_name=f"{recruiter.first_name} {recruiter.last_name}",
-            total_candidates_sourced=total_candidates_sourced,
-            candidates_by_status=candidates_by_status,
-            total_jobs_managed=total_jobs_managed,
-            jobs_by_status=jobs_by_status,
-            sourcing_statistics=sourcing_stats
+            # Candidats sourcés et besoins créés dans la période, sans filtre source ni besoin
+            total_candidates_sourced=status_count(recruiter_candidates, "sourcé", "in_period"),
+            candidates_by_status=status_statistics(recruiter_candidates, CANDIDATE_STATUSES, CandidateStatusStatistics),
+            total_jobs_managed=column_total(recruiter_jobs, "in_period"),
+            jobs_by_status=status_statistics(recruiter_jobs, JOB_STATUSES, JobStatusStatistics),
+            sourcing_statistics=sourcing_statistics_from(recruiter_candidates.get("sourcé"), "in_scope", filters, now)
         ))
-    
+
     return performances
 
 
@@ -881,144 +406,80 @@ def get_manager_kpis(
         job_id=job_id,
         source=source
     )
+    return cached_kpis(
+        session, "manager", filters.model_dump(), lambda session: compute_manager_kpis(session, filters)
+    )
+
+
+def compute_manager_kpis(session: Session, filters: KPIFilters) -> ManagerKPIs:
+    """Calcule les KPI Manager (sans cache)"""
+    scope = KPIScope.from_filters(filters)
+    now = datetime.utcnow()
     
-    # Time to Hire
-    time_to_hire = calculate_time_to_hire(session, filters)
-    
-    # Time to Fill
-    time_to_fill = calculate_time_to_fill(session, filters)
+    # Une requête par entité (compteurs conditionnels, voir services/kpi_engine.py)
+    candidates = load_candidates(session, scope, PeriodStarts.at(now))
+    jobs = load_jobs(session, scope)
+    applications = load_applications(session, scope, owner_id=filters.recruiter_id)
+    interviews = load_interviews(session, scope, now)
     
     # Taux candidats qualifiés: (Nb qualifiés / Nb candidats sourcés) x100
-    sourced_query = select(func.count(Candidate.id)).where(Candidate.status == "sourcé")
-    qualified_query = select(func.count(Candidate.id)).where(Candidate.status == "qualifié")
-    
-    if filters.recruiter_id:
-        sourced_query = sourced_query.where(Candidate.created_by == filters.recruiter_id)
-        qualified_query = qualified_query.where(Candidate.created_by == filters.recruiter_id)
-    if filters.source:
-        sourced_query = sourced_query.where(Candidate.source == filters.source)
-        qualified_query = qualified_query.where(Candidate.source == filters.source)
-    if filters.start_date:
-        sourced_query = sourced_query.where(Candidate.created_at >= filters.start_date)
-        qualified_query = qualified_query.where(Candidate.created_at >= filters.start_date)
-    if filters.end_date:
-        sourced_query = sourced_query.where(Candidate.created_at <= filters.end_date)
-        qualified_query = qualified_query.where(Candidate.created_at <= filters.end_date)
-    
-    total_sourced = session.exec(sourced_query).one()
-    total_qualified = session.exec(qualified_query).one()
-    qualified_rate = (total_qualified / total_sourced * 100) if total_sourced > 0 else 0.0
+    qualified_rate = percentage(
+        status_count(candidates, "qualifié", "in_scope"),
+        status_count(candidates, "sourcé", "in_scope"),
+        0.0
+    )
     
     # Taux acceptation offre: (Nb acceptations / Nb offres envoyées) x100
-    # Utiliser le statut "embauché" comme indicateur d'acceptation
-    total_offers_sent = session.exec(
-        select(func.count(Application.id)).where(Application.offer_sent_at.isnot(None))
-    ).one()
-    total_offers_accepted = session.exec(
-        select(func.count(Application.id)).where(
-            Application.offer_sent_at.isnot(None),
-            Application.status == "embauché"
-        )
-    ).one()
-    offer_acceptance_rate = (total_offers_accepted / total_offers_sent * 100) if total_offers_sent > 0 else 0.0
-    
-    # Taux refus offre: utiliser le statut "rejeté" après envoi d'offre
-    total_offers_rejected = session.exec(
-        select(func.count(Application.id)).where(
-            Application.offer_sent_at.isnot(None),
-            Application.status == "rejeté"
-        )
-    ).one()
-    offer_rejection_rate = (total_offers_rejected / total_offers_sent * 100) if total_offers_sent > 0 else None
+    # Utiliser le statut "embauché" comme indicateur d'acceptation, "rejeté" pour le refus
+    offer_acceptance_rate = percentage(applications["offers_accepted"], applications["offers_sent"], 0.0)
+    offer_rejection_rate = percentage(applications["offers_rejected"], applications["offers_sent"])
     
     # % shortlist acceptée: (Nb shortlist validée / Nb shortlist envoyée) x100
-    total_shortlists = session.exec(
-        select(func.count(Application.id)).where(Application.is_in_shortlist == True)
-    ).one()
-    total_validated_shortlists = session.exec(
-        select(func.count(Application.id)).where(
-            Application.is_in_shortlist == True,
-            Application.client_validated == True
-        )
-    ).one()
-    shortlist_acceptance_rate = (total_validated_shortlists / total_shortlists * 100) if total_shortlists > 0 else 0.0
+    shortlist_acceptance_rate = percentage(applications["shortlist_validated"], applications["shortlisted"], 0.0)
     
     # Score moyen candidat
-    avg_score = session.exec(
-        select(func.avg(Interview.score)).where(Interview.score.isnot(None))
-    ).one()
-    average_candidate_score = float(avg_score) if avg_score else 0.0
-    
-    # Nb candidats sourcés
-    total_candidates_sourced = session.exec(select(func.count(Candidate.id))).one()
-    
-    # Nb entretiens réalisés
-    total_interviews = session.exec(select(func.count(Interview.id))).one()
+    average_candidate_score = as_float(interviews["average_score"]) or 0.0
     
     # Nb recrutements clos vs ouverts
-    closed_jobs = session.exec(
-        select(func.count(Job.id)).where(Job.status == "clôturé")
-    ).one()
-    open_jobs = session.exec(
-        select(func.count(Job.id)).where(Job.status != "clôturé")
-    ).one()
+    closed_jobs = status_count(jobs, "clôturé", "total")
+    open_jobs = column_total(jobs, "total", exclude=("clôturé", None))
     closed_vs_open = (closed_jobs / open_jobs) if open_jobs > 0 else 0.0
     
     # Taux réussite onboarding: (Nb onboardings complets / Nb embauches) x100
     # Pour simplifier, on considère que tous les embauchés ont complété l'onboarding
-    total_hired = session.exec(
-        select(func.count(Application.id)).where(Application.status == "embauché")
-    ).one()
-    # Utiliser le même nombre car on n'a pas de champ onboarding_completed
-    total_onboarded = total_hired
-    onboarding_success_rate = 100.0 if total_hired > 0 else None
+    onboarding_success_rate = 100.0 if applications["hired"] > 0 else None
+    
+    # Coûts (Job.budget comme approximation)
+    budget_count = column_total(jobs, "budget_scope_count")
+    avg_recruitment_cost = as_float(column_total(jobs, "budget_scope_sum") / budget_count) if budget_count else None
+    cost_per_source = None
+    source_budget_count = column_total(jobs, "source_budget_count")
+    if filters.source and source_budget_count:
+        cost_per_source = as_float(column_total(jobs, "source_budget_sum") / source_budget_count)
+    budget_spent_vs_planned = percentage(
+        status_count(jobs, "clôturé", "budget_total"),
+        column_total(jobs, "budget_total")
+    )
+    
+    # Indicateurs par source
+    performance_per_source = None
+    conversion_rate_per_source = None
+    if filters.source:
+        performance_per_source = percentage(applications["source_hired"], applications["source_applications"])
+        conversion_rate_per_source = percentage(
+            applications["source_hired"], column_total(candidates, "source_total")
+        )
     
-    # Calculer tous les KPIs supplémentaires
     avg_cycle_per_stage = calculate_average_cycle_per_stage(session, filters)
-    avg_feedback_delay = calculate_average_feedback_delay(session, filters)
     pct_jobs_on_time = calculate_percentage_jobs_on_time(session, filters)
-    rejection_rate = calculate_rejection_rate_per_stage(session, filters)
-    no_show_rate = calculate_no_show_rate(session, filters)
     turnover_rate = calculate_turnover_rate(session, filters)
-    avg_recruitment_cost = calculate_average_recruitment_cost(session, filters)
-    cost_per_source = calculate_cost_per_source(session, filters)
-    budget_spent_vs_planned = calculate_budget_spent_vs_planned(session, filters)
-    candidate_response_rate = calculate_candidate_response_rate(session, filters)
-    recruiter_success_rate = calculate_recruiter_success_rate(session, filters.recruiter_id) if filters.recruiter_id else None
-    avg_time_per_stage = calculate_average_cycle_per_stage(session, filters)  # Même calcul
-    feedbacks_on_time = calculate_feedbacks_on_time_rate(session, filters)
-    performance_per_source = calculate_performance_per_source(session, filters)
-    conversion_rate_per_source = calculate_conversion_rate_per_source(session, filters)
-    avg_sourcing_time = calculate_average_sourcing_time(session, filters)
-    avg_onboarding_delay = calculate_average_onboarding_delay(session, filters)
-    
-    # Calculer les statistiques de sourcing
-    sourcing_stats = calculate_sourcing_statistics(session, filters)
-    
-    # Appliquer les filtres aux comptages de base
-    candidate_query = select(func.count(Candidate.id))
-    if filters.recruiter_id:
-        candidate_query = candidate_query.where(Candidate.created_by == filters.recruiter_id)
-    if filters.source:
-        candidate_query = candidate_query.where(Candidate.source == filters.source)
-    if filters.start_date:
-        candidate_query = candidate_query.where(Candidate.created_at >= filters.start_date)
-    if filters.end_date:
-        candidate_query = candidate_query.where(Candidate.created_at <= filters.end_date)
-    total_candidates_sourced = session.exec(candidate_query).one()
-    
-    interview_query = select(func.count(Interview.id))
-    if filters.recruiter_id:
-        interview_query = interview_query.where(Interview.created_by == filters.recruiter_id)
-    if filters.start_date:
-        interview_query = interview_query.where(Interview.created_at >= filters.start_date)
-    if filters.end_date:
-        interview_query = interview_query.where(Interview.created_at <= filters.end_date)
-    total_interviews = session.exec(interview_query).one()
+    recruiter_success_rate = percentage(
+        applications["owned_hired"], applications["owned_shortlisted"]
+    ) if filters.recruiter_id else None
     
     # Construire detailed_statistics
-    candidates_stats = calculate_candidates_by_status(session, filters)
-    jobs_stats = calculate_jobs_by_status(session, filters)
+    candidates_stats = status_statistics(candidates, CANDIDATE_STATUSES, CandidateStatusStatistics)
+    jobs_stats = status_statistics(jobs, JOB_STATUSES, JobStatusStatistics)
     recruiters_perf = calculate_recruiters_performance_statistics(session, filters)
     
     detailed_stats = None
@@ -1029,28 +490,30 @@ def get_manager_kpis(
             recruiters_performance=recruiters_perf
         )
     
+    total_candidates_sourced = column_total(candidates, "in_scope")
+    
     return ManagerKPIs(
         time_process=TimeProcessKPIs(
-            time_to_hire=time_to_hire,
-            time_to_fill=time_to_fill,
+            time_to_hire=as_float(applications["time_to_hire"]),
+            time_to_fill=as_float(applications["time_to_fill"]),
             average_cycle_per_stage=avg_cycle_per_stage,
-            average_feedback_delay=avg_feedback_delay,
+            average_feedback_delay=as_float(interviews["feedback_delay"]),
             percentage_jobs_on_time=pct_jobs_on_time
         ),
         quality_selection=QualitySelectionKPIs(
             qualified_candidates_rate=qualified_rate,
-            rejection_rate_per_stage=rejection_rate,
+            rejection_rate_per_stage=percentage(applications["rejected"], applications["total"]),
             shortlist_acceptance_rate=shortlist_acceptance_rate,
             average_candidate_score=average_candidate_score,
-            no_show_rate=no_show_rate,
+            no_show_rate=percentage(interviews["no_show"], interviews["scheduled"]),
             turnover_rate_post_onboarding=turnover_rate
         ),
         volume_productivity=VolumeProductivityKPIs(
             total_candidates_sourced=total_candidates_sourced,
             total_cvs_processed=total_candidates_sourced,
             closed_vs_open_recruitments=closed_vs_open,
-            total_interviews_conducted=total_interviews,
-            sourcing_statistics=sourcing_stats
+            total_interviews_conducted=interviews["in_scope"],
+            sourcing_statistics=sourcing_statistics_from(candidates.get("sourcé"), "in_scope", filters, now)
         ),
         cost_budget=CostBudgetKPIs(
             average_recruitment_cost=avg_recruitment_cost,
@@ -1060,22 +523,22 @@ def get_manager_kpis(
         engagement_satisfaction=EngagementSatisfactionKPIs(
             offer_acceptance_rate=offer_acceptance_rate,
             offer_rejection_rate=offer_rejection_rate,
-            candidate_response_rate=candidate_response_rate
+            candidate_response_rate=percentage(applications["offers_responded"], applications["offers_sent"])
         ),
         recruiter_performance=RecruiterPerformanceKPIs(
             jobs_managed=open_jobs,
             success_rate=recruiter_success_rate,
-            average_time_per_stage=avg_time_per_stage,
-            feedbacks_on_time_rate=feedbacks_on_time
+            average_time_per_stage=avg_cycle_per_stage,
+            feedbacks_on_time_rate=percentage(interviews["feedbacks_on_time"], interviews["feedbacks"])
         ),
         source_channel=SourceChannelKPIs(
             performance_per_source=performance_per_source,
             conversion_rate_per_source=conversion_rate_per_source,
-            average_sourcing_time=avg_sourcing_time
+            average_sourcing_time=as_float(applications["sourcing_time"])
         ),
         onboarding=OnboardingKPIs(
             onboarding_success_rate=onboarding_success_rate,
-            average_onboarding_delay=avg_onboarding_delay,
+            average_onboarding_delay=as_float(applications["onboarding_delay"]),
             post_integration_issues_count=0
         ),
         detailed_statistics=detailed_stats
@@ -1103,111 +566,48 @@ def get_recruiter_kpis(
         job_id=job_id,
         source=source
     )
+    return cached_kpis(
+        session, "recruiter", filters.model_dump(), lambda session: compute_recruiter_kpis(session, filters)
+    )
+
+
+def compute_recruiter_kpis(session: Session, filters: KPIFilters) -> RecruiterKPIs:
+    """Calcule les KPI du recruteur filters.recruiter_id (sans cache)"""
+    scope = KPIScope.from_filters(filters)
+    now = datetime.utcnow()
+    recruiter_id = filters.recruiter_id
     
-    # Nombre de postes gérés
-    jobs_managed = session.exec(
-        select(func.count(Job.id)).where(
-            Job.created_by == current_user.id,
-            Job.status != "clôturé"
-        )
-    ).one()
-    
-    # Nombre de candidats sourcés
-    candidates_sourced = session.exec(
-        select(func.count(Candidate.id)).where(Candidate.created_by == current_user.id)
-    ).one()
+    # Une requête par entité ; les compteurs owned portent sur tout ce que le recruteur a créé
+    candidates = load_candidates(session, scope, PeriodStarts.at(now), owner_id=recruiter_id)
+    jobs = load_jobs(session, scope, owner_id=recruiter_id)
+    applications = load_applications(session, scope, owner_id=recruiter_id)
+    interviews = load_interviews(session, scope, now, owner_id=recruiter_id)
     
-    # Nombre d'entretiens planifiés et réalisés
-    interviews_count = session.exec(
-        select(func.count(Interview.id)).where(Interview.created_by == current_user.id)
-    ).one()
+    # Nombre de postes gérés (non clôturés) et de candidats sourcés
+    jobs_managed = column_total(jobs, "owned", exclude=("clôturé", None))
+    candidates_sourced = column_total(candidates, "owned")
     
     # Taux candidats qualifiés
-    total_sourced = session.exec(
-        select(func.count(Candidate.id)).where(
-            Candidate.created_by == current_user.id,
-            Candidate.status == "sourcé"
-        )
-    ).one()
-    total_qualified = session.exec(
-        select(func.count(Candidate.id)).where(
-            Candidate.created_by == current_user.id,
-            Candidate.status == "qualifié"
-        )
-    ).one()
-    qualified_rate = (total_qualified / total_sourced * 100) if total_sourced > 0 else None
+    qualified_rate = percentage(
+        status_count(candidates, "qualifié", "owned"),
+        status_count(candidates, "sourcé", "owned")
+    )
     
     # Taux shortlist acceptée
-    total_shortlists = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == current_user.id,
-            Application.is_in_shortlist == True
-        )
-    ).one()
-    total_validated = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == current_user.id,
-            Application.is_in_shortlist == True,
-            Application.client_validated == True
-        )
-    ).one()
-    shortlist_acceptance_rate = (total_validated / total_shortlists * 100) if total_shortlists > 0 else None
-    
-    # Score moyen candidat
-    avg_score = session.exec(
-        select(func.avg(Interview.score)).where(
-            Interview.created_by == current_user.id,
-            Interview.score.isnot(None)
-        )
-    ).one()
-    average_candidate_score = float(avg_score) if avg_score else None
-    
-    # Time to Hire moyen
-    time_to_hire = calculate_time_to_hire(session, filters)
-    
-    # Taux acceptation offre
-    total_offers_sent = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == current_user.id,
-            Application.offer_sent_at.isnot(None)
-        )
-    ).one()
-    total_offers_accepted = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == current_user.id,
-            Application.offer_sent_at.isnot(None),
-            Application.status == "embauché"
-        )
-    ).one()
-    offer_acceptance_rate = (total_offers_accepted / total_offers_sent * 100) if total_offers_sent > 0 else None
-    
-    # Taux refus offre
-    total_offers_rejected = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == current_user.id,
-            Application.offer_sent_at.isnot(None),
-            Application.status == "rejeté"
-        )
-    ).one()
-    offer_rejection_rate = (total_offers_rejected / total_offers_sent * 100) if total_offers_sent > 0 else None
+    shortlist_acceptance_rate = percentage(
+        applications["owned_shortlist_validated"], applications["owned_shortlisted"]
+    )
     
-    # Taux réussite onboarding
-    total_hired = session.exec(
-        select(func.count(Application.id)).where(
-            Application.created_by == current_user.id,
-            Application.status == "embauché"
-        )
-    ).one()
-    # Utiliser le même nombre car on n'a pas de champ onboarding_completed
-    total_onboarded = total_hired
-    onboarding_success_rate = 100.0 if total_hired > 0 else None
+    # Taux acceptation et refus offre
+    offer_acceptance_rate = percentage(applications["owned_offers_accepted"], applications["owned_offers_sent"])
+    offer_rejection_rate = percentage(applications["owned_offers_rejected"], applications["owned_offers_sent"])
     
-    # Calculer les statistiques de sourcing
-    sourcing_stats = calculate_sourcing_statistics(session, filters)
+    # Taux réussite onboarding (tous les embauchés sont considérés comme intégrés)
+    onboarding_success_rate = 100.0 if applications["owned_hired"] > 0 else None
     
     # Construire detailed_statistics
-    candidates_stats = calculate_candidates_by_status(session, filters)
-    jobs_stats = calculate_jobs_by_status(session, filters)
+    candidates_stats = status_statistics(candidates, CANDIDATE_STATUSES, CandidateStatusStatistics)
+    jobs_stats = status_statistics(jobs, JOB_STATUSES, JobStatusStatistics)
     recruiters_perf = calculate_recruiters_performance_statistics(session, filters)
     
     detailed_stats = None
@@ -1223,19 +623,19 @@ def get_recruiter_kpis(
             total_candidates_sourced=candidates_sourced,
             total_cvs_processed=candidates_sourced,
             closed_vs_open_recruitments=None,
-            total_interviews_conducted=interviews_count,
-            sourcing_statistics=sourcing_stats
+            total_interviews_conducted=interviews["owned"],
+            sourcing_statistics=sourcing_statistics_from(candidates.get("sourcé"), "in_scope", filters, now)
         ),
         quality_selection=QualitySelectionKPIs(
             qualified_candidates_rate=qualified_rate,
             rejection_rate_per_stage=None,
             shortlist_acceptance_rate=shortlist_acceptance_rate,
-            average_candidate_score=average_candidate_score,
+            average_candidate_score=as_float(interviews["owned_average_score"]),
             no_show_rate=None,
             turnover_rate_post_onboarding=None
         ),
         time_process=TimeProcessKPIs(
-            time_to_hire=time_to_hire,
+            time_to_hire=as_float(applications["time_to_hire"]),
             time_to_fill=None,
             average_cycle_per_stage=None,
             average_feedback_delay=None,
@@ -1298,6 +698,11 @@ def get_kpi_summary(
     
     Accès autorisé aux Recruteurs (lecture), Managers et Administrateurs
     """
+    return cached_kpis(session, "summary", {}, compute_kpi_summary)
+
+
+def compute_kpi_summary(session: Session) -> KPISummary:
+    """Calcule le résumé des KPI globaux (sans cache)"""
     filters = KPIFilters()
     
     # Total candidats
@@ -1345,48 +750,154 @@ def get_recruiters_performance(
     
     Accès réservé aux Managers et Administrateurs
     """
+    return cached_kpis(session, "recruiters", {}, compute_recruiters_performance)
+
+
+def compute_recruiters_performance(session: Session) -> List[RecruiterPerformance]:
+    """Calcule les performances de tous les recruteurs (sans cache)"""
     # Trouver tous les recruteurs
     recruiters_statement = select(User).where(User.role == UserRole.RECRUTEUR.value)
     recruiters = session.exec(recruiters_statement).all()
     
+    # Compteurs de tous les créateurs en deux requêtes (GROUP BY créateur, statut)
+    scope = KPIScope()
+    candidates = load_recruiter_candidates(session, scope, PeriodStarts.at(datetime.utcnow()))
+    jobs = load_recruiter_jobs(session, scope)
+    
     performances = []
     for recruiter in recruiters:
-        # Candidats créés par ce recruteur
-        total_candidates = session.exec(
-            select(func.count(Candidate.id)).where(Candidate.created_by == recruiter.id)
-        ).one()
-        
-        # Jobs créés par ce recruteur
-        total_jobs = session.exec(
-            select(func.count(Job.id)).where(Job.created_by == recruiter.id)
-        ).one()
-        
-        # Candidats en shortlist créés par ce recruteur
-        candidates_in_shortlist = session.exec(
-            select(func.count(Candidate.id))
-            .where(Candidate.created_by == recruiter.id)
-            .where(Candidate.status == "shortlist")
-        ).one()
-        
-        # Candidats embauchés créés par ce recruteur
-        candidates_hired = session.exec(
-            select(func.count(Candidate.id))
-            .where(Candidate.created_by == recruiter.id)
-            .where(Candidate.status == "embauché")
-        ).one()
-        
-        performances.append({
-            "recruiter_id": str(recruiter.id),
-            "recruiter_name": f"{recruiter.first_name} {recruiter.last_name}",
-            "total_candidates": total_candidates,
-            "total_jobs": total_jobs,
-            "candidates_in_shortlist": candidates_in_shortlist,
-            "candidates_hired": candidates_hired
-        })
+        recruiter_candidates = candidates.get(recruiter.id, {})
+        performances.append(RecruiterPerformance(
+            recruiter_id=str(recruiter.id),
+            recruiter_name=f"{recruiter.first_name} {recruiter.last_name}",
+            total_candidates=column_total(recruiter_candidates, "in_scope"),
+            total_jobs=column_total(jobs.get(recruiter.id, {}), "in_scope"),
+            candidates_in_shortlist=status_count(recruiter_candidates, "shortlist", "in_scope"),
+            candidates_hired=status_count(recruiter_candidates, "embauché", "in_scope")
+        ))
     
     return performances
 
 
+# ==================== SÉRIES TEMPORELLES ====================
+
+class KPITimeSeries(BaseModel):
+    """Séries des KPI par période (valeurs alignées sur buckets)"""
+    granularity: str  # 'day', 'week' ou 'month'
+    buckets: List[datetime]  # Débuts de période
+    series: Dict[str, List[Optional[float]]]  # candidates_sourced, interviews_*, offers_sent, hires, time_to_hire (jours)
+    stages: Dict[str, List[int]]  # Candidatures entrées dans chaque étape
+
+
+def kpi_time_series(
+    session: Session,
+    filters: KPIFilters,
+    granularity: str,
+    families: tuple
+) -> KPITimeSeries:
+    """Séries temporelles (une requête par famille d'indicateurs), servies depuis le cache des KPI"""
+    window = SeriesWindow.build(granularity, filters.start_date, filters.end_date, datetime.utcnow())
+    scope = KPIScope.from_filters(filters)
+    key = {
+        **filters.model_dump(),
+        "granularity": granularity,
+        "first": window.first,
+        "last": window.last,
+        "families": ",".join(families),
+    }
+    return cached_kpis(
+        session, "timeseries", key,
+        lambda session: KPITimeSeries(**load_time_series(session, window, scope, families))
+    )
+
+
+@router.get("/timeseries", response_model=KPITimeSeries)
+def get_kpi_time_series(
+    granularity: str = Query("day", description="Période: day, week ou month"),
+    metrics: Optional[str] = Query(None, description="Familles (virgules): candidates, pipeline, interviews, hiring"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    recruiter_id: Optional[UUID] = Query(None),
+    job_id: Optional[UUID] = Query(None),
+    source: Optional[str] = Query(None),
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Récupère les KPI par jour, semaine ou mois (graphiques de tendance)
+    
+    Sans date de début, les 30 derniers jours, 12 dernières semaines ou 12 derniers mois.
+    Accès réservé aux Recruteurs (leurs propres séries), Managers et Administrateurs
+    """
+    if current_user.role == UserRole.RECRUTEUR.value:
+        recruiter_id = current_user.id
+    filters = KPIFilters(
+        start_date=start_date,
+        end_date=end_date,
+        recruiter_id=recruiter_id,
+        job_id=job_id,
+        source=source
+    )
+    return kpi_time_series(session, filters, granularity, parse_families(metrics))
+
+
+# ==================== ENTONNOIR PAR COHORTE ====================
+
+class FunnelStage(BaseModel):
+    """Étape de l'entonnoir pour une cohorte"""
+    stage: str
+    reached: int  # Candidats de la cohorte ayant atteint l'étape (ou une étape suivante)
+    conversion_rate: Optional[float]  # % depuis l'étape précédente (le sourcing pour la première)
+    cumulative_rate: Optional[float]  # % des candidats sourcés
+    median_days: Optional[float]  # Durée médiane entre le sourcing et l'entrée dans l'étape
+
+
+class FunnelCohort(BaseModel):
+    """Cohorte de candidats sourcés sur une période (cohort est null pour le total)"""
+    cohort: Optional[datetime]
+    sourced: int
+    stages: List[FunnelStage]
+
+
+class RecruitmentFunnel(BaseModel):
+    """Matrice cohorte × étape"""
+    granularity: str  # 'week' ou 'month'
+    cohorts: List[FunnelCohort]
+    total: FunnelCohort
+
+
+@router.get("/funnel", response_model=RecruitmentFunnel)
+def get_recruitment_funnel(
+    granularity: str = Query("week", description="Cohortes: week ou month"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    recruiter_id: Optional[UUID] = Query(None),
+    job_id: Optional[UUID] = Query(None),
+    source: Optional[str] = Query(None),
+    current_user: User = Depends(require_manager),
+    session: Session = Depends(get_session)
+):
+    """
+    Récupère l'entonnoir de recrutement par cohorte de sourcing
+    
+    Sans date de début, les 12 dernières semaines ou les 12 derniers mois.
+    Accès réservé aux Managers et Administrateurs
+    """
+    if granularity not in FUNNEL_GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Granularité invalide: {granularity} (valeurs possibles: {', '.join(FUNNEL_GRANULARITIES)})"
+        )
+    window = SeriesWindow.build(granularity, start_date, end_date, datetime.utcnow())
+    filters = KPIFilters(start_date=start_date, end_date=end_date, recruiter_id=recruiter_id, job_id=job_id, source=source)
+    scope = KPIScope.from_filters(filters)
+    key = {**filters.model_dump(), "granularity": granularity, "first": window.first, "last": window.last}
+    return cached_kpis(
+        session, "funnel", key,
+        lambda session: RecruitmentFunnel(**load_funnel(session, window, scope))
+    )
+
+
 # ==================== ANALYSE IA DES KPIs ====================
 
 class KPIInsight(BaseModel):
@@ -1409,6 +920,16 @@ class KPIAnalysis(BaseModel):
     opportunities: List[str]  # Opportunités identifiées
 
 
+def kpis_with_trends(session: Session, kpis: BaseModel, filters: KPIFilters) -> dict:
+    """KPIs et séries mensuelles des 12 derniers mois (mêmes filtres, hors période) pour l'analyse IA"""
+    trend_filters = filters.model_copy(update={"start_date": None, "end_date": None})
+    trends = kpi_time_series(session, trend_filters, "month", ("candidates", "interviews", "hiring"))
+    return {
+        "kpis": kpis.model_dump(mode="json"),
+        "monthly_trends": trends.model_dump(mode="json"),
+    }
+
+
 def analyze_kpis_with_ai(kpis_data: dict, role: str = "manager") -> KPIAnalysis:
     """
     Analyse les KPIs avec l'IA pour générer des insights structurés
@@ -1472,6 +993,7 @@ Règles importantes:
 - Analyse les KPIs en profondeur et identifie les points forts et faibles
 - Fournis des recommandations actionnables et concrètes
 - Identifie les tendances et patterns
+- Si des séries mensuelles (monthly_trends) sont fournies, base "trend" et "predicted_trends" sur leur évolution réelle
 - Priorise les insights par importance
 - Sois factuel et basé sur les données
 - Retourne UNIQUEMENT le JSON, sans texte avant ou après
@@ -1533,7 +1055,84 @@ Règles importantes:
         )
 
 
-@router.get("/manager/ai-analysis", response_model=KPIAnalysis)
+class KPIAnalysisSnapshot(KPIAnalysis):
+    """Dernière analyse IA du périmètre (vide tant que la première n'est pas prête)"""
+    status: str  # 'ready', 'pending' ou 'failed' (première analyse en échec)
+    generated_at: Optional[datetime] = None  # Date de l'instantané des KPI analysé
+    refresh_task_id: Optional[UUID] = None  # Analyse en cours (voir /kpi/ai-analysis/tasks/{task_id})
+
+
+class KPIAnalysisTask(BaseModel):
+    """Suivi d'une analyse IA générée en arrière-plan"""
+    task_id: UUID
+    status: str  # 'pending', 'running', 'done' ou 'failed'
+    requested_at: datetime
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
+    analysis: Optional[KPIAnalysis] = None
+
+
+def role_kpis(session: Session, role: str, filters: KPIFilters) -> BaseModel:
+    """KPI Manager ou Recruteur du périmètre, servis depuis le cache des KPI"""
+    if role == "manager":
+        return cached_kpis(session, "manager", filters.model_dump(), lambda session: compute_manager_kpis(session, filters))
+    return cached_kpis(session, "recruiter", filters.model_dump(), lambda session: compute_recruiter_kpis(session, filters))
+
+
+def kpi_ai_snapshot(session: Session, role: str, filters: dict) -> dict:
+    """Instantané analysé par l'IA : KPI du rôle et séries mensuelles"""
+    kpi_filters = KPIFilters(**filters)
+    return kpis_with_trends(session, role_kpis(session, role, kpi_filters), kpi_filters)
+
+
+AI_ANALYSIS_SOURCE = AnalysisSource(
+    snapshot=kpi_ai_snapshot,
+    analyze=lambda snapshot, role: analyze_kpis_with_ai(snapshot, role=role).model_dump(mode="json"),
+)
+
+
+def kpi_analysis_snapshot(
+    session: Session,
+    role: str,
+    filters: KPIFilters,
+    current_user: User
+) -> KPIAnalysisSnapshot:
+    """Dernière analyse du périmètre, sans attendre le modèle (nouvelle analyse planifiée si nécessaire)"""
+    filters_dict = filters.model_dump()
+    latest = latest_analysis(session, scope_key(role, filters_dict))
+    upcoming = refresh_if_needed(session, role, filters_dict, latest, AI_ANALYSIS_SOURCE, current_user.id)
+    refresh_task_id = upcoming.id if upcoming is not None else None
+    if latest is None:
+        return KPIAnalysisSnapshot(
+            overall_summary="",
+            key_insights=[],
+            top_recommendations=[],
+            predicted_trends="",
+            risk_alerts=[],
+            opportunities=[],
+            status=FAILED if upcoming is not None and upcoming.status == FAILED else "pending",
+            refresh_task_id=refresh_task_id
+        )
+    return KPIAnalysisSnapshot(
+        **json.loads(latest.analysis_data),
+        status="ready",
+        generated_at=latest.completed_at,
+        refresh_task_id=refresh_task_id
+    )
+
+
+def analysis_task(analysis: KPIAIAnalysis) -> KPIAnalysisTask:
+    return KPIAnalysisTask(
+        task_id=analysis.id,
+        status=analysis.status,
+        requested_at=analysis.requested_at,
+        completed_at=analysis.completed_at,
+        error=analysis.error,
+        analysis=KPIAnalysis(**json.loads(analysis.analysis_data)) if analysis.analysis_data else None
+    )
+
+
+@router.get("/manager/ai-analysis", response_model=KPIAnalysisSnapshot)
 def get_manager_kpis_ai_analysis(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
@@ -1544,11 +1143,12 @@ def get_manager_kpis_ai_analysis(
     session: Session = Depends(get_session)
 ):
     """
-    Récupère l'analyse IA des KPIs Manager
+    Récupère la dernière analyse IA des KPIs Manager
     
+    L'analyse est générée en arrière-plan (chaque nuit, quand les KPIs changent
+    significativement ou sur demande via /refresh) : la réponse n'attend pas l'IA.
     Accès réservé aux Managers et Administrateurs
     """
-    # Récupérer les KPIs
     filters = KPIFilters(
         start_date=start_date,
         end_date=end_date,
@@ -1556,23 +1156,36 @@ def get_manager_kpis_ai_analysis(
         job_id=job_id,
         source=source
     )
+    return kpi_analysis_snapshot(session, "manager", filters, current_user)
+
+
+@router.post("/manager/ai-analysis/refresh", response_model=KPIAnalysisTask, status_code=status.HTTP_202_ACCEPTED)
+def refresh_manager_kpis_ai_analysis(
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    recruiter_id: Optional[UUID] = Query(None),
+    job_id: Optional[UUID] = Query(None),
+    source: Optional[str] = Query(None),
+    current_user: User = Depends(require_manager),
+    session: Session = Depends(get_session)
+):
+    """
+    Demande une nouvelle analyse IA des KPIs Manager (suivi via /kpi/ai-analysis/tasks/{task_id})
     
-    # Appeler la fonction existante pour obtenir les KPIs
-    kpis_dict = get_manager_kpis(
+    Accès réservé aux Managers et Administrateurs
+    """
+    filters = KPIFilters(
         start_date=start_date,
         end_date=end_date,
         recruiter_id=recruiter_id,
         job_id=job_id,
-        source=source,
-        current_user=current_user,
-        session=session
+        source=source
     )
-    
-    # Analyser avec l'IA (kpis_dict est déjà un dictionnaire)
-    return analyze_kpis_with_ai(kpis_dict, role="manager")
+    analysis = request_analysis(session, "manager", filters.model_dump(), AI_ANALYSIS_SOURCE, current_user.id)
+    return analysis_task(analysis)
 
 
-@router.get("/recruiter/ai-analysis", response_model=KPIAnalysis)
+@router.get("/recruiter/ai-analysis", response_model=KPIAnalysisSnapshot)
 def get_recruiter_kpis_ai_analysis(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
@@ -1582,11 +1195,12 @@ def get_recruiter_kpis_ai_analysis(
     session: Session = Depends(get_session)
 ):
     """
-    Récupère l'analyse IA des KPIs Recruteur
+    Récupère la dernière analyse IA des KPIs Recruteur
     
+    L'analyse est générée en arrière-plan (chaque nuit, quand les KPIs changent
+    significativement ou sur demande via /refresh) : la réponse n'attend pas l'IA.
     Accès réservé aux Recruteurs, Managers et Administrateurs
     """
-    # Récupérer les KPIs
     filters = KPIFilters(
         start_date=start_date,
         end_date=end_date,
@@ -1594,19 +1208,55 @@ def get_recruiter_kpis_ai_analysis(
         job_id=job_id,
         source=source
     )
+    return kpi_analysis_snapshot(session, "recruteur", filters, current_user)
+
+
+@router.post("/recruiter/ai-analysis/refresh", response_model=KPIAnalysisTask, status_code=status.HTTP_202_ACCEPTED)
+def refresh_recruiter_kpis_ai_analysis(
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    job_id: Optional[UUID] = Query(None),
+    source: Optional[str] = Query(None),
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Demande une nouvelle analyse IA des KPIs Recruteur (suivi via /kpi/ai-analysis/tasks/{task_id})
     
-    # Appeler la fonction existante pour obtenir les KPIs
-    kpis_dict = get_recruiter_kpis(
+    Accès réservé aux Recruteurs, Managers et Administrateurs
+    """
+    filters = KPIFilters(
         start_date=start_date,
         end_date=end_date,
+        recruiter_id=current_user.id,
         job_id=job_id,
-        source=source,
-        current_user=current_user,
-        session=session
+        source=source
     )
+    analysis = request_analysis(session, "recruteur", filters.model_dump(), AI_ANALYSIS_SOURCE, current_user.id)
+    return analysis_task(analysis)
+
+
+@router.get("/ai-analysis/tasks/{task_id}", response_model=KPIAnalysisTask)
+def get_kpis_ai_analysis_task(
+    task_id: UUID,
+    current_user: User = Depends(require_recruteur),
+    session: Session = Depends(get_session)
+):
+    """
+    Récupère l'état d'une analyse IA demandée (et l'analyse une fois terminée)
     
-    # Analyser avec l'IA (kpis_dict est déjà un dictionnaire)
-    return analyze_kpis_with_ai(kpis_dict, role="recruteur")
+    Un recruteur ne voit que les analyses de ses propres KPIs
+    """
+    analysis = session.get(KPIAIAnalysis, task_id)
+    if analysis is None or (
+        current_user.role == UserRole.RECRUTEUR.value
+        and (analysis.role != "recruteur" or json.loads(analysis.filters).get("recruiter_id") != str(current_user.id))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analyse introuvable"
+        )
+    return analysis_task(analysis)
 
 
 # ==================== ENDPOINTS KPI CLIENT ====================
@@ -1628,287 +1278,52 @@ def get_client_kpis(
     filters = KPIFilters(
         start_date=start_date,
         end_date=end_date,
+        client_id=current_user.id,
         job_id=job_id,
         recruiter_id=None,
         source=None
     )
-    
-    # Nombre total de besoins créés par le client
-    jobs_query = select(func.count(Job.id)).where(Job.created_by == current_user.id)
-    if filters.start_date:
-        jobs_query = jobs_query.where(Job.created_at >= filters.start_date)
-    if filters.end_date:
-        jobs_query = jobs_query.where(Job.created_at <= filters.end_date)
-    if filters.job_id:
-        jobs_query = jobs_query.where(Job.id == filters.job_id)
-    total_jobs_created = session.exec(jobs_query).one()
-    
-    # Statistiques par statut de besoin
-    statuses = ['brouillon', 'a_valider', 'urgent', 'tres_urgent', 'besoin_courant', 'validé', 'en_cours', 'gagne', 'standby', 'archive', 'clôturé']
-    client_jobs_by_status = []
-    for status in statuses:
-        status_query = select(func.count(Job.id)).where(
-            Job.status == status,
-            Job.created_by == current_user.id
-        )
-        if filters.start_date:
-            status_query = status_query.where(Job.created_at >= filters.start_date)
-        if filters.end_date:
-            status_query = status_query.where(Job.created_at <= filters.end_date)
-        if filters.job_id:
-            status_query = status_query.where(Job.id == filters.job_id)
-        
-        count = session.exec(status_query).one()
-        percentage = (count / total_jobs_created * 100) if total_jobs_created > 0 else 0
-        
-        client_jobs_by_status.append(JobStatusStatistics(
-            status=status,
-            count=count,
-            percentage=round(percentage, 2)
-        ))
-    
-    # Candidats en shortlist pour les besoins du client
-    shortlist_query = select(func.count(Application.id)).join(
-        Job, Application.job_id == Job.id
-    ).where(
-        Job.created_by == current_user.id,
-        Application.is_in_shortlist == True
+    return cached_kpis(session, "client", filters.model_dump(), lambda session: compute_client_kpis(session, filters))
+
+
+def compute_client_kpis(session: Session, filters: KPIFilters) -> ClientKPIs:
+    """Calcule les KPI du client filters.client_id (sans cache)"""
+    client_id = filters.client_id
+    # Les besoins du client sont ceux qu'il a créés (Job.created_by)
+    scope = KPIScope(
+        start_date=filters.start_date, end_date=filters.end_date, recruiter_id=client_id, job_id=filters.job_id
     )
-    if filters.start_date:
-        shortlist_query = shortlist_query.where(Application.created_at >= filters.start_date)
-    if filters.end_date:
-        shortlist_query = shortlist_query.where(Application.created_at <= filters.end_date)
-    if filters.job_id:
-        shortlist_query = shortlist_query.where(Application.job_id == filters.job_id)
-    total_candidates_in_shortlist = session.exec(shortlist_query).one()
+    now = datetime.utcnow()
     
-    # Candidats validés
-    validated_query = select(func.count(Application.id)).join(
-        Job, Application.job_id == Job.id
-    ).where(
-        Job.created_by == current_user.id,
-        Application.is_in_shortlist == True,
-        Application.client_validated == True
-    )
-    if filters.start_date:
-        validated_query = validated_query.where(Application.created_at >= filters.start_date)
-    if filters.end_date:
-        validated_query = validated_query.where(Application.created_at <= filters.end_date)
-    if filters.job_id:
-        validated_query = validated_query.where(Application.job_id == filters.job_id)
-    total_candidates_validated = session.exec(validated_query).one()
+    # Besoins du client par statut, candidatures et entretiens (une requête chacun)
+    jobs = load_jobs(session, scope)
+    applications = load_client_applications(session, client_id, scope, PeriodStarts.at(now))
+    total_interviews_scheduled = count_client_interviews(session, client_id, scope)
     
-    # Candidats rejetés
-    rejected_query = select(func.count(Application.id)).join(
-        Job, Application.job_id == Job.id
-    ).where(
-        Job.created_by == current_user.id,
-        Application.is_in_shortlist == True,
-        Application.client_validated == False,
-        Application.client_validated_at.isnot(None)
-    )
-    if filters.start_date:
-        rejected_query = rejected_query.where(Application.created_at >= filters.start_date)
-    if filters.end_date:
-        rejected_query = rejected_query.where(Application.created_at <= filters.end_date)
-    if filters.job_id:
-        rejected_query = rejected_query.where(Application.job_id == filters.job_id)
-    total_candidates_rejected = session.exec(rejected_query).one()
+    total_jobs_created = column_total(jobs, "in_scope")
+    client_jobs_by_status = status_statistics(jobs, JOB_STATUSES, JobStatusStatistics, keep_empty=True)
     
     # Taux de validation
-    validation_rate = (total_candidates_validated / total_candidates_in_shortlist * 100) if total_candidates_in_shortlist > 0 else None
-    
-    # Entretiens planifiés pour les besoins du client
-    interviews_query = select(func.count(Interview.id)).join(
-        Application, Interview.application_id == Application.id
-    ).join(
-        Job, Application.job_id == Job.id
-    ).where(
-        Job.created_by == current_user.id
-    )
-    if filters.start_date:
-        interviews_query = interviews_query.where(Interview.created_at >= filters.start_date)
-    if filters.end_date:
-        interviews_query = interviews_query.where(Interview.created_at <= filters.end_date)
-    if filters.job_id:
-        interviews_query = interviews_query.join(Application).where(Application.job_id == filters.job_id)
-    total_interviews_scheduled = session.exec(interviews_query).one()
-    
-    # Temps moyen de recrutement (Time to Hire)
-    time_to_hire_query = select(
-        func.avg(
-            func.extract('epoch', Application.updated_at - Job.created_at) / 86400
-        )
-    ).select_from(Application).join(Job, Application.job_id == Job.id).where(
-        Job.created_by == current_user.id,
-        Application.status == "embauché",
-        Application.updated_at.isnot(None),
-        Job.created_at.isnot(None)
-    )
-    if filters.start_date:
-        time_to_hire_query = time_to_hire_query.where(Job.created_at >= filters.start_date)
-    if filters.end_date:
-        time_to_hire_query = time_to_hire_query.where(Job.created_at <= filters.end_date)
-    if filters.job_id:
-        time_to_hire_query = time_to_hire_query.where(Job.id == filters.job_id)
-    avg_time_to_hire = session.exec(time_to_hire_query).one()
-    average_time_to_hire = float(avg_time_to_hire) if avg_time_to_hire else None
-    
-    # Temps moyen de pourvoir un poste (Time to Fill)
-    time_to_fill_query = select(
-        func.avg(
-            func.extract('epoch', Application.updated_at - Job.validated_at) / 86400
-        )
-    ).select_from(Application).join(Job, Application.job_id == Job.id).where(
-        Job.created_by == current_user.id,
-        Application.status == "offre",
-        Application.updated_at.isnot(None),
-        Job.validated_at.isnot(None)
-    )
-    if filters.start_date:
-        time_to_fill_query = time_to_fill_query.where(Job.created_at >= filters.start_date)
-    if filters.end_date:
-        time_to_fill_query = time_to_fill_query.where(Job.created_at <= filters.end_date)
-    if filters.job_id:
-        time_to_fill_query = time_to_fill_query.where(Job.id == filters.job_id)
-    avg_time_to_fill = session.exec(time_to_fill_query).one()
-    average_time_to_fill = float(avg_time_to_fill) if avg_time_to_fill else None
+    validation_rate = percentage(applications["validated"], applications["shortlisted"])
     
     # % de postes respectant le délai
-    TARGET_DAYS = 60
-    closed_jobs_query = select(Job).where(
-        Job.created_by == current_user.id,
-        Job.status == "clôturé",
-        Job.closed_at.isnot(None),
-        Job.validated_at.isnot(None)
-    )
-    if filters.start_date:
-        closed_jobs_query = closed_jobs_query.where(Job.created_at >= filters.start_date)
-    if filters.end_date:
-        closed_jobs_query = closed_jobs_query.where(Job.created_at <= filters.end_date)
-    if filters.job_id:
-        closed_jobs_query = closed_jobs_query.where(Job.id == filters.job_id)
-    closed_jobs = session.exec(closed_jobs_query).all()
+    on_time_rate = jobs_on_time_rate(session, scope)
     
-    on_time_count = 0
-    for job in closed_jobs:
-        if job.closed_at and job.validated_at:
-            duration = (job.closed_at - job.validated_at).total_seconds() / 86400
-            if duration <= TARGET_DAYS:
-                on_time_count += 1
-    
-    jobs_on_time_rate = (on_time_count / len(closed_jobs) * 100) if closed_jobs else None
-    
-    # Statistiques de sourcing pour les besoins du client
+    # Statistiques de sourcing pour les besoins du client (candidats sourcés via leurs candidatures)
     sourcing_stats = None
-    from datetime import datetime, timedelta
-    now = datetime.utcnow()
-    today_start = datetime(now.year, now.month, now.day)
-    month_start = datetime(now.year, now.month, 1)
-    year_start = datetime(now.year, 1, 1)
-    
-    # Récupérer les IDs des jobs du client
-    client_jobs_ids_query = select(Job.id).where(Job.created_by == current_user.id)
-    if filters.job_id:
-        client_jobs_ids_query = client_jobs_ids_query.where(Job.id == filters.job_id)
-    client_job_ids = session.exec(client_jobs_ids_query).all()
-    
-    if client_job_ids:
-        # Candidats sourcés via les applications des jobs du client
-        today_count_query = select(func.count(Application.id)).join(
-            Candidate, Application.candidate_id == Candidate.id
-        ).where(
-            Application.job_id.in_(client_job_ids),
-            Candidate.status == "sourcé",
-            Candidate.created_at >= today_start
-        )
-        if filters.start_date:
-            today_count_query = today_count_query.where(Candidate.created_at >= filters.start_date)
-        if filters.end_date:
-            today_count_query = today_count_query.where(Candidate.created_at <= filters.end_date)
-        today_count = session.exec(today_count_query).one()
-        
-        this_month_count_query = select(func.count(Application.id)).join(
-            Candidate, Application.candidate_id == Candidate.id
-        ).where(
-            Application.job_id.in_(client_job_ids),
-            Candidate.status == "sourcé",
-            Candidate.created_at >= month_start
-        )
-        if filters.start_date:
-            this_month_count_query = this_month_count_query.where(Candidate.created_at >= filters.start_date)
-        if filters.end_date:
-            this_month_count_query = this_month_count_query.where(Candidate.created_at <= filters.end_date)
-        this_month_count = session.exec(this_month_count_query).one()
-        
-        this_year_count_query = select(func.count(Application.id)).join(
-            Candidate, Application.candidate_id == Candidate.id
-        ).where(
-            Application.job_id.in_(client_job_ids),
-            Candidate.status == "sourcé",
-            Candidate.created_at >= year_start
-        )
-        if filters.start_date:
-            this_year_count_query = this_year_count_query.where(Candidate.created_at >= filters.start_date)
-        if filters.end_date:
-            this_year_count_query = this_year_count_query.where(Candidate.created_at <= filters.end_date)
-        this_year_count = session.exec(this_year_count_query).one()
-        
-        # Total candidats sourcés
-        all_candidates_query = select(func.count(Application.id)).join(
-            Candidate, Application.candidate_id == Candidate.id
-        ).where(
-            Application.job_id.in_(client_job_ids),
-            Candidate.status == "sourcé"
-        )
-        if filters.start_date:
-            all_candidates_query = all_candidates_query.where(Candidate.created_at >= filters.start_date)
-        if filters.end_date:
-            all_candidates_query = all_candidates_query.where(Candidate.created_at <= filters.end_date)
-        total_candidates = session.exec(all_candidates_query).one()
-        
-        # Calculer les moyennes
-        if filters.start_date:
-            start_date = filters.start_date
-        else:
-            first_candidate_query = select(func.min(Candidate.created_at)).join(
-                Application, Candidate.id == Application.candidate_id
-            ).where(
-                Application.job_id.in_(client_job_ids),
-                Candidate.status == "sourcé"
-            )
-            first_candidate_date = session.exec(first_candidate_query).one()
-            start_date = first_candidate_date if first_candidate_date else now - timedelta(days=30)
-        
-        end_date = filters.end_date if filters.end_date else now
-        days_diff = (end_date - start_date).days
-        if days_diff <= 0:
-            days_diff = 1
-        
-        per_day = total_candidates / days_diff if days_diff > 0 else 0
-        per_month = per_day * 30
-        per_year = per_day * 365
-        
-        sourcing_stats = SourcingStatistics(
-            per_day=round(per_day, 2),
-            per_month=round(per_month, 2),
-            per_year=round(per_year, 2),
-            today_count=today_count,
-            this_month_count=this_month_count,
-            this_year_count=this_year_count
-        )
+    if column_total(jobs, "in_scope_all") > 0:
+        sourcing_stats = sourcing_statistics_from(applications, "sourced_total", filters, now)
     
     return ClientKPIs(
         total_jobs_created=total_jobs_created,
         jobs_by_status=client_jobs_by_status,
-        total_candidates_in_shortlist=total_candidates_in_shortlist,
-        total_candidates_validated=total_candidates_validated,
-        total_candidates_rejected=total_candidates_rejected,
+        total_candidates_in_shortlist=applications["shortlisted"],
+        total_candidates_validated=applications["validated"],
+        total_candidates_rejected=applications["rejected"],
         validation_rate=validation_rate,
         total_interviews_scheduled=total_interviews_scheduled,
-        average_time_to_hire=average_time_to_hire,
-        average_time_to_fill=average_time_to_fill,
-        jobs_on_time_rate=jobs_on_time_rate,
+        average_time_to_hire=as_float(applications["time_to_hire"]),
+        average_time_to_fill=as_float(applications["time_to_fill"]),
+        jobs_on_time_rate=on_time_rate,
         sourcing_statistics=sourcing_stats
     )
-
@@ -0,0 +1,111 @@
+"""
+Routes des administrateurs de la plateforme (hors tenant)
+
+Connexion des administrateurs (base MASTER) et statistiques agrégées sur
+l'ensemble des entreprises.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, EmailStr
+
+from auth import authenticate_platform_admin, create_platform_access_token, require_platform_admin
+from models_master import PlatformAdmin
+from services.platform_analytics import REPORTS, active_tenants, cached_report
+from tenant_manager import get_master_session
+
+router = APIRouter(prefix="/platform", tags=["platform"])
+
+
+class PlatformLogin(BaseModel):
+    """Schéma pour la connexion d'un administrateur de la plateforme"""
+    email: EmailStr
+    password: str
+
+
+class PlatformToken(BaseModel):
+    """Schéma de réponse pour le token d'un administrateur de la plateforme"""
+    access_token: str
+    token_type: str
+    admin_id: str
+    admin_role: str
+    admin_email: str
+    admin_name: str
+
+
+class TenantCompany(BaseModel):
+    id: UUID
+    name: str
+
+
+class TenantReport(BaseModel):
+    """Résultat d'une base tenant (error renseigné si elle n'a pas répondu)"""
+    db_name: str
+    companies: List[TenantCompany]
+    rows: List[Dict[str, Any]]
+    error: Optional[str] = None
+    elapsed_ms: Optional[int] = None
+
+
+class PlatformReport(BaseModel):
+    """Rapport agrégé sur toutes les bases tenant actives"""
+    report: str
+    since: datetime  # Début de la période (mois)
+    generated_at: datetime
+    tenants: List[TenantReport]
+    totals: List[Dict[str, Any]]  # Bases ayant répondu
+    failed: int  # Bases en échec ou hors délai
+    elapsed_ms: int
+
+
+@router.post("/auth/login", response_model=PlatformToken)
+def platform_login(credentials: PlatformLogin):
+    """
+    Connexion d'un administrateur de la plateforme
+
+    Le token ne sélectionne aucun tenant : il ne donne accès qu'aux routes /platform.
+    """
+    admin = authenticate_platform_admin(credentials.email, credentials.password)
+    if admin is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Email ou mot de passe incorrect",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlatformToken(
+        access_token=create_platform_access_token(admin),
+        token_type="bearer",
+        admin_id=str(admin.id),
+        admin_role=admin.role,
+        admin_email=admin.email,
+        admin_name=f"{admin.first_name} {admin.last_name}",
+    )
+
+
+def load_active_tenants():
+    with get_master_session() as master_session:
+        return active_tenants(master_session)
+
+
+@router.get("/analytics/{report}", response_model=PlatformReport)
+def get_platform_analytics(
+    report: str,
+    months: int = Query(12, ge=1, le=36, description="Nombre de mois (mois courant compris)"),
+    refresh: bool = Query(False, description="Ignorer le rapport en cache"),
+    admin: PlatformAdmin = Depends(require_platform_admin)
+):
+    """
+    Récupère un rapport agrégé sur toutes les entreprises
+
+    Rapports: usage (volumes par entreprise), hires (embauches par mois),
+    llm_usage (appels au modèle enregistrés par mois).
+    Accès réservé aux administrateurs de la plateforme
+    """
+    if report not in REPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Rapport inconnu: {report} (valeurs possibles: {', '.join(REPORTS)})"
+        )
+    return cached_report(report, months, load_active_tenants, refresh=refresh)
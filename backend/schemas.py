@@ -2,7 +2,7 @@
 Schémas Pydantic pour la validation des données d'entrée/sortie
 """
 from pydantic import BaseModel, ConfigDict, Field, field_validator
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime, date
 from uuid import UUID
 from models import JobStatus, UrgencyLevel
@@ -178,6 +178,49 @@ class JobResponseWithCreator(JobResponse):
     created_by_email: Optional[str] = None
 
 
+class FacetCount(BaseModel):
+    """Nombre de besoins pour une valeur de facette"""
+    value: Optional[str]  # None: non renseigné
+    count: int
+
+
+class JobSearchResponse(BaseModel):
+    """Résultat de la recherche de besoins par facettes"""
+    total: int
+    items: list[dict[str, Any]]  # Besoins (champs selon view / fields)
+    facets: dict[str, list[FacetCount]]
+
+
+class PipelineCard(BaseModel):
+    """Carte d'une candidature dans le tableau d'un besoin"""
+    id: UUID
+    candidate_id: UUID
+    candidate_name: str
+    candidate_email: Optional[str] = None
+    candidate_profile_title: Optional[str] = None
+    candidate_years_of_experience: Optional[int] = None
+    candidate_photo_url: Optional[str] = None
+    candidate_photo_thumbnail_url: Optional[str] = None
+    is_in_shortlist: bool
+    client_validated: Optional[bool] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class PipelineColumn(BaseModel):
+    """Colonne (statut) du tableau d'un besoin"""
+    status: str
+    count: int  # Nombre total de candidatures dans la colonne
+    items: list[PipelineCard]
+    next_cursor: Optional[str] = None  # Curseur de la suite de la colonne (None: colonne complète)
+
+
+class JobPipelineResponse(BaseModel):
+    """Tableau kanban d'un besoin"""
+    job_id: UUID
+    columns: list[PipelineColumn]
+
+
 class JobSubmitForValidation(BaseModel):
     """Schéma pour soumettre un besoin pour validation"""
     pass  # Pas de champs supplémentaires, juste une action
@@ -218,7 +261,9 @@ class CandidateParseResponse(BaseModel):
     skills: Optional[list[str]] = None
     source: Optional[str] = None
     notes: Optional[str] = None
-    profile_picture_base64: Optional[str] = Field(None, description="Photo de profil extraite en base64 (format data URI)")
+    profile_picture_url: Optional[str] = Field(None, description="URL de la photo de profil extraite du CV")
+    profile_picture_thumbnail_url: Optional[str] = Field(None, description="URL de la miniature (256px WebP) de la photo extraite")
+    profile_picture_base64: Optional[str] = Field(None, description="Obsolète: toujours null, utiliser profile_picture_url")
 
 
 class CandidateUpdate(BaseModel):
@@ -250,6 +295,7 @@ class CandidateResponse(BaseModel):
     cv_file_path: Optional[str]
     profile_picture_url: Optional[str]  # URL de la photo (ancien nom, conservé pour compatibilité)
     photo_url: Optional[str]  # URL de la photo de profil
+    photo_thumbnail_url: Optional[str] = None  # URL de la miniature 256px WebP (None si non générée)
     tags: Optional[list[str]]
     skills: Optional[list[str]]  # Liste de compétences (PostgreSQL ARRAY)
     source: Optional[str]
@@ -263,6 +309,61 @@ class CandidateResponse(BaseModel):
     updated_at: datetime
 
 
+
+class CandidateImportRowResult(BaseModel):
+    """Résultat de l'import d'une ligne"""
+    line: int  # Numéro de la ligne de données (en-tête non compris) ou index dans le tableau JSON, à partir de 1
+    status: str  # créé | doublon | invalide
+    candidate_id: Optional[UUID] = None  # Candidat créé
+    existing_candidate_id: Optional[UUID] = None  # Candidat déjà présent (ou créé par une ligne précédente)
+    duplicate_of_line: Optional[int] = None  # Ligne du fichier dont cette ligne est le doublon
+    match_criteria: Optional[str] = None  # email | nom + prénom + téléphone | nom + prénom
+    errors: list[str] = []
+
+
+class CandidateImportReport(BaseModel):
+    """Rapport d'import en masse des candidats"""
+    total: int
+    created: int
+    duplicates: int
+    invalid: int
+    dry_run: bool = False
+    rows: list[CandidateImportRowResult]
+
+
+BULK_ACTION_MAX_ITEMS = 500  # Nombre maximum d'éléments par action groupée
+
+
+class CandidateBulkStatusUpdate(BaseModel):
+    """Schéma pour changer le statut d'un lot de candidats"""
+    candidate_ids: list[UUID] = Field(..., min_length=1, max_length=BULK_ACTION_MAX_ITEMS)
+    status: str = Field(..., description="Nouveau statut")
+
+
+class CandidateBulkTagsUpdate(BaseModel):
+    """Schéma pour ajouter / retirer des tags sur un lot de candidats"""
+    candidate_ids: list[UUID] = Field(..., min_length=1, max_length=BULK_ACTION_MAX_ITEMS)
+    add: list[str] = Field(default=[], description="Tags à ajouter")
+    remove: list[str] = Field(default=[], description="Tags à retirer")
+
+    @field_validator('add', 'remove')
+    @classmethod
+    def clean_tags(cls, v: list[str]) -> list[str]:
+        return [tag.strip() for tag in v if tag and tag.strip()]
+
+
+class BulkActionSkippedItem(BaseModel):
+    """Élément non modifié par une action groupée"""
+    id: UUID
+    reason: str
+
+
+class BulkActionResponse(BaseModel):
+    """Résultat d'une action groupée"""
+    updated: list[UUID]
+    updated_count: int
+    skipped: list[BulkActionSkippedItem] = []
+
 # ========== SCHÉMAS ÉQUIPES ==========
 
 class TeamCreate(BaseModel):
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Exporte les tables de faits de chaque tenant en Parquet pour les outils BI
+
+Par défaut, seules les lignes modifiées depuis le dernier export (filigrane
+updated_at par table) sont exportées ; --full réécrit les tables complètes.
+Les fichiers sont écrits dans le stockage de l'application sous
+exports/analytics/<base>/<table>/ (pyarrow requis: pip install pyarrow).
+Usage (depuis backend/):
+    python scripts/export_analytics.py                       # export incrémental
+    python scripts/export_analytics.py --full
+    python scripts/export_analytics.py --tables applications,interviews
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlmodel import select
+
+from models_master import DatabaseStatus, TenantDatabase
+from services.analytics_export import FACT_TABLES, export_table, require_pyarrow
+from services.storage import get_storage
+from tenant_manager import get_master_session, get_tenant_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export analytique Parquet des tenants")
+    parser.add_argument("--full", action="store_true", help="Exporte les tables complètes")
+    parser.add_argument("--tables", default=",".join(FACT_TABLES),
+                        help=f"Tables à exporter, séparées par des virgules (défaut: {','.join(FACT_TABLES)})")
+    args = parser.parse_args()
+
+    tables = [table.strip() for table in args.tables.split(",") if table.strip()]
+    unknown = [table for table in tables if table not in FACT_TABLES]
+    if unknown:
+        print(f"❌ Tables inconnues: {', '.join(unknown)}")
+        return 2
+
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 2
+
+    storage = get_storage()
+    with get_master_session() as master:
+        tenant_databases = master.exec(
+            select(TenantDatabase).where(TenantDatabase.status == DatabaseStatus.ACTIVE.value)
+        ).all()
+
+    # Plusieurs entreprises peuvent partager une même base : une seule passe par base
+    done = set()
+    failures = 0
+    for tenant_db in tenant_databases:
+        if tenant_db.db_name in done:
+            continue
+        done.add(tenant_db.db_name)
+        engine = get_tenant_engine(tenant_db.company_id)
+        if engine is None:
+            print(f"   ⚠️  Connexion impossible à {tenant_db.db_name}")
+            failures += 1
+            continue
+        try:
+            now = datetime.utcnow()
+            for table in tables:
+                result = export_table(engine, storage, table, args.full, now)
+                print(f"✅ {tenant_db.db_name}.{table}: {result.rows} ligne(s)" + (f" -> {result.key}" if result.key else ""))
+        except Exception as e:
+            print(f"   ❌ {tenant_db.db_name}: {e}")
+            failures += 1
+
+    print(f"📊 {len(done) - failures}/{len(done)} base(s) exportée(s)")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Génère les miniatures WebP des photos de profil existantes
+
+Les photos uploadées avant la mise en place du pipeline de miniatures
+n'en ont pas : ce script les crée une fois pour toutes (stockage local ou S3).
+Usage (depuis backend/): python scripts/generate_thumbnails.py
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.images import list_photos_without_thumbnails, generate_thumbnails
+
+
+def main():
+    photos = list_photos_without_thumbnails()
+    print(f"🖼️  {len(photos)} photo(s) sans miniatures")
+
+    generated = 0
+    for photo_key in photos:
+        if generate_thumbnails(photo_key):
+            generated += 1
+        else:
+            print(f"   ⚠️  Échec pour {photo_key}")
+
+    print(f"✅ Miniatures générées pour {generated}/{len(photos)} photo(s)")
+    return 0 if generated == len(photos) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Régénère les analyses IA des KPI (table kpi_ai_analyses) de chaque tenant
+
+Tâche planifiée nocturne : pour chaque périmètre (rôle + filtres) consulté
+récemment, une nouvelle analyse est générée si la dernière date de plus de
+--max-age-hours et que les données ont changé depuis. Les tableaux de bord
+servent ensuite ces analyses sans attendre l'IA.
+Usage (depuis backend/):
+    python scripts/refresh_kpi_ai_analyses.py                    # analyses de plus de 20 h
+    python scripts/refresh_kpi_ai_analyses.py --active-days 7
+    python scripts/refresh_kpi_ai_analyses.py --force            # même sans changement des données
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlmodel import Session, select
+
+from models_master import DatabaseStatus, TenantDatabase
+from routers.kpi import AI_ANALYSIS_SOURCE
+from services.kpi_ai_analysis import DONE, request_analysis, scopes_to_refresh
+from services.kpi_cache import data_version
+from tenant_manager import get_master_session, get_tenant_engine
+
+
+def refresh_tenant(engine, active_since: datetime, older_than: datetime, force: bool) -> str:
+    generated = failed = 0
+    with Session(engine) as session:
+        version = data_version(session)
+        for latest in scopes_to_refresh(session, active_since, older_than):
+            if not force and latest.data_version == version:
+                continue
+            analysis = request_analysis(
+                session, latest.role, json.loads(latest.filters), AI_ANALYSIS_SOURCE, run_now=True
+            )
+            if analysis.status == DONE:
+                generated += 1
+            else:
+                failed += 1
+    return f"{generated} analyse(s) régénérée(s), {failed} en échec"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Régénération des analyses IA des KPI")
+    parser.add_argument("--max-age-hours", type=float, default=20,
+                        help="Régénère les analyses plus anciennes que ce nombre d'heures (défaut: 20)")
+    parser.add_argument("--active-days", type=float, default=30,
+                        help="Périmètres demandés par un utilisateur depuis ce nombre de jours (défaut: 30)")
+    parser.add_argument("--force", action="store_true", help="Régénère même si les données n'ont pas changé")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    active_since = now - timedelta(days=args.active_days)
+    older_than = now - timedelta(hours=args.max_age_hours)
+    with get_master_session() as master:
+        tenant_databases = master.exec(
+            select(TenantDatabase).where(TenantDatabase.status == DatabaseStatus.ACTIVE.value)
+        ).all()
+
+    # Plusieurs entreprises peuvent partager une même base : une seule passe par base
+    done = set()
+    failures = 0
+    for tenant_db in tenant_databases:
+        if tenant_db.db_name in done:
+            continue
+        done.add(tenant_db.db_name)
+        engine = get_tenant_engine(tenant_db.company_id)
+        if engine is None:
+            print(f"   ⚠️  Connexion impossible à {tenant_db.db_name}")
+            failures += 1
+            continue
+        try:
+            print(f"✅ {tenant_db.db_name}: {refresh_tenant(engine, active_since, older_than, args.force)}")
+        except Exception as e:
+            print(f"   ❌ {tenant_db.db_name}: {e}")
+            failures += 1
+
+    print(f"📊 {len(done) - failures}/{len(done)} base(s) traitée(s)")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
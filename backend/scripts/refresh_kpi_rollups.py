@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Recalcule les agrégats KPI quotidiens (table kpi_daily_rollups) de chaque tenant
+
+Les agrégats sont maintenus après chaque commit par l'application ; cette tâche
+planifiée rattrape les écritures faites hors de l'application (SQL manuel,
+migrations) en recalculant les jours des lignes modifiées récemment.
+Usage (depuis backend/):
+    python scripts/refresh_kpi_rollups.py                  # lignes modifiées depuis 26 h
+    python scripts/refresh_kpi_rollups.py --since-hours 72
+    python scripts/refresh_kpi_rollups.py --full           # reconstruction complète
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlmodel import Session, select
+
+from models_master import DatabaseStatus, TenantDatabase
+from services.kpi_rollups import refresh_changed_since, rebuild_rollups, rollups_built
+from tenant_manager import get_master_session, get_tenant_engine
+
+
+def refresh_tenant(engine, since: datetime, full: bool) -> str:
+    with Session(engine) as session:
+        if full or not rollups_built(session):
+            rebuild_rollups(session)
+            session.commit()
+            return "reconstruits"
+        refreshed = refresh_changed_since(session, since)
+        session.commit()
+        return f"{refreshed} jour(s) recalculé(s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcul des agrégats KPI quotidiens")
+    parser.add_argument("--since-hours", type=float, default=26,
+                        help="Recalcule les jours des lignes modifiées depuis ce nombre d'heures (défaut: 26)")
+    parser.add_argument("--full", action="store_true", help="Reconstruit tous les agrégats")
+    args = parser.parse_args()
+
+    since = datetime.utcnow() - timedelta(hours=args.since_hours)
+    with get_master_session() as master:
+        tenant_databases = master.exec(
+            select(TenantDatabase).where(TenantDatabase.status == DatabaseStatus.ACTIVE.value)
+        ).all()
+
+    # Plusieurs entreprises peuvent partager une même base : une seule passe par base
+    done = set()
+    failures = 0
+    for tenant_db in tenant_databases:
+        if tenant_db.db_name in done:
+            continue
+        done.add(tenant_db.db_name)
+        engine = get_tenant_engine(tenant_db.company_id)
+        if engine is None:
+            print(f"   ⚠️  Connexion impossible à {tenant_db.db_name}")
+            failures += 1
+            continue
+        try:
+            print(f"✅ {tenant_db.db_name}: agrégats {refresh_tenant(engine, since, args.full)}")
+        except Exception as e:
+            print(f"   ❌ {tenant_db.db_name}: {e}")
+            failures += 1
+
+    print(f"📊 {len(done) - failures}/{len(done)} base(s) à jour")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
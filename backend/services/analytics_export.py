@@ -0,0 +1,312 @@
+"""
+Export analytique (Parquet) des tables de faits d'un tenant pour les outils BI
+
+Tables exportées : applications (avec la première entrée dans chaque étape),
+interviews, offers, jobs et candidates (résumé, sans données personnelles).
+Les lignes sont lues par lots avec un curseur côté serveur (iter_row_batches)
+et écrites en record batches Arrow dans un fichier Parquet compressé (zstd),
+un groupe de lignes par lot : la mémoire utilisée ne dépend pas du volume.
+
+Exports incrémentaux : pour chaque table, le filigrane (settings
+analytics_export:<table>) est la borne haute updated_at du dernier export ;
+l'export suivant contient les lignes modifiées depuis (nouvelles versions, à
+dédupliquer par id en gardant le plus grand updated_at). La borne haute est
+décalée de analytics_export_lag secondes pour ne pas manquer une transaction
+en cours. Un export complet réécrit toute la table et repositionne le filigrane.
+
+Fichiers : exports/analytics/<base>/<table>/full-<borne>.parquet ou
+incremental-<début>-<borne>.parquet, dans le stockage de l'application.
+"""
+import os
+import tempfile
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from config import settings
+from models import Application, ApplicationHistory, Candidate, Interview, Job, Offer, Setting
+from services.exports import iter_row_batches
+from services.kpi_engine import CANDIDATE_STATUSES
+from services.storage import StorageBackend
+
+# pyarrow est optionnel : seul l'export analytique en a besoin
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+ANALYTICS_EXPORT_BATCH_SIZE = 50000  # Lignes par record batch (et par groupe de lignes Parquet)
+ANALYTICS_EXPORT_PREFIX = "exports/analytics"
+WATERMARK_PREFIX = "analytics_export:"
+
+# Type de chaque colonne exportée (converti en type Arrow à l'écriture)
+ARROW_TYPES = {
+    "string": lambda: pa.string(),
+    "timestamp": lambda: pa.timestamp("us"),
+    "date": lambda: pa.date32(),
+    "int": lambda: pa.int64(),
+    "float": lambda: pa.float64(),
+    "bool": lambda: pa.bool_(),
+    "strings": lambda: pa.list_(pa.string()),
+}
+
+Column = Tuple[str, Any, str]  # (nom, expression, type)
+
+
+def _id(column: Any) -> Any:
+    """Identifiant exporté en texte"""
+    return cast(column, String)
+
+
+def stage_column(stage: str) -> str:
+    """Nom de colonne ASCII de l'entrée dans une étape (ex: entered_embauche)"""
+    ascii_stage = unicodedata.normalize("NFKD", stage).encode("ascii", "ignore").decode()
+    return f"entered_{ascii_stage}"
+
+
+@dataclass(frozen=True)
+class FactTable:
+    """Table de faits : colonnes exportées et requête des lignes modifiées dans [since, until)"""
+    model: Any
+    columns: Callable[[], List[Column]]
+    source: Callable[[Select, Optional[datetime], datetime], Select] = lambda statement, since, until: statement
+
+    def schema(self):
+        return pa.schema([(name, ARROW_TYPES[kind]()) for name, _, kind in self.columns()])
+
+    def build_query(self, since: Optional[datetime], until: datetime) -> Select:
+        statement = select(*(expression.label(name) for name, expression, _ in self.columns()))
+        statement = self.source(statement, since, until).where(self.model.updated_at < until)
+        if since is not None:
+            statement = statement.where(self.model.updated_at >= since)
+        return statement
+
+
+def _window(since: Optional[datetime], until: datetime) -> List[Any]:
+    conditions = [Application.updated_at < until]
+    if since is not None:
+        conditions.append(Application.updated_at >= since)
+    return conditions
+
+
+def _stage_entries(since: Optional[datetime], until: datetime):
+    """Première entrée de chaque candidature exportée dans chaque étape (historique lu une fois)"""
+    return (
+        select(
+            ApplicationHistory.application_id,
+            *(
+                func.min(ApplicationHistory.created_at).filter(ApplicationHistory.new_status == stage).label(stage_column(stage))
+                for stage in CANDIDATE_STATUSES
+            ),
+        )
+        .join(Application, Application.id == ApplicationHistory.application_id)
+        .where(*_window(since, until))
+        .group_by(ApplicationHistory.application_id)
+        .subquery("stage_entries")
+    )
+
+
+def _application_columns() -> List[Column]:
+    return [
+        ("id", _id(Application.id), "string"),
+        ("candidate_id", _id(Application.candidate_id), "string"),
+        ("job_id", _id(Application.job_id), "string"),
+        ("created_by", _id(Application.created_by), "string"),
+        ("status", Application.status, "string"),
+        ("is_in_shortlist", Application.is_in_shortlist, "bool"),
+        ("client_validated", Application.client_validated, "bool"),
+        ("client_validated_at", Application.client_validated_at, "timestamp"),
+        ("offer_sent_at", Application.offer_sent_at, "timestamp"),
+        ("created_at", Application.created_at, "timestamp"),
+        ("updated_at", Application.updated_at, "timestamp"),
+    ]
+
+
+def _with_stage_entries(statement: Select, since: Optional[datetime], until: datetime) -> Select:
+    entries = _stage_entries(since, until)
+    return statement.add_columns(
+        *(entries.c[stage_column(stage)].label(stage_column(stage)) for stage in CANDIDATE_STATUSES)
+    ).select_from(Application).outerjoin(entries, entries.c.application_id == Application.id)
+
+
+class ApplicationFacts(FactTable):
+    """Candidatures et première entrée dans chaque étape du pipeline"""
+
+    def schema(self):
+        return pa.schema(
+            [(name, ARROW_TYPES[kind]()) for name, _, kind in self.columns()]
+            + [(stage_column(stage), pa.timestamp("us")) for stage in CANDIDATE_STATUSES]
+        )
+
+
+FACT_TABLES: Dict[str, FactTable] = {
+    "applications": ApplicationFacts(Application, _application_columns, _with_stage_entries),
+    "interviews": FactTable(Interview, lambda: [
+        ("id", _id(Interview.id), "string"),
+        ("application_id", _id(Interview.application_id), "string"),
+        ("interviewer_id", _id(Interview.interviewer_id), "string"),
+        ("created_by", _id(Interview.created_by), "string"),
+        ("interview_type", Interview.interview_type, "string"),
+        ("status", Interview.status, "string"),
+        ("decision", Interview.decision, "string"),
+        ("score", Interview.score, "int"),
+        ("scheduled_at", Interview.scheduled_at, "timestamp"),
+        ("scheduled_end_at", Interview.scheduled_end_at, "timestamp"),
+        ("feedback_provided_at", Interview.feedback_provided_at, "timestamp"),
+        ("completed_at", Interview.completed_at, "timestamp"),
+        ("cancelled_at", Interview.cancelled_at, "timestamp"),
+        ("rescheduled_at", Interview.rescheduled_at, "timestamp"),
+        ("created_at", Interview.created_at, "timestamp"),
+        ("updated_at", Interview.updated_at, "timestamp"),
+    ]),
+    "offers": FactTable(Offer, lambda: [
+        ("id", _id(Offer.id), "string"),
+        ("application_id", _id(Offer.application_id), "string"),
+        ("sent_by", _id(Offer.sent_by), "string"),
+        ("salary", Offer.salary, "float"),
+        ("contract_type", Offer.contract_type, "string"),
+        ("status", Offer.status, "string"),
+        ("start_date", Offer.start_date, "timestamp"),
+        ("sent_at", Offer.sent_at, "timestamp"),
+        ("responded_at", Offer.responded_at, "timestamp"),
+        ("created_at", Offer.created_at, "timestamp"),
+        ("updated_at", Offer.updated_at, "timestamp"),
+    ]),
+    "jobs": FactTable(Job, lambda: [
+        ("id", _id(Job.id), "string"),
+        ("title", Job.title, "string"),
+        ("department", Job.department, "string"),
+        ("entreprise", Job.entreprise, "string"),
+        ("contract_type", Job.contract_type, "string"),
+        ("motif_recrutement", Job.motif_recrutement, "string"),
+        ("urgency", Job.urgency, "string"),
+        ("niveau_formation", Job.niveau_formation, "string"),
+        ("experience_requise", Job.experience_requise, "int"),
+        ("localisation", Job.localisation, "string"),
+        ("teletravail", Job.teletravail, "string"),
+        ("salaire_minimum", Job.salaire_minimum, "float"),
+        ("salaire_maximum", Job.salaire_maximum, "float"),
+        ("budget", Job.budget, "float"),
+        ("status", Job.status, "string"),
+        ("created_by", _id(Job.created_by), "string"),
+        ("validated_by", _id(Job.validated_by), "string"),
+        ("date_prise_poste", Job.date_prise_poste, "date"),
+        ("validated_at", Job.validated_at, "timestamp"),
+        ("closed_at", Job.closed_at, "timestamp"),
+        ("created_at", Job.created_at, "timestamp"),
+        ("updated_at", Job.updated_at, "timestamp"),
+    ]),
+    # Résumé sans nom, email, téléphone ni notes
+    "candidates": FactTable(Candidate, lambda: [
+        ("id", _id(Candidate.id), "string"),
+        ("profile_title", Candidate.profile_title, "string"),
+        ("years_of_experience", Candidate.years_of_experience, "int"),
+        ("source", Candidate.source, "string"),
+        ("status", Candidate.status, "string"),
+        ("tags", Candidate.tags, "strings"),
+        ("skills", Candidate.skills, "strings"),
+        ("has_cv", Candidate.cv_file_path.isnot(None), "bool"),
+        ("created_by", _id(Candidate.created_by), "string"),
+        ("created_at", Candidate.created_at, "timestamp"),
+        ("updated_at", Candidate.updated_at, "timestamp"),
+    ]),
+}
+
+
+@dataclass
+class ExportResult:
+    table: str
+    rows: int
+    key: Optional[str]  # None si aucune ligne modifiée
+    since: Optional[datetime]
+    until: datetime
+
+
+# ==================== FILIGRANES ====================
+
+def read_watermark(session: Session, table: str) -> Optional[datetime]:
+    setting = session.execute(select(Setting).where(Setting.key == WATERMARK_PREFIX + table)).scalars().first()
+    return datetime.fromisoformat(setting.value) if setting else None
+
+
+def write_watermark(session: Session, table: str, until: datetime) -> None:
+    """Enregistre la borne haute exportée (sans commit)"""
+    setting = session.execute(select(Setting).where(Setting.key == WATERMARK_PREFIX + table)).scalars().first()
+    if setting is None:
+        setting = Setting(key=WATERMARK_PREFIX + table, value="", description=f"Export analytique de {table} (updated_at)")
+    setting.value = until.isoformat()
+    setting.updated_at = datetime.utcnow()
+    session.add(setting)
+
+
+# ==================== ÉCRITURE ====================
+
+def require_pyarrow() -> None:
+    """Erreur explicite si pyarrow (schémas et écriture Parquet) n'est pas installé"""
+    if pa is None:
+        raise RuntimeError("pyarrow n'est pas installé. Installez-le avec: pip install pyarrow")
+
+
+def write_parquet(batches: Iterable[Sequence], schema: Any, path: Path) -> int:
+    """Écrit les lots de lignes (ordre des colonnes du schéma) en Parquet ; retourne le nombre de lignes"""
+    require_pyarrow()
+    rows = 0
+    with pq.ParquetWriter(str(path), schema, compression="zstd") as writer:
+        for batch in batches:
+            columns = [
+                pa.array([row[index] for row in batch], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            rows += len(batch)
+    return rows
+
+
+def export_key(db_name: str, table: str, since: Optional[datetime], until: datetime) -> str:
+    stamp = "%Y%m%dT%H%M%S"
+    name = f"full-{until:{stamp}}" if since is None else f"incremental-{since:{stamp}}-{until:{stamp}}"
+    return f"{ANALYTICS_EXPORT_PREFIX}/{db_name}/{table}/{name}.parquet"
+
+
+def export_table(
+    engine: Engine,
+    storage: StorageBackend,
+    table: str,
+    full: bool,
+    now: datetime,
+    batch_size: int = ANALYTICS_EXPORT_BATCH_SIZE
+) -> ExportResult:
+    """Exporte une table (complète ou depuis son filigrane) puis avance le filigrane"""
+    require_pyarrow()
+    fact = FACT_TABLES[table]
+    until = now - timedelta(seconds=settings.analytics_export_lag)
+    with Session(engine) as session:
+        since = None if full else read_watermark(session, table)
+
+    fd, tmp_name = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        rows = write_parquet(
+            iter_row_batches(engine, fact.build_query(since, until), batch_size), fact.schema(), Path(tmp_name)
+        )
+        key = None
+        if rows or since is None:
+            key = export_key(engine.url.database, table, since, until)
+            storage.write_file(key, Path(tmp_name), "application/vnd.apache.parquet")
+    finally:
+        os.unlink(tmp_name)
+
+    # Le filigrane n'avance qu'une fois le fichier enregistré
+    with Session(engine) as session:
+        write_watermark(session, table, until)
+        session.commit()
+    return ExportResult(table=table, rows=rows, key=key, since=since, until=until)
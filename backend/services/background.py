@@ -0,0 +1,62 @@
+"""
+Exécution de tâches en arrière-plan dans le processus (rendu d'aperçus, précalculs, ...)
+
+Les tâches sont dédupliquées par clé : une même tâche demandée plusieurs fois
+pendant son exécution n'est lancée qu'une seule fois. Le contexte de la requête
+(tenant courant notamment) est propagé au thread d'exécution.
+"""
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.background_workers,
+    thread_name_prefix="background"
+)
+_pending: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+
+def _on_done(key: str, future: Future) -> None:
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"❌ Tâche d'arrière-plan '{key}' en échec: {exc}", exc_info=exc)
+
+
+def submit_task(key: str, fn: Callable, *args, **kwargs) -> Future:
+    """
+    Planifie fn(*args, **kwargs) en arrière-plan
+
+    Si une tâche de même clé est déjà en attente ou en cours, elle est retournée
+    au lieu d'en créer une nouvelle.
+    """
+    with _lock:
+        existing = _pending.get(key)
+        if existing is not None and not existing.done():
+            return existing
+        ctx = contextvars.copy_context()
+        future = _executor.submit(ctx.run, fn, *args, **kwargs)
+        _pending[key] = future
+    future.add_done_callback(lambda f: _on_done(key, f))
+    return future
+
+
+def is_pending(key: str) -> bool:
+    """Indique si une tâche de cette clé est en attente ou en cours"""
+    with _lock:
+        future = _pending.get(key)
+        return future is not None and not future.done()
+
+
+def shutdown(wait: bool = False) -> None:
+    """Arrête l'exécuteur (appelé à l'arrêt de l'application)"""
+    _executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,367 @@
+"""
+Service des actions groupées sur le pipeline (statuts, tags, shortlist)
+
+Les règles des routes unitaires sont appliquées à tout un lot en quelques requêtes :
+- une requête charge l'état des lignes et la présence d'un feedback d'entretien ;
+- une instruction UPDATE par table modifie toutes les lignes retenues ;
+- l'historique des candidatures est écrit en une seule insertion multi-lignes ;
+- un seul commit.
+
+Les lignes refusées (introuvables, feedback manquant, déjà dans l'état demandé)
+sont retournées avec leur motif, les autres sont appliquées.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import ARRAY, Text, bindparam, case, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlmodel import Session
+
+from models import Application, ApplicationHistory, Candidate, Interview
+
+# Statuts autorisés (contrainte CHECK des tables candidates et applications)
+PIPELINE_STATUSES = ["sourcé", "qualifié", "entretien_rh", "entretien_client", "shortlist", "offre", "embauché", "rejeté"]
+
+# Avancement dans le pipeline : le statut du candidat n'est jamais rétrogradé par une candidature
+STATUS_PRIORITY = {
+    "rejeté": 0,
+    "sourcé": 1,
+    "qualifié": 2,
+    "entretien_rh": 3,
+    "entretien_client": 4,
+    "shortlist": 5,
+    "offre": 6,
+    "embauché": 7,
+}
+
+# Statuts qui exigent un entretien avec feedback
+FEEDBACK_REQUIRED_STATUSES = ("shortlist", "offre")
+
+FEEDBACK_REQUIRED_MESSAGE = "Veuillez saisir un feedback avant de changer le statut"
+APPLICATION_NOT_FOUND_MESSAGE = "Candidature non trouvée"
+CANDIDATE_NOT_FOUND_MESSAGE = "Candidat non trouvé"
+UNCHANGED_MESSAGE = "Déjà dans cet état"
+
+UPDATE_TAGS_SQL = """
+UPDATE candidates
+SET tags = NULLIF(ARRAY(
+        SELECT tag
+        FROM unnest(COALESCE(tags, '{}') || CAST(:add AS TEXT[])) WITH ORDINALITY AS t(tag, position)
+        WHERE NOT tag = ANY(CAST(:remove AS TEXT[]))
+        GROUP BY tag
+        ORDER BY min(position)
+    ), '{}'),
+    updated_at = :now
+WHERE id = ANY(:ids)
+RETURNING id
+"""
+
+
+@dataclass
+class BulkOutcome:
+    """Résultat d'une action groupée"""
+    updated: List[UUID] = field(default_factory=list)
+    skipped: List[Dict[str, Any]] = field(default_factory=list)
+
+    def skip(self, item_id: UUID, reason: str) -> None:
+        self.skipped.append({"id": item_id, "reason": reason})
+
+    def as_response(self) -> Dict[str, Any]:
+        return {"updated": self.updated, "updated_count": len(self.updated), "skipped": self.skipped}
+
+
+def unique_ids(ids: Iterable[UUID]) -> List[UUID]:
+    """Identifiants sans doublons, dans l'ordre de la requête"""
+    return list(dict.fromkeys(ids))
+
+
+def has_interview_feedback(candidate_id_column):
+    """Condition EXISTS : le candidat a au moins un entretien avec un feedback non vide"""
+    return (
+        select(Interview.id)
+        .join(Application, Application.id == Interview.application_id)
+        .where(
+            Application.candidate_id == candidate_id_column,
+            Interview.feedback.isnot(None),
+            func.trim(Interview.feedback) != "",
+        )
+        .exists()
+    )
+
+
+def requires_feedback(old_status: Optional[str], new_status: str) -> bool:
+    """Passage en shortlist / offre depuis un statut qui n'en fait pas partie"""
+    return new_status in FEEDBACK_REQUIRED_STATUSES and old_status not in FEEDBACK_REQUIRED_STATUSES
+
+
+def plan_application_status(
+    ids: Sequence[UUID],
+    rows: Iterable[Tuple],
+    new_status: str,
+    outcome: BulkOutcome,
+) -> Tuple[List[Tuple[UUID, str]], Set[UUID]]:
+    """
+    Détermine les candidatures à modifier et les candidats dont le statut progresse
+
+    rows contient (application_id, statut, candidate_id, statut du candidat, feedback présent).
+    Retourne ([(application_id, ancien statut)], {candidate_id à promouvoir}).
+    """
+    found = {row[0]: row for row in rows}
+    changes = []
+    promoted = set()
+    for application_id in ids:
+        row = found.get(application_id)
+        if row is None:
+            outcome.skip(application_id, APPLICATION_NOT_FOUND_MESSAGE)
+            continue
+        _, old_status, candidate_id, candidate_status, has_feedback = row
+        if old_status == new_status:
+            outcome.skip(application_id, UNCHANGED_MESSAGE)
+            continue
+        if requires_feedback(old_status, new_status) and not has_feedback:
+            outcome.skip(application_id, FEEDBACK_REQUIRED_MESSAGE)
+            continue
+        changes.append((application_id, old_status))
+        if STATUS_PRIORITY.get(new_status, 0) > STATUS_PRIORITY.get(candidate_status, 0):
+            promoted.add(candidate_id)
+    return changes, promoted
+
+
+def plan_shortlist(
+    ids: Sequence[UUID],
+    rows: Iterable[Tuple],
+    in_shortlist: bool,
+    outcome: BulkOutcome,
+) -> List[Tuple[UUID, str, str]]:
+    """
+    Détermine les candidatures à ajouter à (ou retirer de) la shortlist
+
+    rows contient (application_id, statut, is_in_shortlist, feedback présent).
+    Retourne [(application_id, ancien statut, nouveau statut)].
+    """
+    found = {row[0]: row for row in rows}
+    changes = []
+    for application_id in ids:
+        row = found.get(application_id)
+        if row is None:
+            outcome.skip(application_id, APPLICATION_NOT_FOUND_MESSAGE)
+            continue
+        _, old_status, is_in_shortlist, has_feedback = row
+        if bool(is_in_shortlist) == in_shortlist:
+            outcome.skip(application_id, UNCHANGED_MESSAGE)
+            continue
+        if in_shortlist:
+            if requires_feedback(old_status, "shortlist") and not has_feedback:
+                outcome.skip(application_id, FEEDBACK_REQUIRED_MESSAGE)
+                continue
+            new_status = "shortlist"
+        else:
+            # Comme toggle-shortlist : retour à "sourcé" seulement depuis le statut shortlist
+            new_status = "sourcé" if old_status == "shortlist" else old_status
+        changes.append((application_id, old_status, new_status))
+    return changes
+
+
+def history_rows(
+    changes: Iterable[Tuple[UUID, Optional[str], str]],
+    changed_by: UUID,
+    notes: Optional[str],
+    now: datetime,
+) -> List[Dict[str, Any]]:
+    """Lignes d'historique des changements de statut effectifs"""
+    return [
+        {
+            "id": uuid4(),
+            "application_id": application_id,
+            "changed_by": changed_by,
+            "old_status": old_status,
+            "new_status": new_status,
+            "notes": notes,
+            "created_at": now,
+        }
+        for application_id, old_status, new_status in changes
+        if old_status != new_status
+    ]
+
+
+def record_status_changes(
+    session: Session,
+    changes: Iterable[Tuple[UUID, Optional[str], str]],
+    changed_by: UUID,
+    notes: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> None:
+    """Écrit l'historique des changements de statut effectifs (actions groupées et routes unitaires, sans commit)"""
+    rows = history_rows(changes, changed_by, notes, now or datetime.utcnow())
+    if rows:
+        # Une seule instruction INSERT ... VALUES (...), (...), ...
+        session.execute(insert(ApplicationHistory).values(rows))
+
+
+def bulk_update_application_status(
+    session: Session,
+    application_ids: Sequence[UUID],
+    new_status: str,
+    changed_by: UUID,
+    notes: Optional[str] = None,
+) -> BulkOutcome:
+    """Déplace un lot de candidatures dans le pipeline (mêmes règles que PATCH /applications/{id}/status)"""
+    ids = unique_ids(application_ids)
+    outcome = BulkOutcome()
+    rows = session.execute(
+        select(
+            Application.id,
+            Application.status,
+            Application.candidate_id,
+            Candidate.status,
+            has_interview_feedback(Application.candidate_id),
+        )
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .where(Application.id.in_(ids))
+        .with_for_update(of=Application.__table__)
+    ).all()
+
+    changes, promoted = plan_application_status(ids, rows, new_status, outcome)
+    if changes:
+        now = datetime.utcnow()
+        values = {"status": new_status, "updated_at": now}
+        if new_status == "shortlist":
+            values["is_in_shortlist"] = True
+        elif new_status in ["embauché", "rejeté"]:
+            values["is_in_shortlist"] = False
+
+        changed_ids = [application_id for application_id, _ in changes]
+        session.execute(
+            update(Application)
+            .where(Application.id.in_(changed_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if promoted:
+            session.execute(
+                update(Candidate)
+                .where(Candidate.id.in_(promoted))
+                .values(status=new_status, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        record_status_changes(
+            session,
+            ((application_id, old_status, new_status) for application_id, old_status in changes),
+            changed_by, notes, now,
+        )
+        outcome.updated = changed_ids
+
+    session.commit()
+    return outcome
+
+
+def bulk_set_shortlist(
+    session: Session,
+    application_ids: Sequence[UUID],
+    in_shortlist: bool,
+    changed_by: UUID,
+) -> BulkOutcome:
+    """Ajoute un lot de candidatures à la shortlist (ou les en retire)"""
+    ids = unique_ids(application_ids)
+    outcome = BulkOutcome()
+    rows = session.execute(
+        select(
+            Application.id,
+            Application.status,
+            Application.is_in_shortlist,
+            has_interview_feedback(Application.candidate_id),
+        )
+        .where(Application.id.in_(ids))
+        .with_for_update(of=Application.__table__)
+    ).all()
+
+    changes = plan_shortlist(ids, rows, in_shortlist, outcome)
+    if changes:
+        now = datetime.utcnow()
+        changed_ids = [application_id for application_id, _, _ in changes]
+        if in_shortlist:
+            new_status = "shortlist"
+        else:
+            new_status = case((Application.status == "shortlist", "sourcé"), else_=Application.status)
+        session.execute(
+            update(Application)
+            .where(Application.id.in_(changed_ids))
+            .values(is_in_shortlist=in_shortlist, status=new_status, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        record_status_changes(session, changes, changed_by, now=now)
+        outcome.updated = changed_ids
+
+    session.commit()
+    return outcome
+
+
+def bulk_update_candidate_status(
+    session: Session,
+    candidate_ids: Sequence[UUID],
+    new_status: str,
+) -> BulkOutcome:
+    """Change le statut d'un lot de candidats (mêmes règles que PATCH /candidates/{id}/status)"""
+    ids = unique_ids(candidate_ids)
+    outcome = BulkOutcome()
+    rows = session.execute(
+        select(Candidate.id, Candidate.status, has_interview_feedback(Candidate.id))
+        .where(Candidate.id.in_(ids))
+        .with_for_update(of=Candidate.__table__)
+    ).all()
+    found = {row[0]: row for row in rows}
+
+    changed_ids = []
+    for candidate_id in ids:
+        row = found.get(candidate_id)
+        if row is None:
+            outcome.skip(candidate_id, CANDIDATE_NOT_FOUND_MESSAGE)
+        elif row[1] == new_status:
+            outcome.skip(candidate_id, UNCHANGED_MESSAGE)
+        elif requires_feedback(row[1], new_status) and not row[2]:
+            outcome.skip(candidate_id, FEEDBACK_REQUIRED_MESSAGE)
+        else:
+            changed_ids.append(candidate_id)
+
+    if changed_ids:
+        session.execute(
+            update(Candidate)
+            .where(Candidate.id.in_(changed_ids))
+            .values(status=new_status, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        outcome.updated = changed_ids
+
+    session.commit()
+    return outcome
+
+
+def bulk_update_candidate_tags(
+    session: Session,
+    candidate_ids: Sequence[UUID],
+    add: Sequence[str] = (),
+    remove: Sequence[str] = (),
+) -> BulkOutcome:
+    """Ajoute / retire des tags sur un lot de candidats en une instruction (ordre des tags conservé)"""
+    ids = unique_ids(candidate_ids)
+    outcome = BulkOutcome()
+    statement = text(UPDATE_TAGS_SQL).bindparams(
+        bindparam("ids", type_=ARRAY(PG_UUID(as_uuid=True))),
+        bindparam("add", type_=ARRAY(Text)),
+        bindparam("remove", type_=ARRAY(Text)),
+    )
+    updated = {
+        row[0]
+        for row in session.execute(
+            statement, {"ids": ids, "add": list(add), "remove": list(remove), "now": datetime.utcnow()}
+        )
+    }
+    session.commit()
+
+    outcome.updated = [candidate_id for candidate_id in ids if candidate_id in updated]
+    for candidate_id in ids:
+        if candidate_id not in updated:
+            outcome.skip(candidate_id, CANDIDATE_NOT_FOUND_MESSAGE)
+    return outcome
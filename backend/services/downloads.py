@@ -0,0 +1,307 @@
+"""
+Service de téléchargement des fichiers (CV, fiches de poste)
+
+Gère les requêtes conditionnelles (ETag / Last-Modified -> 304), les requêtes
+partielles (Range -> 206, pour l'affichage progressif des PDF) et la détection
+du type de contenu à partir des octets du fichier plutôt que d'un type figé.
+
+Derrière nginx (settings.x_accel_redirect), l'autorisation reste faite en Python
+mais le transfert est délégué à nginx via X-Accel-Redirect : nginx gère alors
+lui-même sendfile, Range et les requêtes conditionnelles. Avec un stockage distant
+(S3), les mêmes règles sont appliquées en lisant uniquement la plage demandée.
+"""
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from config import settings
+from services.storage import StorageBackend, get_storage
+from services.uploads import CONTENT_TYPES, sniff_file_kind
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Le navigateur garde le fichier mais revalide à chaque ouverture (304 si inchangé)
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+
+def detect_media_type(path: Path) -> str:
+    """Type MIME d'un fichier d'après ses premiers octets"""
+    with open(path, "rb") as f:
+        head = f.read(16)
+    return CONTENT_TYPES.get(sniff_file_kind(head), "application/octet-stream")
+
+
+def make_etag(path: Path, content_hash: Optional[str] = None) -> str:
+    """ETag fort dérivé de l'empreinte du contenu, ou faible (date + taille) à défaut"""
+    if content_hash:
+        return f'"{content_hash}"'
+    stat = os.stat(path)
+    return f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def content_disposition(filename: str, disposition_type: str) -> str:
+    """En-tête Content-Disposition (encodage RFC 5987 pour les noms non ASCII)"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition_type}; filename*=utf-8''{quoted}"
+    return f'{disposition_type}; filename="{filename}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110) : on ignore le préfixe W/
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Évalue If-None-Match (prioritaire) puis If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range_header(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Analyse un en-tête Range à plage unique ("bytes=début-fin", "bytes=début-", "bytes=-n")
+
+    Retourne (début, fin) inclusifs, ou None si la plage n'est pas satisfiable.
+    Lève ValueError si l'en-tête est invalide ou contient plusieurs plages.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError("Plage non supportée")
+
+    start_str, _, end_str = spec.strip().partition("-")
+    if not start_str:
+        # Suffixe: les n derniers octets
+        length = int(end_str)
+        if length <= 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start_str)
+    if start >= size:
+        return None
+    end = int(end_str) if end_str else size - 1
+    if start > end:
+        raise ValueError("Plage invalide")
+    return start, min(end, size - 1)
+
+
+def _iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _validator_headers(etag: str, last_modified: float, cache_control: str) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+
+def _requested_range(request: Request, headers: dict, size: int) -> Union[Tuple[int, int], Response, None]:
+    """
+    Plage à servir : (début, fin), une réponse 416, ou None pour le fichier complet
+
+    If-Range: la plage n'est honorée que si le fichier n'a pas changé.
+    """
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if not range_header or not (
+        if_range is None or _etag_matches(if_range, headers["ETag"]) or if_range == headers["Last-Modified"]
+    ):
+        return None
+
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except ValueError:
+        return None  # En-tête invalide: on sert le fichier complet
+
+    if byte_range is None:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{size}"}
+        )
+    if byte_range == (0, size - 1):
+        return None
+    return byte_range
+
+
+def file_download_response(
+    request: Request,
+    path: Path,
+    filename: str,
+    content_hash: Optional[str] = None,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+) -> Response:
+    """
+    Construit la réponse de téléchargement d'un fichier : 304, 206, 416 ou 200
+
+    Les PDF sont servis en inline pour permettre l'affichage progressif dans le navigateur.
+    """
+    stat = os.stat(path)
+    headers = _validator_headers(make_etag(path, content_hash), stat.st_mtime, cache_control)
+
+    if is_not_modified(request, headers["ETag"], stat.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = detect_media_type(path)
+    disposition_type = "inline" if media_type == "application/pdf" else "attachment"
+
+    byte_range = _requested_range(request, headers, stat.st_size)
+    if isinstance(byte_range, Response):
+        return byte_range
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            _iter_file_range(path, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    return FileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat,
+        content_disposition_type=disposition_type,
+    )
+
+
+def object_download_response(
+    request: Request,
+    key: str,
+    filename: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    media_type: Optional[str] = None,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+    storage: Optional[StorageBackend] = None,
+) -> Response:
+    """
+    Équivalent de file_download_response pour un stockage distant (S3)
+
+    Seule la plage demandée est lue dans le stockage (GetObject avec Range).
+    """
+    storage = storage or get_storage()
+    info = storage.stat(key)
+    if info is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fichier non trouvé"
+        )
+
+    if content_hash:
+        etag = f'"{content_hash}"'
+    elif info.etag:
+        etag = f'"{info.etag}"'
+    else:
+        etag = f'W/"{int(info.last_modified * 1e9):x}-{info.size:x}"'
+    headers = _validator_headers(etag, info.last_modified, cache_control)
+
+    if is_not_modified(request, etag, info.last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = (
+        media_type or info.content_type
+        or mimetypes.guess_type(key)[0] or "application/octet-stream"
+    )
+    if filename:
+        disposition_type = "inline" if media_type == "application/pdf" else "attachment"
+        headers["Content-Disposition"] = content_disposition(filename, disposition_type)
+
+    byte_range = _requested_range(request, headers, info.size)
+    if isinstance(byte_range, Response):
+        return byte_range
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            storage.read_range(key, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    headers["Content-Length"] = str(info.size)
+    return StreamingResponse(storage.read_range(key), media_type=media_type, headers=headers)
+
+
+def accel_redirect_response(
+    key: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+) -> Response:
+    """
+    Réponse vide demandant à nginx d'envoyer le fichier depuis sa location interne
+
+    nginx conserve Content-Type, Content-Disposition et Cache-Control de cette réponse.
+    """
+    headers = {
+        "X-Accel-Redirect": f"{settings.x_accel_prefix}/{quote(key)}",
+        "Cache-Control": cache_control,
+    }
+    if filename:
+        disposition_type = "inline" if media_type == "application/pdf" else "attachment"
+        headers["Content-Disposition"] = content_disposition(filename, disposition_type)
+    return Response(media_type=media_type, headers=headers)
+
+
+def send_stored_file(
+    request: Request,
+    key: str,
+    filename: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    media_type: Optional[str] = None,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+    storage: Optional[StorageBackend] = None,
+) -> Response:
+    """
+    Envoie un fichier du stockage dont l'accès a déjà été autorisé
+
+    - stockage local derrière nginx : délégué via X-Accel-Redirect
+    - stockage local : servi par l'application (file_download_response)
+    - stockage distant : lecture partielle en streaming (object_download_response)
+    """
+    storage = storage or get_storage()
+    path = storage.local_path(key)
+    if path is None:
+        return object_download_response(request, key, filename, content_hash, media_type, cache_control, storage)
+
+    if settings.x_accel_redirect:
+        return accel_redirect_response(key, media_type or detect_media_type(path), filename, cache_control)
+
+    if filename is None:
+        return FileResponse(path=path, media_type=media_type, headers={"Cache-Control": cache_control})
+    return file_download_response(request, path, filename, content_hash, cache_control)
@@ -0,0 +1,239 @@
+"""
+Service d'export des candidats (CSV / XLSX) en streaming
+
+Les lignes sont lues par lots avec un curseur côté serveur (yield_per) et écrites
+au fil de l'eau : la mémoire utilisée ne dépend pas du nombre de candidats et les
+premiers octets partent dès le premier lot.
+
+Le XLSX est produit sans dépendance externe : l'archive ZIP est écrite en mode
+flux (descripteurs de données), la feuille en SpreadsheetML avec des chaînes inline.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+from xml.sax.saxutils import escape
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Engine
+
+from models import Application, Candidate, Job
+
+EXPORT_BATCH_SIZE = 1000
+
+# Colonnes exportées : une ligne par candidature (une ligne vide côté candidature
+# pour les candidats sans candidature)
+CANDIDATE_EXPORT_COLUMNS: List[Tuple[str, Any]] = [
+    ("ID candidat", Candidate.id),
+    ("Nom", Candidate.last_name),
+    ("Prénom", Candidate.first_name),
+    ("Email", Candidate.email),
+    ("Téléphone", Candidate.phone),
+    ("Titre du profil", Candidate.profile_title),
+    ("Années d'expérience", Candidate.years_of_experience),
+    ("Statut candidat", Candidate.status),
+    ("Source", Candidate.source),
+    ("Tags", Candidate.tags),
+    ("Compétences", Candidate.skills),
+    ("Créé le", Candidate.created_at),
+    ("ID besoin", Job.id),
+    ("Besoin", Job.title),
+    ("Statut candidature", Application.status),
+    ("En shortlist", Application.is_in_shortlist),
+    ("Candidature créée le", Application.created_at),
+]
+
+EXPORT_HEADERS = [header for header, _ in CANDIDATE_EXPORT_COLUMNS]
+
+# Préfixes interprétés comme formules par les tableurs (injection CSV)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Caractères de contrôle interdits en XML (rendraient le classeur illisible)
+XML_ILLEGAL_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def build_candidate_export_query(
+    status_filter: Optional[str] = None,
+    source_filter: Optional[str] = None,
+    tag_filter: Optional[str] = None,
+    job_id: Optional[UUID] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+) -> Select:
+    """Requête de l'export (mêmes filtres que la liste des candidats, plus besoin et période)"""
+    statement = (
+        select(*[column for _, column in CANDIDATE_EXPORT_COLUMNS])
+        .select_from(Candidate)
+        .outerjoin(Application, Application.candidate_id == Candidate.id)
+        .outerjoin(Job, Job.id == Application.job_id)
+    )
+    if status_filter:
+        statement = statement.where(Candidate.status == status_filter)
+    if source_filter:
+        statement = statement.where(Candidate.source == source_filter)
+    if tag_filter:
+        statement = statement.where(Candidate.tags.any(tag_filter))
+    if job_id:
+        statement = statement.where(
+            Candidate.id.in_(select(Application.candidate_id).where(Application.job_id == job_id))
+        )
+    if created_from:
+        statement = statement.where(Candidate.created_at >= datetime.combine(created_from, datetime.min.time()))
+    if created_to:
+        statement = statement.where(
+            Candidate.created_at < datetime.combine(created_to + timedelta(days=1), datetime.min.time())
+        )
+    return statement.order_by(Candidate.created_at.desc(), Candidate.id, Application.created_at)
+
+
+def iter_row_batches(engine: Engine, statement: Select, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence]:
+    """
+    Exécute la requête avec un curseur côté serveur et retourne les lignes par lots
+
+    La connexion est ouverte ici (et non par la dépendance get_session) car le corps
+    d'une StreamingResponse est produit après la fin du traitement de la requête.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(statement)
+        for batch in result.partitions():
+            yield batch
+
+
+def format_value(value: Any) -> Any:
+    """Valeur d'une cellule : listes jointes, dates ISO, booléens Oui/Non"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Oui" if value else "Non"
+    if isinstance(value, (list, tuple)):
+        return " | ".join(str(item) for item in value)
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, (date, UUID)):
+        return str(value)
+    return value
+
+
+def _csv_safe(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def stream_csv(batches: Iterable[Sequence], headers: Sequence[str] = EXPORT_HEADERS) -> Iterator[bytes]:
+    """CSV UTF-8 (avec BOM pour Excel), un bloc d'octets par lot de lignes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_safe(format_value(value)) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Flux non positionnable : zipfile y écrit, les octets sont récupérés par drain()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_workbook(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_row(values: Iterable[Any]) -> str:
+    cells = []
+    for value in values:
+        value = format_value(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f"<c><v>{value}</v></c>")
+        elif value != "":
+            text = escape(XML_ILLEGAL_CHARS.sub("", str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        else:
+            cells.append("<c/>")
+    return f"<row>{''.join(cells)}</row>"
+
+
+def stream_xlsx(
+    batches: Iterable[Sequence],
+    headers: Sequence[str] = EXPORT_HEADERS,
+    sheet_name: str = "Candidats",
+) -> Iterator[bytes]:
+    """Classeur XLSX à une feuille, produit au fil des lots"""
+    output = _StreamBuffer()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr("xl/workbook.xml", _xlsx_workbook(sheet_name))
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(headers).encode("utf-8"))
+            yield output.drain()
+
+            for batch in batches:
+                sheet.write("".join(_xlsx_row(row) for row in batch).encode("utf-8"))
+                yield output.drain()
+
+            sheet.write(b"</sheetData></worksheet>")
+    yield output.drain()
@@ -0,0 +1,251 @@
+"""
+Service de traitement des photos de profil des candidats
+
+- Sélection de l'image la plus probablement une photo d'identité parmi celles d'un CV
+- Enregistrement de la photo dans le stockage (plus de base64 dans les réponses JSON)
+- Génération de miniatures WebP de taille fixe servies dans les listes
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from services.storage import get_storage
+from services.uploads import CONTENT_TYPES, EXTENSION_KINDS, sniff_file_kind
+
+# Pillow est optionnel : sans lui, les photos sont conservées sans miniatures
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Dossier des photos de profil (servi via /static/uploads) et préfixe de leurs clés de stockage
+PHOTOS_DIR = Path("static/uploads")
+PHOTOS_PREFIX = "static/uploads/"
+
+# Miniatures carrées générées pour chaque photo
+THUMBNAILS_PREFIX = "static/uploads/thumbs/"
+THUMBNAIL_SIZES = (64, 256)
+THUMBNAIL_QUALITY = 80
+
+# Stockage distant: durée pendant laquelle une miniature absente n'est pas revérifiée
+THUMBNAIL_MISSING_TTL = 300
+# Stockage distant: nombre maximum de vérifications mémorisées par processus (les plus anciennes sont oubliées)
+THUMBNAIL_CHECKS_MAX_ENTRIES = 10000
+
+# Heuristiques de sélection de la photo de profil
+MIN_PORTRAIT_SIDE = 48  # En dessous: icônes, puces, logos
+MIN_PORTRAIT_ASPECT = 0.5  # hauteur / largeur
+MAX_PORTRAIT_ASPECT = 2.0
+MAX_SCORED_AREA = 1000 * 1000  # Au-delà, l'image est probablement un fond de page
+
+IMAGE_EXTENSIONS = {"jpeg": ".jpg", "png": ".png", "gif": ".gif", "webp": ".webp"}
+
+# Extensions des photos enregistrées (l'upload conserve l'extension d'origine, .jpeg compris)
+PHOTO_EXTENSIONS = {extension for extension, kind in EXTENSION_KINDS.items() if kind in IMAGE_EXTENSIONS}
+
+
+@dataclass
+class EmbeddedImage:
+    """Image trouvée dans un CV"""
+    data: bytes
+    width: int
+    height: int
+    page: int = 0
+
+
+def portrait_score(image: EmbeddedImage) -> float:
+    """
+    Score de vraisemblance qu'une image soit la photo du candidat (0 = exclue)
+
+    Favorise les images de taille moyenne au format portrait ou carré,
+    situées sur les premières pages.
+    """
+    if image.width < MIN_PORTRAIT_SIDE or image.height < MIN_PORTRAIT_SIDE:
+        return 0.0
+
+    aspect = image.height / image.width
+    if aspect < MIN_PORTRAIT_ASPECT or aspect > MAX_PORTRAIT_ASPECT:
+        return 0.0
+
+    score = float(min(image.width * image.height, MAX_SCORED_AREA))
+    # Format photo d'identité (carré à 2:3) privilégié
+    if not 0.9 <= aspect <= 1.6:
+        score *= 0.5
+    # Une photo est presque toujours sur la première page
+    score /= (1 + image.page)
+    return score
+
+
+def select_portrait(images: Iterable[EmbeddedImage]) -> Optional[EmbeddedImage]:
+    """Retourne l'image la plus probablement une photo de profil, ou None"""
+    best = None
+    best_score = 0.0
+    for image in images:
+        if sniff_file_kind(image.data[:16]) not in IMAGE_EXTENSIONS:
+            continue
+        score = portrait_score(image)
+        if score > best_score:
+            best, best_score = image, score
+    return best
+
+
+def get_thumbnail_key(photo_key: str, size: int) -> str:
+    return f"{THUMBNAILS_PREFIX}{Path(photo_key).stem}_{size}.webp"
+
+
+def render_thumbnails(photo_path: Path) -> Dict[int, bytes]:
+    """
+    Rend les miniatures WebP carrées d'une image (recadrage centré sur le visage)
+
+    Retourne un dictionnaire taille -> contenu ; vide si Pillow n'est pas installé
+    ou si l'image ne peut pas être lue.
+    """
+    if Image is None:
+        logger.warning("Pillow n'est pas installé, miniatures non générées. Installez-le avec: pip install Pillow")
+        return {}
+
+    thumbnails = {}
+    try:
+        with Image.open(photo_path) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+            for size in THUMBNAIL_SIZES:
+                # Centrage légèrement vers le haut : le visage est rarement au centre exact
+                thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS, centering=(0.5, 0.4))
+                buffer = BytesIO()
+                thumbnail.save(buffer, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+                thumbnails[size] = buffer.getvalue()
+    except Exception as e:
+        logger.warning(f"Impossible de générer les miniatures de {photo_path}: {str(e)}")
+        return {}
+    return thumbnails
+
+
+# Stockage distant : résultat des vérifications de miniatures (LRU borné)
+# None = présente, sinon date de la vérification qui l'a trouvée absente
+_thumbnail_checks: "OrderedDict[str, Optional[float]]" = OrderedDict()
+_thumbnail_checks_lock = threading.Lock()
+
+
+def _remember_thumbnail(thumbnail_key: str, missing_since: Optional[float]) -> None:
+    with _thumbnail_checks_lock:
+        _thumbnail_checks[thumbnail_key] = missing_since
+        _thumbnail_checks.move_to_end(thumbnail_key)
+        while len(_thumbnail_checks) > THUMBNAIL_CHECKS_MAX_ENTRIES:
+            _thumbnail_checks.popitem(last=False)
+
+
+def _checked_thumbnail(thumbnail_key: str) -> Optional[bool]:
+    """Présence mémorisée de la miniature, ou None s'il faut la vérifier"""
+    with _thumbnail_checks_lock:
+        if thumbnail_key not in _thumbnail_checks:
+            return None
+        _thumbnail_checks.move_to_end(thumbnail_key)
+        missing_since = _thumbnail_checks[thumbnail_key]
+    if missing_since is None:
+        return True
+    if time.monotonic() - missing_since < THUMBNAIL_MISSING_TTL:
+        return False
+    return None
+
+
+def generate_thumbnails(photo_key: str) -> Dict[int, str]:
+    """
+    Génère et enregistre les miniatures d'une photo du stockage
+
+    Retourne un dictionnaire taille -> clé de la miniature.
+    """
+    storage = get_storage()
+    with storage.open_local(photo_key) as photo_path:
+        rendered = render_thumbnails(photo_path)
+
+    thumbnails = {}
+    for size, data in rendered.items():
+        thumbnail_key = get_thumbnail_key(photo_key, size)
+        storage.write_bytes(thumbnail_key, data, content_type="image/webp")
+        _remember_thumbnail(thumbnail_key, None)
+        thumbnails[size] = thumbnail_key
+    return thumbnails
+
+
+def store_profile_picture(image_data: bytes) -> Optional[str]:
+    """
+    Enregistre une photo extraite d'un CV et génère ses miniatures
+
+    Retourne l'URL publique de la photo ou None si le format n'est pas reconnu.
+    """
+    kind = sniff_file_kind(image_data[:16])
+    extension = IMAGE_EXTENSIONS.get(kind)
+    if not extension:
+        return None
+
+    storage = get_storage()
+    photo_key = f"{PHOTOS_PREFIX}{uuid4().hex}{extension}"
+    storage.write_bytes(photo_key, image_data, content_type=CONTENT_TYPES[kind])
+    generate_thumbnails(photo_key)
+    return storage.public_url(photo_key)
+
+
+def _thumbnail_exists(thumbnail_key: str) -> bool:
+    storage = get_storage()
+    if storage.local_path(thumbnail_key) is not None:
+        return storage.exists(thumbnail_key)
+
+    # Stockage distant: éviter une requête HEAD par candidat dans les listes
+    checked = _checked_thumbnail(thumbnail_key)
+    if checked is not None:
+        return checked
+    exists = storage.exists(thumbnail_key)
+    _remember_thumbnail(thumbnail_key, None if exists else time.monotonic())
+    return exists
+
+
+def get_thumbnail_url(photo_url: Optional[str], size: int = 256) -> Optional[str]:
+    """
+    Retourne l'URL de la miniature d'une photo de profil si elle a été générée
+
+    Les photos externes ou antérieures au pipeline de miniatures retournent None :
+    le client utilise alors photo_url.
+    """
+    if not photo_url:
+        return None
+    storage = get_storage()
+    photo_key = storage.key_from_public_url(photo_url)
+    if not photo_key or not photo_key.startswith(PHOTOS_PREFIX) or photo_key.startswith(THUMBNAILS_PREFIX):
+        return None
+    thumbnail_key = get_thumbnail_key(photo_key, size)
+    if not _thumbnail_exists(thumbnail_key):
+        return None
+    return storage.public_url(thumbnail_key)
+
+
+def load_image_size(image_data: bytes) -> Optional[tuple]:
+    """Retourne (largeur, hauteur) d'une image encodée, ou None si illisible"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(BytesIO(image_data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def list_photos_without_thumbnails() -> List[str]:
+    """Clés des photos existantes dont les miniatures n'ont pas encore été générées"""
+    storage = get_storage()
+    thumbnails = set(storage.list_keys(THUMBNAILS_PREFIX))
+    return [
+        key for key in storage.list_keys(PHOTOS_PREFIX)
+        if "/" not in key[len(PHOTOS_PREFIX):]
+        and Path(key).suffix.lower() in PHOTO_EXTENSIONS
+        and not all(get_thumbnail_key(key, size) in thumbnails for size in THUMBNAIL_SIZES)
+    ]
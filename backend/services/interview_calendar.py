@@ -0,0 +1,170 @@
+"""
+Service du calendrier des entretiens
+
+La plage horaire d'un entretien est l'intervalle tsrange(scheduled_at, fin, '[)'),
+la fin valant scheduled_at + 1 heure lorsqu'elle n'est pas renseignée. La même
+expression est indexée (GiST) : l'affichage d'une semaine ou d'un mois et la
+détection des conflits d'un interviewer sont des recherches de chevauchement (&&)
+sur cet index. La contrainte d'exclusion interviews_interviewer_no_overlap
+(même expression) départage les réservations simultanées d'un même créneau.
+
+Les colonnes sont des TIMESTAMP sans fuseau (UTC) : les dates reçues avec fuseau
+sont converties en UTC avant comparaison.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from models import Application, Candidate, Interview, Job, User
+
+# Durée retenue pour un entretien sans heure de fin (même valeur que l'index)
+DEFAULT_INTERVIEW_DURATION = timedelta(hours=1)
+
+# Entretiens qui occupent l'agenda de l'interviewer
+ACTIVE_INTERVIEW_STATUSES = ("planifié", "reporté")
+
+# Contrainte d'exclusion posée par migrations/add_interview_period_index.sql
+INTERVIEWER_OVERLAP_CONSTRAINT = "interviews_interviewer_no_overlap"
+
+# Fenêtre maximale d'une requête du calendrier (vue mois avec débords)
+MAX_CALENDAR_RANGE = timedelta(days=62)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Date UTC sans fuseau, comme stockée en base"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def interview_period() -> Any:
+    """Plage horaire d'un entretien (expression de l'index idx_interviews_period)"""
+    end = func.coalesce(Interview.scheduled_end_at, Interview.scheduled_at + literal_column("interval '1 hour'"))
+    return func.tsrange(Interview.scheduled_at, end, "[)")
+
+
+def period(start: datetime, end: datetime) -> Any:
+    return func.tsrange(to_utc_naive(start), to_utc_naive(end), "[)")
+
+
+def validate_period(start: datetime, end: Optional[datetime]) -> datetime:
+    """Fin effective de la plage (erreur 400 si elle précède le début)"""
+    effective_end = end if end is not None else start + DEFAULT_INTERVIEW_DURATION
+    if to_utc_naive(effective_end) <= to_utc_naive(start):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fin de l'entretien doit être postérieure à son début"
+        )
+    return effective_end
+
+
+def build_calendar_query(
+    start: datetime,
+    end: datetime,
+    interviewer_ids: Sequence[UUID] = (),
+    job_id: Optional[UUID] = None,
+    include_cancelled: bool = False
+) -> Select:
+    """Entretiens qui chevauchent la fenêtre, avec candidat, besoin et interviewer (une requête)"""
+    statement = (
+        select(
+            Interview.id,
+            Interview.application_id,
+            Interview.interview_type,
+            Interview.status,
+            Interview.scheduled_at,
+            Interview.scheduled_end_at,
+            Interview.location,
+            Interview.meeting_link,
+            Interview.interviewer_id,
+            func.concat_ws(" ", User.first_name, User.last_name).label("interviewer_name"),
+            func.concat_ws(" ", Candidate.first_name, Candidate.last_name).label("candidate_name"),
+            Application.job_id,
+            Job.title.label("job_title"),
+        )
+        .select_from(Interview)
+        .join(Application, Application.id == Interview.application_id)
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .join(Job, Job.id == Application.job_id)
+        .outerjoin(User, User.id == Interview.interviewer_id)
+        .where(interview_period().op("&&")(period(start, end)))
+        .order_by(Interview.scheduled_at, Interview.id)
+    )
+    if interviewer_ids:
+        statement = statement.where(Interview.interviewer_id.in_(interviewer_ids))
+    if job_id:
+        statement = statement.where(Application.job_id == job_id)
+    if not include_cancelled:
+        statement = statement.where(Interview.status != "annulé")
+    return statement
+
+
+def build_conflict_query(
+    interviewer_id: UUID,
+    start: datetime,
+    end: datetime,
+    exclude_id: Optional[UUID] = None
+) -> Select:
+    """Entretiens actifs de l'interviewer qui chevauchent la plage"""
+    statement = select(Interview).where(
+        Interview.interviewer_id == interviewer_id,
+        Interview.status.in_(ACTIVE_INTERVIEW_STATUSES),
+        interview_period().op("&&")(period(start, end)),
+    )
+    if exclude_id is not None:
+        statement = statement.where(Interview.id != exclude_id)
+    return statement.order_by(Interview.scheduled_at)
+
+
+def check_interviewer_availability(
+    session: Session,
+    interviewer_id: Optional[UUID],
+    start: datetime,
+    end: Optional[datetime],
+    exclude_id: Optional[UUID] = None
+) -> None:
+    """Erreur 409 si l'interviewer a déjà un entretien sur la plage"""
+    effective_end = validate_period(start, end)
+    if interviewer_id is None:
+        return
+    conflicts: List[Interview] = session.execute(
+        build_conflict_query(interviewer_id, start, effective_end, exclude_id)
+    ).scalars().all()
+    if conflicts:
+        slots = ", ".join(
+            f"{conflict.scheduled_at:%d/%m/%Y %H:%M}"
+            f"-{(conflict.scheduled_end_at or conflict.scheduled_at + DEFAULT_INTERVIEW_DURATION):%H:%M}"
+            for conflict in conflicts
+        )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"L'interviewer a déjà un entretien sur ce créneau ({slots})"
+        )
+
+
+def save_interview(session: Session, interview: Interview) -> None:
+    """
+    Enregistre l'entretien (erreur 409 si la contrainte d'exclusion refuse le créneau)
+
+    check_interviewer_availability ne voit pas un entretien créé en même temps par
+    une autre requête : la base refuse alors le second chevauchement.
+    """
+    session.add(interview)
+    try:
+        session.commit()
+    except IntegrityError as e:
+        session.rollback()
+        constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None)
+        if constraint != INTERVIEWER_OVERLAP_CONSTRAINT:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="L'interviewer a déjà un entretien sur ce créneau"
+        )
+    session.refresh(interview)
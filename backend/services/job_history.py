@@ -0,0 +1,95 @@
+"""
+Service d'historique des besoins de recrutement
+
+Chaque modification d'un besoin est enregistrée en une seule ligne de job_history
+(un seul INSERT) : la colonne JSONB changes contient la liste des champs modifiés
+[{"field": ..., "old": ..., "new": ...}]. La lecture redéploie ces lignes en un
+élément par champ, au format historique (field_name / old_value / new_value).
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from sqlmodel import Session
+
+from models import JobHistory
+
+# Contraintes historiques des colonnes field_name (VARCHAR(100)) et old/new_value
+FIELD_NAME_MAX_LENGTH = 100
+VALUE_MAX_LENGTH = 5000
+
+
+def _truncate(value: Optional[str], max_length: int, suffix: str = "") -> Optional[str]:
+    if value is None or len(value) <= max_length:
+        return value
+    return value[:max_length - len(suffix)] + suffix
+
+
+def history_change(field_name: str, old_value: Optional[str], new_value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Un champ modifié (valeurs déjà formatées en texte)"""
+    return {
+        "field": _truncate(field_name, FIELD_NAME_MAX_LENGTH, "..."),
+        "old": _truncate(old_value, VALUE_MAX_LENGTH),
+        "new": _truncate(new_value, VALUE_MAX_LENGTH),
+    }
+
+
+def record_job_changes(
+    session: Session,
+    job_id: Optional[UUID],
+    modified_by: UUID,
+    changes: Sequence[Dict[str, Optional[str]]]
+) -> Optional[JobHistory]:
+    """Ajoute une ligne d'historique pour l'ensemble des champs modifiés (aucune si rien n'a changé)"""
+    if not changes:
+        return None
+    entry = JobHistory(job_id=job_id, modified_by=modified_by, changes=list(changes))
+    session.add(entry)
+    return entry
+
+
+def record_status_change(
+    session: Session,
+    job_id: Optional[UUID],
+    modified_by: UUID,
+    old_status: Optional[str],
+    new_status: Optional[str]
+) -> Optional[JobHistory]:
+    """Historique d'un changement de statut"""
+    return record_job_changes(session, job_id, modified_by, [history_change("status", old_status, new_status)])
+
+
+def entry_changes(entry: JobHistory) -> List[Dict[str, Optional[str]]]:
+    """Champs modifiés d'une ligne (les lignes non migrées n'ont qu'un champ, dans field_name)"""
+    if entry.changes is not None:
+        return entry.changes
+    return [{"field": entry.field_name, "old": entry.old_value, "new": entry.new_value}]
+
+
+def expand_job_history(entries: Sequence[JobHistory], field_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Un élément par champ modifié, dans l'ordre des lignes
+
+    Les éléments d'une même ligne ont pour id celui de la ligne, suffixé de leur
+    position lorsque la ligne contient plusieurs champs.
+    """
+    items = []
+    for entry in entries:
+        changes = entry_changes(entry)
+        for index, change in enumerate(changes):
+            if field_name is not None and change["field"] != field_name:
+                continue
+            items.append({
+                "id": str(entry.id) if len(changes) == 1 else f"{entry.id}-{index}",
+                "job_id": entry.job_id,
+                "modified_by": entry.modified_by,
+                "field_name": change["field"],
+                "old_value": change["old"],
+                "new_value": change["new"],
+                "created_at": entry.created_at,
+            })
+    return items
+
+
+def changes_contain(**change: str) -> Any:
+    """Condition SQL : la ligne contient un champ modifié correspondant (opérateur @>, index GIN)"""
+    return JobHistory.changes.contains([change])
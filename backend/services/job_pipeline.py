@@ -0,0 +1,144 @@
+"""
+Service du tableau kanban d'un besoin (candidatures groupées par statut)
+
+Les colonnes sont construites en une requête : row_number() OVER (PARTITION BY status)
+numérote les candidatures de chaque colonne (les plus récemment modifiées d'abord),
+count(*) OVER (PARTITION BY status) donne l'effectif, et seules les N premières cartes
+de chaque colonne sont jointes aux candidats. Le « voir plus » d'une colonne reprend
+après la dernière carte affichée (curseur sur updated_at, id).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.sql import Select
+
+from models import Application, Candidate
+from services.bulk_actions import PIPELINE_STATUSES
+from services.images import get_thumbnail_url
+
+# Ordre des cartes dans une colonne (clé du curseur)
+CARD_ORDER = (Application.updated_at.desc(), Application.id.desc())
+
+Cursor = Tuple[datetime, UUID]
+
+
+def encode_cursor(updated_at: datetime, application_id: UUID) -> str:
+    """Curseur opaque désignant la dernière carte affichée d'une colonne"""
+    payload = json.dumps([updated_at.isoformat(), str(application_id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, application_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(updated_at), UUID(application_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur invalide"
+        )
+
+
+def build_pipeline_query(
+    job_id: UUID,
+    limit: int,
+    column: Optional[str] = None,
+    cursor: Optional[Cursor] = None
+) -> Select:
+    """
+    Cartes des colonnes du besoin (limit + 1 par colonne, pour savoir s'il en reste)
+
+    Avec column et cursor, ne retourne que la suite de cette colonne ; l'effectif
+    reste celui de la colonne entière.
+    """
+    conditions = [Application.job_id == job_id]
+    if column is not None:
+        conditions.append(Application.status == column)
+
+    if cursor is None:
+        column_count = func.count().over(partition_by=Application.status)
+    else:
+        column_count = (
+            select(func.count())
+            .select_from(Application)
+            .where(*conditions)
+            .scalar_subquery()
+        )
+        conditions.append(tuple_(Application.updated_at, Application.id) < tuple_(*cursor))
+
+    ranked = (
+        select(
+            Application.id,
+            Application.candidate_id,
+            Application.status,
+            Application.is_in_shortlist,
+            Application.client_validated,
+            Application.created_at,
+            Application.updated_at,
+            func.row_number().over(partition_by=Application.status, order_by=CARD_ORDER).label("position"),
+            column_count.label("column_count"),
+        )
+        .where(*conditions)
+        .subquery("ranked")
+    )
+
+    return (
+        select(
+            ranked,
+            Candidate.first_name,
+            Candidate.last_name,
+            Candidate.email,
+            Candidate.profile_title,
+            Candidate.years_of_experience,
+            Candidate.profile_picture_url,
+        )
+        .join(Candidate, Candidate.id == ranked.c.candidate_id)
+        .where(ranked.c.position <= limit + 1)
+        .order_by(ranked.c.status, ranked.c.position)
+    )
+
+
+def _card(row: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "candidate_id": row["candidate_id"],
+        "candidate_name": f"{row['first_name']} {row['last_name']}",
+        "candidate_email": row["email"],
+        "candidate_profile_title": row["profile_title"],
+        "candidate_years_of_experience": row["years_of_experience"],
+        "candidate_photo_url": row["profile_picture_url"],
+        "candidate_photo_thumbnail_url": get_thumbnail_url(row["profile_picture_url"]),
+        "is_in_shortlist": row["is_in_shortlist"],
+        "client_validated": row["client_validated"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def build_columns(
+    rows: Sequence[Mapping[str, Any]],
+    limit: int,
+    statuses: Sequence[str] = PIPELINE_STATUSES
+) -> List[Dict[str, Any]]:
+    """
+    Colonnes du tableau dans l'ordre du pipeline (colonnes vides comprises)
+
+    La carte supplémentaire d'une colonne n'est pas retournée : elle indique
+    qu'il reste des cartes, et next_cursor pointe sur la dernière carte affichée.
+    """
+    columns = {name: {"status": name, "count": 0, "items": [], "next_cursor": None} for name in statuses}
+    for row in rows:
+        column = columns.setdefault(row["status"], {"status": row["status"], "count": 0, "items": [], "next_cursor": None})
+        column["count"] = row["column_count"]
+        if row["position"] <= limit:
+            column["items"].append(_card(row))
+        else:
+            last = column["items"][-1]
+            column["next_cursor"] = encode_cursor(last["updated_at"], last["id"])
+    return list(columns.values())
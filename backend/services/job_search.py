@@ -0,0 +1,123 @@
+"""
+Service de recherche des besoins de recrutement par facettes
+
+Les compteurs de toutes les facettes sont calculés en une seule requête :
+GROUP BY GROUPING SETS (une facette par ensemble) et un agrégat
+count(*) FILTER (...) par facette. Le compteur d'une facette applique tous les
+filtres sauf le sien, pour afficher les alternatives disponibles (sélection
+multiple dans une même facette).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from sqlalchemy import and_, func, select, true, tuple_
+from sqlalchemy.sql import Select
+
+from models import Job, JobRecruiter, User, UserRole
+
+# Facettes disponibles : nom -> colonne
+JOB_FACETS = {
+    "status": Job.status,
+    "department": Job.department,
+    "contract_type": Job.contract_type,
+    "urgency": Job.urgency,
+    "localisation": Job.localisation,
+    "teletravail": Job.teletravail,
+}
+
+# Statuts visibles par un recruteur (sur les besoins qui lui sont attribués)
+RECRUITER_VISIBLE_STATUSES = ("validé", "en_cours", "clôturé")
+
+
+@dataclass
+class JobSearchFilters:
+    """Filtres de la recherche (plusieurs valeurs d'une facette = OU)"""
+    facets: Dict[str, List[str]] = field(default_factory=dict)
+    salary_min: Optional[float] = None
+    salary_max: Optional[float] = None
+    skills: List[str] = field(default_factory=list)  # Toutes requises (compétences obligatoires du poste)
+
+
+def job_access_conditions(current_user: User) -> List[Any]:
+    """
+    Restrictions de visibilité selon le rôle
+
+    - Recruteur : besoins validés / en cours / clôturés qui lui sont attribués
+    - Client : ses propres besoins
+    - Manager / admin : tous les besoins
+    """
+    user_role = current_user.role if isinstance(current_user.role, str) else current_user.role.value
+    if user_role == UserRole.RECRUTEUR.value:
+        return [
+            Job.id.in_(select(JobRecruiter.job_id).where(JobRecruiter.recruiter_id == current_user.id)),
+            Job.status.in_(RECRUITER_VISIBLE_STATUSES),
+        ]
+    if user_role == UserRole.CLIENT.value:
+        return [Job.created_by == current_user.id]
+    return []
+
+
+def facet_conditions(filters: JobSearchFilters) -> Dict[str, Any]:
+    """Condition de chaque facette sélectionnée"""
+    return {
+        name: JOB_FACETS[name].in_(values)
+        for name, values in filters.facets.items()
+        if values
+    }
+
+
+def common_conditions(filters: JobSearchFilters) -> List[Any]:
+    """Filtres hors facettes (fourchette de salaire, compétences)"""
+    conditions = []
+    # Fourchettes qui se chevauchent ; un besoin sans salaire renseigné est exclu
+    if filters.salary_min is not None:
+        conditions.append(func.coalesce(Job.salaire_maximum, Job.salaire_minimum) >= filters.salary_min)
+    if filters.salary_max is not None:
+        conditions.append(func.coalesce(Job.salaire_minimum, Job.salaire_maximum) <= filters.salary_max)
+    if filters.skills:
+        conditions.append(Job.competences_techniques_obligatoires.contains(filters.skills))
+    return conditions
+
+
+def build_facet_query(filters: JobSearchFilters, access: Sequence[Any] = ()) -> Select:
+    """Compteurs de toutes les facettes et total, en une requête"""
+    selected = facet_conditions(filters)
+
+    def all_filters_except(name: Optional[str]):
+        return and_(true(), *[condition for facet, condition in selected.items() if facet != name])
+
+    return (
+        select(
+            *[func.grouping(column).label(f"grouping_{name}") for name, column in JOB_FACETS.items()],
+            *[column.label(name) for name, column in JOB_FACETS.items()],
+            *[func.count().filter(all_filters_except(name)).label(f"count_{name}") for name in JOB_FACETS],
+            func.count().filter(all_filters_except(None)).label("total"),
+        )
+        .select_from(Job)
+        .where(*access, *common_conditions(filters))
+        .group_by(func.grouping_sets(*JOB_FACETS.values(), tuple_()))
+    )
+
+
+def collect_facets(rows: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Convertit les lignes de build_facet_query en {"total": n, "facets": {nom: [{value, count}]}}"""
+    total = 0
+    facets: Dict[str, List[Dict[str, Any]]] = {name: [] for name in JOB_FACETS}
+    for row in rows:
+        grouped = [name for name in JOB_FACETS if row[f"grouping_{name}"] == 0]
+        if not grouped:
+            total = row["total"]
+            continue
+        name = grouped[0]
+        count = row[f"count_{name}"]
+        if count:
+            facets[name].append({"value": row[name], "count": count})
+
+    for values in facets.values():
+        values.sort(key=lambda item: (-item["count"], item["value"] is None, item["value"] or ""))
+    return {"total": total, "facets": facets}
+
+
+def apply_search_filters(statement: Select, filters: JobSearchFilters, access: Sequence[Any] = ()) -> Select:
+    """Applique tous les filtres à la requête des résultats"""
+    return statement.where(*access, *common_conditions(filters), *facet_conditions(filters).values())
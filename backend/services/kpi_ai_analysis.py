@@ -0,0 +1,260 @@
+"""
+Analyses IA des KPI générées en arrière-plan
+
+L'appel au modèle (plusieurs secondes) ne se fait plus pendant l'affichage des
+tableaux de bord : chaque périmètre (rôle + filtres normalisés) a des analyses
+enregistrées dans kpi_ai_analyses avec l'instantané des KPI analysé et la
+version des données correspondante. L'endpoint sert la dernière analyse
+terminée et planifie une nouvelle analyse :
+- si le périmètre n'en a encore aucune ;
+- si les données ont changé et qu'un KPI s'écarte de plus de
+  kpi_ai_material_change (en relatif) de l'instantané analysé ;
+- sur demande explicite (rafraîchissement), l'identifiant de la ligne servant
+  d'identifiant de tâche.
+Après l'échec d'une analyse, aucune nouvelle analyse n'est planifiée automatiquement
+pendant kpi_ai_task_timeout : l'analyse en échec est retournée à la place.
+
+La tâche planifiée scripts/refresh_kpi_ai_analyses.py régénère chaque nuit les
+analyses des périmètres consultés récemment.
+
+Les KPI et l'appel au modèle sont fournis par le routeur (AnalysisSource), les
+KPI passant par le cache des KPI.
+"""
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func
+from sqlmodel import Session, select
+
+from config import settings
+from models import KPIAIAnalysis
+from services.background import submit_task
+from services.kpi_cache import data_version, normalize
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class AnalysisSource:
+    """KPI d'un périmètre (cache des KPI) et analyse par le modèle"""
+    snapshot: Callable[[Session, str, Dict[str, Any]], Dict[str, Any]]  # (session, rôle, filtres) -> {"kpis": ..., ...}
+    analyze: Callable[[Dict[str, Any], str], Dict[str, Any]]  # (instantané, rôle) -> KPIAnalysis sérialisée
+
+
+def scope_filters(filters: Mapping[str, Any]) -> Dict[str, Any]:
+    """Filtres renseignés, normalisés (dates en UTC naïf ISO, identifiants en texte), dans un ordre stable"""
+    return {name: normalize(value) for name, value in sorted(filters.items()) if value is not None}
+
+
+def scope_key(role: str, filters: Mapping[str, Any]) -> str:
+    """Empreinte d'un périmètre : rôle et filtres normalisés"""
+    payload = json.dumps([role, scope_filters(filters)], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def latest_analysis(session: Session, key: str) -> Optional[KPIAIAnalysis]:
+    """Dernière analyse terminée du périmètre"""
+    return session.exec(
+        select(KPIAIAnalysis)
+        .where(KPIAIAnalysis.scope_key == key, KPIAIAnalysis.status == DONE)
+        .order_by(KPIAIAnalysis.requested_at.desc())
+        .limit(1)
+    ).first()
+
+
+def pending_analysis(session: Session, key: str, now: datetime) -> Optional[KPIAIAnalysis]:
+    """Analyse en attente ou en cours du périmètre (hors tâches perdues, au-delà de kpi_ai_task_timeout)"""
+    return session.exec(
+        select(KPIAIAnalysis)
+        .where(
+            KPIAIAnalysis.scope_key == key,
+            KPIAIAnalysis.status.in_([PENDING, RUNNING]),
+            KPIAIAnalysis.requested_at >= now - timedelta(seconds=settings.kpi_ai_task_timeout),
+        )
+        .order_by(KPIAIAnalysis.requested_at.desc())
+        .limit(1)
+    ).first()
+
+
+def recent_failure(session: Session, key: str, now: datetime) -> Optional[KPIAIAnalysis]:
+    """Dernière analyse du périmètre si elle a échoué depuis moins de kpi_ai_task_timeout"""
+    last = session.exec(
+        select(KPIAIAnalysis)
+        .where(KPIAIAnalysis.scope_key == key)
+        .order_by(KPIAIAnalysis.requested_at.desc())
+        .limit(1)
+    ).first()
+    if (
+        last is not None
+        and last.status == FAILED
+        and (last.completed_at or last.requested_at) >= now - timedelta(seconds=settings.kpi_ai_task_timeout)
+    ):
+        return last
+    return None
+
+
+def _numbers(value: Any, path: Tuple = ()) -> Iterator[Tuple[Tuple, float]]:
+    """Valeurs numériques d'un instantané, par chemin (clés et positions)"""
+    if isinstance(value, dict):
+        for name, item in value.items():
+            yield from _numbers(item, (*path, name))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from _numbers(item, (*path, index))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, float(value)
+
+
+def material_change(previous: Mapping[str, Any], current: Mapping[str, Any], threshold: float) -> bool:
+    """
+    Indique si un KPI a changé significativement entre deux instantanés
+
+    Écart relatif à l'ancienne valeur (au moins 1, pour les petits compteurs) ;
+    un KPI qui apparaît ou disparaît (null, nouveau recruteur, ...) compte aussi.
+    """
+    before = dict(_numbers(previous))
+    after = dict(_numbers(current))
+    if before.keys() != after.keys():
+        return True
+    return any(
+        abs(after[path] - old) / max(abs(old), 1.0) > threshold
+        for path, old in before.items()
+    )
+
+
+def _fail(session: Session, analysis: KPIAIAnalysis, error: Exception) -> None:
+    session.rollback()
+    analysis.status = FAILED
+    analysis.error = str(getattr(error, "detail", None) or error)[:2000]
+    analysis.completed_at = datetime.utcnow()
+    session.add(analysis)
+    session.commit()
+
+
+def run_analysis(engine: Any, analysis_id: UUID, source: AnalysisSource) -> None:
+    """Génère l'analyse analysis_id (instantané des KPI puis appel au modèle), dans sa propre session"""
+    with Session(engine) as session:
+        analysis = session.get(KPIAIAnalysis, analysis_id)
+        if analysis is None or analysis.status not in (PENDING, RUNNING):
+            return
+        analysis.status = RUNNING
+        session.add(analysis)
+        session.commit()
+
+        try:
+            version = data_version(session)
+            snapshot = source.snapshot(session, analysis.role, json.loads(analysis.filters))
+            result = source.analyze(snapshot, analysis.role)
+        except Exception as e:
+            logger.warning(f"⚠️ Analyse IA des KPI {analysis_id} en échec: {getattr(e, 'detail', None) or e}")
+            _fail(session, analysis, e)
+            return
+
+        analysis.kpi_snapshot = json.dumps(snapshot, default=str)
+        analysis.analysis_data = json.dumps(result, default=str)
+        analysis.data_version = version
+        analysis.status = DONE
+        analysis.completed_at = datetime.utcnow()
+        session.add(analysis)
+        session.commit()
+
+
+def request_analysis(
+    session: Session,
+    role: str,
+    filters: Mapping[str, Any],
+    source: AnalysisSource,
+    requested_by: Optional[UUID] = None,
+    run_now: bool = False
+) -> KPIAIAnalysis:
+    """
+    Planifie une analyse du périmètre (ou retourne celle déjà en attente ou en cours)
+
+    Avec run_now, l'analyse est générée avant de retourner (tâche planifiée).
+    """
+    key = scope_key(role, filters)
+    existing = pending_analysis(session, key, datetime.utcnow())
+    if existing is not None and not run_now:
+        return existing
+
+    analysis = KPIAIAnalysis(
+        scope_key=key,
+        role=role,
+        filters=json.dumps(scope_filters(filters)),
+        requested_by=requested_by,
+    )
+    session.add(analysis)
+    session.commit()
+    session.refresh(analysis)
+
+    engine = session.get_bind()
+    if run_now:
+        run_analysis(engine, analysis.id, source)
+        session.refresh(analysis)
+    else:
+        submit_task(f"kpi-ai:{engine.url.database}:{key}", run_analysis, engine, analysis.id, source)
+    return analysis
+
+
+def refresh_if_needed(
+    session: Session,
+    role: str,
+    filters: Mapping[str, Any],
+    latest: Optional[KPIAIAnalysis],
+    source: AnalysisSource,
+    requested_by: Optional[UUID] = None
+) -> Optional[KPIAIAnalysis]:
+    """
+    Analyse à venir du périmètre : planifiée s'il n'y en a aucune ou si les KPI ont changé significativement
+
+    Les KPI courants ne sont comparés à l'instantané que si la version des données a changé.
+    Après un échec récent, l'analyse en échec est retournée sans nouvel appel au modèle.
+    """
+    key = scope_key(role, filters)
+    now = datetime.utcnow()
+    failure = recent_failure(session, key, now)
+    if failure is not None:
+        return failure
+    if latest is None:
+        return request_analysis(session, role, filters, source, requested_by)
+    if latest.data_version != data_version(session):
+        previous = json.loads(latest.kpi_snapshot or "{}").get("kpis", {})
+        current = source.snapshot(session, role, dict(filters)).get("kpis", {})
+        if material_change(previous, current, settings.kpi_ai_material_change):
+            return request_analysis(session, role, filters, source, requested_by)
+    return pending_analysis(session, key, now)
+
+
+def scopes_to_refresh(session: Session, active_since: datetime, older_than: datetime) -> List[KPIAIAnalysis]:
+    """
+    Dernière analyse terminée des périmètres à régénérer (tâche planifiée)
+
+    Périmètres dont une analyse a été demandée par un utilisateur depuis
+    active_since et dont la dernière analyse date d'avant older_than.
+    """
+    active = select(KPIAIAnalysis.scope_key).where(
+        KPIAIAnalysis.requested_by.isnot(None), KPIAIAnalysis.requested_at >= active_since
+    )
+    latest = (
+        select(KPIAIAnalysis.scope_key, func.max(KPIAIAnalysis.requested_at).label("requested_at"))
+        .where(KPIAIAnalysis.status == DONE, KPIAIAnalysis.scope_key.in_(active))
+        .group_by(KPIAIAnalysis.scope_key)
+        .subquery("latest")
+    )
+    return list(session.exec(
+        select(KPIAIAnalysis)
+        .join(latest, and_(
+            latest.c.scope_key == KPIAIAnalysis.scope_key, latest.c.requested_at == KPIAIAnalysis.requested_at
+        ))
+        .where(KPIAIAnalysis.status == DONE, KPIAIAnalysis.requested_at < older_than)
+    ).all())
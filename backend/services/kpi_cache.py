@@ -0,0 +1,212 @@
+"""
+Cache des résultats KPI par tenant, invalidé par version des données
+
+Chaque base tenant possède une séquence kpi_data_version, incrémentée après
+chaque commit qui modifie des candidats, besoins, candidatures, entretiens,
+l'historique des candidatures, les utilisateurs ou les agrégats KPI. Un résultat
+en cache (clé : base, endpoint, filtres normalisés) reste valide tant que la
+version n'a pas changé et qu'il a moins de kpi_cache_ttl secondes.
+
+Un résultat périmé est servi immédiatement et recalculé en arrière-plan
+(stale-while-revalidate) ; il n'est recalculé pendant la requête que s'il
+n'existe pas ou s'il a plus de kpi_cache_max_stale secondes.
+
+Le cache est propre à chaque processus (worker) ; la version étant lue en base,
+une écriture faite par un autre worker invalide aussi ses résultats.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Hashable, Mapping, Optional, Tuple, TypeVar
+from uuid import UUID
+
+from sqlalchemy import case, column, event, func, select, table
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session
+
+from config import settings
+from models import KPI_DATA_VERSION, Application, ApplicationHistory, Candidate, Interview, Job, KPIDailyRollup, User
+from services.background import submit_task
+from services.interview_calendar import to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Modèles dont les écritures changent les KPI
+VERSIONED_MODELS = (Candidate, Job, Application, Interview, ApplicationHistory, User, KPIDailyRollup)
+
+FRESH = "fresh"
+STALE = "stale"
+MISSING = "missing"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """Résultat calculé pour une version des données"""
+    version: int
+    value: Any
+    computed_at: float  # time.monotonic()
+
+
+class KPICache:
+    """Résultats récents (LRU borné, partagé entre les threads du processus)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        with self._lock:
+            current = self._entries.get(key)
+            # Un recalcul plus lent ne remplace pas un résultat plus récent
+            if current is not None and current.version > version:
+                return
+            self._entries[key] = CacheEntry(version, value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = KPICache(settings.kpi_cache_max_entries)
+
+
+def normalize(value: Any) -> Any:
+    """Valeur de filtre comparable (dates en UTC naïf, identifiants en texte)"""
+    if isinstance(value, datetime):
+        return to_utc_naive(value).isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def cache_key(database: str, endpoint: str, filters: Mapping[str, Any]) -> Tuple:
+    """Clé d'un résultat : base, endpoint et filtres renseignés, dans un ordre stable"""
+    return (database, endpoint, tuple(sorted(
+        (name, normalize(value)) for name, value in filters.items() if value is not None
+    )))
+
+
+def freshness(entry: Optional[CacheEntry], version: int, now: float) -> str:
+    """FRESH (servi tel quel), STALE (servi puis recalculé) ou MISSING (à calculer)"""
+    if entry is None:
+        return MISSING
+    age = now - entry.computed_at
+    if age > settings.kpi_cache_max_stale:
+        return MISSING
+    if entry.version != version or age > settings.kpi_cache_ttl:
+        return STALE
+    return FRESH
+
+
+def build_data_version_query() -> Any:
+    """
+    Dernière valeur de la séquence, sans l'incrémenter
+
+    Une séquence neuve a déjà last_value = 1 (is_called = false) : elle vaut 0
+    jusqu'au premier nextval, sans quoi le premier incrément ne changerait pas la version.
+    """
+    return select(
+        case((column("is_called"), column("last_value")), else_=0)
+    ).select_from(table(KPI_DATA_VERSION.name))
+
+
+def data_version(session: Session) -> int:
+    """Version courante des données du tenant"""
+    return session.execute(build_data_version_query()).scalar_one()
+
+
+def bump_data_version(engine: Any) -> None:
+    """Incrémente la version des données (nextval ne dépend d'aucune transaction)"""
+    with engine.connect() as connection:
+        connection.execute(select(func.nextval(KPI_DATA_VERSION.name)))
+
+
+def _revalidate(engine: Any, key: Tuple, compute: Callable[[Session], Any]) -> None:
+    with Session(engine) as session:
+        version = data_version(session)
+        _cache.put(key, version, compute(session))
+
+
+def cached_kpis(session: Session, endpoint: str, filters: Mapping[str, Any], compute: Callable[[Session], T]) -> T:
+    """
+    Résultat de compute(session) pour ces filtres, servi depuis le cache si possible
+
+    compute ne doit dépendre que de la session et des valeurs de filters : un
+    recalcul en arrière-plan l'appelle avec une autre session.
+    """
+    engine = session.get_bind()
+    key = cache_key(engine.url.database, endpoint, filters)
+    version = data_version(session)
+    entry = _cache.get(key)
+    state = freshness(entry, version, time.monotonic())
+    if state == FRESH:
+        return entry.value
+    if state == STALE:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        submit_task(f"kpi-cache:{engine.url.database}:{digest}", _revalidate, engine, key, compute)
+        return entry.value
+
+    value = compute(session)
+    _cache.put(key, version, value)
+    return value
+
+
+def mark_changed(session: Session) -> None:
+    """Signale une écriture faite hors de l'ORM (SQL brut) : la version sera incrémentée au commit"""
+    session.info["kpi_data_changed"] = True
+
+
+# ==================== VERSION APRÈS COMMIT ====================
+
+@event.listens_for(OrmSession, "after_flush")
+def _track_flushed_rows(session: OrmSession, flush_context: Any) -> None:
+    """Note l'ajout, la modification ou la suppression d'une ligne suivie"""
+    if session.info.get("kpi_data_changed"):
+        return
+    if any(isinstance(instance, VERSIONED_MODELS) for instance in (*session.new, *session.deleted)) or any(
+        isinstance(instance, VERSIONED_MODELS) and session.is_modified(instance) for instance in session.dirty
+    ):
+        session.info["kpi_data_changed"] = True
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _track_bulk_statements(orm_execute_state: Any) -> None:
+    """Note les insertions, mises à jour et suppressions en masse des tables suivies"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, VERSIONED_MODELS):
+        orm_execute_state.session.info["kpi_data_changed"] = True
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _bump_after_commit(session: OrmSession) -> None:
+    if not session.info.pop("kpi_data_changed", False):
+        return
+    try:
+        bump_data_version(session.get_bind())
+    except Exception as e:
+        # Les données sont déjà enregistrées : les KPI seront recalculés à l'expiration du cache
+        logger.warning(f"⚠️ Version des données KPI non incrémentée: {e}")
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_after_rollback(session: OrmSession) -> None:
+    session.info.pop("kpi_data_changed", None)
@@ -0,0 +1,527 @@
+"""
+Moteur de calcul des KPI (tableaux de bord manager, recruteur et client)
+
+Chaque entité est lue en une instruction : les indicateurs sont des agrégats
+conditionnels (count(*) FILTER (WHERE ...), avg(...) FILTER (WHERE ...)) calculés
+dans le même parcours, avec un GROUP BY status pour les répartitions par statut.
+Un chargement de tableau de bord passe ainsi de plusieurs dizaines de requêtes à
+quelques-unes.
+
+Les filtres appliqués par chaque indicateur sont ceux des calculs historiques
+(certains indicateurs sont globaux, d'autres suivent les filtres du tableau de bord).
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import and_, func, literal, select, true
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from models import Application, ApplicationHistory, Candidate, Interview, Job
+
+CANDIDATE_STATUSES = [
+    "sourcé", "qualifié", "entretien_rh", "entretien_client", "shortlist", "offre", "rejeté", "embauché"
+]
+JOB_STATUSES = [
+    "brouillon", "a_valider", "urgent", "tres_urgent", "besoin_courant", "validé", "en_cours",
+    "gagne", "standby", "archive", "clôturé"
+]
+
+# Délai cible de transmission d'un feedback d'entretien (jours)
+FEEDBACK_TARGET_DAYS = 2
+
+# Délai cible entre validation et clôture d'un besoin (jours)
+JOB_TARGET_DAYS = 60
+
+
+@dataclass
+class KPIScope:
+    """Filtres d'un tableau de bord (mêmes champs que KPIFilters)"""
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    recruiter_id: Optional[UUID] = None
+    job_id: Optional[UUID] = None
+    source: Optional[str] = None
+
+    @classmethod
+    def from_filters(cls, filters: Any) -> "KPIScope":
+        return cls(
+            start_date=filters.start_date,
+            end_date=filters.end_date,
+            recruiter_id=filters.recruiter_id,
+            job_id=filters.job_id,
+            source=filters.source,
+        )
+
+
+@dataclass(frozen=True)
+class PeriodStarts:
+    """Débuts du jour, du mois et de l'année en cours (statistiques de sourcing)"""
+    today: datetime
+    month: datetime
+    year: datetime
+
+    @classmethod
+    def at(cls, now: datetime) -> "PeriodStarts":
+        return cls(
+            today=datetime(now.year, now.month, now.day),
+            month=datetime(now.year, now.month, 1),
+            year=datetime(now.year, 1, 1),
+        )
+
+
+def days(interval: Any) -> Any:
+    """Durée en jours d'un intervalle SQL"""
+    return func.extract("epoch", interval) / 86400
+
+
+def where(*conditions: Any) -> Any:
+    """Condition d'un FILTER (vraie si aucune condition)"""
+    return and_(true(), *conditions)
+
+
+def date_conditions(column: Any, scope: KPIScope) -> List[Any]:
+    conditions = []
+    if scope.start_date:
+        conditions.append(column >= scope.start_date)
+    if scope.end_date:
+        conditions.append(column <= scope.end_date)
+    return conditions
+
+
+def _optional_count(condition: Any, enabled: bool, label: str) -> Any:
+    """Compteur conditionnel, ou 0 si le filtre correspondant n'est pas demandé"""
+    if enabled:
+        return func.count().filter(condition).label(label)
+    return literal(0).label(label)
+
+
+# ==================== CANDIDATS ====================
+
+def build_candidate_query(scope: KPIScope, periods: PeriodStarts, owner_id: Optional[UUID] = None) -> Select:
+    """
+    Compteurs des candidats par statut
+
+    - in_scope : filtres recruteur, source et période
+    - today / this_month / this_year / first_created_at : filtres recruteur et source
+    - source_total : candidats de la source, sans autre filtre
+    - owned : candidats créés par owner_id
+    """
+    owner_scope = []
+    if scope.recruiter_id:
+        owner_scope.append(Candidate.created_by == scope.recruiter_id)
+    if scope.source:
+        owner_scope.append(Candidate.source == scope.source)
+
+    return (
+        select(
+            Candidate.status,
+            func.count().filter(where(*owner_scope, *date_conditions(Candidate.created_at, scope))).label("in_scope"),
+            func.count().filter(where(*owner_scope, Candidate.created_at >= periods.today)).label("today"),
+            func.count().filter(where(*owner_scope, Candidate.created_at >= periods.month)).label("this_month"),
+            func.count().filter(where(*owner_scope, Candidate.created_at >= periods.year)).label("this_year"),
+            func.min(Candidate.created_at).filter(where(*owner_scope)).label("first_created_at"),
+            _optional_count(Candidate.source == scope.source, bool(scope.source), "source_total"),
+            _optional_count(Candidate.created_by == owner_id, owner_id is not None, "owned"),
+        )
+        .group_by(Candidate.status)
+    )
+
+
+# ==================== BESOINS ====================
+
+def source_jobs_cte(source: str) -> Any:
+    """Besoins ayant au moins une candidature d'un candidat de la source"""
+    return (
+        select(Application.job_id)
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .where(Candidate.source == source)
+        .distinct()
+        .cte("source_jobs")
+    )
+
+
+def build_job_query(scope: KPIScope, owner_id: Optional[UUID] = None) -> Select:
+    """
+    Compteurs et budgets des besoins par statut
+
+    - in_scope : filtres recruteur (créateur), besoin et période ; in_scope_all : sans la période
+    - total / budget_total : tous les besoins
+    - budget_scope_* : filtres recruteur et besoin (coût moyen de recrutement)
+    - source_budget_* : besoins liés à la source (coût par source)
+    - owned : besoins créés par owner_id
+    """
+    job_scope = []
+    if scope.recruiter_id:
+        job_scope.append(Job.created_by == scope.recruiter_id)
+    if scope.job_id:
+        job_scope.append(Job.id == scope.job_id)
+
+    columns = [
+        Job.status,
+        func.count().filter(where(*job_scope, *date_conditions(Job.created_at, scope))).label("in_scope"),
+        func.count().filter(where(*job_scope)).label("in_scope_all"),
+        func.count().label("total"),
+        func.sum(Job.budget).label("budget_total"),
+        func.sum(Job.budget).filter(where(*job_scope)).label("budget_scope_sum"),
+        func.count(Job.budget).filter(where(*job_scope)).label("budget_scope_count"),
+        _optional_count(Job.created_by == owner_id, owner_id is not None, "owned"),
+    ]
+    if not scope.source:
+        columns += [literal(None).label("source_budget_sum"), literal(0).label("source_budget_count")]
+        return select(*columns).select_from(Job).group_by(Job.status)
+
+    source_jobs = source_jobs_cte(scope.source)
+    linked = source_jobs.c.job_id.isnot(None)
+    columns += [
+        func.sum(Job.budget).filter(linked).label("source_budget_sum"),
+        func.count(Job.budget).filter(linked).label("source_budget_count"),
+    ]
+    return (
+        select(*columns)
+        .select_from(Job)
+        .outerjoin(source_jobs, source_jobs.c.job_id == Job.id)
+        .group_by(Job.status)
+    )
+
+
+# ==================== CANDIDATURES ====================
+
+def application_delay_columns(scope: KPIScope) -> List[Any]:
+    """Délais moyens des candidatures (jours) : les délais suivent les filtres recruteur, besoin et source"""
+    job_scope, application_scope, candidate_scope = [], [], []
+    if scope.recruiter_id:
+        job_scope.append(Job.created_by == scope.recruiter_id)
+        application_scope.append(Application.created_by == scope.recruiter_id)
+        candidate_scope.append(Candidate.created_by == scope.recruiter_id)
+    if scope.job_id:
+        job_scope.append(Job.id == scope.job_id)
+        application_scope.append(Application.job_id == scope.job_id)
+    if scope.source:
+        candidate_scope.append(Candidate.source == scope.source)
+
+    hired = Application.status == "embauché"
+    return [
+        func.avg(days(Application.updated_at - Job.created_at))
+        .filter(where(hired, *job_scope)).label("time_to_hire"),
+        func.avg(days(Application.updated_at - Job.validated_at))
+        .filter(where(Application.status == "offre", *job_scope)).label("time_to_fill"),
+        func.avg(days(Application.updated_at - Application.offer_sent_at))
+        .filter(where(hired, Application.offer_sent_at.isnot(None), *application_scope)).label("onboarding_delay"),
+        func.avg(days(Application.created_at - Candidate.created_at))
+        .filter(where(*candidate_scope)).label("sourcing_time"),
+    ]
+
+
+def _from_applications(statement: Select) -> Select:
+    return (
+        statement
+        .select_from(Application)
+        .join(Job, Job.id == Application.job_id)
+        .join(Candidate, Candidate.id == Application.candidate_id)
+    )
+
+
+def build_application_query(scope: KPIScope, owner_id: Optional[UUID] = None) -> Select:
+    """
+    Indicateurs des candidatures (une ligne)
+
+    Les taux d'offres, de shortlist et de rejet portent sur toutes les candidatures ;
+    les délais suivent les filtres recruteur et besoin ; owned_* porte sur les
+    candidatures créées par owner_id.
+    """
+    offer_sent = Application.offer_sent_at.isnot(None)
+    shortlisted = Application.is_in_shortlist.is_(True)
+    hired = Application.status == "embauché"
+    owned = Application.created_by == owner_id
+    has_owner = owner_id is not None
+
+    return _from_applications(select(
+        func.count().label("total"),
+        func.count().filter(Application.status == "rejeté").label("rejected"),
+        func.count().filter(offer_sent).label("offers_sent"),
+        func.count().filter(offer_sent, hired).label("offers_accepted"),
+        func.count().filter(offer_sent, Application.status == "rejeté").label("offers_rejected"),
+        func.count().filter(offer_sent, Application.status.in_(["offre", "embauché"])).label("offers_responded"),
+        func.count().filter(shortlisted).label("shortlisted"),
+        func.count().filter(shortlisted, Application.client_validated.is_(True)).label("shortlist_validated"),
+        func.count().filter(hired).label("hired"),
+        *application_delay_columns(scope),
+        _optional_count(Candidate.source == scope.source, bool(scope.source), "source_applications"),
+        _optional_count(and_(Candidate.source == scope.source, hired), bool(scope.source), "source_hired"),
+        _optional_count(and_(owned, shortlisted), has_owner, "owned_shortlisted"),
+        _optional_count(and_(owned, shortlisted, Application.client_validated.is_(True)), has_owner, "owned_shortlist_validated"),
+        _optional_count(and_(owned, offer_sent), has_owner, "owned_offers_sent"),
+        _optional_count(and_(owned, offer_sent, hired), has_owner, "owned_offers_accepted"),
+        _optional_count(and_(owned, offer_sent, Application.status == "rejeté"), has_owner, "owned_offers_rejected"),
+        _optional_count(and_(owned, hired), has_owner, "owned_hired"),
+    ))
+
+
+def build_application_delay_query(scope: KPIScope) -> Select:
+    """Délais moyens des candidatures seuls (une ligne)"""
+    return _from_applications(select(*application_delay_columns(scope)))
+
+
+# ==================== ENTRETIENS ====================
+
+def build_interview_query(scope: KPIScope, now: datetime, owner_id: Optional[UUID] = None) -> Select:
+    """Indicateurs des entretiens (une ligne)"""
+    creator_scope = [Interview.created_by == scope.recruiter_id] if scope.recruiter_id else []
+    with_feedback = and_(Interview.feedback_provided_at.isnot(None), Interview.scheduled_at.isnot(None))
+    owned = Interview.created_by == owner_id
+
+    return select(
+        func.avg(Interview.score).label("average_score"),
+        func.count().filter(where(*creator_scope, *date_conditions(Interview.created_at, scope))).label("in_scope"),
+        func.avg(days(Interview.feedback_provided_at - Interview.scheduled_at))
+        .filter(where(*creator_scope)).label("feedback_delay"),
+        func.count().filter(Interview.scheduled_at.isnot(None)).label("scheduled"),
+        func.count().filter(Interview.scheduled_at < now, Interview.feedback.is_(None)).label("no_show"),
+        func.count().filter(with_feedback).label("feedbacks"),
+        func.count().filter(
+            with_feedback,
+            Interview.feedback_provided_at - Interview.scheduled_at <= timedelta(days=FEEDBACK_TARGET_DAYS)
+        ).label("feedbacks_on_time"),
+        _optional_count(owned, owner_id is not None, "owned"),
+        (func.avg(Interview.score).filter(owned) if owner_id is not None else literal(None)).label("owned_average_score"),
+    )
+
+
+def build_no_show_query(now: datetime) -> Select:
+    """Entretiens passés sans feedback (no-show présumés)"""
+    return select(func.count()).select_from(Interview).where(
+        Interview.scheduled_at < now, Interview.feedback.is_(None)
+    )
+
+
+# ==================== HISTORIQUE ET DÉLAIS ====================
+
+def build_stage_cycle_query(scope: KPIScope) -> Select:
+    """
+    Durée moyenne (jours) passée dans une étape, calculée en base
+
+    LAG(created_at) OVER (PARTITION BY application_id ORDER BY created_at) donne la
+    date du changement de statut précédent de la candidature (parcours de l'index
+    (application_id, created_at)) ; seule la moyenne des durées positives est
+    retournée. Les filtres recruteur (créateur de la candidature), besoin et source
+    s'appliquent aux candidatures ; la période porte sur la date du changement, le
+    changement précédent restant pris en compte même s'il la précède.
+    """
+    previous_at = func.lag(ApplicationHistory.created_at).over(
+        partition_by=ApplicationHistory.application_id,
+        order_by=ApplicationHistory.created_at
+    )
+    transitions = select(
+        ApplicationHistory.created_at,
+        (ApplicationHistory.created_at - previous_at).label("duration"),
+    ).select_from(ApplicationHistory)
+
+    if scope.recruiter_id or scope.job_id or scope.source:
+        transitions = transitions.join(Application, Application.id == ApplicationHistory.application_id)
+    if scope.recruiter_id:
+        transitions = transitions.where(Application.created_by == scope.recruiter_id)
+    if scope.job_id:
+        transitions = transitions.where(Application.job_id == scope.job_id)
+    if scope.source:
+        transitions = transitions.join(Candidate, Candidate.id == Application.candidate_id).where(
+            Candidate.source == scope.source
+        )
+    transitions = transitions.cte("transitions")
+
+    return select(func.avg(days(transitions.c.duration))).where(
+        transitions.c.duration > timedelta(0),
+        *date_conditions(transitions.c.created_at, scope)
+    )
+
+
+def build_jobs_on_time_query(scope: KPIScope, target_days: int = JOB_TARGET_DAYS) -> Select:
+    """
+    Besoins clôturés (validation et clôture renseignées) et ceux clôturés dans le délai cible
+
+    Filtres recruteur (créateur du besoin), besoin et période (création du besoin).
+    """
+    statement = select(
+        func.count().label("closed"),
+        func.count().filter(Job.closed_at - Job.validated_at <= timedelta(days=target_days)).label("on_time"),
+    ).where(
+        Job.status == "clôturé",
+        Job.closed_at.isnot(None),
+        Job.validated_at.isnot(None),
+        *date_conditions(Job.created_at, scope)
+    )
+    if scope.recruiter_id:
+        statement = statement.where(Job.created_by == scope.recruiter_id)
+    if scope.job_id:
+        statement = statement.where(Job.id == scope.job_id)
+    return statement
+
+
+# ==================== PAR RECRUTEUR ====================
+
+def build_recruiter_candidate_query(scope: KPIScope, periods: PeriodStarts) -> Select:
+    """
+    Compteurs des candidats par créateur et par statut (tous les recruteurs en une instruction)
+
+    Colonnes de build_candidate_query pour chaque créateur (filtres source et
+    période, scope.recruiter_id ignoré), plus in_period : candidats créés dans la
+    période, toutes sources confondues.
+    """
+    source_scope = [Candidate.source == scope.source] if scope.source else []
+    period = date_conditions(Candidate.created_at, scope)
+    return (
+        select(
+            Candidate.created_by.label("recruiter_id"),
+            Candidate.status,
+            func.count().filter(where(*source_scope, *period)).label("in_scope"),
+            func.count().filter(where(*source_scope, Candidate.created_at >= periods.today)).label("today"),
+            func.count().filter(where(*source_scope, Candidate.created_at >= periods.month)).label("this_month"),
+            func.count().filter(where(*source_scope, Candidate.created_at >= periods.year)).label("this_year"),
+            func.min(Candidate.created_at).filter(where(*source_scope)).label("first_created_at"),
+            func.count().filter(where(*period)).label("in_period"),
+        )
+        .group_by(Candidate.created_by, Candidate.status)
+    )
+
+
+def build_recruiter_job_query(scope: KPIScope) -> Select:
+    """
+    Compteurs des besoins par créateur et par statut
+
+    - in_scope : filtres besoin et période (scope.recruiter_id ignoré)
+    - in_period : besoins créés dans la période, sans filtre besoin
+    """
+    job_scope = [Job.id == scope.job_id] if scope.job_id else []
+    period = date_conditions(Job.created_at, scope)
+    return (
+        select(
+            Job.created_by.label("recruiter_id"),
+            Job.status,
+            func.count().filter(where(*job_scope, *period)).label("in_scope"),
+            func.count().filter(where(*period)).label("in_period"),
+        )
+        .group_by(Job.created_by, Job.status)
+    )
+
+
+# ==================== CLIENT ====================
+
+def build_client_application_query(client_id: UUID, scope: KPIScope, periods: PeriodStarts) -> Select:
+    """Indicateurs des candidatures sur les besoins d'un client (une ligne)"""
+    shortlisted = Application.is_in_shortlist.is_(True)
+    application_dates = date_conditions(Application.created_at, scope)
+    job_dates = date_conditions(Job.created_at, scope)
+    sourced = [Candidate.status == "sourcé", *date_conditions(Candidate.created_at, scope)]
+
+    statement = (
+        select(
+            func.count().filter(where(shortlisted, *application_dates)).label("shortlisted"),
+            func.count().filter(where(
+                shortlisted, Application.client_validated.is_(True), *application_dates
+            )).label("validated"),
+            func.count().filter(where(
+                shortlisted, Application.client_validated.is_(False),
+                Application.client_validated_at.isnot(None), *application_dates
+            )).label("rejected"),
+            func.avg(days(Application.updated_at - Job.created_at))
+            .filter(where(Application.status == "embauché", *job_dates)).label("time_to_hire"),
+            func.avg(days(Application.updated_at - Job.validated_at))
+            .filter(where(Application.status == "offre", *job_dates)).label("time_to_fill"),
+            func.count().filter(where(*sourced)).label("sourced_total"),
+            func.count().filter(where(*sourced, Candidate.created_at >= periods.today)).label("today"),
+            func.count().filter(where(*sourced, Candidate.created_at >= periods.month)).label("this_month"),
+            func.count().filter(where(*sourced, Candidate.created_at >= periods.year)).label("this_year"),
+            func.min(Candidate.created_at).filter(Candidate.status == "sourcé").label("first_created_at"),
+        )
+        .select_from(Application)
+        .join(Job, Job.id == Application.job_id)
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .where(Job.created_by == client_id)
+    )
+    if scope.job_id:
+        statement = statement.where(Job.id == scope.job_id)
+    return statement
+
+
+def build_client_interview_query(client_id: UUID, scope: KPIScope) -> Select:
+    """Nombre d'entretiens planifiés sur les besoins d'un client"""
+    statement = (
+        select(func.count(Interview.id))
+        .select_from(Interview)
+        .join(Application, Application.id == Interview.application_id)
+        .join(Job, Job.id == Application.job_id)
+        .where(Job.created_by == client_id, *date_conditions(Interview.created_at, scope))
+    )
+    if scope.job_id:
+        statement = statement.where(Application.job_id == scope.job_id)
+    return statement
+
+
+# ==================== LECTURE ====================
+
+def by_status(rows: Sequence[Mapping[str, Any]]) -> Dict[str, Mapping[str, Any]]:
+    return {row["status"]: row for row in rows}
+
+
+def by_recruiter(rows: Sequence[Mapping[str, Any]]) -> Dict[Any, Dict[str, Mapping[str, Any]]]:
+    """Lignes par créateur puis par statut"""
+    recruiters: Dict[Any, Dict[str, Mapping[str, Any]]] = {}
+    for row in rows:
+        recruiters.setdefault(row["recruiter_id"], {})[row["status"]] = row
+    return recruiters
+
+
+def status_count(rows: Mapping[str, Mapping[str, Any]], status: str, column: str) -> Any:
+    """Valeur d'un compteur pour un statut (0 si aucune ligne)"""
+    row = rows.get(status)
+    return (row[column] or 0) if row is not None else 0
+
+
+def column_total(rows: Mapping[str, Mapping[str, Any]], column: str, exclude: Sequence[Optional[str]] = ()) -> Any:
+    """Somme d'un compteur sur tous les statuts (sauf exclude)"""
+    return sum(row[column] or 0 for status, row in rows.items() if status not in exclude)
+
+
+def load_candidates(session: Session, scope: KPIScope, periods: PeriodStarts, owner_id: Optional[UUID] = None):
+    return by_status(session.execute(build_candidate_query(scope, periods, owner_id)).mappings().all())
+
+
+def load_jobs(session: Session, scope: KPIScope, owner_id: Optional[UUID] = None):
+    return by_status(session.execute(build_job_query(scope, owner_id)).mappings().all())
+
+
+def load_recruiter_candidates(session: Session, scope: KPIScope, periods: PeriodStarts):
+    return by_recruiter(session.execute(build_recruiter_candidate_query(scope, periods)).mappings().all())
+
+
+def load_recruiter_jobs(session: Session, scope: KPIScope):
+    return by_recruiter(session.execute(build_recruiter_job_query(scope)).mappings().all())
+
+
+def load_applications(session: Session, scope: KPIScope, owner_id: Optional[UUID] = None) -> Mapping[str, Any]:
+    return session.execute(build_application_query(scope, owner_id)).mappings().one()
+
+
+def load_interviews(session: Session, scope: KPIScope, now: datetime, owner_id: Optional[UUID] = None) -> Mapping[str, Any]:
+    return session.execute(build_interview_query(scope, now, owner_id)).mappings().one()
+
+
+def load_client_applications(session: Session, client_id: UUID, scope: KPIScope, periods: PeriodStarts) -> Mapping[str, Any]:
+    return session.execute(build_client_application_query(client_id, scope, periods)).mappings().one()
+
+
+def count_client_interviews(session: Session, client_id: UUID, scope: KPIScope) -> int:
+    return session.execute(build_client_interview_query(client_id, scope)).scalar_one()
+
+
+def average_stage_cycle(session: Session, scope: KPIScope) -> Optional[float]:
+    result = session.execute(build_stage_cycle_query(scope)).scalar_one()
+    return float(result) if result is not None else None
+
+
+def jobs_on_time_rate(session: Session, scope: KPIScope, target_days: int = JOB_TARGET_DAYS) -> Optional[float]:
+    """Pourcentage des besoins clôturés dans le délai cible (None sans besoin clôturé)"""
+    row = session.execute(build_jobs_on_time_query(scope, target_days)).mappings().one()
+    return (row["on_time"] / row["closed"] * 100) if row["closed"] else None
@@ -0,0 +1,161 @@
+"""
+Entonnoir de recrutement par cohorte de sourcing
+
+Une cohorte regroupe les candidats sourcés (créés) dans une même période. Pour
+chaque cohorte et chaque étape du pipeline, la matrice donne le nombre de
+candidats ayant atteint l'étape, le taux de conversion depuis l'étape précédente
+et la durée médiane (jours) entre le sourcing et l'entrée dans l'étape.
+
+Le calcul tient en une instruction, à partir des candidatures et de leur historique :
+- la CTE stage_entries lit une fois les candidatures des candidats des cohortes et
+  leur historique (index applications(candidate_id) puis
+  application_history(application_id, ...)) et donne, par candidat, la première
+  entrée dans chaque étape et l'étape la plus avancée atteinte (historique ou
+  statut actuel de la candidature) ;
+- la requête principale groupe les candidats par cohorte (date_trunc) avec
+  ROLLUP, pour obtenir aussi la ligne de total, avec des count(*) FILTER et des
+  percentile_cont(0.5) WITHIN GROUP ... FILTER par étape.
+
+Un candidat qui saute une étape (entretien client sans entretien RH par exemple)
+est compté comme l'ayant atteinte ; sa durée n'entre que dans la médiane des
+étapes qu'il a réellement traversées. Le statut actuel du candidat compte aussi
+(hors filtre besoin) : un statut changé sans historique reste dans l'entonnoir.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, case, func, nulls_last, select
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from models import Application, ApplicationHistory, Candidate
+from services.kpi_engine import KPIScope, days
+from services.kpi_timeseries import SeriesWindow, next_bucket
+
+# Étapes de l'entonnoir, dans l'ordre (le sourcing est l'entrée de la cohorte)
+FUNNEL_STAGES = ["qualifié", "entretien_rh", "entretien_client", "shortlist", "offre", "embauché"]
+FUNNEL_GRANULARITIES = ("week", "month")
+
+
+def reached_label(index: int) -> str:
+    return f"reached_{index}"
+
+
+def median_label(index: int) -> str:
+    return f"median_days_{index}"
+
+
+def stage_rank(status: Any) -> Any:
+    """Rang d'un statut dans l'entonnoir (1 pour la première étape, NULL hors entonnoir)"""
+    return case({stage: index for index, stage in enumerate(FUNNEL_STAGES, start=1)}, value=status)
+
+
+def build_funnel_query(window: SeriesWindow, scope: KPIScope) -> Select:
+    """
+    Matrice cohorte × étape (une ligne par cohorte, plus le total où cohort est NULL)
+
+    Filtres : recruteur (créateur du candidat), source, besoin (candidats ayant
+    une candidature sur le besoin ; seul son historique est lu).
+    """
+    cohort_scope = [*window.contains(Candidate.created_at)]
+    if scope.recruiter_id:
+        cohort_scope.append(Candidate.created_by == scope.recruiter_id)
+    if scope.source:
+        cohort_scope.append(Candidate.source == scope.source)
+
+    # greatest ignore les NULL : une candidature sans historique compte par son statut actuel
+    entries = (
+        select(
+            Application.candidate_id,
+            func.max(func.greatest(stage_rank(ApplicationHistory.new_status), stage_rank(Application.status)))
+            .label("furthest"),
+            *(
+                func.min(ApplicationHistory.created_at).filter(ApplicationHistory.new_status == stage).label(f"entered_{index}")
+                for index, stage in enumerate(FUNNEL_STAGES)
+            ),
+        )
+        .select_from(Application)
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .outerjoin(ApplicationHistory, and_(
+            ApplicationHistory.application_id == Application.id,
+            ApplicationHistory.new_status.in_(FUNNEL_STAGES),
+        ))
+        .where(*cohort_scope)
+        .group_by(Application.candidate_id)
+    )
+    if scope.job_id:
+        entries = entries.where(Application.job_id == scope.job_id)
+    entries = entries.cte("stage_entries")
+
+    # Avec le filtre besoin, seules les candidatures sur le besoin comptent
+    furthest = entries.c.furthest if scope.job_id else func.greatest(entries.c.furthest, stage_rank(Candidate.status))
+    cohort = func.date_trunc(window.granularity, Candidate.created_at)
+    columns = [cohort.label("cohort"), func.count().label("sourced")]
+    for index in range(len(FUNNEL_STAGES)):
+        entered = entries.c[f"entered_{index}"]
+        columns.append(func.count().filter(furthest >= index + 1).label(reached_label(index)))
+        columns.append(
+            func.percentile_cont(0.5)
+            .within_group(days(entered - Candidate.created_at))
+            .filter(entered.isnot(None))
+            .label(median_label(index))
+        )
+
+    statement = (
+        select(*columns)
+        .select_from(Candidate)
+        .outerjoin(entries, entries.c.candidate_id == Candidate.id)
+        .where(*cohort_scope)
+        .group_by(func.rollup(cohort))
+        .order_by(nulls_last(cohort))
+    )
+    if scope.job_id:
+        statement = statement.where(
+            select(Application.id)
+            .where(Application.candidate_id == Candidate.id, Application.job_id == scope.job_id)
+            .exists()
+        )
+    return statement
+
+
+def _rate(part: int, total: int) -> Optional[float]:
+    return round(part / total * 100, 2) if total else None
+
+
+def cohort_stages(row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Étapes d'une ligne de la matrice : atteints, conversion depuis l'étape précédente et depuis le sourcing"""
+    stages = []
+    previous = row["sourced"]
+    for index, stage in enumerate(FUNNEL_STAGES):
+        reached = row[reached_label(index)] or 0
+        median = row[median_label(index)]
+        stages.append({
+            "stage": stage,
+            "reached": reached,
+            "conversion_rate": _rate(reached, previous),
+            "cumulative_rate": _rate(reached, row["sourced"]),
+            "median_days": round(float(median), 2) if median is not None else None,
+        })
+        previous = reached
+    return stages
+
+
+def load_funnel(session: Session, window: SeriesWindow, scope: KPIScope) -> Dict[str, Any]:
+    """Cohortes (dans l'ordre, cohortes vides comprises) et total, en une requête"""
+    rows = session.execute(build_funnel_query(window, scope)).mappings().all()
+    by_cohort = {row["cohort"]: row for row in rows}
+    empty = {"sourced": 0, **{reached_label(index): 0 for index in range(len(FUNNEL_STAGES))},
+             **{median_label(index): None for index in range(len(FUNNEL_STAGES))}}
+
+    cohorts = []
+    bucket = window.first
+    while bucket <= window.last:
+        row = by_cohort.get(bucket, empty)
+        cohorts.append({"cohort": bucket, "sourced": row["sourced"], "stages": cohort_stages(row)})
+        bucket = next_bucket(bucket, window.granularity)
+
+    total = by_cohort.get(None, empty)
+    return {
+        "granularity": window.granularity,
+        "cohorts": cohorts,
+        "total": {"cohort": None, "sourced": total["sourced"], "stages": cohort_stages(total)},
+    }
@@ -0,0 +1,521 @@
+"""
+Agrégats KPI quotidiens (table kpi_daily_rollups)
+
+Pour chaque entité (candidats, besoins, candidatures, entretiens), une ligne par
+jour de création × créateur × source × statut contient les compteurs et sommes
+utilisés par les tableaux de bord. Les KPI lisent ces lignes (quelques milliers au
+plus) au lieu des tables brutes : la latence ne dépend plus de l'historique.
+
+Maintenance incrémentale :
+- après chaque commit qui ajoute, modifie ou supprime un candidat, un besoin, une
+  candidature ou un entretien, les jours concernés sont recalculés en arrière-plan ;
+  les mises à jour en masse (update/delete ORM) recalculent les jours des lignes
+  modifiées depuis l'instruction (updated_at) ;
+- le script scripts/refresh_kpi_rollups.py (tâche planifiée) recalcule les jours
+  des lignes modifiées récemment, ou reconstruit tout (--full).
+
+Les agrégats sont utilisés dès qu'ils ont été construits une première fois
+(paramètre kpi_rollups_built_at) et que les bornes de période sont des dates
+(minuit) : un filtre au jour près est exact, une date de fin exclut la journée
+de fin (created_at <= fin à minuit). Sinon, les indicateurs sont calculés sur les
+tables (services/kpi_engine.py). Les délais moyens des candidatures et le taux de
+no-show (qui dépend de l'heure courante) restent calculés sur les tables.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import Date, and_, cast, delete, event, func, insert, literal, null, select
+from sqlalchemy.orm import Session as OrmSession
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from models import Application, Candidate, Interview, Job, KPIDailyRollup, Setting
+from services import kpi_engine
+from services.background import submit_task
+from services.interview_calendar import to_utc_naive
+from services.kpi_engine import (
+    FEEDBACK_TARGET_DAYS,
+    KPIScope,
+    PeriodStarts,
+    by_recruiter,
+    by_status,
+    days,
+    where,
+)
+
+logger = logging.getLogger(__name__)
+
+Rollup = KPIDailyRollup
+
+# Paramètre (table settings) indiquant que les agrégats ont été construits
+BUILT_SETTING_KEY = "kpi_rollups_built_at"
+
+# Verrou consultatif des recalculs (un seul recalcul à la fois par base)
+ROLLUP_LOCK_KEY = 724_031
+
+TRACKED_MODELS = {
+    Candidate: "candidates",
+    Job: "jobs",
+    Application: "applications",
+    Interview: "interviews",
+}
+
+MEASURES = (
+    "count", "first_created_at", "offers", "shortlisted", "shortlist_validated", "budget_sum",
+    "budget_count", "score_sum", "score_count", "feedbacks", "feedbacks_on_time", "feedback_delay_sum",
+)
+# Mesures sans valeur (NULL) pour les entités qui ne les renseignent pas ; les autres valent 0
+NULLABLE_MEASURES = {"first_created_at", "budget_sum", "score_sum", "feedback_delay_sum"}
+
+# Marge appliquée à l'heure d'une mise à jour en masse (updated_at calculé juste avant l'instruction)
+BULK_MARGIN = timedelta(minutes=5)
+
+
+# ==================== CALCUL DES AGRÉGATS ====================
+
+def _entity_source(entity: str) -> Dict[str, Any]:
+    """Table, date de création, dimensions et mesures d'une entité"""
+    if entity == "candidates":
+        return {
+            "from": (Candidate,),
+            "created_at": Candidate.created_at,
+            "updated_at": Candidate.updated_at,
+            "dimensions": (Candidate.created_by, Candidate.source, Candidate.status),
+            "measures": {
+                "count": func.count(),
+                "first_created_at": func.min(Candidate.created_at),
+            },
+        }
+    if entity == "jobs":
+        return {
+            "from": (Job,),
+            "created_at": Job.created_at,
+            "updated_at": Job.updated_at,
+            "dimensions": (Job.created_by, None, Job.status),
+            "measures": {
+                "count": func.count(),
+                "budget_sum": func.sum(Job.budget),
+                "budget_count": func.count(Job.budget),
+            },
+        }
+    if entity == "applications":
+        shortlisted = Application.is_in_shortlist.is_(True)
+        return {
+            "from": (Application, (Candidate, Candidate.id == Application.candidate_id)),
+            "created_at": Application.created_at,
+            "updated_at": Application.updated_at,
+            "dimensions": (Application.created_by, Candidate.source, Application.status),
+            "measures": {
+                "count": func.count(),
+                "offers": func.count().filter(Application.offer_sent_at.isnot(None)),
+                "shortlisted": func.count().filter(shortlisted),
+                "shortlist_validated": func.count().filter(shortlisted, Application.client_validated.is_(True)),
+            },
+        }
+    if entity == "interviews":
+        with_feedback = and_(Interview.feedback_provided_at.isnot(None), Interview.scheduled_at.isnot(None))
+        delay = Interview.feedback_provided_at - Interview.scheduled_at
+        return {
+            "from": (Interview,),
+            "created_at": Interview.created_at,
+            "updated_at": Interview.updated_at,
+            "dimensions": (Interview.created_by, None, Interview.status),
+            "measures": {
+                "count": func.count(),
+                "score_sum": func.sum(Interview.score),
+                "score_count": func.count(Interview.score),
+                "feedbacks": func.count().filter(with_feedback),
+                "feedbacks_on_time": func.count().filter(with_feedback, delay <= timedelta(days=FEEDBACK_TARGET_DAYS)),
+                "feedback_delay_sum": func.sum(days(delay)).filter(with_feedback),
+            },
+        }
+    raise ValueError(f"Entité KPI inconnue: {entity}")
+
+
+def day_range_conditions(column: Any, days_to_refresh: List[date]) -> List[Any]:
+    """Jours de création parmi days_to_refresh (plage sur l'index created_at, puis liste exacte)"""
+    start = datetime.combine(min(days_to_refresh), time.min)
+    end = datetime.combine(max(days_to_refresh) + timedelta(days=1), time.min)
+    return [column >= start, column < end, cast(column, Date).in_(days_to_refresh)]
+
+
+def _typed_null(name: str) -> Any:
+    """NULL du type de la colonne d'agrégat (INSERT ... SELECT)"""
+    return cast(null(), Rollup.__table__.c[name].type)
+
+
+def build_rollup_source_query(entity: str, days_to_refresh: Optional[List[date]] = None) -> Select:
+    """Lignes d'agrégats d'une entité (tous les jours, ou les jours donnés), dans l'ordre des colonnes MEASURES"""
+    source = _entity_source(entity)
+    day = cast(source["created_at"], Date)
+    dimensions = [column for column in source["dimensions"] if column is not None]
+    recruiter_id, source_column, status = (
+        column if column is not None else _typed_null(name)
+        for name, column in zip(("recruiter_id", "source", "status"), source["dimensions"])
+    )
+    measures = [
+        source["measures"].get(name, _typed_null(name) if name in NULLABLE_MEASURES else literal(0))
+        for name in MEASURES
+    ]
+
+    table, *joins = source["from"]
+    statement = select(
+        func.gen_random_uuid(), literal(entity), day, recruiter_id, source_column, status,
+        *measures, literal(datetime.utcnow())
+    ).select_from(table)
+    for joined, on in joins:
+        statement = statement.join(joined, on)
+    if days_to_refresh is not None:
+        statement = statement.where(*day_range_conditions(source["created_at"], days_to_refresh))
+    return statement.group_by(day, *dimensions)
+
+
+ROLLUP_COLUMNS = ["id", "entity", "day", "recruiter_id", "source", "status", *MEASURES, "refreshed_at"]
+
+
+def _lock(session: Session) -> None:
+    session.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_KEY)))
+
+
+def refresh_rollup_days(session: Session, entity: str, days_to_refresh: Iterable[date]) -> int:
+    """Recalcule les agrégats des jours donnés pour une entité (sans commit) ; retourne le nombre de jours"""
+    days_to_refresh = sorted(set(days_to_refresh))
+    if not days_to_refresh:
+        return 0
+    _lock(session)
+    session.execute(delete(Rollup).where(Rollup.entity == entity, Rollup.day.in_(days_to_refresh)))
+    session.execute(insert(Rollup).from_select(ROLLUP_COLUMNS, build_rollup_source_query(entity, days_to_refresh)))
+    return len(days_to_refresh)
+
+
+def changed_days(session: Session, entity: str, since: datetime) -> List[date]:
+    """Jours de création des lignes modifiées depuis since"""
+    source = _entity_source(entity)
+    day = cast(source["created_at"], Date)
+    return list(session.execute(select(day).where(source["updated_at"] >= since).distinct()).scalars())
+
+
+def refresh_changed_since(session: Session, since: datetime, entities: Iterable[str] = TRACKED_MODELS.values()) -> int:
+    """Recalcule les jours des lignes modifiées depuis since (sans commit)"""
+    return sum(refresh_rollup_days(session, entity, changed_days(session, entity, since)) for entity in entities)
+
+
+def rebuild_rollups(session: Session) -> None:
+    """Reconstruit tous les agrégats et marque leur construction (sans commit)"""
+    _lock(session)
+    session.execute(delete(Rollup))
+    for entity in TRACKED_MODELS.values():
+        session.execute(insert(Rollup).from_select(ROLLUP_COLUMNS, build_rollup_source_query(entity)))
+
+    setting = session.execute(select(Setting).where(Setting.key == BUILT_SETTING_KEY)).scalars().first()
+    now = datetime.utcnow()
+    if setting is None:
+        setting = Setting(key=BUILT_SETTING_KEY, value=now.isoformat(), description="Construction des agrégats KPI quotidiens")
+    setting.value = now.isoformat()
+    setting.updated_at = now
+    session.add(setting)
+
+
+def rollups_built(session: Session) -> bool:
+    """Indique si les agrégats ont été construits (mis en cache dans la session)"""
+    if "kpi_rollups_built" not in session.info:
+        session.info["kpi_rollups_built"] = session.execute(
+            select(Setting.id).where(Setting.key == BUILT_SETTING_KEY)
+        ).first() is not None
+    return session.info["kpi_rollups_built"]
+
+
+# ==================== LECTURE ====================
+
+def covers(scope: KPIScope) -> bool:
+    """Indique si les bornes de période tombent sur des jours (minuit)"""
+    return all(
+        bound is None or to_utc_naive(bound).time() == time.min
+        for bound in (scope.start_date, scope.end_date)
+    )
+
+
+def day_conditions(scope: KPIScope) -> List[Any]:
+    """Jours de création dans la période (created_at >= début, created_at <= fin à minuit)"""
+    conditions = []
+    if scope.start_date:
+        conditions.append(Rollup.day >= to_utc_naive(scope.start_date).date())
+    if scope.end_date:
+        conditions.append(Rollup.day < to_utc_naive(scope.end_date).date())
+    return conditions
+
+
+def total(column: Any, *conditions: Any) -> Any:
+    """Somme d'une mesure sur les lignes qui vérifient les conditions (0 si aucune)"""
+    return func.coalesce(func.sum(column).filter(where(*conditions)), 0)
+
+
+def average(numerator: Any, denominator: Any) -> Any:
+    """Moyenne à partir d'une somme et d'un effectif (NULL si l'effectif est nul)"""
+    return numerator / func.nullif(denominator, 0)
+
+
+def _scoped(conditions: List[Any], enabled: bool, column: Any, condition: Any) -> Any:
+    return total(column, *conditions, condition) if enabled else literal(0)
+
+
+def build_candidate_rollup_query(scope: KPIScope, periods: PeriodStarts, owner_id: Optional[Any] = None) -> Select:
+    """Mêmes colonnes que kpi_engine.build_candidate_query, lues dans les agrégats"""
+    owner_scope = []
+    if scope.recruiter_id:
+        owner_scope.append(Rollup.recruiter_id == scope.recruiter_id)
+    if scope.source:
+        owner_scope.append(Rollup.source == scope.source)
+
+    return (
+        select(
+            Rollup.status,
+            total(Rollup.count, *owner_scope, *day_conditions(scope)).label("in_scope"),
+            total(Rollup.count, *owner_scope, Rollup.day >= periods.today.date()).label("today"),
+            total(Rollup.count, *owner_scope, Rollup.day >= periods.month.date()).label("this_month"),
+            total(Rollup.count, *owner_scope, Rollup.day >= periods.year.date()).label("this_year"),
+            func.min(Rollup.first_created_at).filter(where(*owner_scope)).label("first_created_at"),
+            _scoped([], bool(scope.source), Rollup.count, Rollup.source == scope.source).label("source_total"),
+            _scoped([], owner_id is not None, Rollup.count, Rollup.recruiter_id == owner_id).label("owned"),
+        )
+        .where(Rollup.entity == "candidates")
+        .group_by(Rollup.status)
+    )
+
+
+def build_job_rollup_query(scope: KPIScope, owner_id: Optional[Any] = None) -> Select:
+    """Mêmes colonnes que kpi_engine.build_job_query (sans filtre besoin ni source)"""
+    job_scope = [Rollup.recruiter_id == scope.recruiter_id] if scope.recruiter_id else []
+    return (
+        select(
+            Rollup.status,
+            total(Rollup.count, *job_scope, *day_conditions(scope)).label("in_scope"),
+            total(Rollup.count, *job_scope).label("in_scope_all"),
+            total(Rollup.count).label("total"),
+            func.sum(Rollup.budget_sum).label("budget_total"),
+            func.sum(Rollup.budget_sum).filter(where(*job_scope)).label("budget_scope_sum"),
+            total(Rollup.budget_count, *job_scope).label("budget_scope_count"),
+            _scoped([], owner_id is not None, Rollup.count, Rollup.recruiter_id == owner_id).label("owned"),
+            literal(None).label("source_budget_sum"),
+            literal(0).label("source_budget_count"),
+        )
+        .where(Rollup.entity == "jobs")
+        .group_by(Rollup.status)
+    )
+
+
+def build_application_rollup_query(scope: KPIScope, owner_id: Optional[Any] = None) -> Select:
+    """Compteurs de kpi_engine.build_application_query lus dans les agrégats (une ligne)"""
+    hired = Rollup.status == "embauché"
+    rejected = Rollup.status == "rejeté"
+    owned = Rollup.recruiter_id == owner_id
+    has_owner = owner_id is not None
+    from_source = Rollup.source == scope.source
+    return select(
+        total(Rollup.count).label("total"),
+        total(Rollup.count, rejected).label("rejected"),
+        total(Rollup.offers).label("offers_sent"),
+        total(Rollup.offers, hired).label("offers_accepted"),
+        total(Rollup.offers, rejected).label("offers_rejected"),
+        total(Rollup.offers, Rollup.status.in_(["offre", "embauché"])).label("offers_responded"),
+        total(Rollup.shortlisted).label("shortlisted"),
+        total(Rollup.shortlist_validated).label("shortlist_validated"),
+        total(Rollup.count, hired).label("hired"),
+        _scoped([], bool(scope.source), Rollup.count, from_source).label("source_applications"),
+        _scoped([hired], bool(scope.source), Rollup.count, from_source).label("source_hired"),
+        _scoped([], has_owner, Rollup.shortlisted, owned).label("owned_shortlisted"),
+        _scoped([], has_owner, Rollup.shortlist_validated, owned).label("owned_shortlist_validated"),
+        _scoped([], has_owner, Rollup.offers, owned).label("owned_offers_sent"),
+        _scoped([hired], has_owner, Rollup.offers, owned).label("owned_offers_accepted"),
+        _scoped([rejected], has_owner, Rollup.offers, owned).label("owned_offers_rejected"),
+        _scoped([hired], has_owner, Rollup.count, owned).label("owned_hired"),
+    ).where(Rollup.entity == "applications")
+
+
+def build_interview_rollup_query(scope: KPIScope, owner_id: Optional[Any] = None) -> Select:
+    """Indicateurs de kpi_engine.build_interview_query lus dans les agrégats, hors no-show (une ligne)"""
+    creator_scope = [Rollup.recruiter_id == scope.recruiter_id] if scope.recruiter_id else []
+    owned = Rollup.recruiter_id == owner_id
+    return select(
+        average(func.sum(Rollup.score_sum), func.sum(Rollup.score_count)).label("average_score"),
+        total(Rollup.count, *creator_scope, *day_conditions(scope)).label("in_scope"),
+        average(
+            func.sum(Rollup.feedback_delay_sum).filter(where(*creator_scope)),
+            func.sum(Rollup.feedbacks).filter(where(*creator_scope))
+        ).label("feedback_delay"),
+        total(Rollup.count).label("scheduled"),
+        total(Rollup.feedbacks).label("feedbacks"),
+        total(Rollup.feedbacks_on_time).label("feedbacks_on_time"),
+        _scoped([], owner_id is not None, Rollup.count, owned).label("owned"),
+        (
+            average(func.sum(Rollup.score_sum).filter(owned), func.sum(Rollup.score_count).filter(owned))
+            if owner_id is not None else literal(None)
+        ).label("owned_average_score"),
+    ).where(Rollup.entity == "interviews")
+
+
+def build_recruiter_candidate_rollup_query(scope: KPIScope, periods: PeriodStarts) -> Select:
+    """Mêmes colonnes que kpi_engine.build_recruiter_candidate_query, lues dans les agrégats"""
+    source_scope = [Rollup.source == scope.source] if scope.source else []
+    period = day_conditions(scope)
+    return (
+        select(
+            Rollup.recruiter_id,
+            Rollup.status,
+            total(Rollup.count, *source_scope, *period).label("in_scope"),
+            total(Rollup.count, *source_scope, Rollup.day >= periods.today.date()).label("today"),
+            total(Rollup.count, *source_scope, Rollup.day >= periods.month.date()).label("this_month"),
+            total(Rollup.count, *source_scope, Rollup.day >= periods.year.date()).label("this_year"),
+            func.min(Rollup.first_created_at).filter(where(*source_scope)).label("first_created_at"),
+            total(Rollup.count, *period).label("in_period"),
+        )
+        .where(Rollup.entity == "candidates")
+        .group_by(Rollup.recruiter_id, Rollup.status)
+    )
+
+
+def build_recruiter_job_rollup_query(scope: KPIScope) -> Select:
+    """Mêmes colonnes que kpi_engine.build_recruiter_job_query (sans filtre besoin)"""
+    period = day_conditions(scope)
+    return (
+        select(
+            Rollup.recruiter_id,
+            Rollup.status,
+            total(Rollup.count, *period).label("in_scope"),
+            total(Rollup.count, *period).label("in_period"),
+        )
+        .where(Rollup.entity == "jobs")
+        .group_by(Rollup.recruiter_id, Rollup.status)
+    )
+
+
+def _use_rollups(session: Session, scope: KPIScope) -> bool:
+    if not covers(scope):
+        return False
+    if rollups_built(session):
+        return True
+    schedule_build(session)
+    return False
+
+
+def load_candidates(session: Session, scope: KPIScope, periods: PeriodStarts, owner_id: Optional[Any] = None):
+    """Compteurs des candidats par statut (agrégats si possible, sinon tables)"""
+    if _use_rollups(session, scope):
+        return by_status(session.execute(build_candidate_rollup_query(scope, periods, owner_id)).mappings().all())
+    return kpi_engine.load_candidates(session, scope, periods, owner_id)
+
+
+def load_jobs(session: Session, scope: KPIScope, owner_id: Optional[Any] = None):
+    """Compteurs des besoins par statut (agrégats si ni besoin ni source ne sont filtrés)"""
+    if not scope.job_id and not scope.source and _use_rollups(session, scope):
+        return by_status(session.execute(build_job_rollup_query(scope, owner_id)).mappings().all())
+    return kpi_engine.load_jobs(session, scope, owner_id)
+
+
+def load_recruiter_candidates(session: Session, scope: KPIScope, periods: PeriodStarts):
+    """Compteurs des candidats par créateur et par statut (agrégats si possible, sinon tables)"""
+    if _use_rollups(session, scope):
+        return by_recruiter(session.execute(build_recruiter_candidate_rollup_query(scope, periods)).mappings().all())
+    return kpi_engine.load_recruiter_candidates(session, scope, periods)
+
+
+def load_recruiter_jobs(session: Session, scope: KPIScope):
+    """Compteurs des besoins par créateur et par statut (agrégats si aucun besoin n'est filtré)"""
+    if not scope.job_id and _use_rollups(session, scope):
+        return by_recruiter(session.execute(build_recruiter_job_rollup_query(scope)).mappings().all())
+    return kpi_engine.load_recruiter_jobs(session, scope)
+
+
+def load_applications(session: Session, scope: KPIScope, owner_id: Optional[Any] = None) -> Mapping[str, Any]:
+    """Indicateurs des candidatures : compteurs lus dans les agrégats, délais calculés sur les tables"""
+    if _use_rollups(session, scope):
+        counts = session.execute(build_application_rollup_query(scope, owner_id)).mappings().one()
+        delays = session.execute(kpi_engine.build_application_delay_query(scope)).mappings().one()
+        return {**counts, **delays}
+    return kpi_engine.load_applications(session, scope, owner_id)
+
+
+def load_interviews(session: Session, scope: KPIScope, now: datetime, owner_id: Optional[Any] = None) -> Mapping[str, Any]:
+    """Indicateurs des entretiens : agrégats, et no-show calculé sur les tables"""
+    if _use_rollups(session, scope):
+        row = session.execute(build_interview_rollup_query(scope, owner_id)).mappings().one()
+        no_show = session.execute(kpi_engine.build_no_show_query(now)).scalar_one()
+        return {**row, "no_show": no_show}
+    return kpi_engine.load_interviews(session, scope, now, owner_id)
+
+
+# ==================== MAINTENANCE APRÈS COMMIT ====================
+
+def _refresh_task(engine: Any, days_by_entity: Mapping[str, Set[date]], since_by_entity: Mapping[str, datetime]) -> None:
+    with Session(engine) as session:
+        if not rollups_built(session):
+            return
+        for entity, entity_days in days_by_entity.items():
+            refresh_rollup_days(session, entity, entity_days)
+        for entity, since in since_by_entity.items():
+            refresh_rollup_days(session, entity, changed_days(session, entity, since))
+        session.commit()
+
+
+def _build_task(engine: Any) -> None:
+    with Session(engine) as session:
+        if rollups_built(session):
+            return
+        rebuild_rollups(session)
+        session.commit()
+        logger.info(f"✅ Agrégats KPI construits ({engine.url.database})")
+
+
+def schedule_build(session: Session) -> None:
+    """Construit les agrégats en arrière-plan (première utilisation des KPI d'un tenant)"""
+    engine = session.get_bind()
+    submit_task(f"kpi-rollups-build:{engine.url.database}", _build_task, engine)
+
+
+def mark_days(session: Session, entity: str, days_to_refresh: Iterable[date]) -> None:
+    """Jours à recalculer au commit (écritures faites hors de l'ORM, en SQL brut)"""
+    session.info.setdefault("kpi_rollup_days", defaultdict(set))[entity].update(days_to_refresh)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _track_flushed_rows(session: OrmSession, flush_context: Any) -> None:
+    """Note les jours de création des lignes suivies ajoutées, modifiées ou supprimées"""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        entity = TRACKED_MODELS.get(type(instance))
+        created_at = getattr(instance, "created_at", None)
+        if entity is not None and created_at is not None:
+            mark_days(session, entity, [created_at.date()])
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _track_bulk_statements(orm_execute_state: Any) -> None:
+    """Note les mises à jour et suppressions en masse des tables suivies"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    entity = TRACKED_MODELS.get(mapper.class_) if mapper is not None else None
+    if entity is not None:
+        since = orm_execute_state.session.info.setdefault("kpi_rollup_since", {})
+        since.setdefault(entity, datetime.utcnow() - BULK_MARGIN)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _refresh_after_commit(session: OrmSession) -> None:
+    days_by_entity = session.info.pop("kpi_rollup_days", None)
+    since_by_entity = session.info.pop("kpi_rollup_since", None)
+    if not days_by_entity and not since_by_entity:
+        return
+    engine = session.get_bind()
+    submit_task(
+        f"kpi-rollups-refresh:{engine.url.database}:{uuid4()}",
+        _refresh_task, engine, dict(days_by_entity or {}), dict(since_by_entity or {})
+    )
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_after_rollback(session: OrmSession) -> None:
+    session.info.pop("kpi_rollup_days", None)
+    session.info.pop("kpi_rollup_since", None)
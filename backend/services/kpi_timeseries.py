@@ -0,0 +1,291 @@
+"""
+Séries temporelles des KPI (graphiques de tendance, analyse IA)
+
+Chaque famille d'indicateurs est calculée en une instruction : les lignes sont
+regroupées par date_trunc(granularité, date) sur la fenêtre demandée, puis jointes
+à generate_series(...) pour que chaque période (jour, semaine ou mois) ait une
+valeur, même sans activité (0, ou NULL pour une moyenne).
+
+Familles et dates de rattachement :
+- candidates : candidats sourcés (création du candidat) ;
+- pipeline : candidatures entrées dans chaque étape (historique des statuts) ;
+- interviews : entretiens planifiés et feedbacks reçus (date de l'entretien) ;
+- hiring : offres envoyées (envoi de l'offre), embauches et time-to-hire
+  (dernière mise à jour des candidatures embauchées).
+
+Le filtre recruteur porte sur le créateur de la ligne comptée (candidat,
+candidature ou entretien) ; les filtres besoin et source passent par la
+candidature et le candidat.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, cast, func, literal, literal_column, select
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from models import Application, ApplicationHistory, Candidate, Interview, Job
+from services.interview_calendar import to_utc_naive
+from services.kpi_engine import CANDIDATE_STATUSES, KPIScope, days
+
+GRANULARITIES = ("day", "week", "month")
+FAMILIES = ("candidates", "pipeline", "interviews", "hiring")
+
+# Fenêtre par défaut (jusqu'à maintenant) et nombre maximum de périodes
+DEFAULT_SPANS = {"day": 30, "week": 12, "month": 12}
+MAX_BUCKETS = 366
+
+STEPS = {
+    "day": literal_column("interval '1 day'"),
+    "week": literal_column("interval '1 week'"),
+    "month": literal_column("interval '1 month'"),
+}
+
+
+def truncate(value: datetime, granularity: str) -> datetime:
+    """Début de la période contenant value (comme date_trunc ; les semaines commencent le lundi)"""
+    day = datetime(value.year, value.month, value.day)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return datetime(value.year, value.month, 1)
+
+
+def next_bucket(value: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return value + timedelta(days=1)
+    if granularity == "week":
+        return value + timedelta(weeks=1)
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+@dataclass(frozen=True)
+class SeriesWindow:
+    """Périodes demandées : de first à last (débuts de période), lignes datées dans [first, stop)"""
+    granularity: str
+    first: datetime
+    last: datetime
+
+    @property
+    def stop(self) -> datetime:
+        return next_bucket(self.last, self.granularity)
+
+    def bucket_count(self) -> int:
+        count, bucket = 0, self.first
+        while bucket <= self.last:
+            count, bucket = count + 1, next_bucket(bucket, self.granularity)
+        return count
+
+    @classmethod
+    def build(cls, granularity: str, start: Optional[datetime], end: Optional[datetime], now: datetime) -> "SeriesWindow":
+        """Fenêtre des paramètres de la requête (erreur 400 si invalide ou trop longue)"""
+        if granularity not in GRANULARITIES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Granularité invalide: {granularity} (valeurs possibles: {', '.join(GRANULARITIES)})"
+            )
+        end = to_utc_naive(end) if end else now
+        last = truncate(end, granularity)
+        if start:
+            first = truncate(to_utc_naive(start), granularity)
+        else:
+            first = last
+            for _ in range(DEFAULT_SPANS[granularity] - 1):
+                first = truncate(first - timedelta(days=1), granularity)
+        if first > last:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La date de début doit précéder la date de fin"
+            )
+        window = cls(granularity, first, last)
+        if window.bucket_count() > MAX_BUCKETS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Période trop longue: {MAX_BUCKETS} {granularity} maximum"
+            )
+        return window
+
+    def contains(self, column: Any) -> List[Any]:
+        return [column >= self.first, column < self.stop]
+
+
+def _bucket(window: SeriesWindow, column: Any) -> Any:
+    return func.date_trunc(window.granularity, column)
+
+
+def _fill(window: SeriesWindow, sources: Sequence[Any], counts: Sequence[str], averages: Sequence[str] = ()) -> Select:
+    """
+    Une ligne par période (generate_series), jointe aux sous-requêtes groupées par période
+
+    Les compteurs absents valent 0, les moyennes absentes NULL.
+    """
+    buckets = select(
+        func.generate_series(
+            cast(literal(window.first), DateTime()), cast(literal(window.last), DateTime()), STEPS[window.granularity]
+        ).label("bucket")
+    ).subquery("buckets")
+
+    columns = [buckets.c.bucket]
+    for source in sources:
+        columns += [func.coalesce(source.c[name], 0).label(name) for name in counts if name in source.c]
+        columns += [source.c[name] for name in averages if name in source.c]
+
+    statement = select(*columns).select_from(buckets)
+    for source in sources:
+        statement = statement.outerjoin(source, source.c.bucket == buckets.c.bucket)
+    return statement.order_by(buckets.c.bucket)
+
+
+def _application_filters(statement: Select, scope: KPIScope) -> Select:
+    """Filtres besoin et source d'une requête qui lit (ou joint) les candidatures"""
+    if scope.job_id:
+        statement = statement.where(Application.job_id == scope.job_id)
+    if scope.source:
+        statement = statement.join(Candidate, Candidate.id == Application.candidate_id).where(
+            Candidate.source == scope.source
+        )
+    return statement
+
+
+def build_candidate_series_query(window: SeriesWindow, scope: KPIScope) -> Select:
+    """Candidats sourcés par période"""
+    bucket = _bucket(window, Candidate.created_at)
+    counts = select(bucket.label("bucket"), func.count().label("candidates_sourced")).where(
+        *window.contains(Candidate.created_at)
+    )
+    if scope.recruiter_id:
+        counts = counts.where(Candidate.created_by == scope.recruiter_id)
+    if scope.source:
+        counts = counts.where(Candidate.source == scope.source)
+    if scope.job_id:
+        counts = counts.where(
+            select(Application.id)
+            .where(Application.candidate_id == Candidate.id, Application.job_id == scope.job_id)
+            .exists()
+        )
+    return _fill(window, [counts.group_by(bucket).subquery("candidate_counts")], ["candidates_sourced"])
+
+
+def stage_label(index: int) -> str:
+    return f"stage_{index}"
+
+
+def build_pipeline_series_query(window: SeriesWindow, scope: KPIScope) -> Select:
+    """Candidatures entrées dans chaque étape par période (colonnes stage_i, dans l'ordre de CANDIDATE_STATUSES)"""
+    bucket = _bucket(window, ApplicationHistory.created_at)
+    labels = [stage_label(index) for index in range(len(CANDIDATE_STATUSES))]
+    counts = select(
+        bucket.label("bucket"),
+        *(
+            func.count().filter(ApplicationHistory.new_status == stage).label(label)
+            for stage, label in zip(CANDIDATE_STATUSES, labels)
+        )
+    ).select_from(ApplicationHistory).where(*window.contains(ApplicationHistory.created_at))
+    if scope.recruiter_id or scope.job_id or scope.source:
+        counts = counts.join(Application, Application.id == ApplicationHistory.application_id)
+    if scope.recruiter_id:
+        counts = counts.where(Application.created_by == scope.recruiter_id)
+    counts = _application_filters(counts, scope)
+    return _fill(window, [counts.group_by(bucket).subquery("stage_counts")], labels)
+
+
+def build_interview_series_query(window: SeriesWindow, scope: KPIScope) -> Select:
+    """Entretiens planifiés (hors annulés) et feedbacks reçus, par date d'entretien"""
+    bucket = _bucket(window, Interview.scheduled_at)
+    counts = select(
+        bucket.label("bucket"),
+        func.count().filter(Interview.status != "annulé").label("interviews_scheduled"),
+        func.count().filter(Interview.feedback_provided_at.isnot(None)).label("interviews_with_feedback"),
+    ).select_from(Interview).where(*window.contains(Interview.scheduled_at))
+    if scope.recruiter_id:
+        counts = counts.where(Interview.created_by == scope.recruiter_id)
+    if scope.job_id or scope.source:
+        counts = counts.join(Application, Application.id == Interview.application_id)
+    counts = _application_filters(counts, scope)
+    return _fill(
+        window, [counts.group_by(bucket).subquery("interview_counts")],
+        ["interviews_scheduled", "interviews_with_feedback"]
+    )
+
+
+def build_hiring_series_query(window: SeriesWindow, scope: KPIScope) -> Select:
+    """Offres envoyées, embauches et time-to-hire moyen (jours) par période"""
+    def scoped(statement: Select) -> Select:
+        if scope.recruiter_id:
+            statement = statement.where(Application.created_by == scope.recruiter_id)
+        return _application_filters(statement, scope)
+
+    offer_bucket = _bucket(window, Application.offer_sent_at)
+    offers = scoped(
+        select(offer_bucket.label("bucket"), func.count().label("offers_sent"))
+        .select_from(Application)
+        .where(*window.contains(Application.offer_sent_at))
+    ).group_by(offer_bucket).subquery("offer_counts")
+
+    hire_bucket = _bucket(window, Application.updated_at)
+    hires = scoped(
+        select(
+            hire_bucket.label("bucket"),
+            func.count().label("hires"),
+            func.avg(days(Application.updated_at - Job.created_at)).label("time_to_hire"),
+        )
+        .select_from(Application)
+        .join(Job, Job.id == Application.job_id)
+        .where(Application.status == "embauché", *window.contains(Application.updated_at))
+    ).group_by(hire_bucket).subquery("hire_counts")
+
+    return _fill(window, [offers, hires], ["offers_sent", "hires"], averages=["time_to_hire"])
+
+
+BUILDERS = {
+    "candidates": build_candidate_series_query,
+    "pipeline": build_pipeline_series_query,
+    "interviews": build_interview_series_query,
+    "hiring": build_hiring_series_query,
+}
+
+
+def parse_families(value: Optional[str]) -> Tuple[str, ...]:
+    """Familles demandées (liste séparée par des virgules, toutes par défaut) ; erreur 400 si inconnue"""
+    if not value:
+        return FAMILIES
+    families = tuple(dict.fromkeys(family.strip() for family in value.split(",") if family.strip()))
+    unknown = [family for family in families if family not in BUILDERS]
+    if unknown or not families:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Indicateurs inconnus: {', '.join(unknown) or value} (valeurs possibles: {', '.join(FAMILIES)})"
+        )
+    return families
+
+
+def load_time_series(
+    session: Session,
+    window: SeriesWindow,
+    scope: KPIScope,
+    families: Sequence[str] = FAMILIES
+) -> Dict[str, Any]:
+    """
+    Séries des familles demandées (une requête par famille)
+
+    Retourne buckets (débuts de période), series (indicateur -> valeurs alignées
+    sur buckets) et stages (étape -> candidatures entrées dans l'étape).
+    """
+    buckets: List[datetime] = []
+    series: Dict[str, List[Optional[float]]] = {}
+    stages: Dict[str, List[int]] = {}
+    for family in families:
+        rows = session.execute(BUILDERS[family](window, scope)).mappings().all()
+        buckets = [row["bucket"] for row in rows]
+        for name in rows[0].keys() if rows else ():
+            if name == "bucket":
+                continue
+            values = [float(row[name]) if row[name] is not None else None for row in rows]
+            if family == "pipeline":
+                stages[CANDIDATE_STATUSES[int(name.removeprefix("stage_"))]] = [int(value) for value in values]
+            else:
+                series[name] = values
+    return {"granularity": window.granularity, "buckets": buckets, "series": series, "stages": stages}
@@ -0,0 +1,257 @@
+"""
+Statistiques de la plateforme sur l'ensemble des tenants (administrateurs de la plateforme)
+
+Chaque entreprise a sa propre base : un rapport exécute la même requête
+d'agrégation (paramétrée) sur chaque base active, en parallèle dans un pool
+de threads borné (platform_analytics_workers). Chaque requête est limitée par
+un statement_timeout (platform_analytics_tenant_timeout) et le rapport par un
+délai global (platform_analytics_timeout) : une base lente ou indisponible est
+signalée dans le rapport sans bloquer les autres.
+
+Les résultats partiels sont fusionnés (par base, et totaux par mois ou
+globaux) ; un rapport complet est mis en cache platform_analytics_cache_ttl
+secondes.
+
+Plusieurs entreprises peuvent partager une même base : les résultats sont
+donnés par base, avec les entreprises qui l'utilisent.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, literal, select, text, union_all
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from config import settings
+from models import Application, Candidate, CandidateJobComparison, Job, KPIAIAnalysis, User
+from models_master import Company, CompanyStatus, DatabaseStatus, TenantDatabase
+from services.kpi_cache import KPICache
+from services.kpi_timeseries import truncate
+from tenant_manager import get_tenant_engine
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.platform_analytics_workers,
+    thread_name_prefix="platform-analytics"
+)
+_cache = KPICache(max_entries=100)
+
+
+@dataclass(frozen=True)
+class TenantTarget:
+    """Base d'un ou plusieurs tenants actifs"""
+    db_name: str
+    company_id: UUID  # Entreprise utilisée pour obtenir la connexion
+    companies: Tuple[Tuple[UUID, str], ...]  # (id, nom) des entreprises de la base
+
+
+@dataclass(frozen=True)
+class Report:
+    """Requête d'agrégation exécutée sur chaque base, et fusion de ses lignes"""
+    build: Callable[[datetime], Select]  # Début de la période -> requête
+    measures: Tuple[str, ...]  # Colonnes additionnées dans les totaux
+    key: Optional[str] = None  # Colonne de regroupement des totaux (mois), ou un total global
+
+
+@dataclass
+class TenantResult:
+    db_name: str
+    companies: List[Dict[str, Any]]
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed_ms: Optional[int] = None
+
+
+def build_usage_query(since: datetime) -> Select:
+    """Volumes actuels : besoins actifs, candidats, candidatures, utilisateurs actifs et embauches de la période"""
+    return select(
+        select(func.count(Job.id)).where(Job.status != "clôturé").scalar_subquery().label("active_jobs"),
+        select(func.count(Candidate.id)).scalar_subquery().label("candidates"),
+        select(func.count(Application.id)).scalar_subquery().label("applications"),
+        select(func.count(User.id)).where(User.is_active.is_(True)).scalar_subquery().label("active_users"),
+        select(func.count(Application.id))
+        .where(Application.status == "embauché", Application.updated_at >= since)
+        .scalar_subquery().label("hires"),
+    )
+
+
+def build_hires_query(since: datetime) -> Select:
+    """Embauches par mois (dernière mise à jour des candidatures embauchées)"""
+    month = func.date_trunc("month", Application.updated_at)
+    return (
+        select(month.label("month"), func.count().label("hires"))
+        .where(Application.status == "embauché", Application.updated_at >= since)
+        .group_by(month)
+        .order_by(month)
+    )
+
+
+def build_llm_usage_query(since: datetime) -> Select:
+    """
+    Appels au modèle enregistrés, par mois : analyses candidat-besoin et analyses IA des KPI
+
+    Les appels dont le résultat n'est pas conservé (extraction de CV, de fiches de poste) ne sont pas comptés.
+    """
+    calls = union_all(
+        select(
+            func.date_trunc("month", CandidateJobComparison.created_at).label("month"),
+            literal("job_comparison").label("kind"),
+        ).where(CandidateJobComparison.created_at >= since),
+        select(
+            func.date_trunc("month", KPIAIAnalysis.completed_at).label("month"),
+            literal("kpi_analysis").label("kind"),
+        ).where(KPIAIAnalysis.status == "done", KPIAIAnalysis.completed_at >= since),
+    ).subquery("llm_calls")
+    return (
+        select(
+            calls.c.month,
+            func.count().filter(calls.c.kind == "job_comparison").label("job_comparisons"),
+            func.count().filter(calls.c.kind == "kpi_analysis").label("kpi_analyses"),
+            func.count().label("llm_calls"),
+        )
+        .group_by(calls.c.month)
+        .order_by(calls.c.month)
+    )
+
+
+REPORTS: Dict[str, Report] = {
+    "usage": Report(build_usage_query, ("active_jobs", "candidates", "applications", "active_users", "hires")),
+    "hires": Report(build_hires_query, ("hires",), key="month"),
+    "llm_usage": Report(build_llm_usage_query, ("job_comparisons", "kpi_analyses", "llm_calls"), key="month"),
+}
+
+
+def period_start(months: int, now: datetime) -> datetime:
+    """Début du mois, months - 1 mois avant le mois courant"""
+    start = truncate(now, "month")
+    for _ in range(months - 1):
+        start = truncate(start - timedelta(days=1), "month")
+    return start
+
+
+def active_tenants(master_session: Session) -> List[TenantTarget]:
+    """Bases actives des entreprises actives (une cible par base)"""
+    rows = master_session.exec(
+        select(TenantDatabase.db_name, Company.id, Company.name)
+        .join(Company, Company.id == TenantDatabase.company_id)
+        .where(
+            TenantDatabase.status == DatabaseStatus.ACTIVE.value,
+            Company.status == CompanyStatus.ACTIVE.value,
+        )
+        .order_by(TenantDatabase.db_name, Company.name)
+    ).all()
+    companies: Dict[str, List[Tuple[UUID, str]]] = {}
+    for db_name, company_id, name in rows:
+        companies.setdefault(db_name, []).append((company_id, name))
+    return [
+        TenantTarget(db_name=db_name, company_id=members[0][0], companies=tuple(members))
+        for db_name, members in companies.items()
+    ]
+
+
+def query_tenant(target: TenantTarget, statement: Select, timeout: float) -> List[Dict[str, Any]]:
+    """Exécute la requête sur la base du tenant (statement_timeout de timeout secondes)"""
+    engine = get_tenant_engine(target.company_id)
+    if engine is None:
+        raise RuntimeError("Connexion impossible à la base")
+    with engine.connect() as connection:
+        connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+        return [dict(row) for row in connection.execute(statement).mappings()]
+
+
+def _timed(query: Callable, target: TenantTarget, statement: Select, timeout: float) -> Tuple[List[Dict[str, Any]], int]:
+    started = time.monotonic()
+    rows = query(target, statement, timeout)
+    return rows, int((time.monotonic() - started) * 1000)
+
+
+def fan_out(
+    targets: List[TenantTarget],
+    statement: Select,
+    query: Callable[[TenantTarget, Select, float], List[Dict[str, Any]]] = query_tenant
+) -> List[TenantResult]:
+    """Exécute la requête sur toutes les bases en parallèle ; erreurs et délais dépassés par base"""
+    futures = {
+        target: _executor.submit(_timed, query, target, statement, settings.platform_analytics_tenant_timeout)
+        for target in targets
+    }
+    wait(futures.values(), timeout=settings.platform_analytics_timeout)
+
+    results = []
+    for target, future in futures.items():
+        result = TenantResult(
+            db_name=target.db_name,
+            companies=[{"id": company_id, "name": name} for company_id, name in target.companies],
+        )
+        if not future.done():
+            future.cancel()
+            result.error = "Délai dépassé"
+        elif future.exception() is not None:
+            result.error = str(future.exception()).splitlines()[0][:500]
+            logger.warning(f"⚠️ Statistiques plateforme: {target.db_name} en échec: {result.error}")
+        else:
+            result.rows, result.elapsed_ms = future.result()
+        results.append(result)
+    return results
+
+
+def merge_totals(report: Report, results: List[TenantResult]) -> List[Dict[str, Any]]:
+    """Totaux des bases ayant répondu : par valeur de la clé (mois), ou une seule ligne"""
+    totals: Dict[Any, Dict[str, Any]] = {}
+    for result in results:
+        for row in result.rows:
+            key = row.get(report.key) if report.key else None
+            total = totals.setdefault(key, {**({report.key: key} if report.key else {}), **{m: 0 for m in report.measures}})
+            for measure in report.measures:
+                total[measure] += row.get(measure) or 0
+    if not report.key:
+        return [totals.get(None, {measure: 0 for measure in report.measures})]
+    return [totals[key] for key in sorted(totals)]
+
+
+def run_report(
+    name: str,
+    months: int,
+    targets: List[TenantTarget],
+    now: datetime,
+    query: Callable[[TenantTarget, Select, float], List[Dict[str, Any]]] = query_tenant
+) -> Dict[str, Any]:
+    """Rapport name sur les bases targets : résultats par base et totaux"""
+    report = REPORTS[name]
+    started = time.monotonic()
+    since = period_start(months, now)
+    results = fan_out(targets, report.build(since), query)
+    return {
+        "report": name,
+        "since": since,
+        "generated_at": now,
+        "tenants": [result.__dict__ for result in results],
+        "totals": merge_totals(report, results),
+        "failed": sum(1 for result in results if result.error),
+        "elapsed_ms": int((time.monotonic() - started) * 1000),
+    }
+
+
+def cached_report(
+    name: str,
+    months: int,
+    load_targets: Callable[[], List[TenantTarget]],
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """Rapport servi depuis le cache s'il est complet et récent, sinon recalculé"""
+    key = (name, months)
+    entry = _cache.get(key)
+    if not refresh and entry is not None and time.monotonic() - entry.computed_at < settings.platform_analytics_cache_ttl:
+        return entry.value
+
+    value = run_report(name, months, load_targets(), datetime.utcnow())
+    # Un rapport partiel n'est pas conservé : le prochain appel réinterroge toutes les bases
+    if value["failed"] == 0:
+        _cache.put(key, 0, value)
+    return value
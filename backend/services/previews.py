@@ -0,0 +1,166 @@
+"""
+Service d'aperçus des CV (images des premières pages)
+
+Les aperçus sont rendus avec PyMuPDF en arrière-plan et mis en cache dans le
+stockage, à côté du CV. Leur nom contient la version du CV (empreinte SHA-256 ou, à défaut,
+date de modification et taille) : un CV modifié produit de nouveaux aperçus et
+les anciens sont supprimés.
+
+Un rendu en échec (PDF corrompu, protégé, ...) laisse un marqueur pour cette
+version : le rendu n'est pas relancé à chaque consultation, seulement quand le
+CV change.
+"""
+import logging
+from io import BytesIO
+from pathlib import Path
+from typing import List, Optional
+
+from services.background import is_pending, submit_task
+from services.storage import get_storage
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Pillow est optionnel : sans lui, les aperçus sont enregistrés en PNG
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_PAGES = 2
+PREVIEW_WIDTH = 800  # Largeur en pixels des aperçus
+PREVIEW_QUALITY = 70
+PREVIEW_FORMAT = "webp" if Image is not None else "png"
+PREVIEW_MEDIA_TYPE = f"image/{PREVIEW_FORMAT}"
+
+# Seuls les PDF peuvent être rendus par PyMuPDF (pas les documents Word)
+PREVIEWABLE_EXTENSIONS = {".pdf"}
+
+
+def can_preview(cv_file_path: Optional[str]) -> bool:
+    return bool(
+        fitz is not None
+        and cv_file_path
+        and Path(cv_file_path).suffix.lower() in PREVIEWABLE_EXTENSIONS
+        and get_storage().exists(cv_file_path)
+    )
+
+
+def get_cv_version(cv_file_path: str, cv_file_hash: Optional[str] = None) -> str:
+    """Identifiant de version du contenu d'un CV"""
+    if cv_file_hash:
+        return cv_file_hash[:16]
+    info = get_storage().stat(cv_file_path)
+    return f"{int(info.last_modified * 1e9):x}{info.size:x}"
+
+
+def _preview_prefix(cv_file_path: str) -> str:
+    cv_path = Path(cv_file_path)
+    return cv_path.with_name(f"{cv_path.stem}.preview-").as_posix()
+
+
+def get_preview_path(cv_file_path: str, version: str, page: int) -> str:
+    """Clé de stockage de l'aperçu d'une page"""
+    return f"{_preview_prefix(cv_file_path)}{version}-p{page}.{PREVIEW_FORMAT}"
+
+
+def get_failure_marker_path(cv_file_path: str, version: str) -> str:
+    """Clé de stockage du marqueur d'échec du rendu d'une version"""
+    return f"{_preview_prefix(cv_file_path)}{version}-failed"
+
+
+def has_failed(cv_file_path: str, version: str) -> bool:
+    """Indique si le rendu des aperçus de cette version du CV a échoué"""
+    return get_storage().exists(get_failure_marker_path(cv_file_path, version))
+
+
+def get_cached_previews(cv_file_path: str, version: str) -> List[str]:
+    """
+    Retourne les aperçus en cache pour cette version du CV (vide si pas encore rendus)
+
+    La page 1 est enregistrée en dernier lors du rendu : sa présence garantit que
+    toutes les pages sont disponibles.
+    """
+    storage = get_storage()
+    if not storage.exists(get_preview_path(cv_file_path, version, 1)):
+        return []
+    pages = []
+    for page in range(1, PREVIEW_PAGES + 1):
+        key = get_preview_path(cv_file_path, version, page)
+        if page > 1 and not storage.exists(key):
+            break
+        pages.append(key)
+    return pages
+
+
+def _remove_stale_previews(cv_file_path: str, version: str) -> None:
+    storage = get_storage()
+    prefix = _preview_prefix(cv_file_path)
+    for key in storage.list_keys(prefix):
+        if not key.startswith(f"{prefix}{version}-"):
+            try:
+                storage.delete(key)
+            except Exception:
+                pass
+
+
+def _encode_page(pixmap) -> bytes:
+    if Image is not None:
+        image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+        buffer = BytesIO()
+        image.save(buffer, "WEBP", quality=PREVIEW_QUALITY, method=4)
+        return buffer.getvalue()
+    return pixmap.tobytes("png")
+
+
+def render_cv_previews(cv_file_path: str, version: str) -> List[str]:
+    """Rend les premières pages d'un CV en images compressées"""
+    if not can_preview(cv_file_path):
+        return []
+
+    storage = get_storage()
+    rendered = []
+    try:
+        with storage.open_local(cv_file_path) as local_path:
+            doc = fitz.open(str(local_path))
+            try:
+                for index in range(min(PREVIEW_PAGES, len(doc))):
+                    page = doc[index]
+                    zoom = PREVIEW_WIDTH / page.rect.width
+                    pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                    rendered.append((get_preview_path(cv_file_path, version, index + 1), _encode_page(pixmap)))
+            finally:
+                doc.close()
+        if not rendered:
+            raise ValueError("Le document ne contient aucune page")
+    except Exception:
+        # Marquer la version en échec : elle ne sera pas rendue à nouveau
+        storage.write_bytes(get_failure_marker_path(cv_file_path, version), b"", content_type="text/plain")
+        _remove_stale_previews(cv_file_path, version)
+        raise
+
+    # Publier en ordre inverse : la page 1 apparaît en dernier
+    for key, data in reversed(rendered):
+        storage.write_bytes(key, data, content_type=PREVIEW_MEDIA_TYPE)
+
+    _remove_stale_previews(cv_file_path, version)
+    logger.info(f"Aperçus générés pour {cv_file_path} ({len(rendered)} page(s))")
+    return [key for key, _ in rendered]
+
+
+def _task_key(cv_file_path: str, version: str) -> str:
+    return f"cv-preview:{cv_file_path}:{version}"
+
+
+def schedule_cv_previews(cv_file_path: str, version: str) -> None:
+    """Planifie le rendu des aperçus d'un CV en arrière-plan (sauf si cette version a déjà échoué)"""
+    if can_preview(cv_file_path) and not has_failed(cv_file_path, version):
+        submit_task(_task_key(cv_file_path, version), render_cv_previews, cv_file_path, version)
+
+
+def is_rendering(cv_file_path: str, version: str) -> bool:
+    return is_pending(_task_key(cv_file_path, version))
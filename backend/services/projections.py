@@ -0,0 +1,96 @@
+"""
+Projections des listes (paramètres fields= et view=summary)
+
+Les tableaux du tableau de bord n'ont besoin que de quelques colonnes : seules les
+colonnes demandées sont lues en SQL et la réponse est validée par un modèle réduit,
+construit à partir du schéma complet (mêmes noms, mêmes types). Les grands champs
+texte (missions, notes, ...) ne sont ni lus, ni sérialisés, ni transmis.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, TypeAdapter, create_model
+
+# Champ calculé : (champs sources, fonction appliquée à la ligne)
+DerivedField = Tuple[Tuple[str, ...], Callable[[Mapping[str, Any]], Any]]
+
+# Sérialisation des éléments remis dans l'ordre des champs demandés
+_items_adapter = TypeAdapter(List[Dict[str, Any]])
+
+
+@lru_cache(maxsize=256)
+def _slim_adapter(model: Type[BaseModel], names: Tuple[str, ...]) -> TypeAdapter:
+    """Validateur d'une liste réduite aux champs names (triés : un modèle par ensemble de champs)"""
+    model_fields = model.model_fields
+    slim_model = create_model(
+        f"{model.__name__}Slim",
+        **{name: (model_fields[name].annotation, None) for name in names},
+    )
+    return TypeAdapter(List[slim_model])
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Champs sélectionnables d'une liste"""
+    model: Type[BaseModel]  # Schéma complet de la réponse (types des champs)
+    columns: Dict[str, Any]  # Champ -> expression SQL
+    summary: Tuple[str, ...]  # Champs de view=summary
+    derived: Dict[str, DerivedField] = field(default_factory=dict)
+    required: Tuple[str, ...] = ("id",)
+
+    @property
+    def available(self) -> List[str]:
+        return [*self.columns, *self.derived]
+
+    def resolve(self, fields: Optional[str], view: Optional[str]) -> Optional[List[str]]:
+        """
+        Champs demandés (identifiant toujours inclus), ou None pour la réponse complète
+
+        fields est prioritaire sur view ; un champ inconnu renvoie une erreur 400.
+        """
+        if fields:
+            names = [name.strip() for name in fields.split(",") if name.strip()]
+        elif view == "summary":
+            names = list(self.summary)
+        else:
+            return None
+
+        unknown = [name for name in names if name not in self.columns and name not in self.derived]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Champs inconnus: {', '.join(unknown)}. Champs disponibles: {', '.join(self.available)}"
+            )
+        return list(dict.fromkeys([*self.required, *names]))
+
+    def select_columns(self, names: Sequence[str]) -> List[Any]:
+        """Expressions SQL à sélectionner (y compris les sources des champs calculés)"""
+        sources = []
+        for name in names:
+            sources.extend(self.derived[name][0] if name in self.derived else (name,))
+        return [self.columns[source].label(source) for source in dict.fromkeys(sources)]
+
+    def adapter(self, names: Sequence[str]) -> TypeAdapter:
+        """Validateur de la liste réduite (modèle construit une fois par ensemble de champs, quel que soit leur ordre)"""
+        return _slim_adapter(self.model, tuple(sorted(names)))
+
+    def serialize(self, names: Sequence[str], rows: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        """Éléments réduits convertis en types JSON (pour être inclus dans une autre réponse)"""
+        adapter = self.adapter(names)
+        items = adapter.dump_python(adapter.validate_python(self._items(names, rows)), mode="json")
+        return [{name: item[name] for name in names} for item in items]
+
+    def response(self, names: Sequence[str], rows: Sequence[Mapping[str, Any]]) -> Response:
+        """Réponse JSON ne contenant que les champs demandés (dans l'ordre demandé)"""
+        return Response(
+            content=_items_adapter.dump_json(self.serialize(names, rows)),
+            media_type="application/json"
+        )
+
+    def _items(self, names: Sequence[str], rows: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {name: self.derived[name][1](row) if name in self.derived else row[name] for name in names}
+            for row in rows
+        ]
@@ -0,0 +1,79 @@
+"""
+Service d'URLs signées pour les fichiers stockés (CV, aperçus)
+
+Une URL signée autorise l'accès à un fichier précis pendant une durée limitée,
+sans en-tête Authorization : elle peut donc être utilisée directement dans un
+<img> ou un <iframe>. La signature HMAC-SHA256 (clé secrète de l'application)
+couvre le chemin du fichier, la date d'expiration et le nom de téléchargement.
+
+L'expiration est arrondie à une fenêtre de signed_url_ttl secondes : deux appels
+proches produisent la même URL, ce qui préserve le cache du navigateur.
+"""
+import hashlib
+import hmac
+import time
+from pathlib import Path, PurePosixPath
+from typing import Optional, Union
+from urllib.parse import urlencode
+
+from config import settings
+
+SIGNED_FILES_URL = "/api/files/signed"
+
+# Dossiers (relatifs au répertoire de travail) dont les fichiers peuvent être servis
+STORAGE_ROOTS = ("uploads", "static")
+
+
+def to_storage_path(file_path: Union[str, Path]) -> str:
+    """
+    Chemin de stockage normalisé d'un fichier ("uploads/cvs/x.pdf")
+
+    Lève ValueError si le fichier est hors des dossiers servis.
+    """
+    path = Path(file_path)
+    if path.is_absolute():
+        path = path.relative_to(Path.cwd())
+    parts = PurePosixPath(path.as_posix()).parts
+    if len(parts) < 2 or parts[0] not in STORAGE_ROOTS or ".." in parts:
+        raise ValueError(f"Fichier hors des dossiers servis: {file_path}")
+    return "/".join(parts)
+
+
+def _sign(storage_path: str, expires: int, filename: str) -> str:
+    message = f"{storage_path}\n{expires}\n{filename}".encode("utf-8")
+    return hmac.new(settings.secret_key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def get_expiry(ttl: Optional[int] = None, now: Optional[float] = None) -> int:
+    """Expiration arrondie: valide au moins ttl secondes, au plus 2 x ttl"""
+    ttl = ttl or settings.signed_url_ttl
+    now = time.time() if now is None else now
+    return (int(now) // ttl + 2) * ttl
+
+
+def make_signed_url(
+    file_path: Union[str, Path],
+    filename: Optional[str] = None,
+    ttl: Optional[int] = None,
+) -> str:
+    """Construit l'URL signée d'un fichier stocké"""
+    storage_path = to_storage_path(file_path)
+    expires = get_expiry(ttl)
+    params = {"path": storage_path, "exp": expires}
+    if filename:
+        params["name"] = filename
+    params["sig"] = _sign(storage_path, expires, filename or "")
+    return f"{SIGNED_FILES_URL}?{urlencode(params)}"
+
+
+def verify_signature(
+    storage_path: str,
+    expires: int,
+    signature: str,
+    filename: Optional[str] = None,
+) -> bool:
+    """Vérifie la signature (comparaison à temps constant) et l'expiration"""
+    if expires < time.time():
+        return False
+    expected = _sign(storage_path, expires, filename or "")
+    return hmac.compare_digest(expected, signature)
@@ -0,0 +1,181 @@
+"""
+Service de rapprochement des disponibilités client et des agendas des interviewers
+
+Les créneaux des demandes d'entretien client sont stockés en lignes
+(client_availability_slots, plage [starts_at, ends_at)). Les propositions de
+toutes les demandes en attente sont calculées en une passe :
+- une requête lit les créneaux à venir des demandes ;
+- une requête lit les entretiens actifs des interviewers qui chevauchent ces
+  créneaux (index GiST des plages horaires) ;
+- un balayage des intervalles (créneaux et occupations triés) trouve, pour chaque
+  demande dans l'ordre d'ancienneté, les premiers créneaux libres d'au moins la
+  durée demandée. Le premier créneau proposé est réservé, pour que deux demandes
+  ne reçoivent pas la même proposition.
+"""
+from bisect import bisect_right, insort
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.sql import Select
+
+from models import ClientAvailabilitySlot, ClientInterviewRequest, Interview
+from services.interview_calendar import ACTIVE_INTERVIEW_STATUSES, DEFAULT_INTERVIEW_DURATION, interview_period
+
+Interval = Tuple[datetime, datetime]
+
+
+def slot_interval(slot_date: str, start_time: str, end_time: str) -> Interval:
+    """Plage d'un créneau saisi (YYYY-MM-DD, HH:MM, HH:MM) ; erreur 400 si invalide"""
+    try:
+        day = date.fromisoformat(slot_date)
+        start = datetime.combine(day, time.fromisoformat(start_time))
+        end = datetime.combine(day, time.fromisoformat(end_time))
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Créneau invalide: {slot_date} {start_time}-{end_time}"
+        )
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Créneau invalide: {slot_date} {start_time}-{end_time} (la fin doit suivre le début)"
+        )
+    return start, end
+
+
+def build_slots_query(
+    request_ids: Sequence[UUID] = (),
+    now: Optional[datetime] = None,
+    access: Sequence[Any] = ()
+) -> Select:
+    """Créneaux à venir des demandes en attente, dans l'ordre des demandes puis des créneaux"""
+    statement = (
+        select(
+            ClientAvailabilitySlot.request_id,
+            ClientInterviewRequest.application_id,
+            ClientAvailabilitySlot.starts_at,
+            ClientAvailabilitySlot.ends_at,
+        )
+        .join(ClientInterviewRequest, ClientInterviewRequest.id == ClientAvailabilitySlot.request_id)
+        .where(ClientInterviewRequest.status == "pending", *access)
+        .order_by(ClientInterviewRequest.created_at, ClientInterviewRequest.id, ClientAvailabilitySlot.starts_at)
+    )
+    if request_ids:
+        statement = statement.where(ClientAvailabilitySlot.request_id.in_(request_ids))
+    if now is not None:
+        statement = statement.where(ClientAvailabilitySlot.ends_at > now)
+    return statement
+
+
+def build_busy_query(interviewer_ids: Sequence[UUID], start: datetime, end: datetime) -> Select:
+    """Occupations des interviewers qui chevauchent [start, end)"""
+    busy_end = func.coalesce(Interview.scheduled_end_at, Interview.scheduled_at + DEFAULT_INTERVIEW_DURATION)
+    return (
+        select(Interview.interviewer_id, Interview.scheduled_at, busy_end.label("busy_end"))
+        .where(
+            Interview.interviewer_id.in_(interviewer_ids),
+            Interview.status.in_(ACTIVE_INTERVIEW_STATUSES),
+            interview_period().op("&&")(func.tsrange(start, end, "[)")),
+        )
+        .order_by(Interview.interviewer_id, Interview.scheduled_at)
+    )
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Intervalles triés et fusionnés (les fins sont alors croissantes)"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_windows(slot: Interval, busy: Sequence[Interval], duration: timedelta) -> Iterator[Interval]:
+    """Parties libres d'un créneau d'au moins duration (busy : intervalles triés et disjoints)"""
+    cursor, slot_end = slot
+    index = bisect_right(busy, cursor, key=lambda interval: interval[1])
+    for busy_start, busy_end in busy[index:]:
+        if busy_start >= slot_end:
+            break
+        if busy_start - cursor >= duration:
+            yield cursor, busy_start
+        cursor = max(cursor, busy_end)
+    if slot_end - cursor >= duration:
+        yield cursor, slot_end
+
+
+def window_starts(window: Interval, duration: timedelta, limit: int) -> List[datetime]:
+    """Débuts possibles dans une fenêtre libre, à la suite les uns des autres"""
+    starts = []
+    start, end = window
+    while start + duration <= end and len(starts) < limit:
+        starts.append(start)
+        start += duration
+    return starts
+
+
+@dataclass
+class RequestSlots:
+    """Créneaux d'une demande en attente"""
+    request_id: UUID
+    application_id: UUID
+    slots: List[Interval] = field(default_factory=list)
+
+
+def group_slots(rows: Iterable[Mapping[str, Any]], now: Optional[datetime] = None) -> List[RequestSlots]:
+    """Regroupe les lignes de build_slots_query par demande (créneaux entamés ramenés à now)"""
+    requests: Dict[UUID, RequestSlots] = {}
+    for row in rows:
+        request = requests.setdefault(row["request_id"], RequestSlots(row["request_id"], row["application_id"]))
+        start = max(row["starts_at"], now) if now is not None else row["starts_at"]
+        request.slots.append((start, row["ends_at"]))
+    return list(requests.values())
+
+
+def match_slots(
+    requests: Sequence[RequestSlots],
+    busy: Mapping[UUID, Sequence[Interval]],
+    duration: timedelta,
+    limit: int = 3
+) -> List[Dict[str, Any]]:
+    """
+    Premières propositions (début, fin, interviewer) de chaque demande, dans l'ordre des demandes
+
+    Les propositions se suivent dans les fenêtres libres ; pour un même début,
+    l'interviewer retenu est le premier de la liste. La première proposition d'une
+    demande est ajoutée à l'occupation de son interviewer.
+    """
+    agendas = {interviewer_id: merge_intervals(intervals) for interviewer_id, intervals in busy.items()}
+    results = []
+    for request in requests:
+        proposals = []
+        for slot in request.slots:
+            candidates = sorted(
+                (start, position, interviewer_id)
+                for position, (interviewer_id, agenda) in enumerate(agendas.items())
+                for window in free_windows(slot, agenda, duration)
+                for start in window_starts(window, duration, limit)
+            )
+            for start, _, interviewer_id in candidates:
+                if len(proposals) == limit:
+                    break
+                if all(proposal["start"] != start for proposal in proposals):
+                    proposals.append({"start": start, "end": start + duration, "interviewer_id": interviewer_id})
+            if len(proposals) == limit:
+                break
+
+        if proposals:
+            first = proposals[0]
+            insort(agendas[first["interviewer_id"]], (first["start"], first["end"]))
+        results.append({
+            "request_id": request.request_id,
+            "application_id": request.application_id,
+            "suggestions": proposals,
+        })
+    return results
@@ -0,0 +1,355 @@
+"""
+Service de stockage des fichiers (CV, photos, aperçus, fiches de poste)
+
+Les fichiers sont identifiés par une clé de la forme "uploads/cvs/<nom>.pdf" ou
+"static/uploads/<nom>.jpg" (la valeur déjà enregistrée en base dans cv_file_path).
+Deux pilotes sont disponibles, choisis par settings.storage_backend :
+
+- "local" : système de fichiers, relatif à settings.storage_local_root
+- "s3"    : stockage objet compatible S3 (AWS, MinIO, ...), upload multipart en
+            streaming et lectures partielles (Range). Permet de lancer plusieurs
+            réplicas du backend sur des hôtes différents sans partage NFS.
+"""
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from config import settings
+
+# boto3 est optionnel : seul le pilote S3 en a besoin
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Taille minimale d'une partie d'upload multipart imposée par S3 (sauf la dernière)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+@dataclass
+class StoredObject:
+    """Métadonnées d'un fichier stocké"""
+    key: str
+    size: int
+    last_modified: float  # Timestamp Unix
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+
+
+class StorageBackend:
+    """Interface commune des pilotes de stockage"""
+
+    name = "base"
+
+    def write(self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None) -> int:
+        """
+        Écrit un fichier à partir d'un flux de blocs et retourne sa taille
+
+        L'écriture est atomique : si le flux lève une exception, aucun fichier
+        partiel n'est visible sous cette clé.
+        """
+        raise NotImplementedError
+
+    def write_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> int:
+        return self.write(key, [data], content_type)
+
+    def write_file(self, key: str, path: Path, content_type: Optional[str] = None) -> int:
+        """Copie un fichier local dans le stockage, par blocs"""
+        with open(path, "rb") as f:
+            return self.write(key, iter(lambda: f.read(READ_CHUNK_SIZE), b""), content_type)
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Lit les octets start..end (inclus) d'un fichier, par blocs"""
+        raise NotImplementedError
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        """Métadonnées du fichier, ou None s'il n'existe pas"""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def list_keys(self, prefix: str) -> List[str]:
+        """Clés des fichiers commençant par prefix"""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Chemin local du fichier si le pilote stocke sur disque (None sinon)"""
+        return None
+
+    def public_url(self, key: str) -> str:
+        """URL publique d'un fichier du dossier static/ (photos de profil)"""
+        raise NotImplementedError
+
+    def key_from_public_url(self, url: str) -> Optional[str]:
+        """Clé correspondant à une URL retournée par public_url (None si externe)"""
+        base = self.public_url("")
+        if not url or not url.startswith(base):
+            return None
+        return url[len(base):] or None
+
+    @contextmanager
+    def open_local(self, key: str) -> Iterator[Path]:
+        """
+        Fournit un chemin local lisible (PyMuPDF, python-docx, Pillow)
+
+        Pour un stockage distant, le fichier est téléchargé dans un fichier temporaire
+        supprimé à la sortie du bloc.
+        """
+        path = self.local_path(key)
+        if path is not None:
+            yield path
+            return
+
+        fd, tmp_name = tempfile.mkstemp(suffix=Path(key).suffix)
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                for chunk in self.read_range(key):
+                    buffer.write(chunk)
+            yield Path(tmp_name)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+
+class LocalStorage(StorageBackend):
+    """Stockage sur le système de fichiers local"""
+
+    name = "local"
+
+    def __init__(self, root: str = "."):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def write(self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None) -> int:
+        destination = self._path(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        size = 0
+        # Fichier temporaire dans le même dossier puis renommage atomique
+        fd, tmp_name = tempfile.mkstemp(dir=str(destination.parent), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                for chunk in chunks:
+                    size += len(chunk)
+                    buffer.write(chunk)
+            os.replace(tmp_name, destination)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        return size
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            stat = os.stat(self._path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return StoredObject(key=key, size=stat.st_size, last_modified=stat.st_mtime)
+
+    def delete(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def list_keys(self, prefix: str) -> List[str]:
+        directory, _, name_prefix = prefix.rpartition("/")
+        folder = self._path(directory) if directory else self.root
+        if not folder.is_dir():
+            return []
+        return sorted(
+            f"{directory}/{path.name}" if directory else path.name
+            for path in folder.iterdir()
+            if path.is_file() and path.name.startswith(name_prefix) and not path.name.endswith(".part")
+        )
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    def public_url(self, key: str) -> str:
+        # Servi par le montage /static de FastAPI ou directement par nginx
+        return f"/{key}"
+
+
+def _is_not_found(error: Exception) -> bool:
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in {"404", "NoSuchKey", "NotFound"}
+
+
+class S3Storage(StorageBackend):
+    """Stockage objet compatible S3 (AWS S3, MinIO, ...)"""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        client=None,
+        part_size: int = 8 * 1024 * 1024,
+        public_url_base: Optional[str] = None,
+    ):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 n'est pas installé. Installez-le avec: pip install boto3")
+            client = boto3.client(
+                "s3",
+                endpoint_url=settings.s3_endpoint_url,
+                region_name=settings.s3_region,
+                aws_access_key_id=settings.s3_access_key_id,
+                aws_secret_access_key=settings.s3_secret_access_key,
+            )
+        self.bucket = bucket
+        self.client = client
+        self.part_size = max(part_size, S3_MIN_PART_SIZE)
+        # Base vide: URLs "/static/..." inchangées, nginx relaie alors /static/ vers le bucket
+        if public_url_base is None:
+            public_url_base = f"{settings.s3_endpoint_url or ''}/{bucket}"
+        self.public_url_base = public_url_base.rstrip("/")
+
+    def write(self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None) -> int:
+        """
+        Upload en streaming : les blocs sont regroupés en parties de part_size octets
+        envoyées au fil de l'eau (mémoire bornée). Un fichier plus petit qu'une partie
+        est envoyé en une seule requête PutObject.
+        """
+        extra = {"ContentType": content_type} if content_type else {}
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        size = 0
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                size += len(chunk)
+                if len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        upload_id = self.client.create_multipart_upload(
+                            Bucket=self.bucket, Key=key, **extra
+                        )["UploadId"]
+                    self._upload_part(key, upload_id, parts, bytes(buffer))
+                    buffer.clear()
+
+            if upload_id is None:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes(buffer), **extra)
+            else:
+                if buffer:
+                    self._upload_part(key, upload_id, parts, bytes(buffer))
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        except BaseException:
+            # Abandon: les parties déjà envoyées sont supprimées côté serveur
+            if upload_id is not None:
+                try:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+                except Exception as e:
+                    logger.warning(f"Impossible d'annuler l'upload multipart de {key}: {str(e)}")
+            raise
+        return size
+
+    def _upload_part(self, key: str, upload_id: str, parts: list, data: bytes) -> None:
+        part_number = len(parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        extra = {}
+        if start or end is not None:
+            extra["Range"] = f"bytes={start}-{'' if end is None else end}"
+        body = self.client.get_object(Bucket=self.bucket, Key=key, **extra)["Body"]
+        try:
+            yield from body.iter_chunks(READ_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return StoredObject(
+            key=key,
+            size=head["ContentLength"],
+            last_modified=head["LastModified"].timestamp(),
+            content_type=head.get("ContentType"),
+            etag=(head.get("ETag") or "").strip('"') or None,
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def list_keys(self, prefix: str) -> List[str]:
+        keys = []
+        params = {"Bucket": self.bucket, "Prefix": prefix}
+        while True:
+            response = self.client.list_objects_v2(**params)
+            keys.extend(item["Key"] for item in response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                break
+            params["ContinuationToken"] = response["NextContinuationToken"]
+        return sorted(keys)
+
+    def public_url(self, key: str) -> str:
+        # Le préfixe static/ du bucket doit être en lecture publique (ou derrière un CDN)
+        return f"{self.public_url_base}/{key}"
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def create_storage() -> StorageBackend:
+    """Instancie le pilote configuré par settings.storage_backend"""
+    backend = settings.storage_backend.lower()
+    if backend == "local":
+        return LocalStorage(settings.storage_local_root)
+    if backend == "s3":
+        return S3Storage(
+            bucket=settings.s3_bucket,
+            part_size=settings.s3_part_size,
+            public_url_base=settings.s3_public_url,
+        )
+    raise ValueError(f"Pilote de stockage inconnu: {settings.storage_backend}")
+
+
+def get_storage() -> StorageBackend:
+    """Pilote de stockage de l'application (instancié au premier appel)"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage: Optional[StorageBackend]) -> None:
+    """Remplace le pilote courant (tests, scripts de migration)"""
+    global _storage
+    _storage = storage
@@ -0,0 +1,285 @@
+"""
+Service de réception des fichiers uploadés (CV, photos, fiches de poste)
+
+Les fichiers sont copiés par blocs de taille fixe : la taille maximale est
+contrôlée au fil de l'eau, le type réel est détecté sur le premier bloc
+(magic bytes) et l'empreinte SHA-256 est calculée pendant la même passe.
+La mémoire utilisée par upload reste donc constante quelle que soit la taille du fichier.
+
+Les fichiers conservés (CV, photos) sont écrits dans le stockage configuré
+(store_upload) ; les fichiers de travail restent locaux (save_upload_to_temp).
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from services.storage import StorageBackend, get_storage
+
+
+# Signatures binaires (magic bytes) des formats acceptés
+FILE_SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "docx": (b"PK\x03\x04",),
+    "doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "gif": (b"GIF87a", b"GIF89a"),
+}
+
+# Type attendu pour chaque extension autorisée
+EXTENSION_KINDS = {
+    ".pdf": "pdf",
+    ".docx": "docx",
+    ".doc": "doc",
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".png": "png",
+    ".gif": "gif",
+    ".webp": "webp",
+}
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "doc": "application/msword",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+
+@dataclass
+class StoredUpload:
+    """Résultat de l'enregistrement d'un fichier uploadé"""
+    path: Path
+    size: int
+    sha256: str
+    kind: str
+    key: Optional[str] = None  # Clé dans le stockage (fichiers enregistrés par store_upload)
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES.get(self.kind, "application/octet-stream")
+
+
+def sniff_file_kind(head: bytes) -> Optional[str]:
+    """Détecte le type réel d'un fichier à partir de ses premiers octets"""
+    # WebP: conteneur RIFF avec la marque WEBP aux octets 8-12
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for kind, signatures in FILE_SIGNATURES.items():
+        if any(head.startswith(signature) for signature in signatures):
+            return kind
+    return None
+
+
+def hash_file(path: Path, chunk_size: Optional[int] = None) -> str:
+    """Empreinte SHA-256 d'un fichier existant, lu par blocs"""
+    chunk_size = chunk_size or settings.upload_chunk_size
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_stored_file(key: str, storage: Optional[StorageBackend] = None) -> str:
+    """Empreinte SHA-256 d'un fichier du stockage, lu par blocs"""
+    storage = storage or get_storage()
+    digest = hashlib.sha256()
+    for chunk in storage.read_range(key):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _too_large_error(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Fichier trop volumineux. Taille maximale autorisée: {max_size // (1024 * 1024)} Mo"
+    )
+
+
+def iter_checked_chunks(
+    source: BinaryIO,
+    expected_kind: str,
+    max_size: int,
+    chunk_size: int,
+    digest,
+) -> Iterator[bytes]:
+    """
+    Lit un flux par blocs en contrôlant le type réel (premier bloc), la taille
+    maximale et l'absence de contenu ; l'empreinte est mise à jour au passage
+    """
+    size = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+
+        if size == 0:
+            detected_kind = sniff_file_kind(chunk)
+            if detected_kind != expected_kind:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail="Le contenu du fichier ne correspond pas à son extension"
+                )
+
+        size += len(chunk)
+        if size > max_size:
+            raise _too_large_error(max_size)
+
+        digest.update(chunk)
+        yield chunk
+
+    if size == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le fichier est vide"
+        )
+
+
+def stream_to_disk(
+    source: BinaryIO,
+    destination: Path,
+    expected_kind: str,
+    max_size: int,
+    chunk_size: int,
+) -> StoredUpload:
+    """
+    Copie un flux vers destination par blocs de chunk_size octets
+
+    Le fichier est écrit dans un fichier temporaire du même dossier puis renommé
+    atomiquement : en cas d'abandon (taille, type), aucun fichier partiel ne reste.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_name = tempfile.mkstemp(dir=str(destination.parent), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            for chunk in iter_checked_chunks(source, expected_kind, max_size, chunk_size, digest):
+                size += len(chunk)
+                buffer.write(chunk)
+        os.replace(tmp_name, destination)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    return StoredUpload(path=destination, size=size, sha256=digest.hexdigest(), kind=expected_kind)
+
+
+def stream_to_storage(
+    source: BinaryIO,
+    key: str,
+    expected_kind: str,
+    max_size: int,
+    chunk_size: int,
+    storage: Optional[StorageBackend] = None,
+) -> StoredUpload:
+    """Copie un flux vers le stockage configuré (disque local ou S3) sous la clé key"""
+    storage = storage or get_storage()
+    digest = hashlib.sha256()
+    size = storage.write(
+        key,
+        iter_checked_chunks(source, expected_kind, max_size, chunk_size, digest),
+        content_type=CONTENT_TYPES.get(expected_kind),
+    )
+    return StoredUpload(path=Path(key), size=size, sha256=digest.hexdigest(), kind=expected_kind, key=key)
+
+
+def _check_upload(
+    upload: UploadFile,
+    allowed_extensions: Iterable[str],
+    max_size: int,
+) -> str:
+    """Contrôles préalables (extension, taille annoncée) ; retourne le type attendu"""
+    extension = Path(upload.filename or "").suffix.lower()
+    if extension not in allowed_extensions or extension not in EXTENSION_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Format de fichier non autorisé. Formats acceptés: {', '.join(sorted(allowed_extensions))}"
+        )
+
+    # Rejet immédiat si la taille annoncée dépasse déjà la limite
+    if upload.size is not None and upload.size > max_size:
+        raise _too_large_error(max_size)
+    return EXTENSION_KINDS[extension]
+
+
+async def save_upload(
+    upload: UploadFile,
+    destination: Path,
+    allowed_extensions: Iterable[str],
+    max_size: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Enregistre un fichier uploadé en streaming vers destination
+
+    Lève une HTTPException 400 (extension), 413 (taille) ou 415 (contenu).
+    La copie s'exécute dans le threadpool pour ne pas bloquer la boucle d'événements.
+    """
+    max_size = max_size or settings.max_upload_size
+    expected_kind = _check_upload(upload, allowed_extensions, max_size)
+
+    await upload.seek(0)
+    return await run_in_threadpool(
+        stream_to_disk,
+        upload.file,
+        destination,
+        expected_kind,
+        max_size,
+        settings.upload_chunk_size,
+    )
+
+
+async def store_upload(
+    upload: UploadFile,
+    key: str,
+    allowed_extensions: Iterable[str],
+    max_size: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Enregistre un fichier uploadé dans le stockage configuré (voir services.storage)
+
+    Mêmes contrôles que save_upload ; avec le pilote S3, le fichier est envoyé en
+    upload multipart au fil de la lecture, sans copie intermédiaire sur disque.
+    """
+    max_size = max_size or settings.max_upload_size
+    expected_kind = _check_upload(upload, allowed_extensions, max_size)
+
+    await upload.seek(0)
+    return await run_in_threadpool(
+        stream_to_storage,
+        upload.file,
+        key,
+        expected_kind,
+        max_size,
+        settings.upload_chunk_size,
+    )
+
+
+async def save_upload_to_temp(
+    upload: UploadFile,
+    allowed_extensions: Iterable[str],
+    max_size: Optional[int] = None,
+) -> StoredUpload:
+    """Enregistre un fichier uploadé dans un fichier temporaire (à supprimer par l'appelant)"""
+    extension = Path(upload.filename or "").suffix.lower()
+    fd, tmp_name = tempfile.mkstemp(suffix=extension)
+    os.close(fd)
+    try:
+        return await save_upload(upload, Path(tmp_name), allowed_extensions, max_size)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
@@ -256,7 +256,9 @@ async def tenant_middleware(request: Request, call_next):
             path = path[4:]  # Enlever "/api"
         
         # Routes publiques qui n'ont pas besoin de tenant
-        public_routes = ["/docs", "/openapi.json", "/health", "/auth/login", "/auth/register", "/auth/register-company"]
+        # /files/signed: l'accès est autorisé par la signature de l'URL
+        # /platform: administrateurs de la plateforme (token sans tenant, vérifié par require_platform_admin)
+        public_routes = ["/docs", "/openapi.json", "/health", "/auth/login", "/auth/register", "/auth/register-company", "/files/signed", "/platform"]
         if any(path.startswith(route) for route in public_routes):
             # Pour les routes publiques, on continue sans tenant
             logger.info(f"✅ [TENANT] Route publique détectée: {request.url.path} (normalisé: {path})")
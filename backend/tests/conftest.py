@@ -1,6 +1,7 @@
 """
 Configuration pytest pour les tests
 """
+import os
 import pytest
 import sys
 from pathlib import Path
@@ -8,3 +9,49 @@ from pathlib import Path
 # Ajouter le répertoire backend au path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    """Pilote de stockage local isolé dans un dossier temporaire"""
+    import services.storage as storage_module
+    storage = storage_module.LocalStorage(str(tmp_path))
+    monkeypatch.setattr(storage_module, "_storage", storage)
+    return storage
+
+
+@pytest.fixture
+def pg_session():
+    """
+    Session sur PostgreSQL (TEST_DATABASE_URL, ou la base configurée) dans un schéma temporaire
+
+    Les tables sont créées dans une transaction annulée à la fin du test ; le test
+    est ignoré si PostgreSQL n'est pas disponible.
+    """
+    from uuid import uuid4
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+    from sqlmodel import Session, SQLModel
+    import models  # noqa: F401 - enregistre les tables dans SQLModel.metadata
+    from config import settings
+
+    engine = create_engine(os.environ.get("TEST_DATABASE_URL", settings.database_url))
+    try:
+        connection = engine.connect()
+    except OperationalError:
+        engine.dispose()
+        pytest.skip("PostgreSQL non disponible")
+
+    transaction = connection.begin()
+    schema = f"test_{uuid4().hex[:12]}"
+    connection.execute(text(f"CREATE SCHEMA {schema}"))
+    connection.execute(text(f"SET LOCAL search_path TO {schema}"))
+    SQLModel.metadata.create_all(connection)
+    session = Session(bind=connection)
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+        engine.dispose()
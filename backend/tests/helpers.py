@@ -0,0 +1,14 @@
+"""
+Outils partagés des tests (requêtes compilées, date de référence)
+"""
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+# Date de référence des tests de requêtes et de KPI (un samedi)
+NOW = datetime(2024, 6, 15, 10, 30)
+
+
+def compile_sql(statement):
+    """Texte SQL d'une requête compilée pour PostgreSQL"""
+    return str(statement.compile(dialect=postgresql.dialect()))
@@ -0,0 +1,105 @@
+"""
+Tests de l'export analytique Parquet
+"""
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+from tests.helpers import NOW, compile_sql
+
+
+class TestQueries:
+    """Tests des requêtes des tables de faits"""
+
+    def test_incremental_window(self):
+        from services.analytics_export import FACT_TABLES
+        sql = compile_sql(FACT_TABLES["interviews"].build_query(datetime(2024, 6, 1), NOW))
+        assert "interviews.updated_at < %(updated_at_1)s" in sql and "interviews.updated_at >= " in sql
+        assert "CAST(interviews.id AS VARCHAR) AS id" in sql
+        assert "ORDER BY" not in sql
+        assert "updated_at >=" not in compile_sql(FACT_TABLES["interviews"].build_query(None, NOW))
+
+    def test_applications_with_stage_entries(self):
+        from services.analytics_export import FACT_TABLES, stage_column
+        from services.kpi_engine import CANDIDATE_STATUSES
+        sql = compile_sql(FACT_TABLES["applications"].build_query(datetime(2024, 6, 1), NOW))
+        assert "LEFT OUTER JOIN (SELECT application_history.application_id" in sql
+        assert sql.count("min(application_history.created_at) FILTER") == len(CANDIDATE_STATUSES)
+        # L'historique lu est limité aux candidatures exportées
+        entries = sql.split("LEFT OUTER JOIN (")[1].split("AS stage_entries")[0]
+        assert entries.count("applications.updated_at") == 2
+        assert [stage_column(stage) for stage in ("sourcé", "embauché")] == ["entered_source", "entered_embauche"]
+
+    def test_candidates_without_personal_data(self):
+        from services.analytics_export import FACT_TABLES
+        sql = compile_sql(FACT_TABLES["candidates"].build_query(None, NOW))
+        for column in ("email", "phone", "first_name", "last_name", "notes"):
+            assert f"candidates.{column}" not in sql
+
+    def test_export_keys(self):
+        from services.analytics_export import export_key
+        assert export_key("tenant_a", "jobs", None, NOW) == "exports/analytics/tenant_a/jobs/full-20240615T103000.parquet"
+        assert export_key("tenant_a", "jobs", datetime(2024, 6, 14), NOW).endswith(
+            "/jobs/incremental-20240614T000000-20240615T103000.parquet"
+        )
+
+
+class TestExport:
+    """Tests de l'écriture Parquet et des filigranes"""
+
+    @pytest.fixture
+    def export(self, monkeypatch, tmp_path):
+        pytest.importorskip("pyarrow")
+        from services import analytics_export
+        from services.storage import LocalStorage
+        state = {"watermark": None, "written": [], "batches": []}
+
+        class FakeSession:
+            def __init__(self, engine):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def commit(self):
+                pass
+
+        monkeypatch.setattr(analytics_export, "Session", FakeSession)
+        monkeypatch.setattr(analytics_export, "read_watermark", lambda session, table: state["watermark"])
+        monkeypatch.setattr(analytics_export, "write_watermark", lambda session, table, until: state["written"].append(until))
+        monkeypatch.setattr(analytics_export, "iter_row_batches", lambda engine, statement, batch_size: iter(state["batches"]))
+        engine = SimpleNamespace(url=SimpleNamespace(database="tenant_a"))
+        storage = LocalStorage(str(tmp_path))
+        return state, lambda table, full: analytics_export.export_table(engine, storage, table, full, NOW), tmp_path
+
+    def test_full_export_round_trip(self, export):
+        import pyarrow.parquet as pq
+        state, run, root = export
+        job = ("id-1", "Développeur", None, None, "CDI", None, None, None, 3, "Dakar", None, 100.0, 200.0, None,
+               "en_cours", "user-1", None, date(2024, 7, 1), None, None, datetime(2024, 6, 1), datetime(2024, 6, 2))
+        state["batches"] = [[job], [("id-2",) + job[1:]]]
+        result = run("jobs", True)
+        assert (result.rows, result.since, result.until) == (2, None, datetime(2024, 6, 15, 10, 29))
+        table = pq.read_table(root / result.key, columns=["id", "experience_requise"])
+        assert table.to_pydict() == {"id": ["id-1", "id-2"], "experience_requise": [3, 3]}
+        assert pq.ParquetFile(root / result.key).metadata.num_row_groups == 2
+        assert state["written"] == [result.until]
+
+    def test_incremental_without_changes(self, export):
+        state, run, root = export
+        state["watermark"] = datetime(2024, 6, 14)
+        result = run("offers", False)
+        assert (result.rows, result.key, result.since) == (0, None, datetime(2024, 6, 14))
+        assert state["written"] == [result.until]
+        assert not (root / "exports").exists()
+
+    def test_missing_pyarrow_fails_before_reading(self, monkeypatch):
+        from services import analytics_export
+        monkeypatch.setattr(analytics_export, "pa", None)
+        monkeypatch.setattr(analytics_export, "Session", lambda engine: pytest.fail("base lue sans pyarrow"))
+        with pytest.raises(RuntimeError, match="pip install pyarrow"):
+            analytics_export.export_table(SimpleNamespace(), None, "jobs", True, NOW)
@@ -0,0 +1,157 @@
+"""
+Tests des actions groupées du pipeline (statuts, shortlist, tags)
+"""
+from uuid import uuid4
+
+from tests.helpers import compile_sql
+
+
+class FakeResult(list):
+    def all(self):
+        return list(self)
+
+
+class FakeSession:
+    """Session simulée : retourne les lignes préparées pour le SELECT et enregistre les écritures"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return FakeResult(self.rows if len(self.statements) == 1 else [])
+
+    def commit(self):
+        self.commits += 1
+
+
+class TestPlanning:
+    """Tests des règles métier appliquées au lot"""
+
+    def test_application_status_rules(self):
+        from services.bulk_actions import (
+            BulkOutcome, FEEDBACK_REQUIRED_MESSAGE, APPLICATION_NOT_FOUND_MESSAGE, UNCHANGED_MESSAGE,
+            plan_application_status
+        )
+        with_feedback, without_feedback, already, missing = uuid4(), uuid4(), uuid4(), uuid4()
+        candidate_a, candidate_b = uuid4(), uuid4()
+        rows = [
+            (with_feedback, "entretien_client", candidate_a, "entretien_client", True),
+            (without_feedback, "qualifié", candidate_b, "embauché", False),
+            (already, "shortlist", candidate_b, "embauché", False),
+        ]
+        outcome = BulkOutcome()
+        changes, promoted = plan_application_status(
+            [with_feedback, without_feedback, already, missing], rows, "shortlist", outcome
+        )
+        assert changes == [(with_feedback, "entretien_client")]
+        # Le statut du candidat n'est promu que s'il est moins avancé
+        assert promoted == {candidate_a}
+        assert outcome.skipped == [
+            {"id": without_feedback, "reason": FEEDBACK_REQUIRED_MESSAGE},
+            {"id": already, "reason": UNCHANGED_MESSAGE},
+            {"id": missing, "reason": APPLICATION_NOT_FOUND_MESSAGE},
+        ]
+
+    def test_feedback_is_not_required_between_shortlist_and_offer(self):
+        from services.bulk_actions import BulkOutcome, plan_application_status
+        application_id = uuid4()
+        changes, _ = plan_application_status(
+            [application_id], [(application_id, "shortlist", uuid4(), "shortlist", False)], "offre", BulkOutcome()
+        )
+        assert changes == [(application_id, "shortlist")]
+
+    def test_shortlist_rules(self):
+        from services.bulk_actions import BulkOutcome, plan_shortlist
+        in_shortlist, offer, interview = uuid4(), uuid4(), uuid4()
+        rows = [
+            (in_shortlist, "shortlist", True, True),
+            (offer, "offre", True, False),
+            (interview, "entretien_rh", False, False),
+        ]
+        outcome = BulkOutcome()
+        changes = plan_shortlist([in_shortlist, offer, interview], rows, False, outcome)
+        assert changes == [(in_shortlist, "shortlist", "sourcé"), (offer, "offre", "offre")]
+        assert [item["id"] for item in outcome.skipped] == [interview]
+
+        outcome = BulkOutcome()
+        assert plan_shortlist([interview], rows, True, outcome) == []
+        assert len(outcome.skipped) == 1
+
+    def test_history_skips_unchanged_status(self):
+        from services.bulk_actions import history_rows
+        from datetime import datetime
+        first, second = uuid4(), uuid4()
+        rows = history_rows([(first, "shortlist", "sourcé"), (second, "offre", "offre")], uuid4(), None, datetime.utcnow())
+        assert [row["application_id"] for row in rows] == [first]
+
+
+class TestStatements:
+    """Tests des requêtes envoyées (une par table, un seul commit)"""
+
+    def test_bulk_application_status_runs_set_based_statements(self):
+        from services.bulk_actions import bulk_update_application_status
+        first, second = uuid4(), uuid4()
+        session = FakeSession([
+            (first, "entretien_client", uuid4(), "qualifié", True),
+            (second, "qualifié", uuid4(), "qualifié", True),
+        ])
+        outcome = bulk_update_application_status(session, [first, second, first], "offre", changed_by=uuid4())
+
+        assert outcome.updated == [first, second]
+        assert session.commits == 1
+        select_sql, application_sql, candidate_sql, history_sql = map(compile_sql, session.statements)
+        assert "EXISTS" in select_sql and "FOR UPDATE OF applications" in select_sql
+        assert application_sql.startswith("UPDATE applications")
+        assert candidate_sql.startswith("UPDATE candidates")
+        # Historique : une seule instruction avec deux lignes VALUES
+        assert history_sql.startswith("INSERT INTO application_history")
+        assert history_sql.count("), (") == 1
+
+    def test_nothing_to_change_still_commits_once(self):
+        from services.bulk_actions import bulk_set_shortlist
+        session = FakeSession([])
+        outcome = bulk_set_shortlist(session, [uuid4()], True, changed_by=uuid4())
+        assert outcome.updated == [] and len(outcome.skipped) == 1
+        assert len(session.statements) == 1 and session.commits == 1
+
+    def test_remove_from_shortlist_uses_case(self):
+        from services.bulk_actions import bulk_set_shortlist
+        application_id = uuid4()
+        session = FakeSession([(application_id, "shortlist", True, False)])
+        bulk_set_shortlist(session, [application_id], False, changed_by=uuid4())
+        assert "CASE WHEN (applications.status =" in compile_sql(session.statements[1])
+
+
+class TestSingleRoutes:
+    """Tests de l'historique écrit par les routes unitaires (même insertion que les actions groupées)"""
+
+    def route_session(self, application):
+        session = FakeSession([])
+        session.get = lambda model, key: application if key == application.id else None
+        session.add = session.refresh = lambda instance: None
+        return session
+
+    def test_status_and_shortlist_routes_write_history(self):
+        from types import SimpleNamespace
+        from models import Application
+        from routers.applications import ApplicationStatusUpdate, toggle_shortlist, update_application_status
+        application = Application(id=uuid4(), candidate_id=uuid4(), job_id=uuid4(), created_by=uuid4(), status="qualifié")
+        user = SimpleNamespace(id=uuid4())
+
+        session = self.route_session(application)
+        update_application_status(application.id, ApplicationStatusUpdate(status="entretien_rh"), user, session)
+        sql = compile_sql(session.statements[0])
+        assert sql.startswith("INSERT INTO application_history")
+        params = session.statements[0].compile().params
+        assert "qualifié" in params.values() and "entretien_rh" in params.values()
+
+        session = self.route_session(application)
+        toggle_shortlist(application.id, user, session)
+        assert application.status == "shortlist" and len(session.statements) == 1
+        # Statut inchangé : aucune ligne d'historique
+        session = self.route_session(application)
+        update_application_status(application.id, ApplicationStatusUpdate(status="shortlist"), user, session)
+        assert session.statements == [] and session.commits == 1
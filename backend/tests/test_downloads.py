@@ -0,0 +1,73 @@
+"""
+Tests des téléchargements conditionnels et partiels
+"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+
+PDF_BYTES = b"%PDF-1.4\n" + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def client(tmp_path):
+    from services.downloads import file_download_response
+
+    pdf_path = tmp_path / "cv.pdf"
+    pdf_path.write_bytes(PDF_BYTES)
+    docx_path = tmp_path / "cv.docx"
+    docx_path.write_bytes(b"PK\x03\x04" + b"0" * 100)
+
+    app = FastAPI()
+
+    @app.get("/files/{name}")
+    def download(name: str, request: Request):
+        return file_download_response(request, tmp_path / name, filename=name, content_hash="abc123")
+
+    return TestClient(app)
+
+
+class TestFileDownloadResponse:
+    """Tests de file_download_response"""
+
+    def test_full_download_with_validators(self, client):
+        response = client.get("/files/cv.pdf")
+        assert response.status_code == 200
+        assert response.content == PDF_BYTES
+        assert response.headers["etag"] == '"abc123"'
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-disposition"].startswith("inline")
+
+    def test_media_type_detected_from_content(self, client):
+        response = client.get("/files/cv.docx")
+        assert response.headers["content-type"].startswith(
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+        assert response.headers["content-disposition"].startswith("attachment")
+
+    def test_if_none_match_returns_304(self, client):
+        response = client.get("/files/cv.pdf", headers={"If-None-Match": '"abc123"'})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_range_request(self, client):
+        response = client.get("/files/cv.pdf", headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.content == PDF_BYTES[10:20]
+        assert response.headers["content-range"] == f"bytes 10-19/{len(PDF_BYTES)}"
+
+    def test_suffix_range(self, client):
+        response = client.get("/files/cv.pdf", headers={"Range": "bytes=-5"})
+        assert response.status_code == 206
+        assert response.content == PDF_BYTES[-5:]
+
+    def test_unsatisfiable_range(self, client):
+        response = client.get("/files/cv.pdf", headers={"Range": f"bytes={len(PDF_BYTES)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(PDF_BYTES)}"
+
+    def test_stale_if_range_serves_full_file(self, client):
+        response = client.get("/files/cv.pdf", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+        assert response.status_code == 200
+        assert response.content == PDF_BYTES
@@ -0,0 +1,109 @@
+"""
+Tests de l'export des candidats (CSV / XLSX en streaming)
+"""
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from uuid import uuid4
+from xml.etree import ElementTree
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.dialects import postgresql
+
+
+SHEET_NS = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def sample_batches():
+    return [
+        [(uuid4(), "Doe", "=HYPERLINK(\"x\")", ["python", "sql"], True, datetime(2024, 3, 1, 9, 30), None)],
+        [(uuid4(), "Martin", "Léa\x01", [], False, datetime(2024, 3, 2, 10, 0), 7)],
+    ]
+
+
+HEADERS = ["ID", "Nom", "Prénom", "Compétences", "Shortlist", "Créé le", "Expérience"]
+
+
+class TestCsvExport:
+    """Tests du format CSV"""
+
+    def test_rows_are_formatted_and_escaped(self):
+        from services.exports import stream_csv
+        chunks = list(stream_csv(sample_batches(), HEADERS))
+        # En-tête puis un bloc par lot
+        assert len(chunks) == 3
+        assert chunks[0].startswith("\ufeff".encode("utf-8"))
+
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+        assert rows[0] == HEADERS
+        assert rows[1][2] == "'=HYPERLINK(\"x\")"
+        assert rows[1][3:] == ["python | sql", "Oui", "2024-03-01 09:30:00", ""]
+        assert rows[2][3:] == ["", "Non", "2024-03-02 10:00:00", "7"]
+
+
+class TestXlsxExport:
+    """Tests du format XLSX"""
+
+    def test_workbook_is_readable(self):
+        from services.exports import stream_xlsx
+        chunks = list(stream_xlsx(sample_batches(), HEADERS))
+        assert len(chunks) > 2
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            assert archive.testzip() is None
+            assert "xl/workbook.xml" in archive.namelist()
+            sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+
+        rows = sheet.findall("s:sheetData/s:row", SHEET_NS)
+        assert len(rows) == 3
+        header = [cell.findtext("s:is/s:t", namespaces=SHEET_NS) for cell in rows[0]]
+        assert header == HEADERS
+
+        last = list(rows[2])
+        # Caractères de contrôle supprimés, nombres en cellules numériques
+        assert last[2].findtext("s:is/s:t", namespaces=SHEET_NS) == "Léa"
+        assert last[6].findtext("s:v", namespaces=SHEET_NS) == "7"
+
+    def test_openpyxl_can_load_workbook(self):
+        openpyxl = pytest.importorskip("openpyxl")
+        from services.exports import stream_xlsx
+        workbook = openpyxl.load_workbook(io.BytesIO(b"".join(stream_xlsx(sample_batches(), HEADERS))))
+        sheet = workbook["Candidats"]
+        assert [cell.value for cell in sheet[1]] == HEADERS
+        assert sheet.max_row == 3
+
+
+class TestExportQuery:
+    """Tests de la requête et de la lecture par lots"""
+
+    def test_filters_are_applied(self):
+        from services.exports import build_candidate_export_query
+        job_id = uuid4()
+        statement = build_candidate_export_query(
+            status_filter="qualifié",
+            tag_filter="python",
+            job_id=job_id,
+            created_from=date(2024, 1, 1),
+            created_to=date(2024, 1, 31),
+        )
+        compiled = statement.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        assert "LEFT OUTER JOIN applications" in sql
+        assert "= ANY (candidates.tags)" in sql
+        params = set(map(str, compiled.params.values()))
+        assert {"qualifié", "python", str(job_id), "2024-01-01 00:00:00", "2024-02-01 00:00:00"} <= params
+        assert "ORDER BY candidates.created_at DESC" in sql
+
+    def test_batches_are_read_with_a_cursor(self):
+        from services.exports import iter_row_batches
+        engine = create_engine("sqlite://")
+        table = Table("items", MetaData(), Column("id", Integer, primary_key=True), Column("name", String))
+        table.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(table), [{"id": i, "name": f"n{i}"} for i in range(25)])
+
+        batches = list(iter_row_batches(engine, select(table).order_by(table.c.id), batch_size=10))
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert batches[2][-1] == (24, "n24")
@@ -0,0 +1,86 @@
+"""
+Tests du pipeline de photos de profil
+"""
+from types import SimpleNamespace
+
+import pytest
+
+
+JPEG_HEADER = b"\xff\xd8\xff\xe0" + b"\x00" * 12
+
+
+class TestSelectPortrait:
+    """Tests de la sélection de la photo de profil"""
+
+    def test_prefers_portrait_over_logo_and_banner(self):
+        from services.images import EmbeddedImage, select_portrait
+        logo = EmbeddedImage(data=JPEG_HEADER + b"logo", width=32, height=32)
+        banner = EmbeddedImage(data=JPEG_HEADER + b"banner", width=1200, height=150)
+        portrait = EmbeddedImage(data=JPEG_HEADER + b"portrait", width=300, height=400)
+        assert select_portrait([logo, banner, portrait]) is portrait
+
+    def test_prefers_first_page(self):
+        from services.images import EmbeddedImage, select_portrait
+        page_one = EmbeddedImage(data=JPEG_HEADER + b"1", width=200, height=260, page=0)
+        page_two = EmbeddedImage(data=JPEG_HEADER + b"2", width=220, height=280, page=1)
+        assert select_portrait([page_two, page_one]) is page_one
+
+    def test_no_candidate(self):
+        from services.images import EmbeddedImage, select_portrait
+        assert select_portrait([]) is None
+        not_an_image = EmbeddedImage(data=b"%PDF-1.4", width=300, height=400)
+        assert select_portrait([not_an_image]) is None
+
+
+class TestThumbnails:
+    """Tests de la génération des miniatures"""
+
+    def test_generate_thumbnails(self, local_storage):
+        Image = pytest.importorskip("PIL.Image")
+        import services.images as images
+
+        photo_path = local_storage.root / "static" / "uploads" / "photo.png"
+        photo_path.parent.mkdir(parents=True)
+        Image.new("RGB", (600, 800), "white").save(photo_path)
+
+        thumbnails = images.generate_thumbnails("static/uploads/photo.png")
+        assert set(thumbnails) == set(images.THUMBNAIL_SIZES)
+        for size, key in thumbnails.items():
+            with Image.open(local_storage.local_path(key)) as thumbnail:
+                assert thumbnail.format == "WEBP"
+                assert thumbnail.size == (size, size)
+        assert images.get_thumbnail_url("/static/uploads/photo.png", 64) == "/static/uploads/thumbs/photo_64.webp"
+        assert images.list_photos_without_thumbnails() == []
+
+    def test_jpeg_photos_are_backfilled(self, local_storage):
+        import services.images as images
+        local_storage.write_bytes("static/uploads/photo.jpeg", b"\xff\xd8\xff")
+        local_storage.write_bytes("static/uploads/notes.txt", b"texte")
+        assert images.list_photos_without_thumbnails() == ["static/uploads/photo.jpeg"]
+
+    def test_thumbnail_url_requires_generated_file(self, local_storage):
+        from services.images import get_thumbnail_url
+        assert get_thumbnail_url(None) is None
+        assert get_thumbnail_url("https://example.com/photo.jpg") is None
+        assert get_thumbnail_url("/static/uploads/does-not-exist.jpg") is None
+
+    def test_remote_checks_are_bounded(self, monkeypatch):
+        import services.images as images
+        calls = []
+        storage = SimpleNamespace(
+            local_path=lambda key: None,
+            exists=lambda key: calls.append(key) or key.endswith("_64.webp"),
+        )
+        monkeypatch.setattr(images, "get_storage", lambda: storage)
+        monkeypatch.setattr(images, "THUMBNAIL_CHECKS_MAX_ENTRIES", 2)
+        images._thumbnail_checks.clear()
+        try:
+            assert images._thumbnail_exists("a_64.webp") is True
+            assert images._thumbnail_exists("b_256.webp") is False
+            assert images._thumbnail_exists("a_64.webp") is True
+            assert images._thumbnail_exists("b_256.webp") is False
+            assert calls == ["a_64.webp", "b_256.webp"]
+            images._thumbnail_exists("c_64.webp")
+            assert list(images._thumbnail_checks) == ["b_256.webp", "c_64.webp"]
+        finally:
+            images._thumbnail_checks.clear()
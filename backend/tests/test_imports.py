@@ -0,0 +1,159 @@
+"""
+Tests de l'import en masse des candidats (lecture, validation, rapport)
+"""
+import csv
+import json
+from uuid import uuid4
+
+import pytest
+
+
+class TestParsing:
+    """Tests de la lecture des fichiers"""
+
+    def test_csv_with_french_headers_and_semicolons(self):
+        from services.imports import parse_csv
+        content = "Prénom;Nom;Email;Compétences;Colonne inconnue\nLéa;Martin;lea@example.com;python, sql;x\n"
+        records = parse_csv(content.encode("cp1252"))
+        assert records == [{
+            "first_name": "Léa", "last_name": "Martin", "email": "lea@example.com", "skills": "python, sql",
+        }]
+
+    def test_export_file_can_be_reimported(self):
+        from services.exports import EXPORT_HEADERS, stream_csv
+        from services.imports import parse_csv, validate_rows
+        row = [None] * len(EXPORT_HEADERS)
+        row[EXPORT_HEADERS.index("Nom")] = "Doe"
+        row[EXPORT_HEADERS.index("Prénom")] = "John"
+        row[EXPORT_HEADERS.index("Tags")] = ["senior", "remote"]
+        content = b"".join(stream_csv([[tuple(row)]]))
+
+        rows = validate_rows(parse_csv(content))
+        assert rows[0].errors == []
+        assert rows[0].values["tags"] == ["senior", "remote"]
+
+    def test_missing_required_columns(self):
+        from services.imports import ImportFileError, parse_csv
+        with pytest.raises(ImportFileError):
+            parse_csv(b"email,phone\na@b.c,0102\n")
+
+    def test_json_array(self):
+        from services.imports import ImportFileError, parse_json
+        records = parse_json(json.dumps([{"first_name": "A", "last_name": "B", "tags": ["x"], "id": 3}]).encode())
+        assert records == [{"first_name": "A", "last_name": "B", "tags": ["x"]}]
+        with pytest.raises(ImportFileError):
+            parse_json(b'{"first_name": "A"}')
+
+
+class TestValidation:
+    """Tests de la validation ligne par ligne"""
+
+    def test_errors_are_reported_per_line(self):
+        from services.imports import validate_rows
+        rows = validate_rows([
+            {"first_name": " Léa ", "last_name": "Martin", "email": "", "years_of_experience": "4"},
+            {"first_name": "", "last_name": "Doe", "years_of_experience": "beaucoup"},
+        ])
+        assert rows[0].errors == []
+        assert rows[0].values["first_name"] == "Léa"
+        assert rows[0].values["email"] is None
+        assert rows[0].values["years_of_experience"] == 4
+        assert rows[1].line == 2
+        assert {error.split(":")[0] for error in rows[1].errors} == {"first_name", "years_of_experience"}
+
+    def test_copy_buffer_encodes_nulls_and_arrays(self):
+        from services.imports import STAGING_COLUMNS, build_copy_buffer, validate_rows
+        rows = validate_rows([{"first_name": "A", "last_name": "B", "tags": ['dit "x"', "a,b\\c"]}])
+        line = build_copy_buffer(rows).getvalue()
+        values = next(csv.reader([line]))
+        assert len(values) == len(STAGING_COLUMNS)
+        assert values[STAGING_COLUMNS.index("email")] == ""
+        assert values[STAGING_COLUMNS.index("tags")] == '{"dit \\"x\\"","a,b\\\\c"}'
+
+
+class FakeCursor:
+    def __init__(self, copies):
+        self.copies = copies
+
+    def copy_expert(self, sql, buffer):
+        self.copies.append(buffer.getvalue())
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Connexion simulée : enregistre les requêtes et retourne le rapport préparé"""
+
+    def __init__(self, report_rows):
+        self.report_rows = report_rows
+        self.statements = []
+        self.copies = []
+        self.connection = self
+
+    def cursor(self):
+        return FakeCursor(self.copies)
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return self.report_rows if "ORDER BY line" in str(statement) else []
+
+
+class FakeSession:
+    def __init__(self, connection):
+        self._connection = connection
+        self.committed = self.rolled_back = False
+        self.info = {}
+
+    def connection(self):
+        return self._connection
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class TestImport:
+    """Tests de l'enchaînement des requêtes et du rapport"""
+
+    def test_report(self):
+        from services.imports import import_candidates, validate_rows
+        rows = validate_rows([
+            {"first_name": "A", "last_name": "B"},
+            {"first_name": "", "last_name": "B"},
+            {"first_name": "C", "last_name": "D", "email": "c@d.fr"},
+            {"first_name": "a", "last_name": "b"},
+        ])
+        existing_id = uuid4()
+        connection = FakeConnection([
+            (1, rows[0].id, None, None, None),
+            (3, rows[2].id, existing_id, None, "email"),
+            (4, rows[3].id, None, 1, "nom + prénom"),
+        ])
+        session = FakeSession(connection)
+
+        report = import_candidates(session, rows, created_by=uuid4())
+        assert [result["status"] for result in report] == ["créé", "invalide", "doublon", "doublon"]
+        assert report[0]["candidate_id"] == rows[0].id
+        assert report[2]["existing_candidate_id"] == existing_id
+        assert report[3]["existing_candidate_id"] == rows[0].id
+        assert report[3]["duplicate_of_line"] == 1
+        assert session.committed
+        # Insertion en SQL brut signalée aux agrégats et au cache des KPI
+        assert session.info["kpi_data_changed"] and set(session.info["kpi_rollup_days"]) == {"candidates"}
+        # Une seule copie, une seule insertion
+        assert len(connection.copies) == 1 and connection.copies[0].count("\n") == 3
+        assert sum("INSERT INTO candidates" in sql for sql in connection.statements) == 1
+
+    def test_dry_run_inserts_nothing(self):
+        from services.imports import import_candidates, validate_rows
+        rows = validate_rows([{"first_name": "A", "last_name": "B"}])
+        connection = FakeConnection([(1, rows[0].id, None, None, None)])
+        session = FakeSession(connection)
+
+        report = import_candidates(session, rows, created_by=uuid4(), dry_run=True)
+        assert report[0]["status"] == "créé" and report[0]["candidate_id"] is None
+        assert session.rolled_back and not session.committed
+        assert not any("INSERT INTO candidates" in sql for sql in connection.statements)
@@ -0,0 +1,198 @@
+"""
+Tests du calendrier des entretiens et de la détection des conflits
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from tests.helpers import compile_sql
+
+
+class FakeResult(list):
+    def all(self):
+        return list(self)
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def exec(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.rows)
+
+
+class TestCalendarQuery:
+    """Tests de la requête du calendrier"""
+
+    def test_overlap_on_indexed_period(self):
+        from services.interview_calendar import build_calendar_query
+        sql = compile_sql(build_calendar_query(datetime(2024, 5, 6), datetime(2024, 5, 13)))
+        assert (
+            "tsrange(interviews.scheduled_at, coalesce(interviews.scheduled_end_at, "
+            "interviews.scheduled_at + interval '1 hour'), %(tsrange_1)s) && tsrange("
+        ) in sql
+
+    def test_aware_dates_are_converted_to_utc(self):
+        from services.interview_calendar import to_utc_naive
+        paris = timezone(timedelta(hours=2))
+        assert to_utc_naive(datetime(2024, 5, 6, 10, 0, tzinfo=paris)) == datetime(2024, 5, 6, 8, 0)
+
+
+class FailingCommitSession:
+    def __init__(self, constraint_name):
+        self.error = IntegrityError(
+            "INSERT INTO interviews", {}, SimpleNamespace(diag=SimpleNamespace(constraint_name=constraint_name))
+        )
+        self.rolled_back = False
+
+    def add(self, instance):
+        pass
+
+    def commit(self):
+        raise self.error
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.fixture
+def agenda(pg_session):
+    """
+    Agenda du 6 mai 2024 : Awa a un entretien 10h-11h (fin implicite), 14h-15h30
+    et un entretien annulé à 16h ; Koffi a un entretien 10h-11h
+    """
+    from models import Application, Candidate, Interview, Job, User
+    session = pg_session
+
+    def user(first_name):
+        return User(email=f"{first_name.lower()}@example.com", password_hash="x", first_name=first_name,
+                    last_name="Test", role="recruteur", company_id=uuid4())
+
+    awa, koffi = user("Awa"), user("Koffi")
+    session.add_all([awa, koffi])
+    session.flush()
+    job = Job(title="Comptable", created_by=awa.id)
+    candidate = Candidate(first_name="Moussa", last_name="Traoré", created_by=awa.id)
+    session.add_all([job, candidate])
+    session.flush()
+    application = Application(candidate_id=candidate.id, job_id=job.id, created_by=awa.id)
+    session.add(application)
+    session.flush()
+
+    def interview(interviewer, start, end=None, interview_status="planifié"):
+        return Interview(application_id=application.id, interviewer_id=interviewer.id, interview_type="rh",
+                         created_by=awa.id, scheduled_at=start, scheduled_end_at=end, status=interview_status)
+
+    interviews = SimpleNamespace(
+        morning=interview(awa, at(10)),
+        afternoon=interview(awa, at(14), at(15, 30)),
+        cancelled=interview(awa, at(16), at(17), "annulé"),
+        koffi=interview(koffi, at(10), at(11)),
+    )
+    session.add_all(vars(interviews).values())
+    session.flush()
+    return SimpleNamespace(session=session, awa=awa, koffi=koffi, job=job, interviews=interviews)
+
+
+def at(hour, minute=0):
+    return datetime(2024, 5, 6, hour, minute)
+
+
+class TestCalendar:
+    """Tests du calendrier sur une base PostgreSQL"""
+
+    def test_window_returns_overlapping_interviews(self, agenda):
+        from services.interview_calendar import build_calendar_query
+        session, interviews = agenda.session, agenda.interviews
+        rows = session.execute(build_calendar_query(at(10, 30), at(15), [agenda.awa.id])).mappings().all()
+        # 10h sans fin occupe jusqu'à 11h ; l'entretien de Koffi est filtré
+        assert [row["id"] for row in rows] == [interviews.morning.id, interviews.afternoon.id]
+        assert rows[0]["candidate_name"] == "Moussa Traoré" and rows[0]["job_title"] == "Comptable"
+
+    def test_cancelled_interviews_are_optional(self, agenda):
+        from services.interview_calendar import build_calendar_query
+        session, cancelled_id = agenda.session, agenda.interviews.cancelled.id
+        for include_cancelled, expected in ((False, []), (True, [cancelled_id])):
+            statement = build_calendar_query(at(15, 30), at(18), job_id=agenda.job.id, include_cancelled=include_cancelled)
+            assert [row["id"] for row in session.execute(statement).mappings().all()] == expected
+
+
+class TestConflicts:
+    """Tests de la détection des conflits"""
+
+    def test_overlap_raises_409(self, agenda):
+        from services.interview_calendar import check_interviewer_availability
+        with pytest.raises(HTTPException) as exc_info:
+            check_interviewer_availability(agenda.session, agenda.awa.id, at(10, 30), None)
+        assert exc_info.value.status_code == 409
+        assert "06/05/2024 10:00-11:00" in exc_info.value.detail
+
+    def test_adjacent_cancelled_and_other_interviewer_slots_are_free(self, agenda):
+        from services.interview_calendar import check_interviewer_availability
+        session, awa_id = agenda.session, agenda.awa.id
+        check_interviewer_availability(session, awa_id, at(11), at(14))
+        check_interviewer_availability(session, awa_id, at(16), at(17))
+        check_interviewer_availability(session, agenda.koffi.id, at(14), None)
+
+    def test_rescheduled_interview_excludes_itself(self, agenda):
+        from services.interview_calendar import check_interviewer_availability
+        afternoon = agenda.interviews.afternoon
+        check_interviewer_availability(agenda.session, agenda.awa.id, at(15), at(16), exclude_id=afternoon.id)
+
+    def test_no_interviewer_no_query(self):
+        from services.interview_calendar import check_interviewer_availability
+        session = FakeSession([])
+        check_interviewer_availability(session, None, datetime(2024, 5, 6, 10), None)
+        assert session.statements == []
+
+    def test_end_before_start(self):
+        from services.interview_calendar import validate_period
+        with pytest.raises(HTTPException) as exc_info:
+            validate_period(datetime(2024, 5, 6, 10), datetime(2024, 5, 6, 9))
+        assert exc_info.value.status_code == 400
+
+    def test_reactivated_interview_is_checked(self, agenda):
+        from routers.interviews import InterviewStatusUpdate, update_interview_status
+        cancelled = agenda.interviews.cancelled
+        cancelled.scheduled_at, cancelled.scheduled_end_at = at(15), at(16)
+        agenda.session.flush()
+        with pytest.raises(HTTPException) as exc_info:
+            update_interview_status(cancelled.id, InterviewStatusUpdate(status="planifié"), None, agenda.session)
+        assert exc_info.value.status_code == 409
+        assert cancelled.status == "annulé"
+
+    def test_moving_the_start_keeps_the_duration(self, agenda, monkeypatch):
+        from routers.interviews import InterviewUpdate, update_interview
+        afternoon = agenda.interviews.afternoon
+        # Le test reste dans la transaction du schéma temporaire
+        monkeypatch.setattr(agenda.session, "commit", agenda.session.flush)
+        update_interview(afternoon.id, InterviewUpdate(scheduled_at=at(17)), None, agenda.session)
+        assert (afternoon.scheduled_at, afternoon.scheduled_end_at) == (at(17), at(18, 30))
+
+
+class TestOverlapConstraint:
+    """Tests des réservations simultanées refusées par la contrainte d'exclusion"""
+
+    def test_exclusion_violation_raises_409(self):
+        from models import Interview
+        from services.interview_calendar import INTERVIEWER_OVERLAP_CONSTRAINT, save_interview
+        session = FailingCommitSession(INTERVIEWER_OVERLAP_CONSTRAINT)
+        with pytest.raises(HTTPException) as exc_info:
+            save_interview(session, Interview(application_id=uuid4(), interview_type="rh", created_by=uuid4(),
+                                              scheduled_at=at(10)))
+        assert exc_info.value.status_code == 409
+        assert session.rolled_back
+
+    def test_other_integrity_errors_are_kept(self):
+        from models import Interview
+        from services.interview_calendar import save_interview
+        session = FailingCommitSession("interviews_application_id_fkey")
+        with pytest.raises(IntegrityError):
+            save_interview(session, Interview(application_id=uuid4(), interview_type="rh", created_by=uuid4(),
+                                              scheduled_at=at(10)))
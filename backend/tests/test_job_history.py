@@ -0,0 +1,84 @@
+"""
+Tests de l'historique des besoins en change-sets
+"""
+from datetime import datetime
+from uuid import uuid4
+
+from tests.helpers import compile_sql
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+
+    def add(self, instance):
+        self.added.append(instance)
+
+
+class TestRecord:
+    """Tests de l'écriture de l'historique"""
+
+    def test_one_row_per_update(self):
+        from services.job_history import history_change, record_job_changes
+        session = FakeSession()
+        job_id, user_id = uuid4(), uuid4()
+        entry = record_job_changes(session, job_id, user_id, [
+            history_change("Intitulé du poste", "Comptable", "Chef comptable"),
+            history_change("Priorité", None, "haute"),
+        ])
+        assert session.added == [entry]
+        assert entry.field_name is None
+        assert entry.changes == [
+            {"field": "Intitulé du poste", "old": "Comptable", "new": "Chef comptable"},
+            {"field": "Priorité", "old": None, "new": "haute"},
+        ]
+
+    def test_nothing_changed_writes_nothing(self):
+        from services.job_history import record_job_changes
+        session = FakeSession()
+        assert record_job_changes(session, uuid4(), uuid4(), []) is None
+        assert session.added == []
+
+    def test_values_are_truncated(self):
+        from services.job_history import history_change
+        change = history_change("x" * 150, "a" * 6000, None)
+        assert len(change["field"]) == 100 and change["field"].endswith("...")
+        assert len(change["old"]) == 5000
+
+
+class TestExpand:
+    """Tests de la lecture par champ"""
+
+    def test_changeset_and_legacy_rows(self):
+        from models import JobHistory
+        from services.job_history import expand_job_history
+        job_id, user_id = uuid4(), uuid4()
+        created_at = datetime(2024, 5, 1, 8, 0)
+        changeset = JobHistory(job_id=job_id, modified_by=user_id, created_at=created_at, changes=[
+            {"field": "status", "old": "brouillon", "new": "supprimé"},
+            {"field": "title", "old": "Comptable", "new": "Comptable"},
+        ])
+        legacy = JobHistory(job_id=job_id, modified_by=user_id, created_at=created_at,
+                            field_name="status", old_value=None, new_value="brouillon")
+
+        items = expand_job_history([changeset, legacy])
+        assert [item["id"] for item in items] == [f"{changeset.id}-0", f"{changeset.id}-1", str(legacy.id)]
+        assert items[0] == {
+            "id": f"{changeset.id}-0",
+            "job_id": job_id,
+            "modified_by": user_id,
+            "field_name": "status",
+            "old_value": "brouillon",
+            "new_value": "supprimé",
+            "created_at": created_at,
+        }
+        assert [item["new_value"] for item in expand_job_history([changeset, legacy], "status")] == [
+            "supprimé", "brouillon"
+        ]
+
+    def test_field_filter_uses_containment(self):
+        from sqlmodel import select
+        from models import JobHistory
+        from services.job_history import changes_contain
+        sql = compile_sql(select(JobHistory).where(changes_contain(field="status", new="supprimé")))
+        assert "job_history.changes @>" in sql
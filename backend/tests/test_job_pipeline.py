@@ -0,0 +1,124 @@
+"""
+Tests du tableau kanban d'un besoin
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from tests.helpers import compile_sql
+
+
+def card_row(status, position, column_count, updated_at=None):
+    return {
+        "id": uuid4(),
+        "candidate_id": uuid4(),
+        "status": status,
+        "is_in_shortlist": False,
+        "client_validated": None,
+        "created_at": datetime(2024, 5, 1),
+        "updated_at": updated_at or datetime(2024, 5, 1) - timedelta(hours=position),
+        "position": position,
+        "column_count": column_count,
+        "first_name": "Awa",
+        "last_name": "Diallo",
+        "email": None,
+        "profile_title": None,
+        "years_of_experience": 3,
+        "profile_picture_url": None,
+    }
+
+
+class TestPipelineQuery:
+    """Tests de la requête du tableau"""
+
+    def test_single_window_query(self):
+        from services.job_pipeline import build_pipeline_query
+        sql = compile_sql(build_pipeline_query(uuid4(), 20))
+        assert "row_number() OVER (PARTITION BY applications.status ORDER BY applications.updated_at DESC, applications.id DESC)" in sql
+
+
+@pytest.fixture
+def pipeline_job(pg_session):
+    """
+    Besoin avec trois candidatures qualifiées (modifiées à 3 h, 2 h et 1 h), une sourcée,
+    et une candidature qualifiée sur un autre besoin
+    """
+    from models import Application, Candidate, Job, User
+    session = pg_session
+    owner = User(email="awa@example.com", password_hash="x", first_name="Awa", last_name="Diallo",
+                 role="recruteur", company_id=uuid4())
+    session.add(owner)
+    session.flush()
+    job, other_job = Job(title="Comptable", created_by=owner.id), Job(title="Juriste", created_by=owner.id)
+    candidates = [Candidate(first_name=f"C{index}", last_name="Test", created_by=owner.id) for index in range(5)]
+    session.add_all([job, other_job, *candidates])
+    session.flush()
+
+    applications = [
+        Application(candidate_id=candidate.id, job_id=target.id, created_by=owner.id, status=status,
+                    updated_at=datetime(2024, 5, 1, hour))
+        for candidate, target, status, hour in zip(
+            candidates,
+            [job, job, job, job, other_job],
+            ["qualifié", "qualifié", "qualifié", "sourcé", "qualifié"],
+            [3, 2, 1, 4, 5],
+        )
+    ]
+    session.add_all(applications)
+    session.flush()
+    return SimpleNamespace(session=session, job=job, applications=applications)
+
+
+class TestPipelineBoard:
+    """Tests du tableau sur une base PostgreSQL"""
+
+    def test_columns_are_grouped_and_counted_per_job(self, pipeline_job):
+        from services.job_pipeline import build_columns, build_pipeline_query
+        rows = pipeline_job.session.execute(build_pipeline_query(pipeline_job.job.id, 2)).mappings().all()
+        columns = {column["status"]: column for column in build_columns(rows, 2)}
+
+        qualified = columns["qualifié"]
+        assert qualified["count"] == 3
+        assert [item["id"] for item in qualified["items"]] == [application.id for application in pipeline_job.applications[:2]]
+        assert qualified["next_cursor"] is not None
+        assert columns["sourcé"]["count"] == 1 and columns["sourcé"]["next_cursor"] is None
+        assert columns["embauché"] == {"status": "embauché", "count": 0, "items": [], "next_cursor": None}
+
+    def test_load_more_continues_after_cursor(self, pipeline_job):
+        from services.job_pipeline import build_columns, build_pipeline_query, decode_cursor
+        session, job_id = pipeline_job.session, pipeline_job.job.id
+        first_page = build_columns(session.execute(build_pipeline_query(job_id, 2)).mappings().all(), 2)
+        cursor = next(column["next_cursor"] for column in first_page if column["status"] == "qualifié")
+
+        rows = session.execute(build_pipeline_query(job_id, 2, "qualifié", decode_cursor(cursor))).mappings().all()
+        [qualified] = build_columns(rows, 2, ["qualifié"])
+        # L'effectif reste celui de la colonne entière
+        assert qualified["count"] == 3
+        assert [item["id"] for item in qualified["items"]] == [pipeline_job.applications[2].id]
+        assert qualified["next_cursor"] is None
+
+
+class TestColumns:
+    """Tests de la construction des colonnes"""
+
+    def test_columns_in_pipeline_order_with_next_cursor(self):
+        from services.bulk_actions import PIPELINE_STATUSES
+        from services.job_pipeline import build_columns, decode_cursor
+        rows = [card_row("qualifié", 1, 3), card_row("qualifié", 2, 3), card_row("qualifié", 3, 3), card_row("sourcé", 1, 1)]
+        columns = build_columns(rows, 2)
+        assert [column["status"] for column in columns] == PIPELINE_STATUSES
+        sourced, qualified = columns[0], columns[1]
+        assert sourced["count"] == 1 and sourced["next_cursor"] is None
+        assert qualified["count"] == 3 and len(qualified["items"]) == 2
+        # Le curseur désigne la dernière carte affichée
+        assert decode_cursor(qualified["next_cursor"]) == (rows[1]["updated_at"], rows[1]["id"])
+        assert qualified["items"][0]["candidate_name"] == "Awa Diallo"
+
+    def test_invalid_cursor(self):
+        from services.job_pipeline import decode_cursor
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor("pas-un-curseur")
+        assert exc_info.value.status_code == 400
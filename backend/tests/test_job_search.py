@@ -0,0 +1,129 @@
+"""
+Tests de la recherche des besoins par facettes
+"""
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from tests.helpers import compile_sql
+
+
+def facet_row(name=None, value=None, count=0, total=0):
+    """Ligne de build_facet_query pour l'ensemble de la facette name (ou l'ensemble vide)"""
+    from services.job_search import JOB_FACETS
+    row = {"total": total}
+    for facet in JOB_FACETS:
+        row[f"grouping_{facet}"] = 0 if facet == name else 1
+        row[facet] = value if facet == name else None
+        row[f"count_{facet}"] = count if facet == name else 0
+    return row
+
+
+class TestFacetQuery:
+    """Tests de la requête des compteurs"""
+
+    def test_single_query_with_grouping_sets(self):
+        from services.job_search import JobSearchFilters, build_facet_query
+        sql = compile_sql(build_facet_query(JobSearchFilters(facets={"status": ["validé"]})))
+        assert "GROUP BY GROUPING SETS(jobs.status, jobs.department" in sql
+
+    def test_collect_facets(self):
+        from services.job_search import collect_facets
+        result = collect_facets([
+            facet_row("status", "validé", 3),
+            facet_row("status", "en_cours", 5),
+            facet_row("department", None, 2),
+            facet_row("department", "IT", 2),
+            facet_row("urgency", "haute", 0),
+            facet_row(total=8),
+        ])
+        assert result["total"] == 8
+        assert result["facets"]["status"] == [{"value": "en_cours", "count": 5}, {"value": "validé", "count": 3}]
+        assert [item["value"] for item in result["facets"]["department"]] == ["IT", None]
+        assert result["facets"]["urgency"] == []
+
+
+@pytest.fixture
+def job_catalog(pg_session):
+    """
+    Besoins (statut, urgence, département, salaire min-max, compétences) :
+    J1 validé/haute/IT 300-500 python+sql, J2 validé/basse/IT 200-250 python,
+    J3 en_cours/haute/RH sans salaire, J4 brouillon/haute/sans département 400-400 sql ;
+    le recruteur n'est attribué qu'à J1 et J4
+    """
+    from models import Job, JobRecruiter, User
+    session = pg_session
+
+    def user(first_name, role):
+        return User(email=f"{first_name.lower()}@example.com", password_hash="x", first_name=first_name,
+                    last_name="Test", role=role, company_id=uuid4())
+
+    client, recruiter = user("Fatou", "client"), user("Koffi", "recruteur")
+    session.add_all([client, recruiter])
+    session.flush()
+    jobs = [
+        Job(title=title, status=job_status, urgency=urgency, department=department, salaire_minimum=low,
+            salaire_maximum=high, competences_techniques_obligatoires=skills, created_by=owner.id)
+        for title, job_status, urgency, department, low, high, skills, owner in [
+            ("J1", "validé", "haute", "IT", 300, 500, ["python", "sql"], client),
+            ("J2", "validé", "basse", "IT", 200, 250, ["python"], client),
+            ("J3", "en_cours", "haute", "RH", None, None, None, recruiter),
+            ("J4", "brouillon", "haute", None, 400, 400, ["sql"], client),
+        ]
+    ]
+    session.add_all(jobs)
+    session.flush()
+    session.add_all([
+        JobRecruiter(job_id=job.id, recruiter_id=recruiter.id, assigned_by=client.id) for job in (jobs[0], jobs[3])
+    ])
+    session.flush()
+    return SimpleNamespace(session=session, client=client, recruiter=recruiter)
+
+
+def search(job_catalog, filters, user=None):
+    from sqlmodel import select
+    from models import Job
+    from services.job_search import apply_search_filters, build_facet_query, collect_facets, job_access_conditions
+    access = job_access_conditions(user) if user else []
+    session = job_catalog.session
+    counts = collect_facets(session.execute(build_facet_query(filters, access)).mappings().all())
+    titles = sorted(session.exec(apply_search_filters(select(Job.title), filters, access)).all())
+    return counts, titles
+
+
+class TestFacetCounts:
+    """Tests des compteurs sur une base PostgreSQL"""
+
+    def test_facet_counts_ignore_their_own_filter(self, job_catalog):
+        from services.job_search import JobSearchFilters
+        counts, titles = search(job_catalog, JobSearchFilters(facets={"status": ["validé"], "urgency": ["haute"]}))
+        assert titles == ["J1"] and counts["total"] == 1
+        facets = counts["facets"]
+        # Statuts des besoins urgents, urgences des besoins validés
+        assert facets["status"] == [
+            {"value": "brouillon", "count": 1}, {"value": "en_cours", "count": 1}, {"value": "validé", "count": 1},
+        ]
+        assert facets["urgency"] == [{"value": "basse", "count": 1}, {"value": "haute", "count": 1}]
+        assert facets["department"] == [{"value": "IT", "count": 1}]
+
+    def test_salary_and_skills_restrict_every_facet(self, job_catalog):
+        from services.job_search import JobSearchFilters
+        counts, titles = search(job_catalog, JobSearchFilters(salary_min=260, skills=["sql"]))
+        assert titles == ["J1", "J4"] and counts["total"] == 2
+        assert counts["facets"]["status"] == [{"value": "brouillon", "count": 1}, {"value": "validé", "count": 1}]
+        assert counts["facets"]["department"] == [{"value": "IT", "count": 1}, {"value": None, "count": 1}]
+
+
+class TestAccess:
+    """Tests des règles de visibilité"""
+
+    def test_recruiter_sees_assigned_visible_jobs(self, job_catalog):
+        from services.job_search import JobSearchFilters
+        counts, titles = search(job_catalog, JobSearchFilters(), job_catalog.recruiter)
+        assert titles == ["J1"] and counts["total"] == 1
+
+    def test_client_sees_own_jobs_and_manager_everything(self, job_catalog):
+        from services.job_search import JobSearchFilters, job_access_conditions
+        assert search(job_catalog, JobSearchFilters(), job_catalog.client)[1] == ["J1", "J2", "J4"]
+        assert job_access_conditions(SimpleNamespace(id=uuid4(), role="manager")) == []
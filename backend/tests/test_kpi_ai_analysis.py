@@ -0,0 +1,168 @@
+"""
+Tests des analyses IA des KPI générées en arrière-plan
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+
+class TestScope:
+    """Tests des périmètres"""
+
+    def test_equivalent_filters_share_a_key(self):
+        from services.kpi_ai_analysis import scope_filters, scope_key
+        recruiter_id = uuid4()
+        naive = {"start_date": datetime(2024, 6, 1), "recruiter_id": recruiter_id, "source": None}
+        aware = {"recruiter_id": str(recruiter_id), "start_date": datetime(2024, 6, 1, 2, tzinfo=timezone(timedelta(hours=2)))}
+        assert scope_key("manager", naive) == scope_key("manager", aware)
+        assert scope_key("manager", naive) != scope_key("recruteur", naive)
+        assert scope_filters(naive) == {"recruiter_id": str(recruiter_id), "start_date": "2024-06-01T00:00:00"}
+
+
+class TestMaterialChange:
+    """Tests de la détection d'un changement significatif des KPI"""
+
+    @pytest.mark.parametrize("current, changed", [
+        ({"time_to_hire": 31.0, "candidates": [{"count": 40}]}, False),
+        ({"time_to_hire": 40.0, "candidates": [{"count": 40}]}, True),
+        ({"time_to_hire": 30.0, "candidates": [{"count": 40}, {"count": 1}]}, True),
+        ({"time_to_hire": None, "candidates": [{"count": 40}]}, True),
+    ])
+    def test_relative_threshold(self, current, changed):
+        from services.kpi_ai_analysis import material_change
+        previous = {"time_to_hire": 30.0, "candidates": [{"count": 40}]}
+        assert material_change(previous, current, 0.1) is changed
+
+    def test_small_counters(self):
+        from services.kpi_ai_analysis import material_change
+        # Un écart d'une unité sur un compteur nul n'est pas relatif à 0
+        assert material_change({"offers": 0}, {"offers": 0.05}, 0.1) is False
+        assert material_change({"offers": 0}, {"offers": 1}, 0.1) is True
+
+
+class TestRefresh:
+    """Tests de la planification des analyses"""
+
+    @pytest.fixture
+    def planner(self, monkeypatch):
+        from services import kpi_ai_analysis
+        state = {"version": 2, "requested": [], "snapshots": 0, "failure": None}
+        monkeypatch.setattr(kpi_ai_analysis, "data_version", lambda session: state["version"])
+        monkeypatch.setattr(kpi_ai_analysis, "pending_analysis", lambda session, key, now: None)
+        monkeypatch.setattr(kpi_ai_analysis, "recent_failure", lambda session, key, now: state["failure"])
+        monkeypatch.setattr(
+            kpi_ai_analysis, "request_analysis",
+            lambda session, role, filters, source, requested_by=None: state["requested"].append(role) or "task"
+        )
+        return state
+
+    def source(self, state, kpis):
+        from services.kpi_ai_analysis import AnalysisSource
+
+        def snapshot(session, role, filters):
+            state["snapshots"] += 1
+            return {"kpis": kpis}
+        return AnalysisSource(snapshot=snapshot, analyze=lambda snapshot, role: {})
+
+    def latest(self, version, kpis):
+        return SimpleNamespace(scope_key="k", data_version=version, kpi_snapshot=json.dumps({"kpis": kpis}))
+
+    def test_first_analysis_is_planned(self, planner):
+        from services.kpi_ai_analysis import refresh_if_needed
+        assert refresh_if_needed(None, "manager", {}, None, self.source(planner, {})) == "task"
+        assert planner["requested"] == ["manager"]
+
+    def test_unchanged_version_skips_the_comparison(self, planner):
+        from services.kpi_ai_analysis import refresh_if_needed
+        assert refresh_if_needed(None, "manager", {}, self.latest(2, {"hires": 1}), self.source(planner, {"hires": 9})) is None
+        assert planner["snapshots"] == 0 and planner["requested"] == []
+
+    def test_material_change_plans_a_new_analysis(self, planner):
+        from services.kpi_ai_analysis import refresh_if_needed
+        source = self.source(planner, {"hires": 10})
+        assert refresh_if_needed(None, "manager", {}, self.latest(1, {"hires": 10.5}), source) is None
+        assert refresh_if_needed(None, "manager", {}, self.latest(1, {"hires": 5}), source) == "task"
+        assert planner["requested"] == ["manager"]
+
+    def test_recent_failure_is_not_retried(self, planner):
+        from services.kpi_ai_analysis import refresh_if_needed
+        planner["failure"] = "failed"
+        source = self.source(planner, {"hires": 10})
+        assert refresh_if_needed(None, "manager", {}, None, source) == "failed"
+        assert refresh_if_needed(None, "manager", {}, self.latest(1, {"hires": 5}), source) == "failed"
+        assert planner["requested"] == [] and planner["snapshots"] == 0
+
+    def test_recent_failure_is_the_last_analysis(self, pg_session):
+        from models import KPIAIAnalysis
+        from services.kpi_ai_analysis import DONE, FAILED, PENDING, recent_failure
+        now = datetime.utcnow()
+
+        def analysis(key, status, minutes_ago):
+            at = now - timedelta(minutes=minutes_ago)
+            return KPIAIAnalysis(scope_key=key, role="manager", filters="{}", status=status, requested_at=at,
+                                 completed_at=at if status != PENDING else None)
+
+        failed = analysis("recent", FAILED, 5)
+        pg_session.add_all([
+            analysis("recent", DONE, 60), failed,
+            analysis("old", FAILED, 60 * 24),
+            analysis("retried", FAILED, 10), analysis("retried", PENDING, 2),
+        ])
+        pg_session.flush()
+        assert recent_failure(pg_session, "recent", now) is failed
+        assert recent_failure(pg_session, "old", now) is None
+        assert recent_failure(pg_session, "retried", now) is None
+
+
+class TestRun:
+    """Tests de la génération"""
+
+    def run(self, monkeypatch, analyze):
+        from models import KPIAIAnalysis
+        from services import kpi_ai_analysis
+        analysis = KPIAIAnalysis(scope_key="k", role="manager", filters=json.dumps({"source": "linkedin"}))
+        commits = []
+        session = SimpleNamespace(
+            get=lambda model, key: analysis,
+            add=lambda instance: None,
+            commit=lambda: commits.append(analysis.status),
+            rollback=lambda: None,
+        )
+
+        class FakeSession:
+            def __init__(self, engine):
+                pass
+
+            def __enter__(self):
+                return session
+
+            def __exit__(self, *exc):
+                return False
+
+        monkeypatch.setattr(kpi_ai_analysis, "Session", FakeSession)
+        monkeypatch.setattr(kpi_ai_analysis, "data_version", lambda session: 7)
+        source = kpi_ai_analysis.AnalysisSource(
+            snapshot=lambda session, role, filters: {"kpis": filters}, analyze=analyze
+        )
+        kpi_ai_analysis.run_analysis(None, analysis.id, source)
+        return analysis, commits
+
+    def test_snapshot_stored_with_analysis(self, monkeypatch):
+        analysis, commits = self.run(monkeypatch, lambda snapshot, role: {"overall_summary": role})
+        assert commits == ["running", "done"]
+        assert json.loads(analysis.kpi_snapshot) == {"kpis": {"source": "linkedin"}}
+        assert json.loads(analysis.analysis_data) == {"overall_summary": "manager"}
+        assert analysis.data_version == 7 and analysis.completed_at is not None
+
+    def test_failure_is_recorded(self, monkeypatch):
+        from fastapi import HTTPException
+
+        def analyze(snapshot, role):
+            raise HTTPException(status_code=500, detail="GEMINI_API_KEY n'est pas configurée")
+
+        analysis, commits = self.run(monkeypatch, analyze)
+        assert commits == ["running", "failed"]
+        assert analysis.error == "GEMINI_API_KEY n'est pas configurée" and analysis.analysis_data is None
@@ -0,0 +1,142 @@
+"""
+Tests du cache des KPI
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from tests.helpers import compile_sql
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Cache vide, version des données contrôlée par le test et recalculs exécutés sur place"""
+    from services import kpi_cache
+    kpi_cache._cache.clear()
+    state = {"version": 1, "submitted": []}
+    monkeypatch.setattr(kpi_cache, "data_version", lambda session: state["version"])
+    monkeypatch.setattr(kpi_cache, "submit_task", lambda key, fn, *args: state["submitted"].append((fn, args)))
+    yield state
+    kpi_cache._cache.clear()
+
+
+def fake_session():
+    return SimpleNamespace(get_bind=lambda: SimpleNamespace(url=SimpleNamespace(database="tenant_test")))
+
+
+class TestKeys:
+    """Tests de la normalisation des filtres"""
+
+    def test_equivalent_filters_share_a_key(self):
+        from services.kpi_cache import cache_key
+        recruiter_id = uuid4()
+        naive = {"start_date": datetime(2024, 6, 1), "recruiter_id": recruiter_id, "source": None}
+        aware = {"recruiter_id": str(recruiter_id), "start_date": datetime(2024, 6, 1, 2, tzinfo=timezone(timedelta(hours=2)))}
+        assert cache_key("t", "manager", naive) == cache_key("t", "manager", aware)
+        assert cache_key("t", "manager", naive) != cache_key("t", "recruiter", naive)
+        assert cache_key("t", "manager", naive) != cache_key("u", "manager", naive)
+
+    def test_lru_eviction(self):
+        from services.kpi_cache import KPICache
+        cache = KPICache(max_entries=2)
+        cache.put("a", 1, "A")
+        cache.put("b", 1, "B")
+        cache.get("a")
+        cache.put("c", 1, "C")
+        assert cache.get("b") is None
+        assert cache.get("a").value == "A"
+
+    def test_older_version_does_not_replace_newer(self):
+        from services.kpi_cache import KPICache
+        cache = KPICache(max_entries=2)
+        cache.put("a", 3, "new")
+        cache.put("a", 2, "old")
+        assert cache.get("a").value == "new"
+
+
+class TestFreshness:
+    """Tests de la validité des résultats"""
+
+    def test_states(self):
+        from config import settings
+        from services.kpi_cache import FRESH, MISSING, STALE, CacheEntry, freshness
+        entry = CacheEntry(version=4, value=None, computed_at=1000.0)
+        assert freshness(None, 4, 1000.0) == MISSING
+        assert freshness(entry, 4, 1001.0) == FRESH
+        assert freshness(entry, 5, 1001.0) == STALE
+        assert freshness(entry, 4, 1001.0 + settings.kpi_cache_ttl) == STALE
+        assert freshness(entry, 5, 1001.0 + settings.kpi_cache_max_stale) == MISSING
+
+
+class TestCachedKPIs:
+    """Tests du stale-while-revalidate"""
+
+    def test_computed_once_per_version(self, cache):
+        from services.kpi_cache import cached_kpis
+        calls = []
+
+        def compute(session):
+            calls.append(cache["version"])
+            return {"version": cache["version"]}
+
+        assert cached_kpis(fake_session(), "manager", {"source": "linkedin"}, compute) == {"version": 1}
+        assert cached_kpis(fake_session(), "manager", {"source": "linkedin"}, compute) == {"version": 1}
+        assert calls == [1]
+
+    def test_stale_result_served_while_revalidating(self, cache):
+        from services.kpi_cache import _cache, cache_key, cached_kpis
+
+        def compute(session):
+            return {"version": cache["version"]}
+
+        cached_kpis(fake_session(), "manager", {}, compute)
+        cache["version"] = 2
+        assert cached_kpis(fake_session(), "manager", {}, compute) == {"version": 1}
+        assert len(cache["submitted"]) == 1
+
+        fn, (engine, key, submitted_compute) = cache["submitted"][0]
+        _cache.put(key, cache["version"], submitted_compute(None))
+        assert key == cache_key("tenant_test", "manager", {})
+        assert cached_kpis(fake_session(), "manager", {}, compute) == {"version": 2}
+
+
+class TestTracking:
+    """Tests du suivi des écritures"""
+
+    def test_new_tracked_rows_mark_the_session(self):
+        from models import Application, Setting
+        from services.kpi_cache import _track_flushed_rows
+        session = SimpleNamespace(new=[Setting(key="x", value="y")], deleted=[], dirty=[], info={})
+        _track_flushed_rows(session, None)
+        assert "kpi_data_changed" not in session.info
+
+        session.new.append(Application(candidate_id=uuid4(), job_id=uuid4(), created_by=uuid4()))
+        _track_flushed_rows(session, None)
+        assert session.info["kpi_data_changed"] is True
+
+    def test_rollback_forgets_changes(self):
+        from services.kpi_cache import _forget_after_rollback
+        session = SimpleNamespace(info={"kpi_data_changed": True})
+        _forget_after_rollback(session)
+        assert session.info == {}
+
+
+class TestDataVersion:
+    """Tests de la lecture de la version des données"""
+
+    def test_unused_sequence_reads_zero(self):
+        from services.kpi_cache import build_data_version_query
+        sql = compile_sql(build_data_version_query())
+        assert "CASE WHEN is_called THEN last_value ELSE" in sql and "FROM kpi_data_version" in sql
+
+    def test_first_increment_changes_the_version(self, pg_session):
+        from sqlalchemy import func, select
+        from models import KPI_DATA_VERSION
+        from services.kpi_cache import data_version
+        assert data_version(pg_session) == 0
+        pg_session.execute(select(func.nextval(KPI_DATA_VERSION.name)))
+        assert data_version(pg_session) == 1
+        pg_session.execute(select(func.nextval(KPI_DATA_VERSION.name)))
+        assert data_version(pg_session) == 2
@@ -0,0 +1,352 @@
+"""
+Tests du moteur de calcul des KPI
+"""
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from tests.helpers import NOW, compile_sql
+
+
+def candidate_row(status, in_scope=0, today=0, this_month=0, this_year=0, first_created_at=None, owned=0):
+    return {
+        "status": status,
+        "in_scope": in_scope,
+        "today": today,
+        "this_month": this_month,
+        "this_year": this_year,
+        "first_created_at": first_created_at,
+        "source_total": 0,
+        "owned": owned,
+    }
+
+
+class TestStatements:
+    """Tests des requêtes du moteur"""
+
+    def test_candidates_in_one_grouped_statement(self):
+        from services.kpi_engine import KPIScope, PeriodStarts, build_candidate_query
+        scope = KPIScope(start_date=NOW - timedelta(days=30), recruiter_id=uuid4(), source="linkedin")
+        sql = compile_sql(build_candidate_query(scope, PeriodStarts.at(NOW), owner_id=uuid4()))
+        assert sql.count("count(*) FILTER (WHERE") == 6
+        assert "GROUP BY candidates.status" in sql
+        assert "min(candidates.created_at) FILTER (WHERE" in sql
+
+    def test_periods(self):
+        from services.kpi_engine import PeriodStarts
+        periods = PeriodStarts.at(NOW)
+        assert periods.today == datetime(2024, 6, 15)
+        assert periods.month == datetime(2024, 6, 1)
+        assert periods.year == datetime(2024, 1, 1)
+
+    def test_job_source_budget_uses_cte(self):
+        from services.kpi_engine import KPIScope, build_job_query
+        sql = compile_sql(build_job_query(KPIScope(source="linkedin")))
+        assert sql.startswith("WITH source_jobs AS")
+        assert "LEFT OUTER JOIN source_jobs ON source_jobs.job_id = jobs.id" in sql
+        assert "GROUP BY jobs.status" in sql
+        assert "WITH" not in compile_sql(build_job_query(KPIScope()))
+
+    def test_applications_in_one_row(self):
+        from services.kpi_engine import KPIScope, build_application_query
+        sql = compile_sql(build_application_query(KPIScope(recruiter_id=uuid4(), source="linkedin"), owner_id=uuid4()))
+        assert "GROUP BY" not in sql
+        assert "avg(EXTRACT(epoch FROM applications.updated_at - jobs.created_at)" in sql
+        assert re.search(r"\) FILTER \(WHERE applications\.status = %\(status_\d+\)s AND jobs\.created_by =", sql)
+        assert "JOIN candidates ON candidates.id = applications.candidate_id" in sql
+
+    def test_feedback_on_time_compares_intervals(self):
+        from services.kpi_engine import KPIScope, build_interview_query
+        statement = build_interview_query(KPIScope(), NOW)
+        sql = compile_sql(statement)
+        assert "interviews.feedback_provided_at - interviews.scheduled_at <=" in sql
+        assert timedelta(days=2) in statement.compile(dialect=postgresql.dialect()).params.values()
+
+    def test_client_statements_are_scoped_to_client_jobs(self):
+        from services.kpi_engine import KPIScope, PeriodStarts, build_client_application_query, build_client_interview_query
+        client_id, job_id = uuid4(), uuid4()
+        scope = KPIScope(job_id=job_id)
+        for statement in (
+            build_client_application_query(client_id, scope, PeriodStarts.at(NOW)),
+            build_client_interview_query(client_id, scope),
+        ):
+            compiled = statement.compile(dialect=postgresql.dialect())
+            assert "jobs.created_by =" in str(compiled)
+            assert client_id in compiled.params.values()
+            assert job_id in compiled.params.values()
+
+
+class TestHistoryStatements:
+    """Tests des délais calculés en base (historique et besoins clôturés)"""
+
+    def test_stage_cycle_uses_lag(self):
+        from services.kpi_engine import KPIScope, build_stage_cycle_query
+        sql = compile_sql(build_stage_cycle_query(KPIScope()))
+        assert "lag(application_history.created_at) OVER (PARTITION BY application_history.application_id " \
+               "ORDER BY application_history.created_at)" in sql
+        assert "JOIN applications" not in sql
+
+    def test_stage_cycle_applies_filters(self):
+        from services.kpi_engine import KPIScope, build_stage_cycle_query
+        recruiter_id, job_id = uuid4(), uuid4()
+        scope = KPIScope(start_date=NOW - timedelta(days=30), recruiter_id=recruiter_id, job_id=job_id, source="linkedin")
+        compiled = build_stage_cycle_query(scope).compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        assert "JOIN applications ON applications.id = application_history.application_id" in sql
+        assert "JOIN candidates ON candidates.id = applications.candidate_id" in sql
+        # La période s'applique après la fenêtre, pour conserver le changement précédent
+        assert "WHERE transitions.duration >" in sql and "transitions.created_at >=" in sql
+        assert {recruiter_id, job_id, "linkedin"} <= set(compiled.params.values())
+
+    def test_jobs_on_time(self):
+        from services.kpi_engine import KPIScope, build_jobs_on_time_query
+        compiled = build_jobs_on_time_query(KPIScope(recruiter_id=uuid4())).compile(dialect=postgresql.dialect())
+        assert "count(*) FILTER (WHERE jobs.closed_at - jobs.validated_at <=" in str(compiled)
+        assert "jobs.created_by =" in str(compiled)
+        assert timedelta(days=60) in compiled.params.values()
+
+
+class TestRecruiterStatements:
+    """Tests des compteurs par recruteur (tous les recruteurs en une instruction)"""
+
+    def test_grouped_by_creator(self):
+        from services.kpi_engine import KPIScope, PeriodStarts, build_recruiter_candidate_query, build_recruiter_job_query
+        scope = KPIScope(start_date=NOW - timedelta(days=30), recruiter_id=uuid4(), job_id=uuid4(), source="linkedin")
+        candidate_sql = compile_sql(build_recruiter_candidate_query(scope, PeriodStarts.at(NOW)))
+        job_sql = compile_sql(build_recruiter_job_query(scope))
+        assert "GROUP BY candidates.created_by, candidates.status" in candidate_sql
+        assert "GROUP BY jobs.created_by, jobs.status" in job_sql
+        # Le filtre recruteur est ignoré : chaque créateur a ses lignes
+        assert "candidates.created_by =" not in candidate_sql and "jobs.created_by =" not in job_sql
+        # in_period ne porte que sur la période
+        assert "count(*) FILTER (WHERE candidates.created_at >=" in candidate_sql
+        assert "count(*) FILTER (WHERE jobs.created_at >=" in job_sql
+
+    def test_by_recruiter(self):
+        from services.kpi_engine import by_recruiter
+        first, second = uuid4(), uuid4()
+        rows = by_recruiter([
+            {"recruiter_id": first, "status": "sourcé", "in_scope": 2},
+            {"recruiter_id": first, "status": "qualifié", "in_scope": 1},
+            {"recruiter_id": second, "status": "sourcé", "in_scope": 4},
+        ])
+        assert set(rows[first]) == {"sourcé", "qualifié"}
+        assert rows[second]["sourcé"]["in_scope"] == 4
+
+
+class TestAssembly:
+    """Tests de la construction des réponses à partir des compteurs"""
+
+    def test_status_statistics(self):
+        from routers.kpi import CandidateStatusStatistics, status_statistics
+        from services.kpi_engine import CANDIDATE_STATUSES, by_status
+        rows = by_status([candidate_row("sourcé", in_scope=3), candidate_row("qualifié", in_scope=1)])
+        statistics = status_statistics(rows, CANDIDATE_STATUSES, CandidateStatusStatistics)
+        assert [item.status for item in statistics] == CANDIDATE_STATUSES
+        assert (statistics[0].count, statistics[0].percentage) == (3, 75.0)
+        assert statistics[-1].count == 0
+        assert status_statistics({}, CANDIDATE_STATUSES, CandidateStatusStatistics) == []
+        assert len(status_statistics({}, CANDIDATE_STATUSES, CandidateStatusStatistics, keep_empty=True)) == 8
+
+    def test_sourcing_statistics(self):
+        from routers.kpi import KPIFilters, sourcing_statistics_from
+        row = candidate_row("sourcé", in_scope=20, today=1, this_month=4, this_year=20,
+                            first_created_at=NOW - timedelta(days=10))
+        statistics = sourcing_statistics_from(row, "in_scope", KPIFilters(), NOW)
+        assert statistics.per_day == 2.0
+        assert statistics.per_month == 60.0
+        assert (statistics.today_count, statistics.this_month_count, statistics.this_year_count) == (1, 4, 20)
+
+        empty = sourcing_statistics_from(None, "in_scope", KPIFilters(), NOW)
+        assert empty.per_day == 0 and empty.today_count == 0
+
+    def test_totals_exclude_statuses(self):
+        from services.kpi_engine import by_status, column_total, status_count
+        rows = by_status([
+            {"status": "clôturé", "total": 2},
+            {"status": "en_cours", "total": 5},
+            {"status": None, "total": 1},
+        ])
+        assert column_total(rows, "total") == 8
+        assert column_total(rows, "total", exclude=("clôturé", None)) == 5
+        assert status_count(rows, "clôturé", "total") == 2
+        assert status_count(rows, "brouillon", "total") == 0
+
+    def test_recruiters_performance_without_per_recruiter_queries(self, monkeypatch):
+        from routers import kpi
+        from services.kpi_engine import by_recruiter
+        recruiters = [
+            SimpleNamespace(id=uuid4(), first_name="Awa", last_name="Diallo"),
+            SimpleNamespace(id=uuid4(), first_name="Koffi", last_name="Mensah"),
+        ]
+        active = recruiters[0].id
+        candidates = by_recruiter([
+            {**candidate_row("sourcé", in_scope=3, this_year=3), "recruiter_id": active, "in_period": 5},
+            {**candidate_row("embauché", in_scope=1), "recruiter_id": active, "in_period": 1},
+        ])
+        jobs = by_recruiter([{"recruiter_id": active, "status": "en_cours", "in_scope": 2, "in_period": 3}])
+        monkeypatch.setattr(kpi, "load_recruiter_candidates", lambda session, scope, periods: candidates)
+        monkeypatch.setattr(kpi, "load_recruiter_jobs", lambda session, scope: jobs)
+
+        statements = []
+        session = SimpleNamespace(exec=lambda statement: statements.append(statement) or SimpleNamespace(all=lambda: recruiters))
+        performances = kpi.calculate_recruiters_performance_statistics(session, kpi.KPIFilters())
+        assert len(statements) == 1
+        assert (performances[0].total_candidates_sourced, performances[0].total_jobs_managed) == (5, 3)
+        assert performances[0].candidates_by_status[0].count == 3
+        assert performances[1].candidates_by_status == [] and performances[1].total_jobs_managed == 0
+
+        summary = kpi.compute_recruiters_performance(session)
+        assert (summary[0].total_candidates, summary[0].candidates_hired, summary[0].total_jobs) == (4, 1, 2)
+        assert summary[1].total_candidates == 0
+
+
+@pytest.fixture
+def kpi_dataset(pg_session, monkeypatch):
+    """
+    Jeu de données de référence (dates relatives au 40e jour précédent)
+
+    - besoins : J1 en cours (Awa, budget 1000), J2 clôturé en 30 jours (Awa, 3000),
+      J3 clôturé en 90 jours (Koffi, sans budget)
+    - candidats : C1 sourcé, C2 qualifié, C3 embauché (Awa) ; C4 sourcé, C5 rejeté (Koffi)
+    - candidatures : A1 embauchée, A2 en offre (Awa) ; A3 rejetée après offre, A4 sourcée (Koffi)
+    - entretiens : feedback en 1 jour (score 8), en 3 jours (score 6), puis un no-show
+    """
+    from models import Application, ApplicationHistory, Candidate, Interview, Job, User
+    from services import kpi_rollups
+    # Sans agrégats construits : tous les indicateurs sont calculés sur les tables
+    monkeypatch.setattr(kpi_rollups, "schedule_build", lambda session: None)
+    session = pg_session
+    start = datetime.utcnow() - timedelta(days=40)
+
+    def at(day):
+        return start + timedelta(days=day)
+
+    def user(first_name, role):
+        return User(email=f"{first_name.lower()}@example.com", password_hash="x", first_name=first_name,
+                    last_name="Test", role=role, company_id=uuid4())
+
+    manager, awa, koffi = user("Mariam", "manager"), user("Awa", "recruteur"), user("Koffi", "recruteur")
+    session.add_all([manager, awa, koffi])
+    session.flush()
+
+    j1 = Job(title="J1", status="en_cours", budget=1000, created_by=awa.id, created_at=at(0), validated_at=at(2))
+    j2 = Job(title="J2", status="clôturé", budget=3000, created_by=awa.id, created_at=at(0), validated_at=at(1),
+             closed_at=at(31))
+    j3 = Job(title="J3", status="clôturé", created_by=koffi.id, created_at=at(0), validated_at=at(0), closed_at=at(90))
+    candidates = [
+        Candidate(first_name=f"C{index + 1}", last_name="Test", status=status, source=source, created_by=owner.id,
+                  created_at=at(index))
+        for index, (status, source, owner) in enumerate([
+            ("sourcé", "linkedin", awa), ("qualifié", "linkedin", awa), ("embauché", "cooptation", awa),
+            ("sourcé", "linkedin", koffi), ("rejeté", "cooptation", koffi),
+        ])
+    ]
+    session.add_all([j1, j2, j3, *candidates])
+    session.flush()
+    c1, c2, c3, c4, c5 = candidates
+
+    a1 = Application(candidate_id=c3.id, job_id=j1.id, created_by=awa.id, status="embauché", is_in_shortlist=True,
+                     client_validated=True, offer_sent_at=at(10), created_at=at(5), updated_at=at(20))
+    a2 = Application(candidate_id=c2.id, job_id=j1.id, created_by=awa.id, status="offre", is_in_shortlist=True,
+                     offer_sent_at=at(12), created_at=at(6), updated_at=at(14))
+    a3 = Application(candidate_id=c5.id, job_id=j2.id, created_by=koffi.id, status="rejeté", is_in_shortlist=True,
+                     client_validated=False, offer_sent_at=at(8), created_at=at(5), updated_at=at(9))
+    a4 = Application(candidate_id=c4.id, job_id=j3.id, created_by=koffi.id, status="sourcé",
+                     created_at=at(4), updated_at=at(4))
+    session.add_all([a1, a2, a3, a4])
+    session.flush()
+
+    session.add_all([
+        Interview(application_id=a1.id, created_by=awa.id, interview_type="rh", scheduled_at=at(7),
+                  feedback="Bon entretien", feedback_provided_at=at(8), score=8, created_at=at(6)),
+        Interview(application_id=a2.id, created_by=awa.id, interview_type="rh", scheduled_at=at(8),
+                  feedback="Réservé", feedback_provided_at=at(11), score=6, created_at=at(7)),
+        Interview(application_id=a3.id, created_by=koffi.id, interview_type="rh", scheduled_at=at(6), created_at=at(5)),
+        # Étapes : A1 4 puis 11 jours, A2 8 jours
+        *[
+            ApplicationHistory(application_id=application.id, changed_by=awa.id, new_status=status, created_at=at(day))
+            for application, status, day in [
+                (a1, "sourcé", 5), (a1, "shortlist", 9), (a1, "embauché", 20), (a2, "sourcé", 6), (a2, "offre", 14),
+            ]
+        ],
+    ])
+    session.flush()
+    return SimpleNamespace(session=session, manager=manager, awa=awa, koffi=koffi)
+
+
+class TestComputedKPIs:
+    """Tests des KPI calculés sur une base PostgreSQL (valeurs calculées à la main)"""
+
+    def test_manager_kpis(self, kpi_dataset):
+        from routers.kpi import KPIFilters, compute_manager_kpis
+        kpis = compute_manager_kpis(kpi_dataset.session, KPIFilters())
+
+        time_process = kpis.time_process
+        assert time_process.time_to_hire == pytest.approx(20)
+        assert time_process.time_to_fill == pytest.approx(12)
+        assert time_process.average_cycle_per_stage == pytest.approx(23 / 3)
+        assert time_process.average_feedback_delay == pytest.approx(2)
+        assert time_process.percentage_jobs_on_time == pytest.approx(50)
+
+        quality = kpis.quality_selection
+        assert quality.qualified_candidates_rate == pytest.approx(50)
+        assert quality.rejection_rate_per_stage == pytest.approx(25)
+        assert quality.shortlist_acceptance_rate == pytest.approx(100 / 3)
+        assert quality.average_candidate_score == pytest.approx(7)
+        assert quality.no_show_rate == pytest.approx(100 / 3)
+
+        volume = kpis.volume_productivity
+        assert (volume.total_candidates_sourced, volume.total_interviews_conducted) == (5, 3)
+        assert volume.closed_vs_open_recruitments == pytest.approx(2)
+        assert (volume.sourcing_statistics.per_day, volume.sourcing_statistics.per_month) == (0.05, 1.5)
+
+        assert kpis.cost_budget.average_recruitment_cost == pytest.approx(2000)
+        assert kpis.cost_budget.budget_spent_vs_planned == pytest.approx(75)
+        engagement = kpis.engagement_satisfaction
+        assert engagement.offer_acceptance_rate == pytest.approx(100 / 3)
+        assert engagement.offer_rejection_rate == pytest.approx(100 / 3)
+        assert engagement.candidate_response_rate == pytest.approx(200 / 3)
+        assert kpis.recruiter_performance.jobs_managed == 1
+        assert kpis.recruiter_performance.feedbacks_on_time_rate == pytest.approx(50)
+        assert kpis.source_channel.average_sourcing_time == pytest.approx(2.5)
+        assert kpis.onboarding.average_onboarding_delay == pytest.approx(10)
+        assert kpis.onboarding.onboarding_success_rate == 100.0
+
+        detailed = kpis.detailed_statistics
+        assert {item.status: (item.count, item.percentage) for item in detailed.candidates_by_status if item.count} == {
+            "sourcé": (2, 40.0), "qualifié": (1, 20.0), "embauché": (1, 20.0), "rejeté": (1, 20.0),
+        }
+        assert {item.status: item.count for item in detailed.jobs_by_status if item.count} == {"en_cours": 1, "clôturé": 2}
+        performances = {item.recruiter_id: item for item in detailed.recruiters_performance}
+        assert set(performances) == {kpi_dataset.awa.id, kpi_dataset.koffi.id}
+        awa, koffi = performances[kpi_dataset.awa.id], performances[kpi_dataset.koffi.id]
+        assert (awa.total_candidates_sourced, awa.total_jobs_managed) == (1, 2)
+        assert (koffi.total_candidates_sourced, koffi.total_jobs_managed) == (1, 1)
+
+    def test_recruiter_kpis(self, kpi_dataset):
+        from routers.kpi import KPIFilters, compute_recruiter_kpis
+        kpis = compute_recruiter_kpis(kpi_dataset.session, KPIFilters(recruiter_id=kpi_dataset.awa.id))
+
+        volume = kpis.volume_productivity
+        assert (volume.total_candidates_sourced, volume.total_interviews_conducted) == (3, 2)
+        quality = kpis.quality_selection
+        assert quality.qualified_candidates_rate == pytest.approx(100)
+        assert quality.shortlist_acceptance_rate == pytest.approx(50)
+        assert quality.average_candidate_score == pytest.approx(7)
+        assert kpis.time_process.time_to_hire == pytest.approx(20)
+        assert kpis.engagement_conversion.offer_acceptance_rate == pytest.approx(50)
+        assert kpis.engagement_conversion.offer_rejection_rate == 0
+        assert kpis.onboarding.onboarding_success_rate == 100.0
+
+        detailed = kpis.detailed_statistics
+        assert {item.status: item.count for item in detailed.candidates_by_status if item.count} == {
+            "sourcé": 1, "qualifié": 1, "embauché": 1,
+        }
+        assert {item.status: item.percentage for item in detailed.jobs_by_status if item.count} == {
+            "en_cours": 50.0, "clôturé": 50.0,
+        }
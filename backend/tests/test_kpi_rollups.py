@@ -0,0 +1,115 @@
+"""
+Tests des agrégats KPI quotidiens
+"""
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from tests.helpers import NOW, compile_sql
+
+
+class TestRollupSource:
+    """Tests des requêtes de calcul des agrégats"""
+
+    def test_columns_follow_insert_order(self):
+        from services.kpi_rollups import ROLLUP_COLUMNS, TRACKED_MODELS, build_rollup_source_query
+        for entity in TRACKED_MODELS.values():
+            statement = build_rollup_source_query(entity)
+            assert len(statement.selected_columns) == len(ROLLUP_COLUMNS)
+
+    def test_groups_by_day_and_dimensions(self):
+        from services.kpi_rollups import build_rollup_source_query
+        sql = compile_sql(build_rollup_source_query("applications"))
+        assert "JOIN candidates ON candidates.id = applications.candidate_id" in sql
+        assert "GROUP BY CAST(applications.created_at AS DATE), applications.created_by, " \
+               "candidates.source, applications.status" in sql
+
+    def test_missing_dimensions_are_typed_nulls(self):
+        from services.kpi_rollups import build_rollup_source_query
+        sql = compile_sql(build_rollup_source_query("jobs"))
+        assert "CAST(NULL AS VARCHAR(100))" in sql
+        assert "GROUP BY CAST(jobs.created_at AS DATE), jobs.created_by, jobs.status" in sql
+
+    def test_refreshed_days(self):
+        from services.kpi_rollups import build_rollup_source_query
+        days = [date(2024, 6, 3), date(2024, 6, 1)]
+        compiled = build_rollup_source_query("interviews", days).compile(dialect=postgresql.dialect())
+        assert "interviews.created_at >=" in str(compiled) and "interviews.created_at <" in str(compiled)
+        params = compiled.params.values()
+        assert datetime(2024, 6, 1) in params and datetime(2024, 6, 4) in params
+
+
+class TestRollupReads:
+    """Tests de la lecture des agrégats"""
+
+    def test_covers_day_bounds_only(self):
+        from services.kpi_engine import KPIScope
+        from services.kpi_rollups import covers
+        assert covers(KPIScope())
+        assert covers(KPIScope(start_date=datetime(2024, 6, 1), end_date=datetime(2024, 6, 30)))
+        assert covers(KPIScope(start_date=datetime(2024, 6, 1, tzinfo=timezone.utc)))
+        assert not covers(KPIScope(start_date=NOW))
+
+    def test_day_conditions(self):
+        from services.kpi_engine import KPIScope
+        from services.kpi_rollups import day_conditions
+        scope = KPIScope(start_date=datetime(2024, 6, 1), end_date=datetime(2024, 6, 30))
+        sql = " ".join(compile_sql(condition) for condition in day_conditions(scope))
+        assert "kpi_daily_rollups.day >=" in sql and "kpi_daily_rollups.day <" in sql
+        assert day_conditions(KPIScope()) == []
+
+    def test_rollup_queries_match_engine_columns(self):
+        from services.kpi_engine import (
+            KPIScope,
+            PeriodStarts,
+            build_application_delay_query,
+            build_application_query,
+            build_candidate_query,
+            build_interview_query,
+            build_job_query,
+        )
+        from services.kpi_rollups import (
+            build_application_rollup_query,
+            build_candidate_rollup_query,
+            build_interview_rollup_query,
+            build_job_rollup_query,
+        )
+
+        def names(statement):
+            return set(statement.selected_columns.keys())
+
+        scope, owner_id, periods = KPIScope(recruiter_id=uuid4()), uuid4(), PeriodStarts.at(NOW)
+        assert names(build_candidate_rollup_query(scope, periods, owner_id)) == \
+            names(build_candidate_query(scope, periods, owner_id))
+        assert names(build_job_rollup_query(scope, owner_id)) == names(build_job_query(scope, owner_id))
+        assert names(build_application_rollup_query(scope, owner_id)) | names(build_application_delay_query(scope)) == \
+            names(build_application_query(scope, owner_id))
+        assert names(build_interview_rollup_query(scope, owner_id)) | {"no_show"} == \
+            names(build_interview_query(scope, NOW, owner_id))
+
+
+class TestTracking:
+    """Tests du suivi des jours à recalculer"""
+
+    def test_flushed_rows(self):
+        from models import Candidate, Interview, Setting
+        from services.kpi_rollups import _track_flushed_rows
+        session = SimpleNamespace(
+            new=[Candidate(first_name="A", last_name="B", created_by=uuid4(), created_at=NOW)],
+            dirty=[Interview(created_at=NOW - timedelta(days=3))],
+            deleted=[Setting(key="x", value="y")],
+            info={},
+        )
+        _track_flushed_rows(session, None)
+        assert dict(session.info["kpi_rollup_days"]) == {
+            "candidates": {date(2024, 6, 15)},
+            "interviews": {date(2024, 6, 12)},
+        }
+
+    def test_rollback_forgets_days(self):
+        from services.kpi_rollups import _forget_after_rollback
+        session = SimpleNamespace(info={"kpi_rollup_days": {"jobs": {NOW.date()}}, "kpi_rollup_since": {"jobs": NOW}})
+        _forget_after_rollback(session)
+        assert session.info == {}
@@ -0,0 +1,120 @@
+"""
+Tests des séries temporelles des KPI
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from tests.helpers import NOW, compile_sql
+
+
+class TestWindow:
+    """Tests des périodes"""
+
+    def test_truncate(self):
+        from services.kpi_timeseries import next_bucket, truncate
+        assert truncate(NOW, "day") == datetime(2024, 6, 15)
+        assert truncate(NOW, "week") == datetime(2024, 6, 10)
+        assert truncate(NOW, "month") == datetime(2024, 6, 1)
+        assert next_bucket(datetime(2024, 12, 1), "month") == datetime(2025, 1, 1)
+
+    def test_default_windows(self):
+        from services.kpi_timeseries import SeriesWindow
+        days = SeriesWindow.build("day", None, None, NOW)
+        weeks = SeriesWindow.build("week", None, None, NOW)
+        months = SeriesWindow.build("month", None, None, NOW)
+        assert (days.first, days.last, days.bucket_count()) == (datetime(2024, 5, 17), datetime(2024, 6, 15), 30)
+        assert (weeks.first, weeks.bucket_count()) == (datetime(2024, 3, 25), 12)
+        assert (months.first, months.stop, months.bucket_count()) == (datetime(2023, 7, 1), datetime(2024, 7, 1), 12)
+
+    def test_explicit_bounds_in_utc(self):
+        from services.kpi_timeseries import SeriesWindow
+        start = datetime(2024, 6, 1, 1, tzinfo=timezone.utc)
+        window = SeriesWindow.build("month", start, datetime(2024, 6, 20), NOW)
+        assert (window.first, window.last) == (datetime(2024, 6, 1), datetime(2024, 6, 1))
+
+    @pytest.mark.parametrize("granularity, start", [
+        ("hour", None),
+        ("day", datetime(2024, 7, 1)),
+        ("day", datetime(2020, 1, 1)),
+    ])
+    def test_invalid_windows(self, granularity, start):
+        from services.kpi_timeseries import SeriesWindow
+        with pytest.raises(HTTPException) as error:
+            SeriesWindow.build(granularity, start, None, NOW)
+        assert error.value.status_code == 400
+
+    def test_families(self):
+        from services.kpi_timeseries import FAMILIES, parse_families
+        assert parse_families(None) == FAMILIES
+        assert parse_families("hiring, candidates,hiring") == ("hiring", "candidates")
+        with pytest.raises(HTTPException):
+            parse_families("revenue")
+
+
+class TestStatements:
+    """Tests des requêtes (une par famille)"""
+
+    def test_gap_filling(self):
+        from services.kpi_engine import KPIScope
+        from services.kpi_timeseries import SeriesWindow, build_candidate_series_query
+        sql = compile_sql(build_candidate_series_query(SeriesWindow.build("week", None, None, NOW), KPIScope()))
+        assert "generate_series(CAST(%(param_1)s AS TIMESTAMP WITHOUT TIME ZONE)" in sql
+        assert "interval '1 week'" in sql
+        assert "LEFT OUTER JOIN (SELECT date_trunc(" in sql
+        assert "coalesce(candidate_counts.candidates_sourced," in sql
+        assert "ORDER BY buckets.bucket" in sql
+
+    def test_hiring_joins_two_groupings(self):
+        from services.kpi_engine import KPIScope
+        from services.kpi_timeseries import SeriesWindow, build_hiring_series_query
+        recruiter_id = uuid4()
+        statement = build_hiring_series_query(SeriesWindow.build("month", None, None, NOW), KPIScope(recruiter_id=recruiter_id))
+        sql = compile_sql(statement)
+        assert "AS offer_counts ON offer_counts.bucket = buckets.bucket" in sql
+        assert "AS hire_counts ON hire_counts.bucket = buckets.bucket" in sql
+        # La moyenne reste NULL pour une période sans embauche
+        assert "hire_counts.time_to_hire" in sql and "coalesce(hire_counts.time_to_hire" not in sql
+        assert recruiter_id in statement.compile(dialect=postgresql.dialect()).params.values()
+
+    def test_pipeline_filters_join_applications(self):
+        from services.kpi_engine import KPIScope
+        from services.kpi_timeseries import SeriesWindow, build_pipeline_series_query
+        window = SeriesWindow.build("day", None, None, NOW)
+        assert "JOIN applications" not in compile_sql(build_pipeline_series_query(window, KPIScope()))
+        sql = compile_sql(build_pipeline_series_query(window, KPIScope(source="linkedin")))
+        assert "JOIN applications ON applications.id = application_history.application_id" in sql
+        assert "JOIN candidates ON candidates.id = applications.candidate_id" in sql
+
+
+class TestAssembly:
+    """Tests de l'assemblage des séries"""
+
+    def test_series_and_stages(self):
+        from services.kpi_engine import CANDIDATE_STATUSES, KPIScope
+        from services.kpi_timeseries import SeriesWindow, load_time_series
+        buckets = [datetime(2024, 5, 1), datetime(2024, 6, 1)]
+        results = {
+            "hire_counts": [
+                {"bucket": buckets[0], "offers_sent": 2, "hires": 1, "time_to_hire": 30.5},
+                {"bucket": buckets[1], "offers_sent": 0, "hires": 0, "time_to_hire": None},
+            ],
+            "stage_counts": [
+                {"bucket": bucket, **{f"stage_{index}": index for index in range(len(CANDIDATE_STATUSES))}}
+                for bucket in buckets
+            ],
+        }
+
+        def execute(statement):
+            name = next(name for name in results if name in compile_sql(statement))
+            return SimpleNamespace(mappings=lambda: SimpleNamespace(all=lambda: results[name]))
+
+        window = SeriesWindow.build("month", datetime(2024, 5, 1), None, NOW)
+        series = load_time_series(SimpleNamespace(execute=execute), window, KPIScope(), ("hiring", "pipeline"))
+        assert series["buckets"] == buckets
+        assert series["series"] == {"offers_sent": [2.0, 0.0], "hires": [1.0, 0.0], "time_to_hire": [30.5, None]}
+        assert series["stages"]["sourcé"] == [0, 0] and series["stages"]["embauché"] == [7, 7]
@@ -0,0 +1,119 @@
+"""
+Tests des statistiques de la plateforme (requête exécutée sur chaque base tenant)
+"""
+import threading
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from tests.helpers import NOW, compile_sql
+
+
+def target(db_name):
+    from services.platform_analytics import TenantTarget
+    company_id = uuid4()
+    return TenantTarget(db_name=db_name, company_id=company_id, companies=((company_id, db_name.title()),))
+
+
+class TestQueries:
+    """Tests des requêtes d'agrégation"""
+
+    def test_period_start(self):
+        from services.platform_analytics import period_start
+        assert period_start(1, NOW) == datetime(2024, 6, 1)
+        assert period_start(12, NOW) == datetime(2023, 7, 1)
+
+    def test_llm_usage_by_month(self):
+        from services.platform_analytics import build_llm_usage_query
+        sql = compile_sql(build_llm_usage_query(datetime(2024, 1, 1)))
+        assert "FROM candidate_job_comparisons" in sql and "FROM kpi_ai_analyses" in sql
+        assert "UNION ALL" in sql and "GROUP BY llm_calls.month" in sql
+
+    def test_usage_is_one_row(self):
+        from services.platform_analytics import build_usage_query
+        sql = compile_sql(build_usage_query(datetime(2024, 1, 1)))
+        assert "GROUP BY" not in sql and sql.count("(SELECT count(") == 5
+
+
+class TestFanOut:
+    """Tests de l'exécution parallèle et de la fusion"""
+
+    def test_errors_and_timeouts_do_not_block_the_report(self, monkeypatch):
+        from config import settings
+        from services.platform_analytics import run_report
+        monkeypatch.setattr(settings, "platform_analytics_timeout", 0.3)
+        release = threading.Event()
+
+        def query(tenant, statement, timeout):
+            if tenant.db_name == "tenant_down":
+                raise RuntimeError("connection refused\nDETAIL: ...")
+            if tenant.db_name == "tenant_slow":
+                release.wait(2)
+            return [{"month": datetime(2024, 5, 1), "hires": 2}, {"month": datetime(2024, 6, 1), "hires": 1}]
+
+        targets = [target("tenant_a"), target("tenant_b"), target("tenant_down"), target("tenant_slow")]
+        try:
+            report = run_report("hires", 2, targets, NOW, query)
+        finally:
+            release.set()
+        errors = {tenant["db_name"]: tenant["error"] for tenant in report["tenants"]}
+        assert errors == {"tenant_a": None, "tenant_b": None, "tenant_down": "connection refused", "tenant_slow": "Délai dépassé"}
+        assert report["failed"] == 2 and report["since"] == datetime(2024, 5, 1)
+        assert report["totals"] == [
+            {"month": datetime(2024, 5, 1), "hires": 4},
+            {"month": datetime(2024, 6, 1), "hires": 2},
+        ]
+
+    def test_tenants_are_queried_concurrently(self):
+        from config import settings
+        from services.platform_analytics import run_report
+
+        def query(tenant, statement, timeout):
+            time.sleep(0.05)
+            return [{"active_jobs": 1, "candidates": 10, "applications": 3, "active_users": 2, "hires": None}]
+
+        tenants = [target(f"tenant_{index}") for index in range(settings.platform_analytics_workers * 2)]
+        started = time.monotonic()
+        report = run_report("usage", 12, tenants, NOW, query)
+        # Deux vagues de requêtes, et non une par base
+        assert time.monotonic() - started < 0.05 * len(tenants) / 2
+        assert report["totals"] == [{
+            "active_jobs": len(tenants), "candidates": 10 * len(tenants), "applications": 3 * len(tenants),
+            "active_users": 2 * len(tenants), "hires": 0,
+        }]
+
+
+class TestCache:
+    """Tests de la mise en cache des rapports"""
+
+    @pytest.fixture
+    def runs(self, monkeypatch):
+        from services import platform_analytics
+        platform_analytics._cache.clear()
+        state = {"runs": 0, "failed": 0}
+
+        def run_report(name, months, targets, now):
+            state["runs"] += 1
+            return {"report": name, "failed": state["failed"]}
+
+        monkeypatch.setattr(platform_analytics, "run_report", run_report)
+        yield state
+        platform_analytics._cache.clear()
+
+    def test_complete_report_is_cached(self, runs):
+        from services.platform_analytics import cached_report
+        cached_report("usage", 12, lambda: [])
+        cached_report("usage", 12, lambda: [])
+        assert runs["runs"] == 1
+        cached_report("usage", 6, lambda: [])
+        cached_report("usage", 12, lambda: [], refresh=True)
+        assert runs["runs"] == 3
+
+    def test_partial_report_is_not_cached(self, runs):
+        from services.platform_analytics import cached_report
+        runs["failed"] = 1
+        cached_report("hires", 12, lambda: [])
+        cached_report("hires", 12, lambda: [])
+        assert runs["runs"] == 2
@@ -0,0 +1,63 @@
+"""
+Tests des aperçus de CV
+"""
+import pytest
+
+
+CV_KEY = "uploads/cvs/cv.pdf"
+
+
+def make_pdf(path, pages=3):
+    fitz = pytest.importorskip("fitz")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = fitz.open()
+    for index in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {index + 1}")
+    doc.save(str(path))
+    doc.close()
+
+
+class TestCvPreviews:
+    """Tests du rendu et du cache des aperçus"""
+
+    def test_render_and_cache(self, local_storage):
+        from services.previews import PREVIEW_PAGES, get_cached_previews, render_cv_previews
+        make_pdf(local_storage.local_path(CV_KEY))
+
+        assert get_cached_previews(CV_KEY, "v1") == []
+        rendered = render_cv_previews(CV_KEY, "v1")
+        assert len(rendered) == PREVIEW_PAGES
+        assert get_cached_previews(CV_KEY, "v1") == rendered
+
+    def test_new_version_replaces_stale_previews(self, local_storage):
+        from services.previews import get_cached_previews, render_cv_previews
+        make_pdf(local_storage.local_path(CV_KEY), pages=1)
+
+        old = render_cv_previews(CV_KEY, "v1")
+        render_cv_previews(CV_KEY, "v2")
+        assert not any(local_storage.exists(key) for key in old)
+        assert len(get_cached_previews(CV_KEY, "v2")) == 1
+
+    def test_word_documents_are_not_previewable(self, local_storage):
+        from services.previews import can_preview
+        local_storage.write_bytes("uploads/cvs/cv.docx", b"PK\x03\x04")
+        assert not can_preview("uploads/cvs/cv.docx")
+        assert not can_preview(None)
+
+    def test_failed_render_is_not_rescheduled(self, local_storage, monkeypatch):
+        pytest.importorskip("fitz")
+        from services import previews
+        local_storage.write_bytes(CV_KEY, b"%PDF-1.4 corrompu")
+        submitted = []
+        monkeypatch.setattr(previews, "submit_task", lambda key, fn, *args: submitted.append(key))
+
+        with pytest.raises(Exception):
+            previews.render_cv_previews(CV_KEY, "v1")
+        assert previews.has_failed(CV_KEY, "v1")
+        assert previews.get_cached_previews(CV_KEY, "v1") == []
+        previews.schedule_cv_previews(CV_KEY, "v1")
+        assert submitted == []
+        # Une nouvelle version du CV est rendue à nouveau
+        previews.schedule_cv_previews(CV_KEY, "v2")
+        assert submitted == [previews._task_key(CV_KEY, "v2")]
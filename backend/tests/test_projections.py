@@ -0,0 +1,121 @@
+"""
+Tests des projections des listes (fields= / view=summary)
+"""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from tests.helpers import compile_sql
+
+
+class TestResolve:
+    """Tests du choix des champs"""
+
+    def test_full_view_by_default(self):
+        from routers.jobs import JOB_PROJECTION
+        assert JOB_PROJECTION.resolve(None, None) is None
+        assert JOB_PROJECTION.resolve(None, "full") is None
+
+    def test_fields_take_precedence_and_include_id(self):
+        from routers.jobs import JOB_PROJECTION
+        assert JOB_PROJECTION.resolve("title, status,title", "summary") == ["id", "title", "status"]
+        assert JOB_PROJECTION.resolve(None, "summary")[:2] == ["id", "title"]
+
+    def test_unknown_field_is_rejected(self):
+        from routers.candidates import CANDIDATE_PROJECTION
+        with pytest.raises(HTTPException) as exc_info:
+            CANDIDATE_PROJECTION.resolve("first_name,password_hash", None)
+        assert exc_info.value.status_code == 400
+        assert "password_hash" in exc_info.value.detail
+
+
+class TestQueries:
+    """Tests des colonnes lues en SQL"""
+
+    def test_summary_skips_long_text_columns(self):
+        from sqlmodel import select
+        from models import Job
+        from routers.jobs import JOB_PROJECTION
+        names = JOB_PROJECTION.resolve(None, "summary")
+        sql = compile_sql(select(*JOB_PROJECTION.select_columns(names)).select_from(Job))
+        assert "jobs.title AS title" in sql
+        for column in ("missions_principales", "kpi_poste", "criteres_eliminatoires", "evolution_poste"):
+            assert column not in sql
+
+    def test_derived_fields_select_their_sources(self):
+        from sqlmodel import select
+        from models import Candidate
+        from routers.candidates import CANDIDATE_PROJECTION
+        names = CANDIDATE_PROJECTION.resolve("photo_url,photo_thumbnail_url,creator_email", None)
+        sql = compile_sql(select(*CANDIDATE_PROJECTION.select_columns(names)).select_from(Candidate))
+        assert sql.count("profile_picture_url") == 2  # Colonne et libellé, une seule fois
+        assert "notes" not in sql
+        assert "(SELECT users.email" in sql
+
+
+class TestResponse:
+    """Tests de la réponse réduite"""
+
+    def test_only_requested_fields_are_serialized(self, local_storage):
+        from routers.candidates import CANDIDATE_PROJECTION
+        names = CANDIDATE_PROJECTION.resolve("last_name,photo_url,created_at", None)
+        candidate_id = uuid4()
+        rows = [{
+            "id": candidate_id,
+            "last_name": "Martin",
+            "profile_picture_url": "/static/uploads/a.jpg",
+            "created_at": datetime(2024, 5, 1, 8, 0),
+        }]
+        response = CANDIDATE_PROJECTION.response(names, rows)
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == [{
+            "id": str(candidate_id),
+            "last_name": "Martin",
+            "photo_url": "/static/uploads/a.jpg",
+            "created_at": "2024-05-01T08:00:00",
+        }]
+
+    def test_slim_model_is_built_once(self):
+        from routers.jobs import JOB_PROJECTION
+        names = JOB_PROJECTION.resolve(None, "summary")
+        assert JOB_PROJECTION.adapter(names) is JOB_PROJECTION.adapter(list(names))
+        assert JOB_PROJECTION.adapter(names) is JOB_PROJECTION.adapter(list(reversed(names)))
+
+    def test_requested_order_is_kept(self, local_storage):
+        from routers.candidates import CANDIDATE_PROJECTION
+        candidate_id = uuid4()
+        row = {"id": candidate_id, "last_name": "Martin", "first_name": "Awa"}
+        for fields in ("last_name,first_name", "first_name,last_name"):
+            names = CANDIDATE_PROJECTION.resolve(fields, None)
+            response = CANDIDATE_PROJECTION.response(names, [row])
+            assert list(json.loads(response.body)[0]) == ["id", *fields.split(",")]
+
+
+class TestTagFilter:
+    """Tests du filtre par tag de la liste des candidats"""
+
+    class CapturingSession:
+        def __init__(self):
+            self.statements = []
+
+        def exec(self, statement):
+            self.statements.append(statement)
+            return SimpleNamespace(all=lambda: [])
+
+    def test_tag_is_filtered_in_sql_before_pagination(self):
+        from models import UserRole
+        from routers.candidates import list_candidates
+        session = self.CapturingSession()
+        user = SimpleNamespace(role=UserRole.RECRUTEUR, department=None)
+        assert list_candidates(
+            skip=0, limit=20, tag_filter="python", source_filter=None, status_filter=None,
+            fields=None, view=None, current_user=user, session=session,
+        ) == []
+        assert session.statements[0].compile().params["tags_1"] == "python"
+        sql = compile_sql(session.statements[0])
+        assert "= ANY (candidates.tags)" in sql
+        assert sql.index("ANY (candidates.tags)") < sql.index("LIMIT")
@@ -0,0 +1,95 @@
+"""
+Tests des URLs signées et de la délégation à nginx (X-Accel-Redirect)
+"""
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 1000
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch, local_storage):
+    """Stockage local temporaire (et répertoire de travail) contenant uploads/cvs/cv.pdf"""
+    monkeypatch.chdir(tmp_path)
+    cv_dir = tmp_path / "uploads" / "cvs"
+    cv_dir.mkdir(parents=True)
+    (cv_dir / "cv.pdf").write_bytes(PDF_BYTES)
+    return tmp_path
+
+
+@pytest.fixture
+def client(storage):
+    from routers import files
+    app = FastAPI()
+    app.include_router(files.router, prefix="/api")
+    return TestClient(app)
+
+
+def query_of(url):
+    return {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+
+
+class TestSignedUrls:
+    """Tests de la signature et de la vérification"""
+
+    def test_roundtrip(self, storage):
+        from services.signed_urls import make_signed_url, verify_signature
+        params = query_of(make_signed_url("uploads/cvs/cv.pdf", filename="CV.pdf"))
+        assert params["path"] == "uploads/cvs/cv.pdf"
+        assert verify_signature(params["path"], int(params["exp"]), params["sig"], params["name"])
+
+    def test_tampered_path_or_name_is_rejected(self, storage):
+        from services.signed_urls import make_signed_url, verify_signature
+        params = query_of(make_signed_url("uploads/cvs/cv.pdf", filename="CV.pdf"))
+        assert not verify_signature("uploads/cvs/other.pdf", int(params["exp"]), params["sig"], params["name"])
+        assert not verify_signature(params["path"], int(params["exp"]), params["sig"], "autre.pdf")
+
+    def test_expired_signature_is_rejected(self, storage):
+        from services.signed_urls import _sign, verify_signature
+        signature = _sign("uploads/cvs/cv.pdf", 1000, "")
+        assert not verify_signature("uploads/cvs/cv.pdf", 1000, signature)
+
+    def test_expiry_is_stable_within_window(self):
+        from services.signed_urls import get_expiry
+        assert get_expiry(300, now=1200) == get_expiry(300, now=1499) == 1800
+        assert get_expiry(300, now=1499) - 1499 >= 300
+
+    def test_paths_outside_storage_are_refused(self, storage):
+        from services.signed_urls import to_storage_path
+        assert to_storage_path(storage / "uploads" / "cvs" / "cv.pdf") == "uploads/cvs/cv.pdf"
+        for path in ("../etc/passwd", "uploads/../config.py", "main.py", "/etc/passwd"):
+            with pytest.raises(ValueError):
+                to_storage_path(path)
+
+
+class TestSignedDownloads:
+    """Tests de la route /files/signed"""
+
+    def test_valid_url_serves_file(self, client):
+        from services.signed_urls import make_signed_url
+        response = client.get(make_signed_url("uploads/cvs/cv.pdf", filename="CV.pdf"))
+        assert response.status_code == 200
+        assert response.content == PDF_BYTES
+        assert response.headers["cache-control"].startswith("private, max-age=")
+
+    def test_invalid_signature_is_forbidden(self, client):
+        from services.signed_urls import make_signed_url
+        url = make_signed_url("uploads/cvs/cv.pdf")
+        response = client.get(url.replace("sig=", "sig=0"))
+        assert response.status_code == 403
+
+    def test_x_accel_redirect(self, client, monkeypatch):
+        from config import settings
+        from services.signed_urls import make_signed_url
+        monkeypatch.setattr(settings, "x_accel_redirect", True)
+
+        response = client.get(make_signed_url("uploads/cvs/cv.pdf", filename="CV éléa.pdf"))
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["x-accel-redirect"] == "/_protected/uploads/cvs/cv.pdf"
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.headers["content-disposition"].startswith("inline; filename*=utf-8''CV%20")
@@ -0,0 +1,91 @@
+"""
+Tests des propositions de créneaux pour les demandes d'entretien client
+"""
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from tests.helpers import compile_sql
+
+
+def at(hour, minute=0):
+    return datetime(2024, 5, 6, hour, minute)
+
+
+HOUR = timedelta(hours=1)
+
+
+class TestIntervals:
+    """Tests du balayage des intervalles"""
+
+    def test_slot_interval(self):
+        from services.slot_matching import slot_interval
+        assert slot_interval("2024-05-06", "09:00", "12:30") == (at(9), at(12, 30))
+        for values in (("2024-05-06", "12:00", "09:00"), ("06/05/2024", "09:00", "10:00")):
+            with pytest.raises(HTTPException) as exc_info:
+                slot_interval(*values)
+            assert exc_info.value.status_code == 400
+
+    def test_merge_intervals(self):
+        from services.slot_matching import merge_intervals
+        assert merge_intervals([(at(11), at(12)), (at(9), at(10)), (at(9, 30), at(11))]) == [(at(9), at(12))]
+
+    def test_free_windows_skip_busy_periods(self):
+        from services.slot_matching import free_windows
+        busy = [(at(8), at(9, 30)), (at(10), at(11)), (at(11, 30), at(12)), (at(15), at(16))]
+        assert list(free_windows((at(9), at(13)), busy, HOUR)) == [(at(12), at(13))]
+        assert list(free_windows((at(9), at(13)), busy, timedelta(minutes=30))) == [
+            (at(9, 30), at(10)), (at(11), at(11, 30)), (at(12), at(13))
+        ]
+
+
+class TestMatching:
+    """Tests des propositions"""
+
+    def test_first_proposal_is_reserved_for_the_oldest_request(self):
+        from services.slot_matching import RequestSlots, match_slots
+        interviewer = uuid4()
+        first = RequestSlots(uuid4(), uuid4(), [(at(9), at(11))])
+        second = RequestSlots(uuid4(), uuid4(), [(at(9), at(11))])
+        results = match_slots([first, second], {interviewer: [(at(9), at(9, 30))]}, HOUR, limit=2)
+
+        assert [proposal["start"] for proposal in results[0]["suggestions"]] == [at(9, 30)]
+        # Le créneau 9h30-10h30 est réservé pour la première demande
+        assert results[1]["suggestions"] == []
+
+    def test_earliest_interviewer_wins(self):
+        from services.slot_matching import RequestSlots, match_slots
+        busy_one, free_one = uuid4(), uuid4()
+        request = RequestSlots(uuid4(), uuid4(), [(at(9), at(12))])
+        result = match_slots([request], {busy_one: [(at(9), at(10))], free_one: []}, HOUR, limit=3)[0]
+        assert [(proposal["start"], proposal["interviewer_id"]) for proposal in result["suggestions"]] == [
+            (at(9), free_one), (at(10), busy_one), (at(11), busy_one)
+        ]
+
+    def test_group_slots_trims_started_slots(self):
+        from services.slot_matching import group_slots
+        request_id, application_id = uuid4(), uuid4()
+        rows = [
+            {"request_id": request_id, "application_id": application_id, "starts_at": at(9), "ends_at": at(12)},
+            {"request_id": request_id, "application_id": application_id, "starts_at": at(14), "ends_at": at(15)},
+        ]
+        (request,) = group_slots(rows, now=at(10))
+        assert request.slots == [(at(10), at(12)), (at(14), at(15))]
+
+
+class TestQueries:
+    """Tests des requêtes"""
+
+    def test_busy_query_uses_indexed_period(self):
+        from services.slot_matching import build_busy_query
+        sql = compile_sql(build_busy_query([uuid4()], at(8), at(18)))
+        assert "interval '1 hour'), %(tsrange_1)s) && tsrange(" in sql
+        assert "interviews.status IN" in sql
+
+    def test_slots_query_only_pending_requests(self):
+        from services.slot_matching import build_slots_query
+        sql = compile_sql(build_slots_query([uuid4()], now=at(8)))
+        assert "client_interview_requests.status =" in sql
+        assert "client_availability_slots.ends_at >" in sql
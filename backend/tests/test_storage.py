@@ -0,0 +1,229 @@
+"""
+Tests des pilotes de stockage (local et compatible S3)
+
+Le pilote S3 est testé contre un serveur S3 simulé en mémoire (même API que
+boto3 / MinIO pour les appels utilisés), sans dépendance réseau.
+"""
+import asyncio
+import hashlib
+import io
+import itertools
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+
+
+MB = 1024 * 1024
+
+
+class FakeClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeBody:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def iter_chunks(self, chunk_size):
+        return iter(lambda: self._stream.read(chunk_size), b"")
+
+    def close(self):
+        pass
+
+
+class FakeS3Client:
+    """Serveur S3 minimal en mémoire (stand-in de MinIO)"""
+
+    MIN_PART_SIZE = 5 * MB
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self._ids = itertools.count(1)
+
+    def _store(self, key, data, content_type):
+        self.objects[key] = {
+            "data": data,
+            "content_type": content_type,
+            "last_modified": datetime.now(timezone.utc),
+            "etag": hashlib.md5(data).hexdigest(),
+        }
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self._store(Key, Body, ContentType)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None):
+        upload_id = f"upload-{next(self._ids)}"
+        self.uploads[upload_id] = {"key": Key, "parts": {}, "content_type": ContentType}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId]["parts"][PartNumber] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        upload = self.uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(upload["parts"])
+        sizes = [len(upload["parts"][number]) for number in numbers]
+        # Contrainte S3: toutes les parties sauf la dernière font au moins 5MB
+        assert all(size >= self.MIN_PART_SIZE for size in sizes[:-1])
+        self._store(Key, b"".join(upload["parts"][number] for number in numbers), upload["content_type"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def get_object(self, Bucket, Key, Range=None):
+        if Key not in self.objects:
+            raise FakeClientError("NoSuchKey")
+        data = self.objects[Key]["data"]
+        if Range:
+            start, _, end = Range.removeprefix("bytes=").partition("-")
+            data = data[int(start):int(end) + 1 if end else None]
+        return {"Body": FakeBody(data)}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise FakeClientError("404")
+        obj = self.objects[Key]
+        return {
+            "ContentLength": len(obj["data"]),
+            "LastModified": obj["last_modified"],
+            "ContentType": obj["content_type"],
+            "ETag": f'"{obj["etag"]}"',
+        }
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + 2]  # Pages courtes pour couvrir la pagination
+        truncated = start + 2 < len(keys)
+        response = {"Contents": [{"Key": key} for key in page], "IsTruncated": truncated}
+        if truncated:
+            response["NextContinuationToken"] = str(start + 2)
+        return response
+
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    import services.storage as storage_module
+    storage = storage_module.S3Storage(bucket="test", client=FakeS3Client(), public_url_base="")
+    monkeypatch.setattr(storage_module, "_storage", storage)
+    return storage
+
+
+def chunked(data, size=64 * 1024):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class TestS3Storage:
+    """Tests du pilote S3"""
+
+    def test_large_file_uses_multipart_upload(self, s3_storage):
+        data = bytes(range(256)) * (12 * MB // 256)
+        size = s3_storage.write("uploads/cvs/big.pdf", chunked(data), content_type="application/pdf")
+        assert size == len(data)
+        assert s3_storage.client.objects["uploads/cvs/big.pdf"]["data"] == data
+        assert s3_storage.client.uploads == {}
+        assert s3_storage.stat("uploads/cvs/big.pdf").content_type == "application/pdf"
+
+    def test_small_file_uses_single_put(self, s3_storage, monkeypatch):
+        monkeypatch.setattr(s3_storage.client, "create_multipart_upload", None)
+        s3_storage.write_bytes("static/uploads/photo.png", b"\x89PNG\r\n\x1a\n")
+        assert s3_storage.exists("static/uploads/photo.png")
+
+    def test_failed_stream_aborts_multipart_upload(self, s3_storage):
+        def failing_stream():
+            yield b"0" * (6 * MB)
+            raise RuntimeError("connexion interrompue")
+
+        with pytest.raises(RuntimeError):
+            s3_storage.write("uploads/cvs/broken.pdf", failing_stream())
+        assert not s3_storage.exists("uploads/cvs/broken.pdf")
+        assert s3_storage.client.uploads == {}
+
+    def test_ranged_read_and_listing(self, s3_storage):
+        s3_storage.write_bytes("uploads/cvs/a.pdf", b"0123456789")
+        for name in ("b", "c", "d"):
+            s3_storage.write_bytes(f"uploads/cvs/{name}.pdf", b"x")
+
+        assert b"".join(s3_storage.read_range("uploads/cvs/a.pdf", 2, 5)) == b"2345"
+        assert b"".join(s3_storage.read_range("uploads/cvs/a.pdf", 7)) == b"789"
+        assert s3_storage.list_keys("uploads/cvs/") == [f"uploads/cvs/{name}.pdf" for name in "abcd"]
+        assert s3_storage.stat("uploads/cvs/missing.pdf") is None
+
+    def test_open_local_downloads_temporary_copy(self, s3_storage):
+        s3_storage.write_bytes("uploads/cvs/a.pdf", b"%PDF-1.4 contenu")
+        with s3_storage.open_local("uploads/cvs/a.pdf") as path:
+            assert path.read_bytes() == b"%PDF-1.4 contenu"
+        assert not path.exists()
+
+    def test_store_upload_streams_and_checks_content(self, s3_storage):
+        from services.uploads import store_upload
+        pdf = b"%PDF-1.4\n" + b"0" * 1000
+        stored = asyncio.run(store_upload(
+            UploadFile(file=io.BytesIO(pdf), filename="cv.pdf"), "uploads/cvs/cv.pdf", {".pdf"}
+        ))
+        assert stored.key == "uploads/cvs/cv.pdf"
+        assert stored.sha256 == hashlib.sha256(pdf).hexdigest()
+        assert s3_storage.stat("uploads/cvs/cv.pdf").content_type == "application/pdf"
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(store_upload(
+                UploadFile(file=io.BytesIO(b"<html>"), filename="x.pdf"), "uploads/cvs/x.pdf", {".pdf"}
+            ))
+        assert exc_info.value.status_code == 415
+        assert not s3_storage.exists("uploads/cvs/x.pdf")
+
+    def test_download_with_range(self, s3_storage):
+        from services.downloads import send_stored_file
+        pdf = b"%PDF-1.4\n" + bytes(range(256)) * 4
+        s3_storage.write_bytes("uploads/cvs/cv.pdf", pdf, content_type="application/pdf")
+
+        app = FastAPI()
+
+        @app.get("/cv")
+        def download(request: Request):
+            return send_stored_file(request, "uploads/cvs/cv.pdf", filename="CV.pdf", content_hash="abc")
+
+        client = TestClient(app)
+        response = client.get("/cv")
+        assert response.status_code == 200
+        assert response.content == pdf
+        assert response.headers["content-disposition"] == 'inline; filename="CV.pdf"'
+
+        response = client.get("/cv", headers={"Range": "bytes=9-18"})
+        assert response.status_code == 206
+        assert response.content == pdf[9:19]
+        assert client.get("/cv", headers={"If-None-Match": '"abc"'}).status_code == 304
+
+
+class TestLocalStorage:
+    """Tests du pilote local"""
+
+    def test_roundtrip(self, local_storage):
+        local_storage.write("uploads/cvs/cv.pdf", chunked(b"0123456789", 3))
+        assert (local_storage.root / "uploads" / "cvs" / "cv.pdf").read_bytes() == b"0123456789"
+        assert b"".join(local_storage.read_range("uploads/cvs/cv.pdf", 3, 4)) == b"34"
+        assert local_storage.list_keys("uploads/cvs/cv") == ["uploads/cvs/cv.pdf"]
+        assert local_storage.public_url("static/uploads/p.jpg") == "/static/uploads/p.jpg"
+        assert local_storage.key_from_public_url("/static/uploads/p.jpg") == "static/uploads/p.jpg"
+
+        local_storage.delete("uploads/cvs/cv.pdf")
+        assert local_storage.stat("uploads/cvs/cv.pdf") is None
+
+    def test_failed_stream_leaves_no_file(self, local_storage):
+        def failing_stream():
+            yield b"abc"
+            raise RuntimeError("interrompu")
+
+        with pytest.raises(RuntimeError):
+            local_storage.write("uploads/cvs/cv.pdf", failing_stream())
+        assert list((local_storage.root / "uploads" / "cvs").iterdir()) == []
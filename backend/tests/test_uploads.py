@@ -0,0 +1,67 @@
+"""
+Tests du service d'upload en streaming
+"""
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 200_000
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"1" * 1_000
+
+
+def make_upload(content: bytes, filename: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+class TestSniffFileKind:
+    """Tests de la détection du type réel"""
+
+    def test_known_signatures(self):
+        from services.uploads import sniff_file_kind
+        assert sniff_file_kind(PDF_BYTES[:16]) == "pdf"
+        assert sniff_file_kind(PNG_BYTES[:16]) == "png"
+        assert sniff_file_kind(b"PK\x03\x04rest") == "docx"
+        assert sniff_file_kind(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+
+    def test_unknown_signature(self):
+        from services.uploads import sniff_file_kind
+        assert sniff_file_kind(b"<html>") is None
+
+
+class TestSaveUpload:
+    """Tests de l'enregistrement par blocs"""
+
+    def test_save_computes_hash_and_size(self, tmp_path):
+        from services.uploads import save_upload
+        destination = tmp_path / "cv.pdf"
+        stored = asyncio.run(save_upload(make_upload(PDF_BYTES, "cv.pdf"), destination, {".pdf"}))
+        assert stored.size == len(PDF_BYTES)
+        assert stored.sha256 == hashlib.sha256(PDF_BYTES).hexdigest()
+        assert stored.content_type == "application/pdf"
+        assert destination.read_bytes() == PDF_BYTES
+
+    def test_too_large_is_rejected_without_leftovers(self, tmp_path):
+        from services.uploads import save_upload
+        upload = make_upload(PDF_BYTES, "cv.pdf")
+        upload.size = None  # Forcer le contrôle pendant la copie
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(save_upload(upload, tmp_path / "cv.pdf", {".pdf"}, max_size=100_000))
+        assert exc_info.value.status_code == 413
+        assert list(tmp_path.iterdir()) == []
+
+    def test_content_mismatch_is_rejected(self, tmp_path):
+        from services.uploads import save_upload
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(save_upload(make_upload(PNG_BYTES, "cv.pdf"), tmp_path / "cv.pdf", {".pdf"}))
+        assert exc_info.value.status_code == 415
+        assert list(tmp_path.iterdir()) == []
+
+    def test_extension_not_allowed(self, tmp_path):
+        from services.uploads import save_upload
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(save_upload(make_upload(PNG_BYTES, "photo.png"), tmp_path / "photo.png", {".pdf"}))
+        assert exc_info.value.status_code == 400
@@ -139,7 +139,8 @@ def apply_schema_to_database(
             User, Job, Candidate, Interview, Application, Notification,
             JobHistory, ApplicationHistory, Offer, OnboardingChecklist,
             SecurityLog, Setting, Team, TeamMember, JobRecruiter,
-            ClientInterviewRequest, CandidateJobComparison
+            ClientInterviewRequest, ClientAvailabilitySlot, CandidateJobComparison,
+            KPIDailyRollup
         )
         
         logger.info(f"🔄 Application du schéma à la base de données...")
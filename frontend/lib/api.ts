@@ -890,6 +890,10 @@ export interface KPIAnalysis {
   predicted_trends: string
   risk_alerts: string[]
   opportunities: string[]
+  // Analyse générée en arrière-plan : 'pending' tant que la première n'est pas prête
+  status?: 'ready' | 'pending'
+  generated_at?: string | null
+  refresh_task_id?: string | null
 }
 
 export async function getManagerKPIsAIAnalysis(params?: {
@@ -67,6 +67,7 @@ CREATE TABLE candidates (
     email VARCHAR(255),
     phone VARCHAR(20),
     cv_file_path VARCHAR(500),                     -- Chemin vers le CV (PDF, Word)
+    cv_file_hash VARCHAR(64),                      -- Empreinte SHA-256 du CV
     profile_picture_url VARCHAR(500),               -- URL de la photo de profil
     tags TEXT[],                                    -- Tags et mots-clés (tableau)
     skills TEXT[],                                  -- Compétences du candidat (tableau)
@@ -85,7 +86,10 @@ CREATE TABLE candidates (
 CREATE INDEX idx_candidates_status ON candidates(status);
 CREATE INDEX idx_candidates_source ON candidates(source);
 CREATE INDEX idx_candidates_created_by ON candidates(created_by);
+CREATE INDEX idx_candidates_created_at ON candidates(created_at);
 CREATE INDEX idx_candidates_email ON candidates(email); -- Pour détecter les doublons
+CREATE INDEX idx_candidates_lower_email ON candidates(lower(email)) WHERE email IS NOT NULL;
+CREATE INDEX idx_candidates_lower_name ON candidates(lower(first_name), lower(last_name));
 
 -- ============================================
 -- TABLE: applications (Candidatures)
@@ -119,6 +123,7 @@ CREATE INDEX idx_applications_job_id ON applications(job_id);
 CREATE INDEX idx_applications_created_by ON applications(created_by);
 CREATE INDEX idx_applications_status ON applications(status);
 CREATE INDEX idx_applications_shortlist ON applications(is_in_shortlist);
+CREATE INDEX idx_applications_job_pipeline ON applications(job_id, status, updated_at DESC, id DESC);
 
 -- ============================================
 -- TABLE: interviews (Entretiens)
@@ -146,6 +151,9 @@ CREATE INDEX idx_interviews_application_id ON interviews(application_id);
 CREATE INDEX idx_interviews_scheduled_at ON interviews(scheduled_at);
 CREATE INDEX idx_interviews_interviewer_id ON interviews(interviewer_id);
 CREATE INDEX idx_interviews_type ON interviews(interview_type);
+CREATE INDEX idx_interviews_period ON interviews USING GIST (
+    tsrange(scheduled_at, COALESCE(scheduled_end_at, scheduled_at + interval '1 hour'), '[)')
+);
 
 -- ============================================
 -- TABLE: job_history (Historique des modifications de jobs)
@@ -157,10 +165,12 @@ CREATE TABLE job_history (
     field_name VARCHAR(100),                        -- Champ modifié
     old_value TEXT,                                 -- Ancienne valeur
     new_value TEXT,                                 -- Nouvelle valeur
+    changes JSONB,                                  -- Champs modifiés : [{"field", "old", "new"}]
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_job_history_job_id ON job_history(job_id);
+CREATE INDEX idx_job_history_changes ON job_history USING GIN (changes jsonb_path_ops);
 
 -- ============================================
 -- TABLE: application_history (Historique des candidatures)
@@ -176,6 +186,7 @@ CREATE TABLE application_history (
 );
 
 CREATE INDEX idx_application_history_application_id ON application_history(application_id);
+CREATE INDEX idx_application_history_app_created ON application_history(application_id, created_at);
 
 -- ============================================
 -- TABLE: notifications